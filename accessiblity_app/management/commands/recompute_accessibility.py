@@ -0,0 +1,43 @@
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from accessiblity_app.recompute import Point, recompute_accessibility, run_requested_recomputes
+
+
+class Command(BaseCommand):
+    help = 'Derive the computed accessibility rows from facility and population locations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--points',
+            help='CSV file with latitude, longitude and population columns; sector centroids are used otherwise',
+        )
+        parser.add_argument(
+            '--pending', action='store_true',
+            help='Only recompute if facility changes are waiting for a recompute, e.g. after a worker restart',
+        )
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            runs = run_requested_recomputes()
+            if runs is None:
+                self.stdout.write('A recompute is already running in another process.')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'Ran {runs} pending recompute(s).'))
+            return
+
+        points = None
+        if options['points']:
+            points = []
+            with open(options['points'], newline='', encoding='utf-8-sig') as rows:
+                reader = csv.DictReader(rows)
+                for row in reader:
+                    try:
+                        points.append(Point(float(row['latitude']), float(row['longitude']), int(row['population'])))
+                    except (KeyError, TypeError, ValueError):
+                        raise CommandError(f'Line {reader.line_num}: latitude, longitude and population are required')
+
+        result = recompute_accessibility(points)
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["points"]} points, {result["facilities"]} active facilities: created {result["created"]}, '
+            f'updated {result["updated"]}, deleted {result["deleted"]} rows.'
+        ))
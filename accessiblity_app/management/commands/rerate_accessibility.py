@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from accessiblity_app.models import AccessibilityRatingPolicy
+from accessiblity_app.rating import rerate
+
+
+class Command(BaseCommand):
+    help = 'Re-rate the accessibility rows under the latest rating policy, resuming an interrupted run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        policy = AccessibilityRatingPolicy.objects.order_by('-id').first()
+        if policy is None:
+            raise CommandError('No rating policy has been saved.')
+        if policy.status == 'DONE':
+            self.stdout.write(f'Policy v{policy.id} has already been applied to {policy.rows_done} rows.')
+            return
+
+        kwargs = {'chunk_size': options['chunk_size']} if options['chunk_size'] else {}
+        try:
+            policy = rerate(policy.id, **kwargs)
+        except Exception as e:
+            policy.refresh_from_db()
+            raise CommandError(f'Re-rating stopped after {policy.rows_done} rows: {e}')
+        self.stdout.write(self.style.SUCCESS(f'Policy v{policy.id}: re-rated {policy.rows_done} rows.'))
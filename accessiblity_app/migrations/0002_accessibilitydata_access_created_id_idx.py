@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessiblity_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accessibilitydata',
+            index=models.Index(fields=['created_at', 'id'], name='access_created_id_idx'),
+        ),
+    ]
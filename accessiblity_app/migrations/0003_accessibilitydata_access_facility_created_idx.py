@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessiblity_app', '0002_accessibilitydata_access_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accessibilitydata',
+            index=models.Index(fields=['health_facility', 'created_at'], name='access_facility_created_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.17 on 2026-10-18 16:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessiblity_app', '0003_accessibilitydata_access_facility_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accessibilitydata',
+            name='computed',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='accessibilitydata',
+            index=models.Index(fields=['computed', 'health_facility'], name='access_computed_facility_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.17 on 2026-10-18 16:18
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('accessiblity_app', '0004_accessibilitydata_computed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessibilityRatingPolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('good_travel_time', models.FloatField(help_text='Minutes', validators=[django.core.validators.MinValueValidator(0)])),
+                ('good_distance', models.FloatField(help_text='Kilometers', validators=[django.core.validators.MinValueValidator(0)])),
+                ('moderate_travel_time', models.FloatField(help_text='Minutes', validators=[django.core.validators.MinValueValidator(0)])),
+                ('moderate_distance', models.FloatField(help_text='Kilometers', validators=[django.core.validators.MinValueValidator(0)])),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('SUPERSEDED', 'Superseded by a newer version'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('rows_total', models.IntegerField(default=0)),
+                ('rows_done', models.IntegerField(default=0)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -1,7 +1,75 @@
+import numpy as np
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.conf import settings
 from health_facility_app.models import HealthFacility
 
+# (rating, longest travel time in minutes, longest distance in km), best first;
+# anything beyond the last one is POOR. Used until a rating policy is saved.
+RATING_THRESHOLDS = (
+    ('GOOD', 15, 5),
+    ('MODERATE', 30, 10),
+)
+
+
+def rate_accessibility(travel_times, distances, thresholds=None):
+    """
+    calculate_rating() over arrays of travel times and distances at once,
+    under the current rating policy unless thresholds are given.
+    """
+    if thresholds is None:
+        from .rating import current_thresholds
+        thresholds = current_thresholds()
+    travel_times, distances = np.asarray(travel_times), np.asarray(distances)
+    return np.select(
+        [(travel_times <= time) & (distances <= distance) for _, time, distance in thresholds],
+        [rating for rating, _, _ in thresholds],
+        default='POOR',
+    )
+
+
+class AccessibilityRatingPolicy(models.Model):
+    """
+    Rating cutoffs. Every change is saved as a new version and the latest
+    one is in force; rating.py re-rates the existing rows and records its
+    progress here.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('SUPERSEDED', 'Superseded by a newer version'),
+        ('FAILED', 'Failed'),
+    ]
+
+    good_travel_time = models.FloatField(validators=[MinValueValidator(0)], help_text="Minutes")
+    good_distance = models.FloatField(validators=[MinValueValidator(0)], help_text="Kilometers")
+    moderate_travel_time = models.FloatField(validators=[MinValueValidator(0)], help_text="Minutes")
+    moderate_distance = models.FloatField(validators=[MinValueValidator(0)], help_text="Kilometers")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    rows_total = models.IntegerField(default=0)
+    rows_done = models.IntegerField(default=0)
+    # Rows up to this id have been re-rated, so an interrupted run can resume
+    last_id = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    @property
+    def thresholds(self):
+        return (
+            ('GOOD', self.good_travel_time, self.good_distance),
+            ('MODERATE', self.moderate_travel_time, self.moderate_distance),
+        )
+
+    def __str__(self):
+        return f"Accessibility rating policy v{self.pk}"
+
+
 class AccessibilityData(models.Model):
     health_facility = models.ForeignKey(HealthFacility, on_delete=models.CASCADE, related_name='accessibility_data')
     people_served = models.IntegerField()
@@ -17,6 +85,16 @@ class AccessibilityData(models.Model):
         ('POOR', 'Poor'),
     ]
     accessibility_rating = models.CharField(max_length=20, choices=ACCESSIBILITY_RATING_CHOICES, editable=False)
+    # Written by recompute_accessibility() from facility and population locations
+    computed = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['created_at', 'id'], name='access_created_id_idx'),
+            models.Index(fields=['health_facility', 'created_at'], name='access_facility_created_idx'),
+            models.Index(fields=['computed', 'health_facility'], name='access_computed_facility_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Calculate the accessibility rating before saving
@@ -25,17 +103,18 @@ class AccessibilityData(models.Model):
 
     def calculate_rating(self):
         """
-        A custom method to calculate the accessibility rating.
-        - GOOD: Travel time <= 15 mins and distance <= 5 km
-        - MODERATE: Travel time <= 30 mins and distance <= 10 km
+        A custom method to calculate the accessibility rating under the
+        current AccessibilityRatingPolicy (RATING_THRESHOLDS before one is saved).
+        - GOOD: Travel time and distance within the GOOD cutoffs
+        - MODERATE: Travel time and distance within the MODERATE cutoffs
         - POOR: Otherwise
         """
-        if self.avg_travel_time <= 15 and self.distance_to_nearest_facility <= 5:
-            return 'GOOD'
-        elif self.avg_travel_time <= 30 and self.distance_to_nearest_facility <= 10:
-            return 'MODERATE'
-        else:
-            return 'POOR'
+        from .rating import current_thresholds
+
+        for rating, travel_time, distance in current_thresholds():
+            if self.avg_travel_time <= travel_time and self.distance_to_nearest_facility <= distance:
+                return rating
+        return 'POOR'
 
     def __str__(self):
         return f"Accessibility data for {self.health_facility.name}"
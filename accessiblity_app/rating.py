@@ -0,0 +1,167 @@
+"""
+Accessibility rating policies and set-based re-rating.
+
+The latest AccessibilityRatingPolicy holds the cutoffs in force. Workers keep
+it in memory and reload it when the cache version bumped on every new policy
+changes.
+
+Saving a policy starts a background thread that re-rates every existing row
+with one UPDATE ... SET accessibility_rating = CASE ... per CHUNK_SIZE ids,
+so no row is loaded into Python. Progress is written to the policy after each
+chunk, a run stops as soon as a newer policy exists, and an interrupted run
+can be resumed with the rerate_accessibility command. Until it finishes,
+rating_distributions() answers how the rows rate under the previous and the
+new cutoffs, next to the ratings currently stored.
+"""
+import logging
+import threading
+from django.db import connection, transaction
+from django.db.models import Case, CharField, Count, F, Value, When
+from django.utils import timezone
+from backend.cache import get_version, bump_version
+from resource_allocation_app.coverage import invalidate_coverage
+from resource_allocation_app.dashboard import invalidate_areas
+from .models import AccessibilityData, AccessibilityRatingPolicy, RATING_THRESHOLDS
+
+CHUNK_SIZE = 5000
+POLICY_NAMESPACE = 'accessibility-rating-policy'
+RATINGS = [rating for rating, _ in AccessibilityData.ACCESSIBILITY_RATING_CHOICES]
+
+logger = logging.getLogger(__name__)
+
+_loaded = (None, None)
+
+
+def invalidate_policy():
+    transaction.on_commit(lambda: bump_version(POLICY_NAMESPACE))
+
+
+def current_policy():
+    """
+    The policy in force, or None before the first one is saved.
+    """
+    global _loaded
+    version = get_version(POLICY_NAMESPACE)
+    loaded_version, policy = _loaded
+    if loaded_version == version:
+        return policy
+
+    policy = AccessibilityRatingPolicy.objects.order_by('-id').first()
+    # A policy created inside an open transaction may still be rolled back
+    if not transaction.get_connection().in_atomic_block:
+        _loaded = (version, policy)
+    return policy
+
+
+def current_thresholds():
+    policy = current_policy()
+    return policy.thresholds if policy else RATING_THRESHOLDS
+
+
+def rating_case(thresholds):
+    """
+    SQL expression rating a row under the given cutoffs, as calculate_rating() does.
+    """
+    return Case(
+        *[
+            When(avg_travel_time__lte=travel_time, distance_to_nearest_facility__lte=distance, then=Value(rating))
+            for rating, travel_time, distance in thresholds
+        ],
+        default=Value('POOR'),
+        output_field=CharField(),
+    )
+
+
+def rating_distributions(policy):
+    """
+    Row counts per rating under the policy before `policy` (the default
+    cutoffs for the first one), under `policy`, and as currently stored,
+    from one grouped scan of the table.
+    """
+    previous = AccessibilityRatingPolicy.objects.filter(id__lt=policy.id).order_by('-id').first()
+    groups = AccessibilityData.objects.annotate(
+        previous_rating=rating_case(previous.thresholds if previous else RATING_THRESHOLDS),
+        new_rating=rating_case(policy.thresholds),
+    ).values_list('previous_rating', 'new_rating', 'accessibility_rating').annotate(count=Count('id')).order_by()
+
+    distributions = {name: dict.fromkeys(RATINGS, 0) for name in ('previous', 'new', 'stored')}
+    for previous_rating, new_rating, stored_rating, count in groups:
+        distributions['previous'][previous_rating] += count
+        distributions['new'][new_rating] += count
+        distributions['stored'][stored_rating] = distributions['stored'].get(stored_rating, 0) + count
+    return distributions
+
+
+def rerate(policy_id, chunk_size=CHUNK_SIZE):
+    """
+    Re-rate every row under a policy, resuming after its last_id. Returns
+    the policy as left by the run.
+    """
+    policies = AccessibilityRatingPolicy.objects.filter(id=policy_id)
+    policy = policies.get()
+    if policy.status in ('DONE', 'SUPERSEDED'):
+        return policy
+
+    last_id = policy.last_id
+    policies.update(
+        status='RUNNING', started_at=policy.started_at or timezone.now(), error='',
+        rows_total=policy.rows_done + AccessibilityData.objects.filter(id__gt=last_id).count(),
+    )
+    case = rating_case(policy.thresholds)
+    try:
+        while True:
+            if AccessibilityRatingPolicy.objects.filter(id__gt=policy_id).exists():
+                policies.update(status='SUPERSEDED', finished_at=timezone.now())
+                break
+
+            chunk = AccessibilityData.objects.filter(id__gt=last_id)
+            upper = chunk.order_by('id').values_list('id', flat=True)[chunk_size - 1:chunk_size].first()
+            if upper is not None:
+                chunk = chunk.filter(id__lte=upper)
+            sector_ids = set(chunk.values_list('health_facility__sector_ref_id', flat=True).distinct())
+            with transaction.atomic():
+                rerated = chunk.update(accessibility_rating=case)
+                if upper is None:
+                    policies.update(
+                        rows_done=F('rows_done') + rerated, status='DONE', finished_at=timezone.now()
+                    )
+                else:
+                    policies.update(rows_done=F('rows_done') + rerated, last_id=upper)
+            # Cached dashboards and coverage gaps show the ratings
+            invalidate_areas(sector_ids)
+            invalidate_coverage()
+            if upper is None:
+                break
+            last_id = upper
+    except Exception as e:
+        policies.update(status='FAILED', error=str(e), finished_at=timezone.now())
+        raise
+    return policies.get()
+
+
+def _rerate_in_thread(policy_id):
+    try:
+        rerate(policy_id)
+    except Exception:
+        # Also recorded on the policy; the command can resume the run
+        logger.exception('Re-rating under accessibility rating policy v%s failed', policy_id)
+    finally:
+        connection.close()
+
+
+def start_rerating(policy_id):
+    thread = threading.Thread(target=_rerate_in_thread, args=(policy_id,), daemon=True)
+    thread.start()
+    return thread
+
+
+def save_policy(policy):
+    """
+    Save a new policy version and re-rate the rows in the background once
+    it is committed.
+    """
+    with transaction.atomic():
+        policy.save()
+        invalidate_policy()
+        transaction.on_commit(lambda: start_rerating(policy.id))
+    return policy
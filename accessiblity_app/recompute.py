@@ -0,0 +1,250 @@
+"""
+Accessibility figures derived from facility and population locations.
+
+Population points are matched to their nearest ACTIVE facility with NumPy:
+points and facilities become unit vectors, a chunk of points times every
+facility is one broadcast matrix product, and argmax over its rows picks
+the facility. By default the points
+are sector centroids weighted by the sector's census population; callers
+can pass their own points instead.
+
+Every facility that is nearest to at least one point gets one computed
+AccessibilityData row:
+
+- people_served: the population of those points;
+- distance_to_nearest_facility: their population-weighted mean distance;
+- avg_travel_time: that distance stretched by ROAD_FACTOR and covered at
+  TRAVEL_SPEED_KMH.
+
+Ratings are derived for all rows at once and everything is written in one
+transaction with bulk updates and inserts. Rows entered by users are left
+alone.
+
+Facility location and status changes request a recompute
+(start_recompute). Each request bumps a counter in the shared cache, and a
+background thread runs the recompute under a cross-process lock until the
+last request is covered, so one run serves every worker and changes
+committed during a run are folded into one more run. A run cut short by a
+worker restart leaves its request pending for the next change, or for
+`recompute_accessibility --pending` run from cron.
+"""
+import logging
+import threading
+import uuid
+from collections import namedtuple
+import numpy as np
+from django.core.cache import cache
+from django.db import connection, transaction
+from backend.cache import get_version, bump_version, make_key
+from backend.signals import post_bulk_create
+from geography_app.models import Sector
+from health_facility_app.models import HealthFacility
+from health_facility_app.spatial import haversine_pairs
+from population_data_app.models import PopulationData
+from .models import AccessibilityData, rate_accessibility
+
+# Road distance over straight-line distance
+ROAD_FACTOR = 1.3
+# Assumed average door-to-door speed
+TRAVEL_SPEED_KMH = 30.0
+# Largest distance matrix built at once
+MATRIX_SIZE = 2000000
+BATCH_SIZE = 1000
+
+Point = namedtuple('Point', ['latitude', 'longitude', 'population'])
+
+COMPUTED_FIELDS = ['people_served', 'avg_travel_time', 'distance_to_nearest_facility', 'accessibility_rating']
+
+logger = logging.getLogger(__name__)
+
+REQUESTED_NAMESPACE = 'accessibility-recompute-requested'
+DONE_KEY = make_key('accessibility-recompute', 'done')
+LOCK_KEY = make_key('lock', 'accessibility-recompute')
+# Longer than any run; a lock left by a killed worker expires after it
+LOCK_TIMEOUT = 600
+
+
+def sector_points():
+    """
+    One point per sector with a centroid and census data, weighted by its population.
+    """
+    populations = dict(PopulationData.objects.values_list('sector_ref_id', 'total_population'))
+    return [
+        Point(latitude, longitude, populations[sector_id])
+        for sector_id, latitude, longitude in Sector.objects.filter(
+            latitude__isnull=False, longitude__isnull=False
+        ).values_list('id', 'latitude', 'longitude')
+        if sector_id in populations
+    ]
+
+
+def _unit_vectors(latitudes, longitudes):
+    latitudes, longitudes = np.radians(latitudes), np.radians(longitudes)
+    return np.column_stack((
+        np.cos(latitudes) * np.cos(longitudes), np.cos(latitudes) * np.sin(longitudes), np.sin(latitudes),
+    ))
+
+
+def nearest_facilities(points, facility_latitudes, facility_longitudes):
+    """
+    Position of the nearest facility for every point, and its distance in km.
+    """
+    latitudes = np.array([point.latitude for point in points], dtype=np.float64)
+    longitudes = np.array([point.longitude for point in points], dtype=np.float64)
+    # On the unit sphere the nearest facility has the largest dot product, so
+    # each chunk of points needs one matrix product rather than a haversine
+    # per pair
+    facilities = _unit_vectors(facility_latitudes, facility_longitudes).T
+    nearest = np.zeros(len(points), dtype=np.int64)
+    step = max(1, MATRIX_SIZE // max(1, len(facility_latitudes)))
+    for start in range(0, len(points), step):
+        vectors = _unit_vectors(latitudes[start:start + step], longitudes[start:start + step])
+        nearest[start:start + step] = (vectors @ facilities).argmax(axis=1)
+    distances = haversine_pairs(latitudes, longitudes, facility_latitudes[nearest], facility_longitudes[nearest])
+    return nearest, distances
+
+
+def compute_accessibility(points, facility_latitudes, facility_longitudes):
+    """
+    Per-facility (served, people served, mean distance in km, travel time in
+    minutes, rating) arrays, where served is False for facilities nearest to
+    no point.
+    """
+    count = len(facility_latitudes)
+    if not points or not count:
+        return (
+            np.zeros(count, dtype=bool), np.zeros(count, dtype=np.int64),
+            np.zeros(count), np.zeros(count), np.full(count, 'POOR'),
+        )
+
+    nearest, distances = nearest_facilities(points, facility_latitudes, facility_longitudes)
+    populations = np.array([point.population for point in points], dtype=np.float64)
+    people = np.bincount(nearest, weights=populations, minlength=count)
+    points_per_facility = np.bincount(nearest, minlength=count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Unpopulated catchments fall back to the plain mean
+        mean_distance = np.where(
+            people > 0,
+            np.bincount(nearest, weights=populations * distances, minlength=count) / people,
+            np.bincount(nearest, weights=distances, minlength=count) / points_per_facility,
+        )
+    mean_distance = np.nan_to_num(mean_distance).round(2)
+    travel_time = (mean_distance * ROAD_FACTOR / TRAVEL_SPEED_KMH * 60).round(1)
+    return (
+        points_per_facility > 0, people.round().astype(np.int64),
+        mean_distance, travel_time, rate_accessibility(travel_time, mean_distance),
+    )
+
+
+def recompute_accessibility(points=None):
+    """
+    Rewrite the computed AccessibilityData rows from the ACTIVE facilities
+    with a location and `points` (sector_points() when None). Returns
+    {'points', 'facilities', 'created', 'updated', 'deleted'}; rows whose
+    figures did not change are not written.
+    """
+    if points is None:
+        points = sector_points()
+    facilities = list(HealthFacility.objects.filter(
+        status='ACTIVE', latitude__isnull=False, longitude__isnull=False
+    ).values_list('id', 'latitude', 'longitude', 'created_by_id'))
+    facility_latitudes = np.array([row[1] for row in facilities], dtype=np.float64)
+    facility_longitudes = np.array([row[2] for row in facilities], dtype=np.float64)
+    served, people, distances, travel_times, ratings = compute_accessibility(
+        points, facility_latitudes, facility_longitudes
+    )
+
+    with transaction.atomic():
+        existing = {}
+        duplicates = []
+        for row in AccessibilityData.objects.filter(computed=True).order_by('id'):
+            if row.health_facility_id in existing:
+                duplicates.append(row.id)
+            else:
+                existing[row.health_facility_id] = row
+
+        updated, created = [], []
+        people, distances, travel_times, ratings = (
+            people.tolist(), distances.tolist(), travel_times.tolist(), ratings.tolist()
+        )
+        for position in np.flatnonzero(served).tolist():
+            facility_id, _, _, created_by_id = facilities[position]
+            values = (people[position], travel_times[position], distances[position], ratings[position])
+            row = existing.pop(facility_id, None)
+            if row is None:
+                row = AccessibilityData(health_facility_id=facility_id, created_by_id=created_by_id, computed=True)
+                created.append(row)
+            elif tuple(getattr(row, field) for field in COMPUTED_FIELDS) != values:
+                updated.append(row)
+            else:
+                continue
+            for field, value in zip(COMPUTED_FIELDS, values):
+                setattr(row, field, value)
+
+        stale = duplicates + [row.id for row in existing.values()]
+        deleted, _ = AccessibilityData.objects.filter(id__in=stale).delete() if stale else (0, None)
+        AccessibilityData.objects.bulk_update(updated, COMPUTED_FIELDS, batch_size=BATCH_SIZE)
+        AccessibilityData.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        # Upserted rows are announced like created ones, as the census import does
+        post_bulk_create.send(sender=AccessibilityData, objs=updated + created)
+
+    return {
+        'points': len(points),
+        'facilities': len(facilities),
+        'created': len(created),
+        'updated': len(updated),
+        'deleted': deleted,
+    }
+
+
+def recompute_pending():
+    return cache.get(DONE_KEY) != get_version(REQUESTED_NAMESPACE)
+
+
+def run_requested_recomputes():
+    """
+    Recompute until every request made so far is covered, holding the
+    cross-process lock. Returns the number of runs, or None when another
+    process holds the lock. A failed run is logged and left pending.
+    """
+    runs = 0
+    while recompute_pending():
+        token = uuid.uuid4().hex
+        if not cache.add(LOCK_KEY, token, LOCK_TIMEOUT):
+            return runs or None
+        try:
+            while recompute_pending():
+                requested = get_version(REQUESTED_NAMESPACE)
+                try:
+                    recompute_accessibility()
+                except Exception:
+                    logger.exception('Accessibility recompute failed')
+                    return runs
+                cache.set(DONE_KEY, requested, None)
+                runs += 1
+        finally:
+            if cache.get(LOCK_KEY) == token:
+                cache.delete(LOCK_KEY)
+        # A request made while the lock was being released is picked up here
+    return runs
+
+
+def _recompute_in_thread():
+    try:
+        run_requested_recomputes()
+    finally:
+        connection.close()
+
+
+def start_recompute():
+    """
+    Request a recompute from sector_points() and run it in a background
+    thread. Returns the thread, or None when a run in progress, in this
+    process or another, will pick the request up.
+    """
+    bump_version(REQUESTED_NAMESPACE)
+    if cache.get(LOCK_KEY) is not None:
+        return None
+    thread = threading.Thread(target=_recompute_in_thread, daemon=True)
+    thread.start()
+    return thread
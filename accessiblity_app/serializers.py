@@ -1,35 +1,22 @@
 from rest_framework import serializers
 from health_facility_app.models import HealthFacility
-from .models import AccessibilityData
-from health_facility_app.models import HealthFacility
-from userApp.models import CustomUser
-
-# Serializer for the created_by user
-class CustomUserSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = CustomUser()  # Fetches the custom user model
-        fields = ['id', 'phone_number', 'email', 'role', 'is_active', 'is_staff', 'created_at']  # Specify desired fields
+from .models import AccessibilityData, AccessibilityRatingPolicy
+from health_facility_app.serializers import HealthFacilitySerializer, CustomUserSerializer
+from backend.serializers import DynamicFieldsMixin
 
-# Serializer for the health facility
-class HealthFacilitySerializer(serializers.ModelSerializer):
-    created_by = CustomUserSerializer(read_only=True)  # Nest the user serializer
-
-    class Meta:
-        model = HealthFacility
-        fields = '__all__'
-        read_only_fields = ('id','created_at', 'created_by')
-        
-        
-
-class AccessibilityDataSerializer(serializers.ModelSerializer):
-    health_facility = HealthFacilitySerializer(read_only=True)
-    created_by = CustomUserSerializer(read_only=True)
+class AccessibilityDataSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    health_facility = serializers.PrimaryKeyRelatedField(read_only=True)
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
     accessibility_rating = serializers.CharField(read_only=True)  # Make it read-only
     health_facility_id = serializers.PrimaryKeyRelatedField(
         queryset=HealthFacility.objects.all(),
         source='health_facility',  # Maps to the foreign key
         write_only=True
     )
+    expandable_fields = {
+        'health_facility': HealthFacilitySerializer,
+        'created_by': CustomUserSerializer,
+    }
 
     class Meta:
         model = AccessibilityData
@@ -41,7 +28,55 @@ class AccessibilityDataSerializer(serializers.ModelSerializer):
             'avg_travel_time',
             'distance_to_nearest_facility',
             'accessibility_rating',
+            'computed',
             'created_at',
             'created_by'
         ]
-        read_only_fields = ['id', 'accessibility_rating', 'created_at', 'created_by']
+        read_only_fields = ['id', 'accessibility_rating', 'computed', 'created_at', 'created_by']
+
+
+class PopulationPointSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    population = serializers.IntegerField(min_value=0)
+
+
+class AccessibilityRatingPolicySerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AccessibilityRatingPolicy
+        fields = [
+            'id',
+            'good_travel_time',
+            'good_distance',
+            'moderate_travel_time',
+            'moderate_distance',
+            'status',
+            'rows_total',
+            'rows_done',
+            'progress',
+            'error',
+            'created_at',
+            'started_at',
+            'finished_at',
+            'created_by',
+        ]
+        read_only_fields = [
+            'id', 'status', 'rows_total', 'rows_done', 'error', 'created_at', 'started_at', 'finished_at', 'created_by'
+        ]
+
+    def get_progress(self, obj):
+        # Share of the rows re-rated so far, from 0 to 1
+        if obj.status == 'DONE':
+            return 1.0
+        return round(obj.rows_done / obj.rows_total, 4) if obj.rows_total else 0.0
+
+    def validate(self, data):
+        if data['good_travel_time'] > data['moderate_travel_time']:
+            raise serializers.ValidationError(
+                {'good_travel_time': 'The GOOD travel time cannot exceed the MODERATE one.'}
+            )
+        if data['good_distance'] > data['moderate_distance']:
+            raise serializers.ValidationError({'good_distance': 'The GOOD distance cannot exceed the MODERATE one.'})
+        return data
@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from health_facility_app.models import HealthFacility
+from .recompute import start_recompute
+
+
+def _located(status, latitude, longitude):
+    # Only ACTIVE facilities with a location take part in the recompute
+    return status == 'ACTIVE' and latitude is not None and longitude is not None
+
+
+def _recompute_later():
+    # Requested once the change is committed; one background run serves every worker
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        start_recompute()
+        return
+
+    # A rolled back savepoint discards its hooks, so check the hook is still queued
+    scheduled = any(hook[1] is start_recompute for hook in connection.run_on_commit)
+    if not scheduled:
+        transaction.on_commit(start_recompute)
+
+
+@receiver(pre_save, sender=HealthFacility)
+def remember_location(sender, instance, **kwargs):
+    instance._previous_location = None
+    if instance.pk and not instance._state.adding:
+        instance._previous_location = sender.objects.filter(pk=instance.pk).values_list(
+            'status', 'latitude', 'longitude'
+        ).first()
+
+
+@receiver(post_save, sender=HealthFacility)
+def facility_location_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_location', None)
+    current = (instance.status, instance.latitude, instance.longitude)
+    if previous != current and (_located(*current) or (previous and _located(*previous))):
+        _recompute_later()
+
+
+@receiver(post_delete, sender=HealthFacility)
+def facility_location_deleted(sender, instance, **kwargs):
+    if _located(instance.status, instance.latitude, instance.longitude):
+        _recompute_later()
@@ -1,3 +1,215 @@
+import io
+import threading
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from backend.testing import FastPathEquivalenceMixin, make_user, populate_area
+from health_facility_app.models import HealthFacility
+from . import rating, recompute
+from .models import AccessibilityData, AccessibilityRatingPolicy
 
-# Create your tests here.
+
+class AccessibilityFastPathTests(FastPathEquivalenceMixin, TestCase):
+    ENDPOINTS = [
+        ('GET', '/accessibility/accessibilities/', {}, None),
+        ('GET', '/accessibility/user/', {}, None),
+        ('GET', '/accessibility/facility/', {}, {'facility_name': 'kimironko facility 3'}),
+    ]
+    FIELDS = ['id,people_served,accessibility_rating,computed', 'id,created_at,avg_travel_time,health_facility']
+    EXPAND = ['health_facility', 'health_facility,health_facility.created_by', 'created_by']
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 20)
+
+
+class RecomputeSchedulingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 4)
+
+    def setUp(self):
+        patcher = mock.patch('accessiblity_app.signals.start_recompute')
+        self.start_recompute = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_location_changes_start_one_background_run_on_commit(self):
+        computed = AccessibilityData.objects.filter(computed=True).count()
+        with self.captureOnCommitCallbacks(execute=True):
+            for i, facility in enumerate(HealthFacility.objects.order_by('id')):
+                facility.latitude, facility.longitude = -1.95 + i / 100, 30.1
+                facility.save()
+            self.start_recompute.assert_not_called()
+        self.start_recompute.assert_called_once_with()
+        # Nothing was recomputed in the request
+        self.assertEqual(AccessibilityData.objects.filter(computed=True).count(), computed)
+
+    def test_other_edits_start_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            facility = HealthFacility.objects.order_by('id').first()
+            facility.capacity = 99
+            facility.save()
+        self.start_recompute.assert_not_called()
+
+
+class BackgroundRecomputeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(recompute, 'recompute_accessibility', return_value={})
+        self.run = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_requests_during_a_run_are_folded_into_one_more_run(self):
+        started, release = threading.Event(), threading.Event()
+
+        def first_run_blocks():
+            if not started.is_set():
+                started.set()
+                release.wait(5)
+            return {}
+
+        self.run.side_effect = first_run_blocks
+        thread = recompute.start_recompute()
+        self.assertTrue(started.wait(5))
+        self.assertIsNone(recompute.start_recompute())
+        self.assertIsNone(recompute.start_recompute())
+        release.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.run.call_count, 2)
+        self.assertFalse(recompute.recompute_pending())
+
+    def test_a_run_in_another_process_takes_the_request(self):
+        cache.add(recompute.LOCK_KEY, 'another worker')
+        self.assertIsNone(recompute.start_recompute())
+        self.assertIsNone(recompute.run_requested_recomputes())
+        self.run.assert_not_called()
+        self.assertTrue(recompute.recompute_pending())
+
+    def test_pending_command_catches_up_after_a_lost_run(self):
+        # A worker died holding the lock, which has since expired
+        cache.add(recompute.LOCK_KEY, 'dead worker')
+        recompute.start_recompute()
+        cache.delete(recompute.LOCK_KEY)
+
+        output = io.StringIO()
+        call_command('recompute_accessibility', '--pending', stdout=output)
+        self.assertIn('Ran 1 pending', output.getvalue())
+        call_command('recompute_accessibility', '--pending', stdout=output)
+        self.assertIn('Ran 0 pending', output.getvalue())
+        self.assertEqual(self.run.call_count, 1)
+
+    def test_a_failed_run_stays_pending(self):
+        self.run.side_effect = [RuntimeError, {}]
+        with self.assertLogs('accessiblity_app.recompute', 'ERROR'):
+            recompute.start_recompute().join(5)
+        self.assertTrue(recompute.recompute_pending())
+        self.assertIsNone(cache.get(recompute.LOCK_KEY))
+        self.assertEqual(recompute.run_requested_recomputes(), 1)
+        self.assertFalse(recompute.recompute_pending())
+
+
+class RatingPolicyTests(TestCase):
+    ROWS = 20
+    CUTOFFS = {'good_travel_time': 10, 'good_distance': 4, 'moderate_travel_time': 40, 'moderate_distance': 12}
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', cls.ROWS)
+        cls.ids = list(AccessibilityData.objects.order_by('id').values_list('id', flat=True))
+        for i, row_id in enumerate(cls.ids):
+            AccessibilityData.objects.filter(id=row_id).update(
+                avg_travel_time=i * 3, distance_to_nearest_facility=i, accessibility_rating='POOR'
+            )
+
+    def setUp(self):
+        patcher = mock.patch('accessiblity_app.rating.start_rerating')
+        self.start_rerating = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def expected_ratings(self, ids):
+        return {
+            row_id: 'GOOD' if i * 3 <= 10 and i <= 4 else 'MODERATE' if i * 3 <= 40 and i <= 12 else 'POOR'
+            for i, row_id in enumerate(self.ids) if row_id in ids
+        }
+
+    def stored_ratings(self, ids):
+        return dict(AccessibilityData.objects.filter(id__in=ids).values_list('id', 'accessibility_rating'))
+
+    def create_policy(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/accessibility/rating-policy/create/', self.CUTOFFS, format='json')
+        self.assertEqual(response.status_code, 202, response.data)
+        return AccessibilityRatingPolicy.objects.get(id=response.data['id'])
+
+    def test_saving_a_policy_rerates_in_the_background(self):
+        policy = self.create_policy()
+        self.start_rerating.assert_called_once_with(policy.id)
+        self.assertEqual(policy.status, 'PENDING')
+        self.assertEqual(set(self.stored_ratings(self.ids).values()), {'POOR'})
+
+    def test_rows_are_rerated_by_chunked_updates(self):
+        policy = self.create_policy()
+        with CaptureQueriesContext(connection) as queries:
+            policy = rating.rerate(policy.id, chunk_size=7)
+        self.assertEqual(self.stored_ratings(self.ids), self.expected_ratings(self.ids))
+        self.assertEqual((policy.status, policy.rows_total, policy.rows_done), ('DONE', self.ROWS, self.ROWS))
+        updates = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('UPDATE "accessiblity_app_accessibilitydata"')
+        ]
+        self.assertEqual(len(updates), 3)
+        self.assertTrue(all('CASE WHEN' in sql for sql in updates))
+
+    def test_an_interrupted_run_resumes_after_last_id(self):
+        policy = self.create_policy()
+        AccessibilityRatingPolicy.objects.filter(id=policy.id).update(status='RUNNING', rows_done=10, last_id=self.ids[9])
+        policy = rating.rerate(policy.id, chunk_size=7)
+        self.assertEqual((policy.status, policy.rows_done, policy.rows_total), ('DONE', self.ROWS, self.ROWS))
+        # Rows up to last_id were done before the interruption and aren't touched again
+        self.assertEqual(set(self.stored_ratings(self.ids[:10]).values()), {'POOR'})
+        self.assertEqual(self.stored_ratings(self.ids[10:]), self.expected_ratings(self.ids[10:]))
+
+    def test_a_failing_chunk_marks_the_policy_failed(self):
+        policy = self.create_policy()
+        with mock.patch('accessiblity_app.rating.invalidate_coverage', side_effect=[None, RuntimeError('boom')]):
+            with self.assertRaisesMessage(RuntimeError, 'boom'):
+                rating.rerate(policy.id, chunk_size=7)
+        policy.refresh_from_db()
+        self.assertEqual((policy.status, policy.error, policy.rows_done), ('FAILED', 'boom', 14))
+        self.assertEqual(policy.last_id, self.ids[13])
+        self.assertIsNotNone(policy.finished_at)
+
+        # The command resumes it
+        call_command('rerate_accessibility', '--chunk-size', '7', stdout=io.StringIO())
+        policy.refresh_from_db()
+        self.assertEqual((policy.status, policy.rows_done), ('DONE', self.ROWS))
+        self.assertEqual(self.stored_ratings(self.ids), self.expected_ratings(self.ids))
+
+    def test_background_failures_are_logged(self):
+        policy = self.create_policy()
+        # The test database connection must stay open
+        with mock.patch('accessiblity_app.rating.connection'), \
+                mock.patch('accessiblity_app.rating.rerate', side_effect=RuntimeError('boom')):
+            with self.assertLogs('accessiblity_app.rating', 'ERROR') as logs:
+                rating._rerate_in_thread(policy.id)
+        self.assertIn('policy v%s failed' % policy.id, logs.output[0])
+        self.assertIn('RuntimeError: boom', logs.output[0])
+
+    def test_a_newer_policy_supersedes_a_run(self):
+        policy = self.create_policy()
+        self.create_policy()
+        policy = rating.rerate(policy.id)
+        self.assertEqual((policy.status, policy.rows_done), ('SUPERSEDED', 0))
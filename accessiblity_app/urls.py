@@ -9,4 +9,8 @@ urlpatterns = [
     path('update/<int:pk>/', views.update_accessibility_data, name='update_accessibility_data'),
     path('delete/<int:pk>/', views.delete_accessibility_data, name='delete_accessibility_data'),
     path('user/', views.get_accessibility_data_by_user, name='get_user_accessibilities'),
+    path('recompute/', views.recompute_accessibility_data, name='recompute_accessibility_data'),
+    path('rating-policy/', views.get_rating_policy, name='get_rating_policy'),
+    path('rating-policy/create/', views.create_rating_policy, name='create_rating_policy'),
+    path('rating-policy/<int:pk>/', views.get_rating_policy_by_id, name='get_rating_policy_by_id'),
 ]
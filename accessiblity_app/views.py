@@ -2,8 +2,12 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from .models import AccessibilityData
-from .serializers import AccessibilityDataSerializer
+from .models import AccessibilityData, AccessibilityRatingPolicy
+from .serializers import AccessibilityDataSerializer, PopulationPointSerializer, AccessibilityRatingPolicySerializer
+from .recompute import Point, recompute_accessibility
+from .rating import rating_distributions, save_policy
+from backend.streaming import is_streaming_requested, streaming_json_response
+from backend.pagination import paginated_response
 from health_facility_app.models import HealthFacility
 
 @api_view(['POST'])
@@ -22,7 +26,7 @@ def create_accessibility_data(request):
         # Set created_by to the current user
         data['created_by'] = request.user.id
 
-        serializer = AccessibilityDataSerializer(data=data)
+        serializer = AccessibilityDataSerializer(data=data, context={'request': request})
         if serializer.is_valid():
             serializer.save(created_by=request.user)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -39,7 +43,7 @@ def create_accessibility_data(request):
 def get_accessibility_data_by_id(request, pk):
     try:
         data = AccessibilityData.objects.get(id=pk)
-        serializer = AccessibilityDataSerializer(data)
+        serializer = AccessibilityDataSerializer(data, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     except AccessibilityData.DoesNotExist:
         return Response({"error": f"Accessibility data with ID {pk} does not exist."}, status=status.HTTP_404_NOT_FOUND)
@@ -51,12 +55,13 @@ def get_accessibility_data_by_id(request, pk):
 @permission_classes([IsAuthenticated])
 def get_all_accessibility_data(request):
     """
-    Retrieve all accessibility records.
+    Retrieve all accessibility records. Pass ?stream=1 to stream the list.
     """
     try:
         data = AccessibilityData.objects.all()
-        serializer = AccessibilityDataSerializer(data, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if is_streaming_requested(request):
+            return streaming_json_response(request, data, AccessibilityDataSerializer)
+        return paginated_response(request, data, AccessibilityDataSerializer)
     except Exception as e:
         return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -70,8 +75,7 @@ def get_accessibility_data_by_user(request):
     try:
         user = request.user
         data = AccessibilityData.objects.filter(created_by=user)
-        serializer = AccessibilityDataSerializer(data, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginated_response(request, data, AccessibilityDataSerializer)
     except Exception as e:
         return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -90,13 +94,12 @@ def get_accessibility_data_by_facility(request):
             return Response({"error": "Facility name is required."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            facility = HealthFacility.objects.get(name__iexact=facility_name)  # Case-insensitive match
+            facility = HealthFacility.objects.get(name__lower=facility_name.lower())  # Case-insensitive match
         except HealthFacility.DoesNotExist:
             return Response({"error": f"Health facility with name '{facility_name}' does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
         data = AccessibilityData.objects.filter(health_facility=facility)
-        serializer = AccessibilityDataSerializer(data, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginated_response(request, data, AccessibilityDataSerializer)
     except Exception as e:
         return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -114,7 +117,7 @@ def update_accessibility_data(request, pk):
         if data.created_by != request.user:
             return Response({"error": "You do not have permission to update this record."}, status=status.HTTP_403_FORBIDDEN)
 
-        serializer = AccessibilityDataSerializer(data, data=request.data, partial=True)
+        serializer = AccessibilityDataSerializer(data, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -142,3 +145,76 @@ def delete_accessibility_data(request, pk):
         return Response({"error": f"Accessibility data with ID {pk} does not exist."}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def recompute_accessibility_data(request):
+    """
+    Derive the computed accessibility rows from facility locations. The body
+    may list population points as {"points": [{"latitude", "longitude",
+    "population"}]}; sector centroids are used otherwise.
+    """
+    try:
+        points = None
+        if request.data.get('points') is not None:
+            serializer = PopulationPointSerializer(data=request.data['points'], many=True)
+            if not serializer.is_valid():
+                return Response({"points": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+            points = [Point(**point) for point in serializer.validated_data]
+
+        return Response(recompute_accessibility(points), status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_rating_policy(request):
+    """
+    The rating policy in force and the progress of re-rating the rows under it.
+    """
+    try:
+        policy = AccessibilityRatingPolicy.objects.order_by('-id').first()
+        if policy is None:
+            return Response({"error": "No rating policy has been saved; the default cutoffs apply."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(AccessibilityRatingPolicySerializer(policy).data, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_rating_policy(request):
+    """
+    Save new rating cutoffs as the next policy version. Existing rows are
+    re-rated in the background.
+    """
+    try:
+        serializer = AccessibilityRatingPolicySerializer(data=request.data)
+        if serializer.is_valid():
+            policy = save_policy(AccessibilityRatingPolicy(created_by=request.user, **serializer.validated_data))
+            return Response(AccessibilityRatingPolicySerializer(policy).data, status=status.HTTP_202_ACCEPTED)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_rating_policy_by_id(request, pk):
+    """
+    One policy version with its re-rating progress, and the rating counts
+    under the previous cutoffs, under this version's and as stored.
+    """
+    try:
+        policy = AccessibilityRatingPolicy.objects.get(id=pk)
+        data = AccessibilityRatingPolicySerializer(policy).data
+        data['distributions'] = rating_distributions(policy)
+        return Response(data, status=status.HTTP_200_OK)
+    except AccessibilityRatingPolicy.DoesNotExist:
+        return Response({"error": f"Rating policy with ID {pk} does not exist."}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({"error": f"Unexpected error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
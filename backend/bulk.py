@@ -0,0 +1,50 @@
+"""
+Bulk upserts that work on every supported database backend.
+
+PostgreSQL and SQLite name the unique fields of INSERT ... ON CONFLICT DO
+UPDATE. MySQL's ON DUPLICATE KEY UPDATE can't name them and matches any
+unique key instead, and Django refuses unique_fields there. Backends without
+any upsert insert what is new and update the rest by primary key.
+"""
+from django.db import connections, router
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=None):
+    """
+    Insert `objs`, or update `update_fields` of the rows that already have
+    the same `unique_fields`. Primary keys may be left unset.
+    """
+    objs = list(objs)
+    if not objs:
+        return objs
+    features = connections[router.db_for_write(model)].features
+    if features.supports_update_conflicts_with_target:
+        return model.objects.bulk_create(
+            objs, batch_size=batch_size, update_conflicts=True,
+            unique_fields=unique_fields, update_fields=update_fields,
+        )
+    if features.supports_update_conflicts:
+        return model.objects.bulk_create(
+            objs, batch_size=batch_size, update_conflicts=True, update_fields=update_fields,
+        )
+
+    model.objects.bulk_create(objs, batch_size=batch_size, ignore_conflicts=True)
+    attnames = [model._meta.get_field(name).attname for name in unique_fields]
+    # bulk_update() doesn't fill in auto_now fields the way an upsert does
+    auto_now = [
+        field for field in map(model._meta.get_field, update_fields) if getattr(field, 'auto_now', False)
+    ]
+    chunk = batch_size or len(objs)
+    for first in range(0, len(objs), chunk):
+        batch = objs[first:first + chunk]
+        # Each field matches any key of the batch; the exact keys are matched here
+        candidates = model.objects.filter(**{
+            f'{attname}__in': {getattr(obj, attname) for obj in batch} for attname in attnames
+        })
+        pks = {tuple(row[1:]): row[0] for row in candidates.values_list('pk', *attnames)}
+        for obj in batch:
+            obj.pk = pks.get(tuple(getattr(obj, attname) for attname in attnames))
+            for field in auto_now:
+                field.pre_save(obj, add=False)
+        model.objects.bulk_update([obj for obj in batch if obj.pk is not None], update_fields)
+    return objs
@@ -0,0 +1,123 @@
+"""
+Versioned caching on top of Django's cache framework.
+
+Cached values live under a namespace with a version counter. Bumping the
+version makes every entry of the namespace unreachable, so invalidating a
+namespace is a single cache write instead of a key scan. Hit/miss counters
+are kept in the cache too, so they are shared by all workers when a shared
+backend is configured.
+
+A bump only reaches other processes through a shared cache. In a
+process-local cache, version counters expire after LOCAL_VERSION_TIMEOUT
+seconds instead, and the fresh version that replaces them makes each
+process reload its tables and rebuild its cached values.
+"""
+import time
+from urllib.parse import quote
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def make_key(*parts):
+    return ':'.join(quote(str(part), safe='') for part in parts)
+
+
+def _fresh_version():
+    # Time based, so a version counter lost to eviction never restarts at a
+    # value that still has entries cached under it
+    return int(time.time() * 1000)
+
+
+def _version_timeout():
+    if isinstance(caches['default'], LocMemCache):
+        return settings.LOCAL_VERSION_TIMEOUT
+    return None
+
+
+def get_version(namespace):
+    key = make_key('version', namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=_version_timeout())
+        version = cache.get(key)
+    return version
+
+
+def get_versions(namespaces):
+    keys = {make_key('version', namespace): namespace for namespace in namespaces}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for namespace in namespaces:
+        if namespace not in versions:
+            versions[namespace] = get_version(namespace)
+    return versions
+
+
+def bump_version(namespace):
+    key = make_key('version', namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=_version_timeout())
+
+
+def bump_versions(namespaces):
+    """
+    Bump many namespaces with two cache round trips instead of one each.
+    Every version moves to the current time in milliseconds, or one past
+    its current value if that is higher, so it never repeats a value.
+    """
+    keys = [make_key('version', namespace) for namespace in namespaces]
+    current = cache.get_many(keys)
+    fresh = _fresh_version()
+    cache.set_many({key: max(current.get(key, 0) + 1, fresh) for key in keys}, timeout=_version_timeout())
+
+
+def record(group, outcome, count=1):
+    key = make_key('stats', group, outcome)
+    try:
+        cache.incr(key, count)
+    except ValueError:
+        if not cache.add(key, count, timeout=None):
+            cache.incr(key, count)
+
+
+def get_stats(group):
+    hits = cache.get(make_key('stats', group, 'hit'), 0)
+    misses = cache.get(make_key('stats', group, 'miss'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
+
+
+def get_many_versioned(group, namespaces, build, timeout=DEFAULT_TIMEOUT):
+    """
+    Fetch one cached value per namespace, building the missing ones in a
+    single call. `build` receives the list of missing namespaces and returns
+    a dict keyed by namespace.
+    """
+    versions = get_versions(namespaces)
+    keys = {namespace: make_key(group, namespace, versions[namespace]) for namespace in namespaces}
+
+    found = cache.get_many(keys.values())
+    values = {namespace: found[key] for namespace, key in keys.items() if key in found}
+    missing = [namespace for namespace in namespaces if namespace not in values]
+
+    if values:
+        record(group, 'hit', len(values))
+    if missing:
+        record(group, 'miss', len(missing))
+        built = build(missing)
+        cache.set_many({keys[namespace]: built[namespace] for namespace in missing}, timeout)
+        values.update(built)
+
+    return values
+
+
+def get_versioned(group, namespace, build, timeout=DEFAULT_TIMEOUT):
+    return get_many_versioned(group, [namespace], lambda missing: {namespace: build()}, timeout)[namespace]
@@ -0,0 +1,186 @@
+"""
+Full-table extracts as CSV or NDJSON.
+
+GET /export/<name>.csv and /export/<name>.ndjson stream every row that
+matches the filters. Rows are read in primary key batches (see
+iter_pk_chunks), rendered by the values() fast path and written out a batch
+at a time, so memory stays flat however large the table is. Clients that
+send Accept-Encoding: gzip get a gzipped stream.
+
+Filters are the ones the list endpoints take in their URLs, passed as query
+parameters, e.g. /export/incidents.csv?district=Gasabo&status=active.
+?fields= picks columns as it does for the JSON endpoints.
+"""
+import csv
+import json
+import re
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from rest_framework import status
+from rest_framework.decorators import api_view, content_negotiation_class, permission_classes
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from geography_app.resolver import resolve_district, resolve_sector, resolve_sector_ids
+from health_facility_app.models import HealthFacility
+from health_facility_app.serializers import HealthFacilitySerializer
+from disease_incident_app.models import DiseaseIncident
+from disease_incident_app.serializers import DiseaseIncidentSerializer
+from population_data_app.models import PopulationData
+from population_data_app.serializers import PopulationDataSerializer
+from accessiblity_app.models import AccessibilityData
+from accessiblity_app.serializers import AccessibilityDataSerializer
+from resource_allocation_app.models import ResourceAllocation
+from resource_allocation_app.serializers import ResourceAllocationSerializer
+from search_app.index import facility_ids_containing
+from .fastpath import get_values_renderer
+from .streaming import iter_pk_chunks
+
+CHUNK_SIZE = 2000
+
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def _area_filter(prefix=''):
+    def apply(queryset, params):
+        district, sector = params.get('district'), params.get('sector')
+        if district and sector:
+            return queryset.filter(**{prefix + 'sector_ref_id': resolve_sector(district, sector)})
+        if district:
+            return queryset.filter(**{prefix + 'district_ref_id': resolve_district(district)})
+        if sector:
+            return queryset.filter(**{prefix + 'sector_ref_id__in': resolve_sector_ids(sector)})
+        return queryset
+    return apply
+
+
+def _param_filter(param, lookup, convert=str):
+    def apply(queryset, params):
+        value = params.get(param)
+        return queryset.filter(**{lookup: convert(value)}) if value else queryset
+    return apply
+
+
+# name -> (model, serializer, filters)
+EXPORTS = {
+    'facilities': (HealthFacility, HealthFacilitySerializer, [
+        _area_filter(),
+        _param_filter('name', 'id__in', facility_ids_containing),
+        _param_filter('status', 'status', str.upper),
+    ]),
+    'incidents': (DiseaseIncident, DiseaseIncidentSerializer, [
+        _area_filter('health_facility__'),
+        _param_filter('facility', 'health_facility_id', int),
+        _param_filter('disease', 'disease_name__lower', str.lower),
+        _param_filter('status', 'status', str.upper),
+    ]),
+    'population': (PopulationData, PopulationDataSerializer, [
+        _area_filter(),
+        _param_filter('status', 'socioeconomic_status', str.upper),
+    ]),
+    'accessibility': (AccessibilityData, AccessibilityDataSerializer, [
+        _area_filter('health_facility__'),
+        _param_filter('facility', 'health_facility_id', int),
+    ]),
+    'allocations': (ResourceAllocation, ResourceAllocationSerializer, [
+        _area_filter('health_facility__'),
+        _param_filter('facility', 'health_facility_id', int),
+    ]),
+}
+
+
+class _Echo:
+    # csv.writer target that hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    # List fields (e.g. allocation line items) go in one cell as JSON
+    if isinstance(value, list):
+        return json.dumps(value, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return value
+
+
+def stream_csv(chunks, renderer):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(renderer.names)
+    for chunk in chunks:
+        yield ''.join(
+            writer.writerow([_cell(item[name]) for name in renderer.names]) for item in renderer.render(chunk)
+        )
+
+
+def stream_ndjson(chunks, renderer):
+    for chunk in chunks:
+        yield ''.join(
+            json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')) + '\n'
+            for item in renderer.render(chunk)
+        )
+
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
+
+
+class _URLFormatNegotiation(BaseContentNegotiation):
+    """
+    The export format comes from the URL, so the Accept header is ignored
+    and error responses are always JSON. DRF would otherwise answer
+    Accept: text/csv with 406 before the view runs.
+    """
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@content_negotiation_class(_URLFormatNegotiation)
+def export_rows(request, name, extension):
+    # The URL kwarg isn't called "format": DRF would treat it as a format
+    # suffix and look for a renderer
+    if name not in EXPORTS:
+        return Response(
+            {'error': f'Unknown export: {name}. Choose from {", ".join(EXPORTS)}'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    if extension not in FORMATS:
+        return Response(
+            {'error': f'Unsupported format: {extension}. Use csv or ndjson'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    model, serializer_class, filters = EXPORTS[name]
+    renderer = get_values_renderer(serializer_class, request)
+    if renderer is None:
+        return Response(
+            {'error': 'Exports contain flat columns only; ?expand= is not supported'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        queryset = model.objects.all()
+        for apply in filters:
+            queryset = apply(queryset, request.query_params)
+    except ValueError:
+        return Response({'error': 'facility must be an integer id'}, status=status.HTTP_400_BAD_REQUEST)
+
+    write, content_type = FORMATS[extension]
+    content = write(iter_pk_chunks(renderer.values(queryset), CHUNK_SIZE), renderer)
+    gzipped = _accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if gzipped:
+        content = compress_sequence(chunk.encode() for chunk in content)
+
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{name}.{extension}"'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    return response
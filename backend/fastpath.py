@@ -0,0 +1,152 @@
+"""
+Read-only fast path for list endpoints.
+
+Rendering big lists through ModelSerializer spends most of its time building
+model instances and walking serializer fields per row. When a response only
+needs flat columns, i.e. no ?expand=, the same dicts can be built straight
+from QuerySet.values(). The column list and per-field converters are worked
+out once per (serializer, fields) pair from the serializer itself, so the
+output matches what the serializer would have produced. List fields named
+in a serializer's values_list_loaders are filled in with one extra query per
+rendered chunk.
+"""
+from functools import lru_cache
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .serializers import parse_list
+
+# Fields whose to_representation() is the identity for values the database
+# driver already returns
+_PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.FloatField,
+)
+
+# Columns the keyset paginator needs even when ?fields= leaves them out
+_CURSOR_COLUMNS = ('id', 'created_at')
+
+
+class ValuesRenderer:
+    def __init__(self, names, columns, converters, loaders=None):
+        self.names = names
+        # None for fields filled in by a loader
+        self.columns = columns
+        self.converters = converters
+        # field name -> function(ids) returning {id: list}, called once per
+        # rendered chunk for list fields that values() can't produce
+        self.loaders = loaders or {}
+
+    def values(self, queryset):
+        columns = [column for column in self.columns if column is not None]
+        extra = [column for column in _CURSOR_COLUMNS if column not in columns]
+        return queryset.select_related(None).values(*columns, *extra)
+
+    def render(self, rows):
+        converters = [bind() if bind is not None else None for bind in self.converters]
+        items = tuple(zip(self.names, self.columns, converters))
+        loaded = {}
+        if self.loaders:
+            rows = list(rows)
+            ids = [row['id'] for row in rows]
+            loaded = {name: load(ids) for name, load in self.loaders.items()}
+        rendered = []
+        for row in rows:
+            item = {}
+            for name, column, convert in items:
+                if column is None:
+                    item[name] = loaded[name].get(row['id'], [])
+                    continue
+                value = row[column]
+                item[name] = value if convert is None or value is None else convert(value)
+            rendered.append(item)
+        return rendered
+
+
+def _constant(convert):
+    return lambda: convert
+
+
+def _datetime_converter(field):
+    """
+    DateTimeField.to_representation looks the current timezone up for every
+    value. Resolve it once per render call instead; anything other than an
+    aware datetime in ISO 8601 output still goes through the field.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return _constant(field.to_representation)
+
+    def bind():
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if field_timezone is None:
+            return field.to_representation
+
+        def convert(value):
+            if isinstance(value, str) or value.tzinfo is None:
+                return field.to_representation(value)
+            value = value.astimezone(field_timezone).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return convert
+    return bind
+
+
+def _column_for(field):
+    """
+    Return (values() column, converter factory or None) for a serializer field,
+    or None when the field can't be rendered from a plain column.
+    """
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        if field.pk_field is not None:
+            return None
+        return field.source + '_id', None
+    if isinstance(field, serializers.BooleanField):
+        return field.source, _constant(bool)
+    if isinstance(field, _PASSTHROUGH_FIELDS):
+        return field.source, None
+    if isinstance(field, serializers.DateTimeField):
+        return field.source, _datetime_converter(field)
+    if isinstance(field, serializers.DateField):
+        return field.source, _constant(field.to_representation)
+    return None
+
+
+@lru_cache(maxsize=None)
+def _build_renderer(serializer_class, fields):
+    serializer = serializer_class(fields=set(fields), expand=set())
+    list_loaders = getattr(serializer_class, 'values_list_loaders', {})
+    names, columns, converters, loaders = [], [], [], {}
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.field_name in list_loaders:
+            names.append(field.field_name)
+            columns.append(None)
+            converters.append(None)
+            loaders[field.field_name] = list_loaders[field.field_name]
+            continue
+        if not field.source or '.' in field.source or field.source == '*':
+            return None
+        mapped = _column_for(field)
+        if mapped is None:
+            return None
+        names.append(field.field_name)
+        columns.append(mapped[0])
+        converters.append(mapped[1])
+    return ValuesRenderer(names, columns, converters, loaders)
+
+
+def get_values_renderer(serializer_class, request):
+    """
+    Return a ValuesRenderer for this request, or None when the response needs
+    the full serializer (expanded relations or fields values() can't reproduce).
+    """
+    if not getattr(serializer_class, 'supports_values_fast_path', False):
+        return None
+    if parse_list(request.query_params.get('expand')):
+        return None
+    fields = frozenset(parse_list(request.query_params.get('fields')))
+    return _build_renderer(serializer_class, fields)
@@ -0,0 +1,115 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are ordered on (created_at, id) and the cursor is an opaque token
+holding the last row of the previous page. Each page is fetched with a
+range condition on the (created_at, id) index instead of an OFFSET, so
+page 1,000 costs the same as page 1.
+"""
+import base64
+import json
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .fastpath import get_values_renderer
+
+CURSOR_PARAM = 'cursor'
+PAGE_SIZE_PARAM = 'page_size'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_page_size(request):
+    options = settings.KEYSET_PAGINATION
+    try:
+        page_size = int(request.query_params.get(PAGE_SIZE_PARAM, options['PAGE_SIZE']))
+    except (TypeError, ValueError):
+        page_size = options['PAGE_SIZE']
+    return max(1, min(page_size, options['MAX_PAGE_SIZE']))
+
+
+def encode_cursor(created_at, pk):
+    raw = json.dumps([created_at.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = parse_datetime(created_at)
+        if created_at is None or not isinstance(pk, int):
+            raise ValueError
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise InvalidCursor(token)
+    return created_at, pk
+
+
+def _row_key(row):
+    if isinstance(row, dict):
+        return row['created_at'], row['id']
+    return row.created_at, row.pk
+
+
+def paginate_queryset(request, queryset):
+    """
+    Return (rows, next_cursor) for the page selected by the request.
+    Raises InvalidCursor for a malformed cursor.
+    """
+    page_size = get_page_size(request)
+    queryset = queryset.order_by('created_at', 'id')
+
+    token = request.query_params.get(CURSOR_PARAM)
+    if token:
+        created_at, pk = decode_cursor(token)
+        queryset = queryset.filter(created_at__gte=created_at).filter(
+            Q(created_at__gt=created_at) | Q(id__gt=pk)
+        )
+
+    # One extra row tells us whether there is a next page
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(*_row_key(rows[-1]))
+    return rows, next_cursor
+
+
+def paginated_response(request, queryset, serializer_class=None, results_key='results',
+                       empty_message=None):
+    """
+    Paginate a queryset and render {"next": <url or null>, <results_key>: [...]}.
+
+    Without a serializer class the rows are rendered as they come, e.g. from
+    QuerySet.values(). When empty_message is given, an empty first page is
+    reported as 404 with that message, like the unpaginated views did.
+    """
+    renderer = get_values_renderer(serializer_class, request) if serializer_class else None
+    if renderer is not None:
+        queryset = renderer.values(queryset)
+    elif hasattr(serializer_class, 'optimize_queryset'):
+        queryset = serializer_class.optimize_queryset(queryset, request)
+
+    try:
+        rows, next_cursor = paginate_queryset(request, queryset)
+    except InvalidCursor:
+        return Response({'error': 'Invalid cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if empty_message and not rows and not request.query_params.get(CURSOR_PARAM):
+        return Response({'message': empty_message}, status=status.HTTP_404_NOT_FOUND)
+
+    if renderer is not None:
+        rows = renderer.render(rows)
+    elif serializer_class is not None:
+        rows = serializer_class(rows, many=True, context={'request': request}).data
+
+    next_url = None
+    if next_cursor:
+        next_url = replace_query_param(request.build_absolute_uri(), CURSOR_PARAM, next_cursor)
+
+    return Response({'next': next_url, results_key: rows}, status=status.HTTP_200_OK)
@@ -0,0 +1,73 @@
+"""
+Sparse fieldsets and opt-in expansion for model serializers.
+
+Serializers using DynamicFieldsMixin render their relations as bare ids.
+Clients ask for nested objects with ?expand=health_facility,created_by
+(dotted names such as health_facility.created_by reach further down) and
+trim the payload with ?fields=id,disease_name,... Views pass the same
+request to optimize_queryset() so only the expanded relations are joined.
+"""
+_UNSET = object()
+
+
+def parse_list(value):
+    if not value:
+        return set()
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+class DynamicFieldsMixin:
+    # Relation name -> serializer class used when the relation is expanded
+    expandable_fields = {}
+    # Unexpanded lists may be rendered from QuerySet.values() (backend/fastpath.py).
+    # Turn this off for serializers that customise to_representation().
+    supports_values_fast_path = True
+
+    def __init__(self, *args, fields=_UNSET, expand=_UNSET, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+
+        if fields is _UNSET:
+            fields = parse_list(request.query_params.get('fields')) if request else set()
+        if expand is _UNSET:
+            expand = parse_list(request.query_params.get('expand')) if request else set()
+
+        for name, serializer_class in self.expandable_fields.items():
+            if name in expand and name in self.fields:
+                self.fields[name] = serializer_class(read_only=True, fields=set(), expand=_nested(expand, name))
+
+        # Only trim when rendering; writes still need every writable field
+        if fields and not hasattr(self, 'initial_data'):
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def select_related_paths(cls, expand):
+        paths = []
+        for name, serializer_class in cls.expandable_fields.items():
+            if name in expand:
+                paths.append(name)
+                paths.extend(
+                    f'{name}__{path}'
+                    for path in serializer_class.select_related_paths(_nested(expand, name))
+                )
+        return paths
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request=None, expand=None):
+        """
+        Join exactly the relations the response will expand.
+        """
+        if expand is None:
+            expand = parse_list(request.query_params.get('expand')) if request else set()
+        queryset = queryset.select_related(None)
+        paths = cls.select_related_paths(expand)
+        if paths:
+            queryset = queryset.select_related(*paths)
+        return queryset
+
+
+def _nested(expand, name):
+    prefix = name + '.'
+    return {item[len(prefix):] for item in expand if item.startswith(prefix)}
+
@@ -1,6 +1,7 @@
 from pathlib import Path
 from datetime import timedelta
 import os
+from django.core.exceptions import ImproperlyConfigured
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -30,11 +31,13 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'userApp',
+    'geography_app',
     'health_facility_app',
     'disease_incident_app',
     'population_data_app',
     'resource_allocation_app',
     'accessiblity_app',
+    'search_app',
 
    
 ]
@@ -93,6 +96,47 @@ DATABASES = {
 }
 
 
+# Cache
+# Cached dashboards and rankings, and the version counters that tell every
+# worker to reload its name tables, search index, spatial grid and rating
+# policy, only reach all workers through a shared cache. Set CACHE_URL to a
+# Redis (redis://host:6379/0) or Memcached (memcached://host:11211) server;
+# it is required when DEBUG is off. Without it each process keeps its own
+# local memory cache, where version counters expire after
+# LOCAL_VERSION_TIMEOUT seconds so that other processes catch up.
+
+CACHE_URL = os.environ.get('CACHE_URL', '')
+LOCAL_VERSION_TIMEOUT = int(os.environ.get('LOCAL_VERSION_TIMEOUT', 30))
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'TIMEOUT': 60 * 15,
+        }
+    }
+elif CACHE_URL.startswith('memcached://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': CACHE_URL[len('memcached://'):],
+            'TIMEOUT': 60 * 15,
+        }
+    }
+elif CACHE_URL:
+    raise ImproperlyConfigured('CACHE_URL must start with redis://, rediss:// or memcached://')
+elif not DEBUG:
+    raise ImproperlyConfigured('Set CACHE_URL to a shared Redis or Memcached server when DEBUG is off')
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'TIMEOUT': 60 * 15,
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -155,6 +199,14 @@ REST_FRAMEWORK = {
 }
 
 
+# Keyset pagination for list endpoints (see backend/pagination.py).
+# Clients pick a page size with ?page_size=, capped at MAX_PAGE_SIZE.
+KEYSET_PAGINATION = {
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 1000,
+}
+
+
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
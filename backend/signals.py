@@ -0,0 +1,12 @@
+"""
+Signals shared across apps.
+
+QuerySet.bulk_create() skips save() and its signals, so code that
+bulk-creates rows other apps keep derived data for (rollups, area summaries,
+cached dashboards) sends post_bulk_create afterwards with the created objects.
+"""
+from django.dispatch import Signal
+
+# Sent with sender=<model class> and objs=<list of created instances>. Primary
+# keys may be unset on backends that don't return them from bulk inserts.
+post_bulk_create = Signal()
@@ -0,0 +1,83 @@
+"""
+Streaming JSON responses for list endpoints.
+
+Rows are read from the database one chunk at a time, each chunk its own
+query continuing after the last primary key seen, and serialized as they
+arrive, so a worker only ever holds a single chunk in memory no matter how
+large the table is. QuerySet.iterator() wouldn't do: MySQL's client library
+buffers the whole result set.
+"""
+import json
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+from .fastpath import get_values_renderer
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+def is_streaming_requested(request):
+    return request.query_params.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def _encode(items):
+    return ','.join(
+        json.dumps(item, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+        for item in items
+    )
+
+
+def iter_pk_chunks(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Lists of at most chunk_size rows in primary key order, one query each.
+    Rows must include 'id' when the queryset is a values() query.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+        last_pk = last['id'] if isinstance(last, dict) else last.pk
+
+
+def stream_json_array(queryset, serializer_class=None, context=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                      renderer=None):
+    """
+    Yield the JSON array for a queryset piece by piece. Rows are rendered by
+    the values() fast path renderer or the serializer class when given, and
+    emitted as they come otherwise, e.g. from QuerySet.values().
+    """
+    yield '['
+    separator = ''
+    for chunk in iter_pk_chunks(queryset, chunk_size):
+        if renderer is not None:
+            chunk = renderer.render(chunk)
+        elif serializer_class is not None:
+            chunk = serializer_class(chunk, many=True, context=context).data
+        yield separator + _encode(chunk)
+        separator = ','
+    yield ']'
+
+
+def streaming_json_response(request, queryset, serializer_class=None,
+                            chunk_size=DEFAULT_CHUNK_SIZE, wrap_key=None):
+    renderer = get_values_renderer(serializer_class, request) if serializer_class else None
+    if renderer is not None:
+        queryset = renderer.values(queryset)
+    elif hasattr(serializer_class, 'optimize_queryset'):
+        queryset = serializer_class.optimize_queryset(queryset, request)
+    content = stream_json_array(queryset, serializer_class, {'request': request}, chunk_size, renderer)
+    if wrap_key is not None:
+        content = _wrapped(content, wrap_key)
+    return StreamingHttpResponse(content, content_type='application/json')
+
+
+def _wrapped(content, key):
+    yield '{' + json.dumps(key) + ':'
+    yield from content
+    yield '}'
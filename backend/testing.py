@@ -0,0 +1,144 @@
+"""
+Fixtures and checks shared by the app test modules.
+"""
+import json
+from urllib.parse import urlencode
+from unittest import mock
+from rest_framework.test import APIClient
+from userApp.models import CustomUser
+from .fastpath import get_values_renderer
+
+
+def make_user(email='admin@example.com', phone_number='0780000000'):
+    return CustomUser.objects.create_user(email=email, phone_number=phone_number, role='admin', password='secret')
+
+
+def populate_area(user, district, sector, rows):
+    """
+    `rows` facilities in one sector, each with an incident, an accessibility
+    row and an allocation with equipment lines, written in bulk.
+    """
+    from geography_app.resolver import get_or_create_area
+    from health_facility_app.models import HealthFacility
+    from disease_incident_app.models import DiseaseIncident
+    from population_data_app.models import PopulationData
+    from accessiblity_app.models import AccessibilityData
+    from resource_allocation_app.models import ResourceAllocation
+    from resource_allocation_app.equipment import set_equipment
+
+    area = get_or_create_area(district, sector)
+    PopulationData.objects.bulk_create([PopulationData(
+        district=area.district, sector=area.sector, district_ref_id=area.district_id, sector_ref_id=area.sector_id,
+        total_population=20000, male_population=10000, female_population=10000, children_under_5=2000,
+        youth_population=6000, adult_population=10000, elderly_population=2000, population_density=100.0,
+        socioeconomic_status='MIDDLE', unemployment_rate=10.0, literacy_rate=80.0, created_by=user,
+    )])
+    HealthFacility.objects.bulk_create([
+        HealthFacility(
+            name=f'{sector} Facility {i}', facility_type='HOSPITAL' if i % 3 else 'CLINIC',
+            district=area.district, sector=area.sector,
+            district_ref_id=area.district_id, sector_ref_id=area.sector_id,
+            capacity=50, contact_number='0780000000', created_by=user,
+            latitude=-1.9 + i / 10000 if i % 2 else None, longitude=30.1 if i % 2 else None,
+        )
+        for i in range(rows)
+    ])
+    # Rows are re-read because MySQL doesn't return ids from bulk inserts
+    facility_ids = list(HealthFacility.objects.filter(sector_ref_id=area.sector_id).values_list('id', flat=True))
+    DiseaseIncident.objects.bulk_create([
+        DiseaseIncident(
+            disease_name='Malaria', health_facility_id=facility_id, number_of_cases=i % 5 + 1,
+            status='ACTIVE' if i % 2 else 'RESOLVED', created_by=user,
+        )
+        for i, facility_id in enumerate(facility_ids)
+    ])
+    AccessibilityData.objects.bulk_create([
+        AccessibilityData(
+            health_facility_id=facility_id, people_served=1000, avg_travel_time=30,
+            distance_to_nearest_facility=5, accessibility_rating='GOOD', computed=bool(i % 2), created_by=user,
+        )
+        for i, facility_id in enumerate(facility_ids)
+    ])
+    allocations = [
+        ResourceAllocation(
+            health_facility_id=facility_id, equipment='2 x ventilator', specialist=1, duration_in_days=30,
+            created_by=user,
+        )
+        for facility_id in facility_ids
+    ]
+    for allocation in allocations:
+        allocation.set_dates()
+    ResourceAllocation.objects.bulk_create(allocations)
+    set_equipment({
+        allocation_id: [('ventilator', 2)]
+        for allocation_id in ResourceAllocation.objects.filter(
+            health_facility__sector_ref_id=area.sector_id
+        ).values_list('id', flat=True)
+    })
+    return area
+
+
+class FastPathEquivalenceMixin:
+    """
+    Checks that list endpoints render the same rows through the values()
+    fast path as through their serializer.
+
+    ENDPOINTS lists (method, path, query parameters, JSON body or None). Every
+    endpoint is requested as is and with each ?fields= value in FIELDS, once
+    normally and once with the fast path turned off. Each relation in EXPAND
+    is also requested with ?expand=, and its nested objects must carry the
+    ids the fast path returns; dotted names need their parent listed too,
+    e.g. 'health_facility,health_facility.created_by'.
+    """
+    ENDPOINTS = ()
+    FIELDS = ()
+    EXPAND = ()
+    PAGE_SIZE = 1000
+
+    def _get(self, method, path, params, body):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        query = urlencode({'page_size': self.PAGE_SIZE, **params})
+        response = client.generic(method, f'{path}?{query}', json.dumps(body or {}), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        rows = json.loads(response.content)['results']
+        self.assertTrue(rows, f'{path} returned no rows')
+        return rows
+
+    def _get_both_ways(self, method, path, params, body):
+        renderers = []
+
+        def record(*args):
+            renderers.append(get_values_renderer(*args))
+            return renderers[-1]
+
+        with mock.patch('backend.pagination.get_values_renderer', side_effect=record):
+            fast = self._get(method, path, params, body)
+        with mock.patch('backend.pagination.get_values_renderer', return_value=None):
+            slow = self._get(method, path, params, body)
+        return fast, slow, any(renderer is not None for renderer in renderers)
+
+    def test_fast_path_matches_serializer(self):
+        for method, path, params, body in self.ENDPOINTS:
+            used_fast_path = False
+            for fields in (None, *self.FIELDS):
+                variant = dict(params, fields=fields) if fields else params
+                with self.subTest(path=path, fields=fields):
+                    fast, slow, used = self._get_both_ways(method, path, variant, body)
+                    self.assertEqual(fast, slow)
+                    used_fast_path = used_fast_path or used
+            with self.subTest(path=path):
+                self.assertTrue(used_fast_path, f'{path} never took the fast path')
+
+    def test_expanded_relations_match_fast_path_ids(self):
+        for method, path, params, body in self.ENDPOINTS:
+            flat, _, _ = self._get_both_ways(method, path, params, body)
+            for name in self.EXPAND:
+                with self.subTest(path=path, expand=name):
+                    expanded = self._get(method, path, dict(params, expand=name), body)
+                    relations = {part.split('.')[0] for part in name.split(',')}
+                    for row in expanded:
+                        for relation in relations:
+                            self.assertIsInstance(row[relation], dict)
+                            row[relation] = row[relation]['id']
+                    self.assertEqual(expanded, flat)
@@ -0,0 +1,169 @@
+import base64
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from health_facility_app.models import HealthFacility
+from resource_allocation_app.models import ResourceAllocation
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, paginate_queryset
+from .testing import make_user, populate_area
+
+
+def page_request(**params):
+    return Request(APIRequestFactory().get('/', params))
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 12)
+        ids = list(HealthFacility.objects.order_by('id').values_list('id', flat=True))
+        # Rows created in the same instant are ordered by id
+        now = timezone.now()
+        for position, facility_id in enumerate(ids):
+            HealthFacility.objects.filter(id=facility_id).update(
+                created_at=now if position % 3 else now - timedelta(minutes=1)
+            )
+        cls.ordered = list(HealthFacility.objects.order_by('created_at', 'id').values_list('id', flat=True))
+
+    def walk(self, page_size):
+        pages, cursor = [], None
+        while True:
+            params = {'page_size': page_size}
+            if cursor:
+                params['cursor'] = cursor
+            rows, cursor = paginate_queryset(page_request(**params), HealthFacility.objects.all())
+            pages.append([row.id for row in rows])
+            if cursor is None:
+                return pages
+
+    def test_pages_with_equal_timestamps(self):
+        for page_size in (1, 4, 5, 12):
+            with self.subTest(page_size=page_size):
+                pages = self.walk(page_size)
+                self.assertEqual([row for page in pages for row in page], self.ordered)
+                self.assertTrue(all(len(page) == page_size for page in pages[:-1]))
+
+    def test_values_rows(self):
+        queryset = HealthFacility.objects.values('id', 'created_at')
+        rows, cursor = paginate_queryset(page_request(page_size=5), queryset)
+        rows, _ = paginate_queryset(page_request(page_size=5, cursor=cursor), queryset)
+        self.assertEqual([row['id'] for row in rows], self.ordered[5:10])
+
+    @override_settings(KEYSET_PAGINATION={'PAGE_SIZE': 3, 'MAX_PAGE_SIZE': 5})
+    def test_page_size_is_clamped(self):
+        for page_size, expected in ((None, 3), ('0', 1), ('-2', 1), ('4', 4), ('50', 5), ('lots', 3)):
+            with self.subTest(page_size=page_size):
+                params = {} if page_size is None else {'page_size': page_size}
+                rows, _ = paginate_queryset(page_request(**params), HealthFacility.objects.all())
+                self.assertEqual(len(rows), expected)
+
+    def test_cursor_round_trip(self):
+        created_at = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(created_at, 42)), (created_at, 42))
+
+    def test_malformed_cursors(self):
+        def token(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+        for cursor in ('', '!!!', token('[]'), token('{"a": 1}'), token('["not a date", 1]'),
+                       token('["2026-01-01T00:00:00+00:00", "1"]'), token('été')):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    decode_cursor(cursor)
+
+    def test_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/facility/facilities/', {'page_size': 10})
+        self.assertEqual([row['id'] for row in response.data['results']], self.ordered[:10])
+        cursor = parse_qs(urlparse(response.data['next']).query)['cursor'][0]
+
+        response = client.get('/facility/facilities/', {'page_size': 10, 'cursor': cursor})
+        self.assertEqual([row['id'] for row in response.data['results']], self.ordered[10:])
+        self.assertIsNone(response.data['next'])
+
+        response = client.get('/facility/facilities/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Invalid cursor.'})
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 5)
+        populate_area(cls.user, 'Kicukiro', 'Niboye', 3)
+        cls.gasabo_ids = list(HealthFacility.objects.filter(district='Gasabo').order_by('id').values_list(
+            'id', flat=True
+        ))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, path, params=None, **headers):
+        response = self.client.get(path, params or {}, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        # The format comes from the URL whatever the Accept header says
+        response, body = self.export('/export/facilities.csv', {'district': 'Gasabo'}, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="facilities.csv"')
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual([int(row['id']) for row in rows], self.gasabo_ids)
+        self.assertEqual({row['district'] for row in rows}, {'Gasabo'})
+
+    def test_csv_list_cells(self):
+        _, body = self.export('/export/allocations.csv', {'fields': 'id,equipment_items'})
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows[0], ['id', 'equipment_items'])
+        self.assertEqual(len(rows), 1 + ResourceAllocation.objects.count())
+        self.assertEqual({row[1] for row in rows[1:]}, {'[{"item":"ventilator","quantity":2}]'})
+
+    def test_ndjson_in_chunks(self):
+        _, body = self.export('/export/facilities.ndjson', {'fields': 'id,name'})
+        with mock.patch('backend.export.CHUNK_SIZE', 3):
+            response, chunked = self.export('/export/facilities.ndjson', {'fields': 'id,name'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(chunked, body)
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], sorted(HealthFacility.objects.values_list('id', flat=True)))
+        self.assertEqual(set(rows[0]), {'id', 'name'})
+
+    def test_gzip(self):
+        for path in ('/export/incidents.csv', '/export/incidents.ndjson'):
+            with self.subTest(path=path):
+                plain_response, plain = self.export(path)
+                self.assertFalse(plain_response.has_header('Content-Encoding'))
+                response, body = self.export(path, HTTP_ACCEPT_ENCODING='deflate, gzip;q=0.8')
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertIn('Accept-Encoding', response['Vary'])
+                self.assertEqual(gzip.decompress(body), plain)
+
+    def test_errors_are_json(self):
+        for path, params, code in [
+            ('/export/patients.csv', {}, 404),
+            ('/export/incidents.xlsx', {}, 404),
+            ('/export/incidents.csv', {'facility': 'abc'}, 400),
+            ('/export/incidents.csv', {'expand': 'health_facility'}, 400),
+        ]:
+            with self.subTest(path=path, params=params):
+                response = self.client.get(path, params, HTTP_ACCEPT='text/csv')
+                self.assertEqual(response.status_code, code)
+                self.assertEqual(response['Content-Type'], 'application/json')
+                self.assertIn('error', response.json())
@@ -1,6 +1,7 @@
 
 from django.contrib import admin
 from django.urls import path, include
+from . import export
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,4 +11,6 @@ urlpatterns = [
     path('population/', include('population_data_app.urls')),
     path('resource_allocation/', include('resource_allocation_app.urls')),
     path('accessibility/', include('accessiblity_app.urls')),
+    path('search/', include('search_app.urls')),
+    path('export/<slug:name>.<slug:extension>', export.export_rows, name='export-rows'),
 ]
\ No newline at end of file
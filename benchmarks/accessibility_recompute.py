@@ -0,0 +1,123 @@
+"""
+Deriving accessibility rows from facility and population locations.
+
+    python -m benchmarks.accessibility_recompute [--facilities 5000] [--sectors 416] [--points 100000]
+
+Times the nearest-facility matching with one matrix product per chunk of
+points against a haversine loop over the points, then the full recompute against the
+database: the first run inserts every row, a rerun without changes writes
+nothing, and moving one facility rewrites the rows it affects.
+"""
+import argparse
+import random
+from .harness import setup_django, test_database, best_of, make_user, print_table
+
+BATCH = 10000
+# Rwanda's bounding box
+LATITUDES = (-2.84, -1.05)
+LONGITUDES = (28.86, 30.90)
+
+
+def populate(facilities, sectors, user):
+    from geography_app.models import District, Sector
+    from geography_app.resolver import invalidate_names
+    from health_facility_app.models import HealthFacility
+    from population_data_app.models import PopulationData
+
+    generator = random.Random(1)
+    District.objects.bulk_create(District(name=f'District {i}') for i in range(30))
+    districts = list(District.objects.order_by('id'))
+    Sector.objects.bulk_create(
+        Sector(
+            district=districts[i % 30], name=f'Sector {i}',
+            latitude=generator.uniform(*LATITUDES), longitude=generator.uniform(*LONGITUDES),
+        )
+        for i in range(sectors)
+    )
+    rows = list(Sector.objects.order_by('id'))
+    invalidate_names()
+
+    PopulationData.objects.bulk_create(
+        PopulationData(
+            district=districts[i % 30].name, sector=sector.name,
+            district_ref_id=sector.district_id, sector_ref_id=sector.id,
+            total_population=20000, male_population=10000, female_population=10000, children_under_5=2000,
+            youth_population=6000, adult_population=10000, elderly_population=2000, population_density=100.0,
+            socioeconomic_status='MIDDLE', unemployment_rate=10.0, literacy_rate=80.0, created_by=user,
+        )
+        for i, sector in enumerate(rows)
+    )
+    HealthFacility.objects.bulk_create(
+        (
+            HealthFacility(
+                name=f'Facility {i}', facility_type='HEALTH_CENTER', status='ACTIVE',
+                district=districts[i % 30].name, sector=rows[i % sectors].name,
+                district_ref_id=rows[i % sectors].district_id, sector_ref_id=rows[i % sectors].id,
+                latitude=generator.uniform(*LATITUDES), longitude=generator.uniform(*LONGITUDES),
+                capacity=50, contact_number='0780000000', created_by=user,
+            )
+            for i in range(facilities)
+        ),
+        batch_size=BATCH,
+    )
+
+
+def run(facilities, sectors, points):
+    import numpy as np
+    from health_facility_app.models import HealthFacility
+    from health_facility_app.spatial import haversine_km
+    from accessiblity_app.recompute import Point, nearest_facilities, recompute_accessibility
+
+    with test_database():
+        user = make_user()
+        populate(facilities, sectors, user)
+
+        located = HealthFacility.objects.values_list('latitude', 'longitude')
+        latitudes = np.array([row[0] for row in located])
+        longitudes = np.array([row[1] for row in located])
+        generator = random.Random(2)
+        sample = [
+            Point(generator.uniform(*LATITUDES), generator.uniform(*LONGITUDES), 100) for _ in range(points)
+        ]
+
+        def loop(points):
+            return [haversine_km(point.latitude, point.longitude, latitudes, longitudes).argmin() for point in points]
+
+        loop_time, expected = best_of(lambda: loop(sample[:points // 10]), repeat=1)
+        matrix_time, (nearest, _) = best_of(lambda: nearest_facilities(sample, latitudes, longitudes))
+        assert nearest[:points // 10].tolist() == [int(position) for position in expected]
+
+        first_time, first = best_of(recompute_accessibility, repeat=1)
+        rerun_time, rerun = best_of(recompute_accessibility)
+        facility = HealthFacility.objects.order_by('id').first()
+
+        def move():
+            # The save runs the recompute through the facility signals
+            facility.latitude += 0.01
+            facility.save()
+
+        move_time, _ = best_of(move)
+
+    print_table(['step', 'ms', 'rows written'], [
+        (f'match {points} points: loop', f'{loop_time * 10 * 1000:.0f}', ''),
+        (f'match {points} points: matrix product', f'{matrix_time * 1000:.0f}', ''),
+        ('recompute: first run', f'{first_time * 1000:.0f}', first['created']),
+        ('recompute: no changes', f'{rerun_time * 1000:.0f}', rerun['created'] + rerun['updated']),
+        ('save a moved facility', f'{move_time * 1000:.0f}', ''),
+    ])
+    print(f'{facilities} facilities, {sectors} sector centroids; the loop time is extrapolated from '
+          f'{points // 10} points')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--facilities', type=int, default=5000)
+    parser.add_argument('--sectors', type=int, default=416)
+    parser.add_argument('--points', type=int, default=100000)
+    args = parser.parse_args()
+    setup_django()
+    run(args.facilities, args.sectors, args.points)
+
+
+if __name__ == '__main__':
+    main()
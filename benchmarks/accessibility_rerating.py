@@ -0,0 +1,94 @@
+"""
+Re-rating every AccessibilityData row after a rating policy change.
+
+    python -m benchmarks.accessibility_rerating [--rows 1000000] [--chunk-size 5000]
+
+Compares the chunked UPDATE ... CASE run with loading and saving rows one at
+a time (timed on a sample and extrapolated), and times the rating
+distribution query the policy endpoint answers while a run is in progress.
+"""
+import argparse
+import random
+from itertools import islice
+from .harness import setup_django, test_database, best_of, make_user, print_table
+
+BATCH = 10000
+SAMPLE = 2000
+
+
+def populate(rows, user):
+    from geography_app.resolver import get_or_create_area
+    from health_facility_app.models import HealthFacility
+    from accessiblity_app.models import AccessibilityData
+
+    area = get_or_create_area('Gasabo', 'Kimironko')
+    HealthFacility.objects.bulk_create(
+        HealthFacility(
+            name=f'Facility {i}', facility_type='HEALTH_CENTER', district=area.district, sector=area.sector,
+            district_ref_id=area.district_id, sector_ref_id=area.sector_id,
+            capacity=50, contact_number='0780000000', created_by=user,
+        )
+        for i in range(100)
+    )
+    facility_ids = list(HealthFacility.objects.values_list('id', flat=True))
+    generator = random.Random(1)
+    records = (
+        AccessibilityData(
+            health_facility_id=facility_ids[i % len(facility_ids)], people_served=1000,
+            avg_travel_time=generator.uniform(0, 60), distance_to_nearest_facility=generator.uniform(0, 20),
+            accessibility_rating='POOR', created_by=user,
+        )
+        for i in range(rows)
+    )
+    while True:
+        batch = list(islice(records, BATCH))
+        if not batch:
+            break
+        AccessibilityData.objects.bulk_create(batch)
+
+
+def run(rows, chunk_size):
+    from django.db import transaction
+    from accessiblity_app.models import AccessibilityData, AccessibilityRatingPolicy
+    from accessiblity_app.rating import rerate, rating_distributions, invalidate_policy
+
+    with test_database():
+        user = make_user()
+        populate(rows, user)
+        policy = AccessibilityRatingPolicy.objects.create(
+            good_travel_time=20, good_distance=6, moderate_travel_time=40, moderate_distance=12,
+        )
+        invalidate_policy()
+
+        def save_each():
+            # In one transaction, so the area summary is refreshed once on
+            # commit rather than after every save
+            with transaction.atomic():
+                for row in AccessibilityData.objects.order_by('id')[:SAMPLE]:
+                    row.save()
+
+        save_time, _ = best_of(save_each, repeat=1)
+        distribution_time, before = best_of(lambda: rating_distributions(policy))
+        rerate_time, policy = best_of(lambda: rerate(policy.id, chunk_size), repeat=1)
+        after = rating_distributions(policy)
+        assert after['new'] == after['stored'], 'stored ratings differ from the new policy'
+
+    print_table(['method', 'rows', 'seconds'], [
+        ('save() per row (extrapolated)', rows, f'{save_time / SAMPLE * rows:.1f}'),
+        (f'UPDATE ... CASE per {chunk_size} ids', policy.rows_done, f'{rerate_time:.1f}'),
+        ('rating distributions query', rows, f'{distribution_time:.2f}'),
+    ])
+    print(f'previous {before["previous"]}, new {after["new"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+    setup_django()
+    run(args.rows, args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Active-on-a-day and overlap queries over resource allocations.
+
+    python -m benchmarks.allocation_intervals [--facilities 5000] [--allocations 200000] [--proposals 1000]
+
+Compares the indexed start/end dates with reading every candidate row and
+working its end out from the start and duration_in_days, and bulk conflict detection with
+one overlap query per proposal.
+"""
+import argparse
+import random
+from datetime import timedelta
+from itertools import islice
+from .harness import setup_django, test_database, best_of, make_user, print_table
+
+BATCH = 10000
+
+
+def populate(facilities, allocations, user):
+    from django.utils import timezone
+    from geography_app.models import District, Sector
+    from geography_app.resolver import invalidate_names
+    from health_facility_app.models import HealthFacility
+    from resource_allocation_app.models import ResourceAllocation
+
+    generator = random.Random(1)
+    District.objects.bulk_create(District(name=f'District {i}') for i in range(30))
+    districts = list(District.objects.order_by('id'))
+    Sector.objects.bulk_create(Sector(district=districts[i % 30], name=f'Sector {i}') for i in range(416))
+    sectors = list(Sector.objects.order_by('id'))
+    invalidate_names()
+    HealthFacility.objects.bulk_create(
+        (
+            HealthFacility(
+                name=f'Facility {i}', facility_type='HEALTH_CENTER',
+                district=districts[i % 30].name, sector=sectors[i % 416].name,
+                district_ref_id=sectors[i % 416].district_id, sector_ref_id=sectors[i % 416].id,
+                capacity=50, contact_number='0780000000', created_by=user,
+            )
+            for i in range(facilities)
+        ),
+        batch_size=BATCH,
+    )
+    facility_ids = list(HealthFacility.objects.values_list('id', flat=True))
+    today = timezone.localdate()
+
+    def allocation():
+        # Three years of history, one allocation in a hundred still running
+        row = ResourceAllocation(
+            health_facility_id=generator.choice(facility_ids), equipment='', specialist=1,
+            duration_in_days=generator.randint(1, 60), start_date=today - timedelta(days=generator.randint(0, 1095)),
+            created_by=user,
+        )
+        row.set_dates()
+        return row
+
+    rows = (allocation() for _ in range(allocations))
+    while True:
+        batch = list(islice(rows, BATCH))
+        if not batch:
+            break
+        ResourceAllocation.objects.bulk_create(batch)
+    return facility_ids, generator
+
+
+def run(facilities, allocations, proposals):
+    from django.utils import timezone
+    from resource_allocation_app.models import ResourceAllocation
+    from resource_allocation_app.intervals import active_on, overlapping, find_conflicts
+
+    with test_database():
+        user = make_user()
+        facility_ids, generator = populate(facilities, allocations, user)
+        today = timezone.localdate()
+        facility_id = facility_ids[len(facility_ids) // 2]
+
+        def derived_active(scope):
+            # Without stored dates every candidate row is read and its end worked out
+            return [
+                allocation_id
+                for allocation_id, start_date, days in ResourceAllocation.objects.filter(**scope).values_list(
+                    'id', 'start_date', 'duration_in_days'
+                ).iterator(chunk_size=BATCH)
+                if start_date <= today < start_date + timedelta(days=days)
+            ]
+
+        def stored_active(scope):
+            return list(active_on(today).filter(**scope).values_list('id', flat=True))
+
+        national_derived, expected = best_of(lambda: derived_active({}))
+        national_stored, found = best_of(lambda: stored_active({}))
+        assert sorted(expected) == sorted(found)
+        active_count = len(found)
+        facility_derived, expected = best_of(lambda: derived_active({'health_facility_id': facility_id}), repeat=20)
+        facility_stored, found = best_of(lambda: stored_active({'health_facility_id': facility_id}), repeat=20)
+        assert sorted(expected) == sorted(found)
+        facility_count = len(found)
+
+        batch = []
+        for _ in range(proposals):
+            start = today + timedelta(days=generator.randint(-30, 30))
+            batch.append((generator.choice(facility_ids), start, start + timedelta(days=generator.randint(1, 30))))
+
+        def per_proposal():
+            return [
+                list(overlapping(start, end).filter(health_facility_id=proposal_facility).values_list('id', flat=True))
+                for proposal_facility, start, end in batch
+            ]
+
+        loop_time, expected = best_of(per_proposal)
+        bulk_time, found = best_of(lambda: find_conflicts(batch))
+        assert [sorted(ids) for ids in expected] == [sorted(result['allocations']) for result in found]
+        conflicts = sum(bool(result['allocations']) for result in found)
+
+    print_table(['query', 'matches', 'ms'], [
+        ('active today, national, derived end', active_count, f'{national_derived * 1000:.1f}'),
+        ('active today, national, stored dates', active_count, f'{national_stored * 1000:.1f}'),
+        ('active today, one facility, derived end', facility_count, f'{facility_derived * 1000:.2f}'),
+        ('active today, one facility, stored dates', facility_count, f'{facility_stored * 1000:.2f}'),
+        ('conflicts, one query per proposal', conflicts, f'{loop_time * 1000:.0f}'),
+        ('conflicts, find_conflicts', conflicts, f'{bulk_time * 1000:.0f}'),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--facilities', type=int, default=5000)
+    parser.add_argument('--allocations', type=int, default=200000)
+    parser.add_argument('--proposals', type=int, default=1000)
+    args = parser.parse_args()
+    setup_django()
+    run(args.facilities, args.allocations, args.proposals)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Time to plan specialist allocations for a national set of facilities.
+
+    python -m benchmarks.allocation_optimizer [--facilities 5000] [--incidents 50000] [--allocations 20000] [--budget 2000]
+
+Times the vectorized solver on its own and against a heap that hands out one
+specialist at a time, then /resource_allocation/optimize/ with and without
+committing the plan. The whole request should stay under TARGET_SECONDS.
+"""
+import argparse
+import heapq
+import random
+from datetime import timedelta
+from itertools import islice
+from .harness import setup_django, test_database, best_of, make_user, print_table
+
+BATCH = 10000
+TARGET_SECONDS = 2.0
+
+
+def populate(facilities, incidents, allocations, user):
+    from django.utils import timezone
+    from geography_app.models import District, Sector
+    from geography_app.resolver import invalidate_names
+    from health_facility_app.models import HealthFacility
+    from disease_incident_app.models import DiseaseIncident
+    from population_data_app.models import PopulationData
+    from resource_allocation_app.models import ResourceAllocation
+
+    generator = random.Random(1)
+    District.objects.bulk_create(District(name=f'District {i}') for i in range(30))
+    districts = list(District.objects.order_by('id'))
+    Sector.objects.bulk_create(Sector(district=districts[i % 30], name=f'Sector {i}') for i in range(416))
+    sectors = list(Sector.objects.order_by('id'))
+    invalidate_names()
+
+    PopulationData.objects.bulk_create(
+        PopulationData(
+            district=districts[i % 30].name, sector=sector.name,
+            district_ref_id=sector.district_id, sector_ref_id=sector.id,
+            total_population=generator.randint(5000, 80000), male_population=10000, female_population=10000,
+            children_under_5=2000, youth_population=6000, adult_population=10000, elderly_population=2000,
+            population_density=100.0, socioeconomic_status='MIDDLE', unemployment_rate=10.0, literacy_rate=80.0,
+            created_by=user,
+        )
+        for i, sector in enumerate(sectors)
+    )
+    HealthFacility.objects.bulk_create(
+        (
+            HealthFacility(
+                name=f'Facility {i}', facility_type='HEALTH_CENTER',
+                status='ACTIVE' if generator.random() < 0.95 else 'CLOSED',
+                district=districts[i % 30].name, sector=sectors[i % 416].name,
+                district_ref_id=sectors[i % 416].district_id, sector_ref_id=sectors[i % 416].id,
+                capacity=generator.randint(10, 200), contact_number='0780000000', created_by=user,
+            )
+            for i in range(facilities)
+        ),
+        batch_size=BATCH,
+    )
+    facility_ids = list(HealthFacility.objects.values_list('id', flat=True))
+
+    def insert(model, rows):
+        while True:
+            batch = list(islice(rows, BATCH))
+            if not batch:
+                break
+            model.objects.bulk_create(batch)
+
+    insert(DiseaseIncident, (
+        DiseaseIncident(
+            disease_name='Malaria', health_facility_id=generator.choice(facility_ids),
+            number_of_cases=generator.randint(1, 50), status=generator.choice(['ACTIVE', 'RESOLVED']), created_by=user,
+        )
+        for _ in range(incidents)
+    ))
+
+    def allocation():
+        # Spread over the last three months so some have ended
+        row = ResourceAllocation(
+            health_facility_id=generator.choice(facility_ids), equipment='', specialist=generator.randint(1, 3),
+            duration_in_days=generator.randint(1, 90), start_date=today - timedelta(days=generator.randint(0, 90)),
+            created_by=user,
+        )
+        row.set_dates()
+        return row
+
+    today = timezone.localdate()
+    insert(ResourceAllocation, (allocation() for _ in range(allocations)))
+
+
+def heap_greedy(demand, current, budget):
+    extra = [0] * len(demand)
+    heap = [(-value / (have + 1), i) for i, (value, have) in enumerate(zip(demand, current)) if value > 0]
+    heapq.heapify(heap)
+    for _ in range(budget):
+        if not heap:
+            break
+        _, i = heapq.heappop(heap)
+        extra[i] += 1
+        heapq.heappush(heap, (-demand[i] / (current[i] + extra[i] + 1), i))
+    return extra
+
+
+def run(facilities, incidents, allocations, budget):
+    from rest_framework.test import APIClient
+    from resource_allocation_app.optimizer import RESIDENTS_PER_UNIT, allocate, load_inputs
+
+    with test_database():
+        user = make_user()
+        populate(facilities, incidents, allocations, user)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        inputs = load_inputs()
+        demand = inputs.cases + inputs.catchment / RESIDENTS_PER_UNIT
+        load_time, _ = best_of(load_inputs)
+        solve_time, extra = best_of(lambda: allocate(demand, inputs.current, budget))
+        heap_time, heap_extra = best_of(lambda: heap_greedy(demand.tolist(), inputs.current.tolist(), budget))
+        assert extra.tolist() == heap_extra, 'solver and heap disagree'
+
+        def request(commit=False):
+            body = {'budget': budget}
+            if commit:
+                body.update(commit=True, duration_in_days=30)
+            response = client.post('/resource_allocation/optimize/', body, format='json')
+            assert response.status_code in (200, 201), response.data
+            return response.data
+
+        plan_time, data = best_of(request)
+        commit_time, _ = best_of(lambda: request(commit=True), repeat=1)
+
+    print_table(['step', 'facilities', 'ms'], [
+        ('load inputs', data['facilities_considered'], f'{load_time * 1000:.0f}'),
+        ('heap, one specialist at a time', data['facilities_considered'], f'{heap_time * 1000:.1f}'),
+        ('vectorized solver', data['facilities_considered'], f'{solve_time * 1000:.1f}'),
+        ('endpoint, plan', len(data['plan']), f'{plan_time * 1000:.0f}'),
+        ('endpoint, plan and commit', len(data['plan']), f'{commit_time * 1000:.0f}'),
+    ])
+    print(f'target {TARGET_SECONDS:.0f} s: {"met" if max(plan_time, commit_time) < TARGET_SECONDS else "MISSED"}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--facilities', type=int, default=5000)
+    parser.add_argument('--incidents', type=int, default=50000)
+    parser.add_argument('--allocations', type=int, default=20000)
+    parser.add_argument('--budget', type=int, default=2000)
+    args = parser.parse_args()
+    setup_django()
+    run(args.facilities, args.incidents, args.allocations, args.budget)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Incidents/sec through /incident/add/bulk/ against one POST per incident.
+
+    python -m benchmarks.bulk_ingest [--rows 5000] [--facilities 50]
+"""
+import argparse
+import json
+import time
+from .harness import setup_django, test_database, print_table, make_user
+
+
+def populate(facilities, user):
+    from health_facility_app.models import HealthFacility
+
+    # Saved one by one so the area keys and summaries are set up as in production
+    return [
+        HealthFacility.objects.create(
+            name=f'Facility {i}', facility_type='CLINIC', district=f'District {i % 5}',
+            sector=f'Sector {i}', capacity=50, contact_number='0780000000', created_by=user,
+        ).id
+        for i in range(facilities)
+    ]
+
+
+def incident_rows(rows, facility_ids):
+    return [
+        {
+            'disease_name': ('Malaria', 'Cholera', 'Measles')[i % 3],
+            'health_facility_id': facility_ids[i % len(facility_ids)],
+            'number_of_cases': i % 7,
+            'status': 'ACTIVE',
+            'description': 'Daily report',
+        }
+        for i in range(rows)
+    ]
+
+
+def run(rows, facilities):
+    from rest_framework.test import APIClient
+    from disease_incident_app.models import DiseaseIncident, IncidentDailyRollup
+
+    results = []
+    with test_database():
+        user = make_user()
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = incident_rows(rows, populate(facilities, user))
+
+        started = time.perf_counter()
+        for row in payload:
+            response = client.post('/incident/add/', row, format='json')
+            assert response.status_code == 201, response.data
+        per_row_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = client.post('/incident/add/bulk/', payload, format='json')
+        bulk_time = time.perf_counter() - started
+        assert response.status_code == 201 and response.data['created'] == rows, response.data
+
+        ndjson = '\n'.join(json.dumps(row) for row in payload)
+        started = time.perf_counter()
+        response = client.generic('POST', '/incident/add/bulk/', ndjson, content_type='application/x-ndjson')
+        ndjson_time = time.perf_counter() - started
+        assert response.status_code == 201 and response.data['created'] == rows, response.data
+
+        # The rollup must agree with a recount after both paths
+        rolled_up = {
+            tuple(getattr(row, field) for field in IncidentDailyRollup.KEY_FIELDS): (row.total_cases, row.incident_count)
+            for row in IncidentDailyRollup.objects.all()
+        }
+        assert rolled_up == IncidentDailyRollup.grouped_deltas(DiseaseIncident.objects.all()), 'rollup out of sync'
+
+    for name, elapsed in (('per-row POST', per_row_time), ('bulk JSON', bulk_time), ('bulk NDJSON', ndjson_time)):
+        results.append((name, rows, f'{elapsed:.2f}', f'{rows / elapsed:,.0f}', f'{per_row_time / elapsed:.1f}x'))
+    print_table(['endpoint', 'rows', 'seconds', 'rows/s', 'speedup'], results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--facilities', type=int, default=50)
+    args = parser.parse_args()
+    setup_django()
+    run(args.rows, args.facilities)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Rows/sec and peak memory of the streaming census import.
+
+    python -m benchmarks.census_import [--rows 10000 100000] [--sample 500]
+
+Each size is imported into a fresh database and then re-imported, which
+updates every row. Peak memory is measured with tracemalloc in a separate
+pass and should stay flat as the file grows. One add_population POST per row is timed on a sample
+for comparison.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from .harness import setup_django, test_database, print_table, make_user
+
+HEADER = (
+    'district,sector,total_population,male_population,female_population,children_under_5,'
+    'youth_population,adult_population,elderly_population,population_density,'
+    'unemployment_rate,literacy_rate,socioeconomic_status\n'
+)
+
+
+def write_census(path, rows):
+    # Written line by line so generating the file doesn't skew the memory numbers
+    with open(path, 'w', newline='') as census:
+        census.write(HEADER)
+        for i in range(rows):
+            census.write(f'District {i % 30},Sector {i},1000,480,520,120,250,530,100,315.5,9.5,81.0,MIDDLE\n')
+
+
+def post_rows(count, user):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user)
+    started = time.perf_counter()
+    for i in range(count):
+        response = client.post('/population/add/', {
+            'district': f'Sample District {i % 30}', 'sector': f'Sample Sector {i}',
+            'total_population': 1000, 'male_population': 480, 'female_population': 520,
+            'children_under_5': 120, 'youth_population': 250, 'adult_population': 530,
+            'elderly_population': 100, 'population_density': 315.5, 'socioeconomic_status': 'MIDDLE',
+            'unemployment_rate': 9.5, 'literacy_rate': 81.0,
+        }, format='json')
+        assert response.status_code == 201, response.data
+    return time.perf_counter() - started
+
+
+def timed_import(path, user, trace=False):
+    from population_data_app.census import import_census
+
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with open(path, newline='') as census:
+        result = import_census(census, user)
+    elapsed = time.perf_counter() - started
+    peak = None
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def run(sizes, sample):
+    from population_data_app.models import PopulationData
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f'census-{size}.csv')
+            write_census(path, size)
+            with test_database():
+                user = make_user()
+                timings = {}
+                for label, expected in (('insert', {'created': size, 'updated': 0}),
+                                        ('upsert', {'created': 0, 'updated': size})):
+                    timings[label], _, result = timed_import(path, user)
+                    assert result == {**expected, 'rejected': 0}, result
+                assert PopulationData.objects.count() == size
+                # tracemalloc slows the import down, so memory gets its own pass
+                _, peak, _ = timed_import(path, user, trace=True)
+
+            results.append((
+                'census import', size, f'{size / timings["insert"]:,.0f}',
+                f'{size / timings["upsert"]:,.0f}', f'{peak / 2 ** 20:.1f}',
+            ))
+
+    with test_database():
+        elapsed = post_rows(sample, make_user())
+        results.append(('add_population POSTs', sample, f'{sample / elapsed:,.0f}', '-', '-'))
+
+    print_table(['method', 'rows', 'insert rows/s', 'upsert rows/s', 'peak MiB'], results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--sample', type=int, default=500)
+    args = parser.parse_args()
+    setup_django()
+    run(args.rows, args.sample)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Latency of /resource_allocation/coverage-gaps/ for a national dataset.
+
+    python -m benchmarks.coverage_gaps [--sectors 416] [--facilities 5000] [--records 200000]
+
+Compares the grouped queries behind the endpoint, cold and cached, with
+aggregating each sector on its own.
+"""
+import argparse
+import random
+from itertools import islice
+from .harness import setup_django, test_database, best_of, make_user, print_table
+
+BATCH = 10000
+RATINGS = ['GOOD', 'MODERATE', 'POOR']
+
+
+def populate(sectors, facilities, records, user):
+    from geography_app.models import District, Sector
+    from geography_app.resolver import invalidate_names
+    from health_facility_app.models import HealthFacility
+    from population_data_app.models import PopulationData
+    from accessiblity_app.models import AccessibilityData
+
+    generator = random.Random(1)
+    District.objects.bulk_create(District(name=f'District {i}') for i in range(30))
+    districts = list(District.objects.order_by('id'))
+    Sector.objects.bulk_create(Sector(district=districts[i % 30], name=f'Sector {i}') for i in range(sectors))
+    rows = list(Sector.objects.order_by('id'))
+    invalidate_names()
+
+    PopulationData.objects.bulk_create(
+        PopulationData(
+            district=districts[i % 30].name, sector=sector.name,
+            district_ref_id=sector.district_id, sector_ref_id=sector.id,
+            total_population=20000, male_population=10000, female_population=10000, children_under_5=2000,
+            youth_population=6000, adult_population=10000, elderly_population=2000, population_density=100.0,
+            socioeconomic_status='MIDDLE', unemployment_rate=10.0, literacy_rate=80.0, created_by=user,
+        )
+        for i, sector in enumerate(rows)
+    )
+    HealthFacility.objects.bulk_create(
+        (
+            HealthFacility(
+                name=f'Facility {i}', facility_type='HEALTH_CENTER',
+                status='ACTIVE' if generator.random() < 0.9 else 'CLOSED',
+                district=districts[i % 30].name, sector=rows[i % sectors].name,
+                district_ref_id=rows[i % sectors].district_id, sector_ref_id=rows[i % sectors].id,
+                capacity=generator.randint(10, 200), contact_number='0780000000', created_by=user,
+            )
+            for i in range(facilities)
+        ),
+        batch_size=BATCH,
+    )
+    facility_ids = list(HealthFacility.objects.values_list('id', flat=True))
+    accessibility = (
+        AccessibilityData(
+            health_facility_id=generator.choice(facility_ids), people_served=generator.randint(100, 5000),
+            avg_travel_time=30, distance_to_nearest_facility=5, accessibility_rating=generator.choice(RATINGS),
+            created_by=user,
+        )
+        for _ in range(records)
+    )
+    while True:
+        batch = list(islice(accessibility, BATCH))
+        if not batch:
+            break
+        AccessibilityData.objects.bulk_create(batch)
+
+
+def per_sector():
+    from django.db.models import Count, Q, Sum
+    from geography_app.models import Sector
+    from health_facility_app.models import HealthFacility
+    from population_data_app.models import PopulationData
+    from accessiblity_app.models import AccessibilityData
+
+    results = []
+    for sector_id in Sector.objects.values_list('id', flat=True):
+        population = PopulationData.objects.filter(sector_ref_id=sector_id).aggregate(total=Sum('total_population'))
+        capacity = HealthFacility.objects.filter(sector_ref_id=sector_id, status='ACTIVE').aggregate(
+            total=Sum('capacity')
+        )
+        access = AccessibilityData.objects.filter(health_facility__sector_ref_id=sector_id).aggregate(
+            count=Count('id'), poor=Count('id', filter=Q(accessibility_rating='POOR')), people=Sum('people_served')
+        )
+        results.append((sector_id, population, capacity, access))
+    return results
+
+
+def run(sectors, facilities, records):
+    from django.core.cache import cache
+    from rest_framework.test import APIClient
+
+    with test_database():
+        user = make_user()
+        populate(sectors, facilities, records, user)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def request():
+            response = client.get('/resource_allocation/coverage-gaps/')
+            assert response.status_code == 200, response.data
+            return response.data
+
+        def cold():
+            cache.clear()
+            return request()
+
+        naive_time, _ = best_of(per_sector)
+        cold_time, data = best_of(cold)
+        request()
+        warm_time, _ = best_of(request, repeat=20)
+
+    print_table(['method', 'sectors', 'ms'], [
+        ('aggregate per sector', sectors, f'{naive_time * 1000:.0f}'),
+        ('endpoint, cold', data['count'], f'{cold_time * 1000:.0f}'),
+        ('endpoint, cached', data['count'], f'{warm_time * 1000:.1f}'),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sectors', type=int, default=416)
+    parser.add_argument('--facilities', type=int, default=5000)
+    parser.add_argument('--records', type=int, default=200000)
+    args = parser.parse_args()
+    setup_django()
+    run(args.sectors, args.facilities, args.records)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Allocated equipment totals per district.
+
+    python -m benchmarks.equipment_totals [--facilities 5000] [--allocations 200000]
+
+Compares one GROUP BY over the allocation line items with reading every
+allocation's free-text equipment and parsing it in Python, for all items
+and for one item in one district.
+"""
+import argparse
+import random
+from itertools import islice
+from .harness import setup_django, test_database, best_of, make_user, print_table
+
+BATCH = 10000
+ITEMS = ['ventilator', 'oxygen concentrator', 'hospital bed', 'ultrasound machine', 'defibrillator', 'infusion pump']
+
+
+def populate(facilities, allocations, user):
+    from django.utils import timezone
+    from geography_app.models import District, Sector
+    from geography_app.resolver import invalidate_names
+    from health_facility_app.models import HealthFacility
+    from resource_allocation_app.models import ResourceAllocation
+    from resource_allocation_app.equipment import parse_equipment, set_equipment
+
+    generator = random.Random(1)
+    District.objects.bulk_create(District(name=f'District {i}') for i in range(30))
+    districts = list(District.objects.order_by('id'))
+    Sector.objects.bulk_create(Sector(district=districts[i % 30], name=f'Sector {i}') for i in range(416))
+    sectors = list(Sector.objects.order_by('id'))
+    invalidate_names()
+    HealthFacility.objects.bulk_create(
+        (
+            HealthFacility(
+                name=f'Facility {i}', facility_type='HEALTH_CENTER',
+                district=districts[i % 30].name, sector=sectors[i % 416].name,
+                district_ref_id=sectors[i % 416].district_id, sector_ref_id=sectors[i % 416].id,
+                capacity=50, contact_number='0780000000', created_by=user,
+            )
+            for i in range(facilities)
+        ),
+        batch_size=BATCH,
+    )
+    facility_ids = list(HealthFacility.objects.values_list('id', flat=True))
+    today = timezone.localdate()
+
+    def allocation():
+        text = ', '.join(
+            f'{generator.randint(1, 10)} {item}s' for item in generator.sample(ITEMS, generator.randint(1, 3))
+        )
+        row = ResourceAllocation(
+            health_facility_id=generator.choice(facility_ids), equipment=text, specialist=1,
+            duration_in_days=30, start_date=today, created_by=user,
+        )
+        row.set_dates()
+        return row
+
+    rows = (allocation() for _ in range(allocations))
+    while True:
+        batch = list(islice(rows, BATCH))
+        if not batch:
+            break
+        ResourceAllocation.objects.bulk_create(batch)
+    # Rows are re-read because MySQL doesn't return ids from bulk inserts
+    lines = {}
+    for allocation_id, text in ResourceAllocation.objects.values_list('id', 'equipment').iterator(chunk_size=BATCH):
+        lines[allocation_id] = parse_equipment(text)
+        if len(lines) == BATCH:
+            set_equipment(lines)
+            lines = {}
+    set_equipment(lines)
+    return districts
+
+
+def parse_totals(district_id=None, item=None):
+    from resource_allocation_app.models import ResourceAllocation
+    from resource_allocation_app.equipment import parse_equipment, normalize, item_name
+
+    rows = ResourceAllocation.objects.all()
+    if district_id is not None:
+        rows = rows.filter(health_facility__district_ref_id=district_id)
+    totals = {}
+    for district, text in rows.values_list('health_facility__district_ref_id', 'equipment').iterator(chunk_size=BATCH):
+        for name, quantity in parse_equipment(text):
+            if item and normalize(name) != normalize(item_name(item)):
+                continue
+            key = (district, normalize(name))
+            totals[key] = totals.get(key, 0) + quantity
+    return totals
+
+
+def run(facilities, allocations):
+    from rest_framework.test import APIClient
+    from resource_allocation_app.equipment import equipment_totals, normalize
+
+    with test_database():
+        user = make_user()
+        districts = populate(facilities, allocations, user)
+        district_ids = {district.name: district.id for district in districts}
+        client = APIClient()
+        client.force_authenticate(user)
+        district = districts[7]
+
+        def grouped(**filters):
+            return {
+                (district_ids[row['district']], normalize(row['item'])): row['quantity']
+                for row in equipment_totals(['district', 'item'], **filters)
+            }
+
+        parse_all, expected = best_of(parse_totals)
+        group_all, found = best_of(grouped)
+        assert found == expected
+        parse_one, expected = best_of(lambda: parse_totals(district.id, 'ventilators'))
+        group_one, found = best_of(lambda: grouped(item='ventilators', district=district.name))
+        assert found == expected
+
+        def request():
+            response = client.get('/resource_allocation/equipment-totals/', {
+                'group_by': 'district,item', 'item': 'ventilator', 'district': district.name,
+            })
+            assert response.status_code == 200, response.data
+            return response.data
+
+        endpoint, _ = best_of(request)
+
+    print_table(['query', 'ms'], [
+        ('all items per district, parse text', f'{parse_all * 1000:.0f}'),
+        ('all items per district, GROUP BY', f'{group_all * 1000:.0f}'),
+        ('ventilators in one district, parse text', f'{parse_one * 1000:.1f}'),
+        ('ventilators in one district, GROUP BY', f'{group_one * 1000:.1f}'),
+        ('endpoint, ventilators in one district', f'{endpoint * 1000:.1f}'),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--facilities', type=int, default=5000)
+    parser.add_argument('--allocations', type=int, default=200000)
+    args = parser.parse_args()
+    setup_django()
+    run(args.facilities, args.allocations)
+
+
+if __name__ == '__main__':
+    main()
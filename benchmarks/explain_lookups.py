@@ -0,0 +1,94 @@
+"""
+Check that the filter endpoints' queries are planned as index scans.
+
+Builds each list endpoint's query the way the view does, runs EXPLAIN on the
+page query and reports the index the database picked. Exits non-zero when an
+expected index isn't used.
+
+    python -m benchmarks.explain_lookups [--rows 20000]
+"""
+import argparse
+import sys
+from .harness import setup_django, test_database, make_user, print_table
+from .list_fastpath import populate
+
+
+def analyze():
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            tables = ', '.join(connection.ops.quote_name(name) for name in connection.introspection.table_names())
+            cursor.execute(f'ANALYZE TABLE {tables}')
+            cursor.fetchall()
+        else:
+            cursor.execute('ANALYZE')
+
+
+def cases():
+    from geography_app.resolver import resolve_district, resolve_sector_ids
+    from health_facility_app.models import HealthFacility
+    from disease_incident_app.models import DiseaseIncident
+    from population_data_app.models import PopulationData
+    from accessiblity_app.models import AccessibilityData
+    from resource_allocation_app.models import ResourceAllocation
+
+    facility_id = HealthFacility.objects.order_by('id').values_list('id', flat=True)[0]
+    district_id = resolve_district('district 7')
+    sector_ids = resolve_sector_ids('sector 7')
+    return [
+        ('facilities by district', HealthFacility.objects.filter(district_ref_id=district_id),
+         'facility_district_created_idx'),
+        ('facilities by sector', HealthFacility.objects.filter(sector_ref_id__in=sector_ids),
+         'facility_sector_created_idx'),
+        ('facilities by name', HealthFacility.objects.filter(name__lower='facility 7'),
+         'facility_name_ci_idx'),
+        ('facilities by status', HealthFacility.objects.filter(status='CLOSED'),
+         'facility_status_created_idx'),
+        ('incidents by district', DiseaseIncident.objects.filter(health_facility__district_ref_id=district_id),
+         'facility_district_created_idx'),
+        ('incidents by sector', DiseaseIncident.objects.filter(health_facility__sector_ref_id__in=sector_ids),
+         'facility_sector_created_idx'),
+        ('incidents by status', DiseaseIncident.objects.filter(status='CONTAINED'),
+         'incident_status_created_idx'),
+        ('populations by district', PopulationData.objects.filter(district_ref_id=district_id),
+         'population_district_idx'),
+        ('populations by sector', PopulationData.objects.filter(sector_ref_id__in=sector_ids),
+         'population_sector_idx'),
+        ('accessibility by facility', AccessibilityData.objects.filter(health_facility_id=facility_id),
+         'access_facility_created_idx'),
+        ('allocations by facility', ResourceAllocation.objects.filter(health_facility_id=facility_id),
+         'allocation_facility_idx'),
+    ]
+
+
+def run(rows):
+    from django.conf import settings
+
+    page_size = settings.KEYSET_PAGINATION['PAGE_SIZE']
+    results, failed = [], False
+    with test_database():
+        populate(rows, make_user())
+        analyze()
+        for name, queryset, index in cases():
+            plan = queryset.order_by('created_at', 'id')[:page_size + 1].explain()
+            used = index in plan
+            failed = failed or not used
+            results.append((name, index, 'yes' if used else 'NO'))
+            if not used:
+                print(f'{name}:\n{plan}\n', file=sys.stderr)
+
+    print_table(['query', 'expected index', 'used'], results)
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+    setup_django()
+    sys.exit(0 if run(args.rows) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Rows/sec and peak memory of the streaming /export/ endpoints.
+
+    python -m benchmarks.export_stream [--rows 100000 1000000]
+
+Each format is consumed once for timing and once under tracemalloc for peak
+memory, which should stay flat as the table grows.
+"""
+import argparse
+import time
+import tracemalloc
+from itertools import islice
+from .harness import setup_django, test_database, print_table, make_user
+
+BATCH = 10000
+
+
+def populate(rows, user):
+    from geography_app.resolver import get_or_create_area
+    from health_facility_app.models import HealthFacility
+    from disease_incident_app.models import DiseaseIncident
+
+    area = get_or_create_area('Gasabo', 'Kimironko')
+    facility = HealthFacility.objects.create(
+        name='Export Clinic', facility_type='CLINIC', district=area.district, sector=area.sector,
+        capacity=50, contact_number='0780000000', created_by=user,
+    )
+    incidents = (
+        DiseaseIncident(
+            disease_name='Malaria', health_facility=facility, number_of_cases=i % 9,
+            description='Weekly report, "quoted", with commas', created_by=user,
+        )
+        for i in range(rows)
+    )
+    while True:
+        batch = list(islice(incidents, BATCH))
+        if not batch:
+            break
+        DiseaseIncident.objects.bulk_create(batch)
+
+
+def consume(client, url, headers, trace=False):
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(url, **headers)
+    assert response.status_code == 200, response
+    size = sum(len(chunk) for chunk in response.streaming_content)
+    elapsed = time.perf_counter() - started
+    peak = None
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def run(sizes):
+    from rest_framework.test import APIClient
+
+    cases = [
+        ('csv', '/export/incidents.csv', {}),
+        ('ndjson', '/export/incidents.ndjson', {}),
+        ('csv + gzip', '/export/incidents.csv', {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+    ]
+    results = []
+    for size in sizes:
+        with test_database():
+            user = make_user()
+            populate(size, user)
+            client = APIClient()
+            client.force_authenticate(user)
+            for label, url, headers in cases:
+                elapsed, length, _ = consume(client, url, headers)
+                # tracemalloc slows the export down, so memory gets its own pass
+                _, _, peak = consume(client, url, headers, trace=True)
+                results.append((
+                    label, size, f'{size / elapsed:,.0f}', f'{length / 2 ** 20:,.1f}', f'{peak / 2 ** 20:.1f}',
+                ))
+
+    print_table(['format', 'rows', 'rows/s', 'MiB sent', 'peak MiB'], results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    args = parser.parse_args()
+    setup_django()
+    run(args.rows)
+
+
+if __name__ == '__main__':
+    main()
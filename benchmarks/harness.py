@@ -0,0 +1,65 @@
+"""
+Shared setup for the benchmark scripts.
+
+Benchmarks run against a throwaway test database created from the configured
+DATABASES, the same way the test runner does, so they never touch real data.
+Run them from the project root, e.g.:
+
+    python -m benchmarks.list_fastpath
+"""
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    # Like the test runner; with DEBUG on every query would also be logged
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    # Cached payloads and name tables would otherwise outlive the database
+    cache.clear()
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def best_of(func, repeat=3):
+    """
+    Run func `repeat` times and return (best wall time in seconds, last result).
+    """
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def make_user(email='benchmark@example.com', phone_number='0700000000'):
+    from userApp.models import CustomUser
+    return CustomUser.objects.create_user(
+        email=email, phone_number=phone_number, role='admin', password='benchmark'
+    )
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    line = '  '.join('{:>%d}' % width for width in widths)
+    print(line.format(*headers))
+    for row in rows:
+        print(line.format(*row))
@@ -0,0 +1,101 @@
+"""
+Latency of /incident/incidence/ for a national dataset, cold and cached.
+
+    python -m benchmarks.incidence_rates [--sectors 416] [--diseases 40] [--days 60]
+
+Rollup rows are inserted directly: one per sector, disease and day.
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from itertools import islice
+from .harness import setup_django, test_database, best_of, make_user, print_table
+
+BATCH = 10000
+
+
+def populate(sectors, diseases, days, user):
+    from geography_app.models import District, Sector
+    from geography_app.resolver import invalidate_names
+    from population_data_app.models import PopulationData
+    from disease_incident_app.models import IncidentDailyRollup
+
+    District.objects.bulk_create(District(name=f'District {i}') for i in range(30))
+    districts = list(District.objects.order_by('id'))
+    Sector.objects.bulk_create(Sector(district=districts[i % 30], name=f'Sector {i}') for i in range(sectors))
+    rows = list(Sector.objects.order_by('id'))
+    invalidate_names()
+
+    generator = random.Random(1)
+    populations = []
+    for sector in rows:
+        bands = [generator.randint(2000, 6000) for _ in range(4)]
+        populations.append(PopulationData(
+            district=districts[rows.index(sector) % 30].name, sector=sector.name,
+            district_ref_id=sector.district_id, sector_ref_id=sector.id,
+            total_population=sum(bands), male_population=sum(bands) // 2,
+            female_population=sum(bands) - sum(bands) // 2, children_under_5=bands[0],
+            youth_population=bands[1], adult_population=bands[2], elderly_population=bands[3],
+            population_density=100.0, socioeconomic_status='MIDDLE', unemployment_rate=10.0,
+            literacy_rate=80.0, created_by=user,
+        ))
+    PopulationData.objects.bulk_create(populations)
+
+    start = date(2025, 1, 1)
+    rollups = (
+        IncidentDailyRollup(
+            day=start + timedelta(days=day), district_ref_id=sector.district_id, sector_ref_id=sector.id,
+            disease_name=f'Disease {disease}', status='ACTIVE',
+            total_cases=generator.randint(0, 30), incident_count=1,
+        )
+        for sector in rows for disease in range(diseases) for day in range(days)
+    )
+    while True:
+        batch = list(islice(rollups, BATCH))
+        if not batch:
+            break
+        IncidentDailyRollup.objects.bulk_create(batch)
+    return sectors * diseases * days
+
+
+def run(sectors, diseases, days):
+    from django.core.cache import cache
+    from rest_framework.test import APIClient
+
+    with test_database():
+        user = make_user()
+        count = populate(sectors, diseases, days, user)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def request(params=None):
+            response = client.get('/incident/incidence/', params or {})
+            assert response.status_code == 200, response.data
+            return response.data
+
+        def cold(params=None):
+            cache.clear()
+            return request(params)
+
+        rows = []
+        for label, params in (('all diseases', None), ('one disease', {'disease': 'disease 3'})):
+            cold_time, data = best_of(lambda: cold(params))
+            request(params)
+            warm_time, _ = best_of(lambda: request(params), repeat=20)
+            rows.append((label, count, len(data['results']), f'{cold_time * 1000:.0f}', f'{warm_time * 1000:.1f}'))
+
+    print_table(['query', 'rollup rows', 'results', 'cold ms', 'cached ms'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sectors', type=int, default=416)
+    parser.add_argument('--diseases', type=int, default=40)
+    parser.add_argument('--days', type=int, default=60)
+    args = parser.parse_args()
+    setup_django()
+    run(args.sectors, args.diseases, args.days)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Rows/sec of the values() fast path against the model serializers.
+
+    python -m benchmarks.list_fastpath [--rows 10000 100000]
+"""
+import argparse
+from datetime import timedelta
+from .harness import setup_django, test_database, best_of, make_user, print_table
+
+
+def populate(rows, user):
+    from django.utils import timezone
+    from geography_app.models import District, Sector
+    from geography_app.resolver import invalidate_names
+    from health_facility_app.models import HealthFacility
+    from disease_incident_app.models import DiseaseIncident
+    from population_data_app.models import PopulationData
+    from accessiblity_app.models import AccessibilityData
+    from resource_allocation_app.models import ResourceAllocation
+    from resource_allocation_app.equipment import parse_equipment, set_equipment
+
+    # bulk_create skips save(), so the area keys are filled in here. Rows are
+    # re-read because MySQL doesn't return ids from bulk inserts.
+    District.objects.bulk_create(District(name=f'District {i}') for i in range(30))
+    districts = list(District.objects.order_by('id'))
+    Sector.objects.bulk_create(Sector(district=districts[i % 30], name=f'Sector {i}') for i in range(rows))
+    sectors = list(Sector.objects.order_by('id'))
+    invalidate_names()
+    HealthFacility.objects.bulk_create(
+        HealthFacility(
+            name=f'Facility {i}', facility_type='CLINIC', district=f'District {i % 30}',
+            sector=f'Sector {i}', district_ref=districts[i % 30], sector_ref=sectors[i],
+            capacity=50, contact_number='0780000000', created_by=user,
+        )
+        for i in range(rows)
+    )
+    facility_ids = list(HealthFacility.objects.values_list('id', flat=True))
+    PopulationData.objects.bulk_create(
+        PopulationData(
+            district=f'District {i % 30}', sector=f'Sector {i}', district_ref=districts[i % 30],
+            sector_ref=sectors[i], total_population=1000,
+            male_population=500, female_population=500, children_under_5=100,
+            youth_population=200, adult_population=600, elderly_population=100,
+            population_density=120.5, socioeconomic_status='MIDDLE', unemployment_rate=12.5,
+            literacy_rate=80.0, created_by=user,
+        )
+        for i in range(rows)
+    )
+    DiseaseIncident.objects.bulk_create(
+        DiseaseIncident(
+            disease_name='Malaria', health_facility_id=facility_id, number_of_cases=3,
+            description='Weekly report', created_by=user,
+        )
+        for facility_id in facility_ids
+    )
+    AccessibilityData.objects.bulk_create(
+        AccessibilityData(
+            health_facility_id=facility_id, people_served=1200, avg_travel_time=20.0,
+            distance_to_nearest_facility=4.5, accessibility_rating='MODERATE', created_by=user,
+        )
+        for facility_id in facility_ids
+    )
+    today = timezone.localdate()
+    ResourceAllocation.objects.bulk_create(
+        ResourceAllocation(
+            health_facility_id=facility_id, equipment='2 ventilators', specialist=2,
+            duration_in_days=30, start_date=today, end_date=today + timedelta(days=30), created_by=user,
+        )
+        for facility_id in facility_ids
+    )
+    set_equipment({
+        allocation_id: parse_equipment('2 ventilators')
+        for allocation_id in ResourceAllocation.objects.values_list('id', flat=True)
+    })
+
+
+def run(sizes):
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from backend.fastpath import get_values_renderer
+    from health_facility_app.models import HealthFacility
+    from health_facility_app.serializers import HealthFacilitySerializer
+    from disease_incident_app.models import DiseaseIncident
+    from disease_incident_app.serializers import DiseaseIncidentSerializer
+    from population_data_app.models import PopulationData
+    from population_data_app.serializers import PopulationDataSerializer
+    from accessiblity_app.models import AccessibilityData
+    from accessiblity_app.serializers import AccessibilityDataSerializer
+    from resource_allocation_app.models import ResourceAllocation
+    from resource_allocation_app.serializers import ResourceAllocationSerializer
+
+    cases = [
+        (HealthFacility, HealthFacilitySerializer),
+        (DiseaseIncident, DiseaseIncidentSerializer),
+        (PopulationData, PopulationDataSerializer),
+        (AccessibilityData, AccessibilityDataSerializer),
+        (ResourceAllocation, ResourceAllocationSerializer),
+    ]
+    request = Request(APIRequestFactory().get('/'))
+    results = []
+
+    for size in sizes:
+        with test_database():
+            populate(size, make_user())
+            for model, serializer_class in cases:
+                queryset = model.objects.order_by('created_at', 'id')
+                renderer = get_values_renderer(serializer_class, request)
+
+                # The serializer path prefetches the way paginated_response() does
+                serializer_time, slow = best_of(lambda: serializer_class(
+                    serializer_class.optimize_queryset(queryset.all(), request), many=True, context={'request': request}
+                ).data)
+                fast_time, fast = best_of(lambda: renderer.render(renderer.values(queryset.all())))
+                assert fast == slow, f'{model.__name__}: fast path output differs from serializer'
+
+                results.append((
+                    model.__name__, size,
+                    f'{size / serializer_time:,.0f}', f'{size / fast_time:,.0f}',
+                    f'{serializer_time / fast_time:.1f}x',
+                ))
+
+    print_table(['model', 'rows', 'serializer rows/s', 'values() rows/s', 'speedup'], results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+    setup_django()
+    run(args.rows)
+
+
+if __name__ == '__main__':
+    main()
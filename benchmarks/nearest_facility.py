@@ -0,0 +1,108 @@
+"""
+Nearest-facility lookups on the spatial index at 50k facilities.
+
+    python -m benchmarks.nearest_facility [--facilities 50000] [--queries 2000]
+
+Facilities are scattered over Rwanda's bounding box. Index lookups are timed
+on their own and through /facility/nearest/, and compared with computing
+every distance in NumPy.
+"""
+import argparse
+import random
+import statistics
+import time
+from .harness import setup_django, test_database, make_user, print_table
+
+BATCH = 10000
+# Rwanda's bounding box
+LATITUDES = (-2.84, -1.05)
+LONGITUDES = (28.86, 30.90)
+
+
+def populate(facilities, user):
+    from geography_app.resolver import get_or_create_area
+    from health_facility_app.models import HealthFacility
+
+    area = get_or_create_area('Gasabo', 'Kimironko')
+    generator = random.Random(1)
+    types = [value for value, _ in HealthFacility.FACILITY_TYPES]
+    statuses = [value for value, _ in HealthFacility.STATUS_CHOICES]
+    HealthFacility.objects.bulk_create(
+        (
+            HealthFacility(
+                name=f'Facility {i}', facility_type=generator.choice(types), status=generator.choice(statuses),
+                district=area.district, sector=area.sector,
+                district_ref_id=area.district_id, sector_ref_id=area.sector_id,
+                latitude=generator.uniform(*LATITUDES), longitude=generator.uniform(*LONGITUDES),
+                capacity=50, contact_number='0780000000', created_by=user,
+            )
+            for i in range(facilities)
+        ),
+        batch_size=BATCH,
+    )
+
+
+def timings(func, points):
+    results = []
+    for latitude, longitude in points:
+        started = time.perf_counter()
+        func(latitude, longitude)
+        results.append(time.perf_counter() - started)
+    results.sort()
+    p95 = results[min(len(results) - 1, int(len(results) * 0.95))]
+    return f'{statistics.median(results) * 1000:.3f}', f'{p95 * 1000:.3f}'
+
+
+def run(facilities, queries):
+    import numpy as np
+    from rest_framework.test import APIClient
+    from health_facility_app.spatial import get_spatial_index, haversine_km
+
+    with test_database():
+        user = make_user()
+        populate(facilities, user)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        started = time.perf_counter()
+        index = get_spatial_index()
+        print(f'Index of {len(index)} facilities built in {(time.perf_counter() - started) * 1000:.0f} ms')
+
+        generator = random.Random(2)
+        points = [(generator.uniform(*LATITUDES), generator.uniform(*LONGITUDES)) for _ in range(queries)]
+        latitudes, longitudes = index.latitudes[:len(index)], index.longitudes[:len(index)]
+
+        def brute_force(latitude, longitude):
+            distances = haversine_km(latitude, longitude, latitudes, longitudes)
+            return np.argpartition(distances, 10)[:10]
+
+        def endpoint(latitude, longitude):
+            response = client.get('/facility/nearest/', {
+                'lat': latitude, 'lon': longitude, 'k': 10, 'type': 'HOSPITAL', 'status': 'ACTIVE',
+            })
+            assert response.status_code == 200, response.data
+
+        rows = [
+            ('index: 10 nearest', *timings(lambda lat, lon: index.nearest(lat, lon, 10), points)),
+            ('index: 10 nearest open hospitals', *timings(
+                lambda lat, lon: index.nearest(lat, lon, 10, ['HOSPITAL'], ['ACTIVE']), points
+            )),
+            ('index: within 5 km', *timings(lambda lat, lon: index.within(lat, lon, 5, 100), points)),
+            ('numpy: every distance', *timings(brute_force, points)),
+            ('GET /facility/nearest/', *timings(endpoint, points[:max(1, queries // 10)])),
+        ]
+
+    print_table(['lookup', 'p50 ms', 'p95 ms'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--facilities', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+    setup_django()
+    run(args.facilities, args.queries)
+
+
+if __name__ == '__main__':
+    main()
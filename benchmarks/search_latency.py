@@ -0,0 +1,148 @@
+"""
+Latency of /search/ against the icontains lookups it replaces.
+
+    python -m benchmarks.search_latency [--incidents 1000000] [--facilities 5000]
+
+Queries include misspellings. The icontains column runs the old
+leading-wildcard lookups for the correctly spelled query, which is all they
+can match.
+"""
+import argparse
+import random
+import statistics
+import time
+from itertools import islice
+from .harness import setup_django, test_database, make_user, print_table
+
+BATCH = 10000
+
+DISEASES = [
+    'Malaria', 'Cholera', 'Tuberculosis', 'Typhoid Fever', 'Measles', 'Dengue Fever', 'Influenza',
+    'Hepatitis B', 'Meningitis', 'Pneumonia', 'Diarrhoea', 'Schistosomiasis', 'Rabies', 'Yellow Fever',
+    'Ebola Virus Disease', 'Marburg Virus Disease', 'Mpox', 'Polio', 'Brucellosis', 'Anthrax',
+]
+PLACES = [
+    'Kimironko', 'Remera', 'Kacyiru', 'Nyamirambo', 'Kicukiro', 'Gikondo', 'Kanombe', 'Rwezamenyo',
+    'Muhima', 'Gisozi', 'Kinyinya', 'Jabana', 'Ndera', 'Rusororo', 'Masaka', 'Gahanga', 'Niboye',
+]
+KINDS = ['Health Centre', 'District Hospital', 'Health Post', 'Clinic', 'Referral Hospital']
+
+# (query, correctly spelled text)
+QUERIES = [
+    ('malaria', 'malaria'), ('malara', 'malaria'), ('tuberclosis', 'tuberculosis'),
+    ('typhoid', 'typhoid'), ('cholerra', 'cholera'), ('yelow fever', 'yellow fever'),
+    ('kimironko', 'kimironko'), ('kimronko health', 'kimironko health'), ('remera hospital', 'remera hospital'),
+    ('nyamirambo', 'nyamirambo'), ('ndera clinc', 'ndera clinic'), ('marburg', 'marburg'),
+]
+
+
+def populate(incidents, facilities, user):
+    from geography_app.resolver import get_or_create_area
+    from health_facility_app.models import HealthFacility
+    from disease_incident_app.models import DiseaseIncident
+    from search_app.models import SearchTerm
+
+    area = get_or_create_area('Gasabo', 'Kimironko')
+    HealthFacility.objects.bulk_create(
+        (
+            HealthFacility(
+                name=f'{PLACES[i % len(PLACES)]} {KINDS[i // len(PLACES) % len(KINDS)]} {i}',
+                facility_type='CLINIC', district=area.district, sector=area.sector,
+                district_ref_id=area.district_id, sector_ref_id=area.sector_id,
+                capacity=50, contact_number='0780000000', created_by=user,
+            )
+            for i in range(facilities)
+        ),
+        batch_size=BATCH,
+    )
+    facility_ids = list(HealthFacility.objects.values_list('id', flat=True))
+    # A few hundred distinct names: each disease with strain/serotype variants
+    names = DISEASES + [f'{name} {variant}' for name in DISEASES for variant in range(1, 15)]
+    generator = random.Random(1)
+    rows = (
+        DiseaseIncident(
+            disease_name=generator.choice(names), health_facility_id=generator.choice(facility_ids),
+            number_of_cases=generator.randint(1, 20), description='Weekly report', created_by=user,
+        )
+        for _ in range(incidents)
+    )
+    while True:
+        batch = list(islice(rows, BATCH))
+        if not batch:
+            break
+        DiseaseIncident.objects.bulk_create(batch)
+    # bulk_create sends no signals, so the terms are built in one pass
+    SearchTerm.rebuild_all()
+
+
+def icontains(text, limit):
+    from health_facility_app.models import HealthFacility
+    from disease_incident_app.models import DiseaseIncident
+
+    list(HealthFacility.objects.filter(name__icontains=text)[:limit])
+    list(DiseaseIncident.objects.filter(disease_name__icontains=text).order_by('-created_at')[:limit])
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return f'{statistics.median(timings) * 1000:.1f}', f'{p95 * 1000:.1f}'
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run(incidents, facilities, repeat):
+    from rest_framework.test import APIClient
+    from search_app.index import get_index
+
+    with test_database():
+        user = make_user()
+        populate(incidents, facilities, user)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        started = time.perf_counter()
+        get_index()
+        print(f'Index loaded in {(time.perf_counter() - started) * 1000:.0f} ms')
+
+        rows, search_all, icontains_all = [], [], []
+        for query, spelled in QUERIES:
+            def search():
+                response = client.get('/search/', {'q': query})
+                assert response.status_code == 200, response.data
+                return response.data
+
+            data = search()
+            top = (data['facilities'] or data['incidents'] or [{}])[0]
+            search_timings = measure(search, repeat)
+            icontains_timings = measure(lambda: icontains(spelled, 10), max(1, repeat // 10))
+            search_all += search_timings
+            icontains_all += icontains_timings
+            rows.append((
+                query, top.get('name') or top.get('disease_name', '-'),
+                *percentiles(search_timings), *percentiles(icontains_timings),
+            ))
+        rows.append(('all', '', *percentiles(search_all), *percentiles(icontains_all)))
+
+    print_table(['query', 'top match', 'search p50 ms', 'search p95 ms', 'icontains p50 ms', 'icontains p95 ms'], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--incidents', type=int, default=1000000)
+    parser.add_argument('--facilities', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    setup_django()
+    run(args.incidents, args.facilities, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
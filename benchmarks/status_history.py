@@ -0,0 +1,102 @@
+"""
+As-of status counts from snapshots plus a short replay, against replaying
+the whole event log.
+
+    python -m benchmarks.status_history [--events 1000000] [--days 365]
+
+Events are spread evenly over the days; a snapshot is taken at the end of
+each day, as a daily snapshot_incident_status run would.
+"""
+import argparse
+import random
+from datetime import datetime, time, timedelta
+from itertools import islice
+from .harness import setup_django, test_database, best_of, print_table
+
+BATCH = 10000
+SECTORS = 100
+STATUSES = ['ACTIVE', 'RESOLVED', 'UNDER_INVESTIGATION', 'CONTAINED']
+
+
+def populate(events, days):
+    from django.utils import timezone
+    from geography_app.models import District, Sector
+    from geography_app.resolver import invalidate_names
+    from disease_incident_app.models import IncidentStatusEvent
+    from disease_incident_app.history import make_event
+
+    District.objects.bulk_create(District(name=f'District {i}') for i in range(10))
+    districts = list(District.objects.order_by('id'))
+    Sector.objects.bulk_create(Sector(district=districts[i % 10], name=f'Sector {i}') for i in range(SECTORS))
+    areas = [(sector.district_id, sector.id) for sector in Sector.objects.order_by('id')]
+    invalidate_names()
+
+    start = timezone.make_aware(datetime(2025, 1, 1))
+    step = timedelta(days=days) / events
+    generator = random.Random(1)
+    # Each incident is created, then changes status a couple of times
+    state = {}
+
+    def generate():
+        for i in range(events):
+            occurred_at = start + step * i
+            incident_id = generator.randrange(events // 3 + 1)
+            previous = state.get(incident_id)
+            current = (*generator.choice(areas), generator.choice(STATUSES), generator.randint(1, 20))
+            if previous:
+                current = (*previous[:2], *current[2:])
+            state[incident_id] = current
+            event = make_event('UPDATED' if previous else 'CREATED', incident_id, 'Malaria', previous, current)
+            event.occurred_at = occurred_at
+            yield event
+
+    rows = generate()
+    while True:
+        batch = list(islice(rows, BATCH))
+        if not batch:
+            break
+        IncidentStatusEvent.objects.bulk_create(batch)
+    return start, districts
+
+
+def run(events, days):
+    from django.utils import timezone
+    from disease_incident_app.models import IncidentStatusSnapshot
+    from disease_incident_app.history import take_snapshot, status_counts_as_of
+
+    with test_database():
+        start, districts = populate(events, days)
+        ends = [
+            timezone.make_aware(datetime.combine((start + timedelta(days=day)).date(), time.max))
+            for day in range(days)
+        ]
+        queries = [end - timedelta(hours=6) for end in ends[days // 2::max(1, days // 20)]]
+        area = {'district_ref_id': districts[3].id}
+
+        def replay_all():
+            return [status_counts_as_of(at, area)[0] for at in queries]
+
+        full_time, full = best_of(replay_all)
+        snapshot_time, _ = best_of(lambda: [take_snapshot(end) for end in ends], repeat=1)
+        snapshotted_time, snapshotted = best_of(replay_all)
+        assert full == snapshotted, 'snapshot counts differ from the full replay'
+        count = IncidentStatusSnapshot.objects.count()
+
+    print_table(['method', 'events', 'ms/query'], [
+        ('full replay', events, f'{full_time / len(queries) * 1000:.1f}'),
+        ('snapshot + replay', events, f'{snapshotted_time / len(queries) * 1000:.1f}'),
+    ])
+    print(f'{count} daily snapshots taken in {snapshot_time:.1f} s ({snapshot_time / count * 1000:.0f} ms each)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+    setup_django()
+    run(args.events, args.days)
+
+
+if __name__ == '__main__':
+    main()
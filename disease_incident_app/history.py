@@ -0,0 +1,130 @@
+"""
+Incident status counts at any past moment, from the event log.
+
+Signals append an IncidentStatusEvent whenever an incident is created,
+deleted, changes status or case count, or moves with its facility.
+take_snapshot() stores the counts per sector and status at a point in time,
+built from the previous snapshot plus the events since. status_counts_as_of()
+starts from the nearest earlier snapshot and replays only the events after
+it, with two grouped queries, so a query never scans the whole history.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from .models import DiseaseIncident, IncidentStatusEvent, IncidentStatusSnapshot, IncidentStatusSnapshotCount
+
+# Events are stamped before their transaction commits, so scheduled
+# snapshots stop this long before now to leave in-flight events after them
+SNAPSHOT_LAG = timedelta(minutes=5)
+
+SNAPSHOT_COLUMNS = ('district_ref', 'sector_ref', 'status')
+
+
+def make_event(action, incident_id, disease_name, previous=None, current=None):
+    """
+    Unsaved event moving an incident from `previous` to `current`, each a
+    (district id, sector id, status, cases) tuple, or None when the incident
+    didn't exist on that side.
+    """
+    previous = previous or (None, None, None, None)
+    current = current or (None, None, None, None)
+    return IncidentStatusEvent(
+        incident_id=incident_id, action=action, disease_name=disease_name,
+        previous_district_ref_id=previous[0], previous_sector_ref_id=previous[1],
+        previous_status=previous[2], previous_cases=previous[3],
+        district_ref_id=current[0], sector_ref_id=current[1],
+        status=current[2], number_of_cases=current[3],
+    )
+
+
+def net_changes(events, columns, area=None):
+    """
+    Net change in incidents and cases over a queryset of events, as
+    {values of `columns`: [incidents, cases]}. `area` holds lookups on the
+    new side (e.g. {'district_ref_id': 1}); they are applied to the previous
+    side too.
+    """
+    area = area or {}
+    changes = defaultdict(lambda: [0, 0])
+    for prefix, cases_column, sign in (('', 'number_of_cases', 1), ('previous_', 'previous_cases', -1)):
+        legs = events.filter(
+            **{prefix + 'status__isnull': False},
+            **{prefix + lookup: value for lookup, value in area.items()},
+        )
+        rows = legs.values_list(*(prefix + column for column in columns)).annotate(
+            incidents=Count('id'), cases=Sum(cases_column)
+        ).order_by()
+        for *key, incidents, cases in rows:
+            change = changes[tuple(key)]
+            change[0] += sign * incidents
+            change[1] += sign * (cases or 0)
+    return changes
+
+
+def take_snapshot(at=None):
+    """
+    Store the status counts per sector as of `at` (default: SNAPSHOT_LAG
+    ago). Snapshots are taken in order; `at` must be after the latest one.
+    """
+    at = at or timezone.now() - SNAPSHOT_LAG
+    if at > timezone.now():
+        raise ValueError('Snapshots cannot be taken in the future')
+
+    with transaction.atomic():
+        previous = IncidentStatusSnapshot.objects.order_by('-taken_at').first()
+        if previous and at <= previous.taken_at:
+            raise ValueError(f'The latest snapshot is already at {previous.taken_at.isoformat()}')
+
+        counts = defaultdict(lambda: [0, 0])
+        events = IncidentStatusEvent.objects.filter(occurred_at__lte=at)
+        if previous:
+            for *key, incidents, cases in previous.counts.values_list(
+                'district_ref', 'sector_ref', 'status', 'incident_count', 'total_cases'
+            ):
+                counts[tuple(key)] = [incidents, cases]
+            events = events.filter(occurred_at__gt=previous.taken_at)
+        for key, (incidents, cases) in net_changes(events, SNAPSHOT_COLUMNS).items():
+            counts[key][0] += incidents
+            counts[key][1] += cases
+
+        snapshot = IncidentStatusSnapshot.objects.create(taken_at=at)
+        IncidentStatusSnapshotCount.objects.bulk_create(
+            (
+                IncidentStatusSnapshotCount(
+                    snapshot=snapshot, district_ref_id=district_id, sector_ref_id=sector_id,
+                    status=status, incident_count=incidents, total_cases=cases,
+                )
+                for (district_id, sector_id, status), (incidents, cases) in counts.items()
+                if incidents
+            ),
+            batch_size=1000,
+        )
+    return snapshot
+
+
+def status_counts_as_of(at, area=None):
+    """
+    Incidents and cases per status at `at`, optionally narrowed by area
+    lookups such as {'district_ref_id': 1} or {'sector_ref_id__in': [2, 3]}.
+    Returns (counts, snapshot used or None).
+    """
+    area = area or {}
+    counts = {status: [0, 0] for status, _ in DiseaseIncident.STATUS_CHOICES}
+    snapshot = IncidentStatusSnapshot.objects.filter(taken_at__lte=at).order_by('-taken_at').first()
+    events = IncidentStatusEvent.objects.filter(occurred_at__lte=at)
+    if snapshot:
+        for status, incidents, cases in snapshot.counts.filter(**area).values_list('status').annotate(
+            incidents=Sum('incident_count'), cases=Sum('total_cases')
+        ).order_by():
+            counts.setdefault(status, [0, 0])
+            counts[status][0] += incidents
+            counts[status][1] += cases
+        events = events.filter(occurred_at__gt=snapshot.taken_at)
+
+    for (status,), (incidents, cases) in net_changes(events, ('status',), area).items():
+        counts.setdefault(status, [0, 0])
+        counts[status][0] += incidents
+        counts[status][1] += cases
+    return counts, snapshot
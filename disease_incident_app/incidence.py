@@ -0,0 +1,211 @@
+"""
+Incidence rates per sector and disease.
+
+Case totals come from one grouped query over IncidentDailyRollup and
+population totals from one grouped query over PopulationData. Everything
+else is computed on NumPy arrays:
+
+- crude rate: cases per 100,000 residents of the sector;
+- age-adjusted rate: incidents carry no patient age, so the adjustment is
+  indirect. Each sector's expected cases spread the national case count
+  over its age bands weighted by AGE_BAND_RISK (relative risk of each
+  band); the standardized incidence ratio (observed / expected) times the
+  national rate gives the adjusted rate. With equal risks it equals the
+  crude rate.
+- 95% confidence intervals from Byar's approximation to the Poisson
+  interval of the case count.
+
+Results are cached under a version that the rollup and population signal
+handlers bump.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.core.cache import cache
+from backend.cache import make_key, get_version, bump_version, record
+from geography_app.resolver import get_name_tables
+from population_data_app.models import PopulationData
+from .models import IncidentDailyRollup
+
+PER = 100000
+Z = 1.959964
+
+AGE_BANDS = ('children_under_5', 'youth_population', 'adult_population', 'elderly_population')
+# Relative incidence risk of each age band, for the age-adjusted rate
+AGE_BAND_RISK = (1.0, 1.0, 1.0, 1.0)
+
+CACHE_GROUP = 'incidence-rates'
+INCIDENCE_NAMESPACE = 'incidence'
+
+
+def invalidate_incidence():
+    transaction.on_commit(lambda: bump_version(INCIDENCE_NAMESPACE))
+
+
+def poisson_interval(counts):
+    """
+    Byar's approximate 95% interval for Poisson counts, as (lower, upper).
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    upper_counts = counts + 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lower = counts * (1 - 1 / (9 * counts) - Z / (3 * np.sqrt(counts))) ** 3
+    lower = np.where(counts > 0, lower, 0.0)
+    upper = upper_counts * (1 - 1 / (9 * upper_counts) + Z / (3 * np.sqrt(upper_counts))) ** 3
+    return lower, upper
+
+
+def load_cases(start=None, end=None, disease=None):
+    """
+    Cases per (sector, disease) over the period, with disease names grouped
+    case-insensitively.
+    """
+    rollups = IncidentDailyRollup.objects.all()
+    if start:
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        rollups = rollups.filter(day__lte=end)
+    if disease:
+        rollups = rollups.filter(disease_name__lower=disease.lower())
+    # Grouping on the raw name and merging spellings here is cheaper than
+    # grouping on LOWER(disease_name) in the database
+    return [
+        (sector_id, name.lower(), name, cases)
+        for sector_id, name, cases in rollups.values_list('sector_ref', 'disease_name').annotate(
+            cases=Sum('total_cases')
+        ).order_by()
+    ]
+
+
+def load_populations():
+    return list(
+        PopulationData.objects.values_list('sector_ref').annotate(
+            total=Sum('total_population'), **{f'{band}_total': Sum(band) for band in AGE_BANDS}
+        ).order_by()
+    )
+
+
+def _rounded(values, digits=None):
+    # NaN and infinity (no population data) become None
+    finite = np.isfinite(values)
+    values = np.where(finite, values, 0)
+    values = values.round().astype(np.int64) if digits is None else values.round(digits)
+    return [value if ok else None for value, ok in zip(values.tolist(), finite.tolist())]
+
+
+def compute_rates(case_rows, population_rows, age_risk=AGE_BAND_RISK, all_sectors=False):
+    """
+    Rates for every (sector, disease) in case_rows. With all_sectors, every
+    sector with population data gets a row for every disease, zero cases
+    included. Sectors without population data have no rates.
+    """
+    sector_ids = [row[0] for row in population_rows]
+    position = {sector_id: i for i, sector_id in enumerate(sector_ids)}
+    populations = np.array([row[1] for row in population_rows], dtype=np.float64).reshape(-1)
+    bands = np.array([row[2:] for row in population_rows], dtype=np.float64).reshape(-1, len(AGE_BANDS))
+    weighted = bands @ np.asarray(age_risk, dtype=np.float64)
+
+    names = {}
+    cases_by_pair = {}
+    for sector_id, key, name, cases in case_rows:
+        names[key] = min(names.get(key, name), name)
+        cases_by_pair[(sector_id, key)] = cases_by_pair.get((sector_id, key), 0) + (cases or 0)
+    if all_sectors:
+        for key in names:
+            for sector_id in sector_ids:
+                cases_by_pair.setdefault((sector_id, key), 0)
+
+    pairs = list(cases_by_pair)
+    # Sectors without population data index the trailing NaN
+    padded_populations = np.append(populations, np.nan)
+    padded_weighted = np.append(weighted, np.nan)
+    diseases = sorted(names)
+    disease_index = {key: i for i, key in enumerate(diseases)}
+    cases = np.array([cases_by_pair[pair] for pair in pairs], dtype=np.float64)
+    rows = np.array([position.get(pair[0], -1) for pair in pairs], dtype=np.int64)
+    columns = np.array([disease_index[pair[1]] for pair in pairs], dtype=np.int64)
+    known = rows >= 0
+
+    # National reference per disease, over the sectors with population data
+    national_cases = np.bincount(columns[known], weights=cases[known], minlength=len(diseases))
+    national_population = populations.sum()
+    national_weighted = weighted.sum()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        population = padded_populations[rows]
+        rate = cases / population * PER
+        lower, upper = poisson_interval(cases)
+        rate_lower, rate_upper = lower / population * PER, upper / population * PER
+
+        national_rate = national_cases / national_population * PER
+        expected = national_cases[columns] * padded_weighted[rows] / national_weighted
+        sir = cases / expected
+        adjusted = sir * national_rate[columns]
+        adjusted_lower = lower / expected * national_rate[columns]
+        adjusted_upper = upper / expected * national_rate[columns]
+
+    columns_out = {
+        'cases': cases.astype(np.int64).tolist(),
+        'population': _rounded(population),
+        'rate': _rounded(rate, 2),
+        'rate_lower': _rounded(rate_lower, 2),
+        'rate_upper': _rounded(rate_upper, 2),
+        'expected_cases': _rounded(expected, 2),
+        'sir': _rounded(sir, 3),
+        'age_adjusted_rate': _rounded(adjusted, 2),
+        'age_adjusted_lower': _rounded(adjusted_lower, 2),
+        'age_adjusted_upper': _rounded(adjusted_upper, 2),
+    }
+    areas = get_name_tables().areas
+    results = []
+    for i, (sector_id, key) in enumerate(pairs):
+        area = areas.get(sector_id)
+        results.append({
+            'district': area.district if area else None,
+            'sector': area.sector if area else None,
+            'disease': names[key],
+            'cases': columns_out['cases'][i],
+            'population': columns_out['population'][i],
+            'rate': columns_out['rate'][i],
+            'rate_ci': [columns_out['rate_lower'][i], columns_out['rate_upper'][i]],
+            'expected_cases': columns_out['expected_cases'][i],
+            'sir': columns_out['sir'][i],
+            'age_adjusted_rate': columns_out['age_adjusted_rate'][i],
+            'age_adjusted_ci': [columns_out['age_adjusted_lower'][i], columns_out['age_adjusted_upper'][i]],
+        })
+
+    order = sorted(range(len(pairs)), key=lambda i: (
+        results[i]['disease'].lower(), results[i]['district'] or '', results[i]['sector'] or ''
+    ))
+    national = [
+        {'disease': names[key], 'cases': int(national_cases[i]), 'rate': rate}
+        for i, (key, rate) in enumerate(zip(diseases, _rounded(national_rate, 2)))
+    ]
+    return {
+        'population': int(national_population),
+        'national': national,
+        'results': [results[i] for i in order],
+        # Sector of each result, for filtering by area
+        'sector_ids': [pairs[i][0] for i in order],
+    }
+
+
+def cached_incidence_rates(start=None, end=None, disease=None, age_risk=AGE_BAND_RISK):
+    """
+    compute_rates() for the whole country, cached until incidents or
+    population data change.
+    """
+    key = make_key(
+        CACHE_GROUP, get_version(INCIDENCE_NAMESPACE), start, end, (disease or '').lower(), *age_risk
+    )
+    rates = cache.get(key)
+    if rates is not None:
+        record(CACHE_GROUP, 'hit')
+        return rates
+
+    record(CACHE_GROUP, 'miss')
+    rates = compute_rates(
+        load_cases(start, end, disease), load_populations(), age_risk, all_sectors=bool(disease)
+    )
+    cache.set(key, rates)
+    return rates
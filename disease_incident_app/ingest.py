@@ -0,0 +1,65 @@
+"""
+Bulk incident ingestion.
+
+Every facility a batch refers to is loaded with one query, each row is
+validated in memory against that set, and the valid rows go in with one
+bulk_create. post_bulk_create then lets the rollup and area summaries catch
+up once for the whole batch instead of once per incident. Backends that
+don't return ids from bulk inserts save the rows one by one.
+"""
+from django.db import connection, transaction
+from rest_framework import serializers
+from backend.signals import post_bulk_create
+from health_facility_app.models import HealthFacility
+from .models import DiseaseIncident
+from .serializers import BulkIncidentRowSerializer
+
+MAX_BULK_ROWS = 10000
+
+
+def _facility_ids(rows):
+    ids = set()
+    for row in rows:
+        if isinstance(row, dict):
+            try:
+                ids.add(int(row.get('health_facility_id')))
+            except (TypeError, ValueError):
+                pass
+    return ids
+
+
+def validate_rows(rows):
+    """
+    Returns (valid, errors): valid is a list of (row number, validated data)
+    and errors a list of {'row': n, 'errors': {...}}, rows numbered from 0.
+    """
+    facility_ids = set(HealthFacility.objects.filter(id__in=_facility_ids(rows)).values_list('id', flat=True))
+    row_serializer = BulkIncidentRowSerializer(context={'facility_ids': facility_ids})
+
+    valid, errors = [], []
+    for number, row in enumerate(rows):
+        try:
+            valid.append((number, row_serializer.run_validation(row)))
+        except serializers.ValidationError as exc:
+            errors.append({'row': number, 'errors': exc.detail})
+    return valid, errors
+
+
+def ingest_incidents(rows, user):
+    """
+    Validate and insert a batch of incident dicts. Returns (created, errors).
+    """
+    valid, errors = validate_rows(rows)
+    incidents = [DiseaseIncident(created_by=user, **data) for _, data in valid]
+    if incidents:
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                created = DiseaseIncident.objects.bulk_create(incidents, batch_size=1000)
+                post_bulk_create.send(sender=DiseaseIncident, objs=created)
+            else:
+                # MySQL doesn't return ids from bulk inserts, and the status
+                # history needs them; each save() is caught up on by the
+                # per-incident signals instead
+                for incident in incidents:
+                    incident.save()
+    return len(incidents), errors
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from disease_incident_app.outbreaks import run_detection
+
+
+class Command(BaseCommand):
+    help = 'Score incident series for outbreaks and store the alerts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Re-score every series, not only the ones touched since the last run')
+        parser.add_argument('--as-of', help='Last day to score, YYYY-MM-DD (default: today)')
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            as_of = parse_date(options['as_of'])
+            if as_of is None:
+                raise CommandError('--as-of must be a date in YYYY-MM-DD format')
+
+        run = run_detection(as_of=as_of, incremental=not options['full'])
+        mode = 'incremental' if run.incremental else 'full'
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {run.series_scored} series ({mode}) as of {run.as_of}, {run.alerts_raised} alerts.'
+        ))
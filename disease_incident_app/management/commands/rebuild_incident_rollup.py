@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from disease_incident_app.models import IncidentDailyRollup
+from disease_incident_app.incidence import invalidate_incidence
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the IncidentDailyRollup table from scratch'
+
+    def handle(self, *args, **options):
+        count = IncidentDailyRollup.rebuild_all()
+        invalidate_incidence()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} incident rollup rows.'))
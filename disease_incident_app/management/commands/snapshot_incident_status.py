@@ -0,0 +1,34 @@
+from datetime import datetime, time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from disease_incident_app.history import take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Store incident status counts per sector, for as-of queries (run periodically, e.g. daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--at', help='Snapshot time, YYYY-MM-DD (end of that day) or an ISO datetime (default: a few minutes ago)'
+        )
+
+    def handle(self, *args, **options):
+        at = None
+        if options['at']:
+            at = parse_datetime(options['at'])
+            if at is None:
+                day = parse_date(options['at'])
+                if day is None:
+                    raise CommandError('--at must be YYYY-MM-DD or an ISO datetime')
+                at = datetime.combine(day, time.max)
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        try:
+            snapshot = take_snapshot(at)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {snapshot.counts.count()} status counts as of {snapshot.taken_at.isoformat()}.'
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disease_incident_app', '0002_remove_diseaseincident_reporting_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='diseaseincident',
+            index=models.Index(fields=['created_at', 'id'], name='incident_created_id_idx'),
+        ),
+    ]
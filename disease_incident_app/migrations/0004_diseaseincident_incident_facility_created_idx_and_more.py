@@ -0,0 +1,21 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disease_incident_app', '0003_diseaseincident_incident_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='diseaseincident',
+            index=models.Index(fields=['health_facility', 'created_at'], name='incident_facility_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diseaseincident',
+            index=models.Index(fields=['status', 'created_at'], name='incident_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography_app', '0002_backfill_area_refs'),
+        ('disease_incident_app', '0004_diseaseincident_incident_facility_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('disease_name', models.CharField(max_length=255)),
+                ('status', models.CharField(max_length=20)),
+                ('total_cases', models.BigIntegerField(default=0)),
+                ('incident_count', models.IntegerField(default=0)),
+                ('district_ref', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.district')),
+                ('sector_ref', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.sector')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['district_ref', 'day'], name='rollup_district_day_idx'), models.Index(django.db.models.functions.text.Lower('disease_name'), models.F('day'), name='rollup_disease_day_idx')],
+                'unique_together': {('day', 'sector_ref', 'disease_name', 'status')},
+            },
+        ),
+    ]
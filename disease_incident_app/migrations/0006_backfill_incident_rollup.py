@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_incident_rollup(apps, schema_editor):
+    DiseaseIncident = apps.get_model('disease_incident_app', 'DiseaseIncident')
+    IncidentDailyRollup = apps.get_model('disease_incident_app', 'IncidentDailyRollup')
+
+    rows = DiseaseIncident.objects.annotate(day=TruncDate('created_at')).values(
+        'day', 'health_facility__district_ref', 'health_facility__sector_ref', 'disease_name', 'status'
+    ).annotate(cases=models.Sum('number_of_cases'), incidents=models.Count('id')).order_by()
+    IncidentDailyRollup.objects.bulk_create(
+        (
+            IncidentDailyRollup(
+                day=row['day'],
+                district_ref_id=row['health_facility__district_ref'],
+                sector_ref_id=row['health_facility__sector_ref'],
+                disease_name=row['disease_name'],
+                status=row['status'],
+                total_cases=row['cases'] or 0,
+                incident_count=row['incidents'],
+            )
+            for row in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disease_incident_app', '0005_incidentdailyrollup'),
+        ('health_facility_app', '0006_alter_healthfacility_district_ref_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_incident_rollup, migrations.RunPython.noop),
+    ]
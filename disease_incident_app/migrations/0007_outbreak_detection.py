@@ -0,0 +1,55 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_facility_app', '0006_alter_healthfacility_district_ref_and_more'),
+        ('geography_app', '0002_backfill_area_refs'),
+        ('disease_incident_app', '0006_backfill_incident_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutbreakDetectionRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('as_of', models.DateField()),
+                ('incremental', models.BooleanField(default=False)),
+                ('series_scored', models.IntegerField(default=0)),
+                ('alerts_raised', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='incidentdailyrollup',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name='OutbreakAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('FACILITY', 'Facility'), ('SECTOR', 'Sector')], max_length=20)),
+                ('series_id', models.BigIntegerField()),
+                ('disease_name', models.CharField(max_length=255)),
+                ('day', models.DateField()),
+                ('detector', models.CharField(choices=[('EWMA', 'EWMA'), ('CUSUM', 'CUSUM'), ('POISSON', 'Poisson threshold')], max_length=20)),
+                ('observed_cases', models.IntegerField()),
+                ('expected_cases', models.FloatField()),
+                ('score', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('district_ref', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.district')),
+                ('health_facility', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbreak_alerts', to='health_facility_app.healthfacility')),
+                ('sector_ref', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.sector')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at', 'id'], name='alert_created_id_idx'), models.Index(fields=['district_ref', 'day'], name='alert_district_day_idx'), models.Index(fields=['sector_ref', 'day'], name='alert_sector_day_idx')],
+                'unique_together': {('level', 'series_id', 'disease_name', 'day', 'detector')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-18 15:41
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disease_incident_app', '0007_outbreak_detection'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='diseaseincident',
+            index=models.Index(django.db.models.functions.text.Lower('disease_name'), models.F('created_at'), name='incident_disease_ci_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.17 on 2026-10-18 15:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography_app', '0002_backfill_area_refs'),
+        ('disease_incident_app', '0008_diseaseincident_incident_disease_ci_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentStatusSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IncidentStatusSnapshotCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=20)),
+                ('incident_count', models.IntegerField()),
+                ('total_cases', models.BigIntegerField()),
+                ('district_ref', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.district')),
+                ('sector_ref', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.sector')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counts', to='disease_incident_app.incidentstatussnapshot')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['snapshot', 'district_ref'], name='snapshot_count_district_idx')],
+                'unique_together': {('snapshot', 'sector_ref', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='IncidentStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('incident_id', models.BigIntegerField(blank=True, db_index=True, null=True)),
+                ('action', models.CharField(choices=[('CREATED', 'Created'), ('UPDATED', 'Updated'), ('MOVED', 'Moved with its facility'), ('DELETED', 'Deleted')], max_length=20)),
+                ('disease_name', models.CharField(max_length=255)),
+                ('previous_status', models.CharField(blank=True, max_length=20, null=True)),
+                ('previous_cases', models.IntegerField(blank=True, null=True)),
+                ('status', models.CharField(blank=True, max_length=20, null=True)),
+                ('number_of_cases', models.IntegerField(blank=True, null=True)),
+                ('occurred_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('district_ref', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.district')),
+                ('previous_district_ref', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.district')),
+                ('previous_sector_ref', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.sector')),
+                ('sector_ref', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.sector')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['district_ref', 'occurred_at'], name='event_district_time_idx'), models.Index(fields=['sector_ref', 'occurred_at'], name='event_sector_time_idx'), models.Index(fields=['previous_district_ref', 'occurred_at'], name='event_prev_district_time_idx'), models.Index(fields=['previous_sector_ref', 'occurred_at'], name='event_prev_sector_time_idx')],
+            },
+        ),
+    ]
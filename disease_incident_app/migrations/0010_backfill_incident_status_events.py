@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def backfill_incident_status_events(apps, schema_editor):
+    # Earlier changes were never recorded, so existing incidents enter the
+    # log as created at their creation time with their current status
+    DiseaseIncident = apps.get_model('disease_incident_app', 'DiseaseIncident')
+    IncidentStatusEvent = apps.get_model('disease_incident_app', 'IncidentStatusEvent')
+
+    rows = DiseaseIncident.objects.order_by('created_at', 'id').values_list(
+        'id', 'disease_name', 'health_facility__district_ref', 'health_facility__sector_ref',
+        'status', 'number_of_cases', 'created_at',
+    )
+    IncidentStatusEvent.objects.bulk_create(
+        (
+            IncidentStatusEvent(
+                incident_id=incident_id, action='CREATED', disease_name=disease_name,
+                district_ref_id=district_id, sector_ref_id=sector_id, status=status,
+                number_of_cases=cases, occurred_at=created_at,
+            )
+            for incident_id, disease_name, district_id, sector_id, status, cases, created_at in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disease_incident_app', '0009_incident_status_history'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_incident_status_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('disease_incident_app', '0010_backfill_incident_status_events'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incidentdailyrollup',
+            index=models.Index(fields=['sector_ref', 'disease_name', 'day', 'total_cases'], name='rollup_sector_disease_idx'),
+        ),
+    ]
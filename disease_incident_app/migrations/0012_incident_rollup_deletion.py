@@ -0,0 +1,24 @@
+# Generated by Django 4.2.17 on 2026-10-18 17:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography_app', '0003_sector_latitude_sector_longitude'),
+        ('disease_incident_app', '0011_incidentdailyrollup_rollup_sector_disease_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IncidentRollupDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('disease_name', models.CharField(max_length=255)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('sector_ref', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='geography_app.sector')),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 # models.py
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Lower, TruncDate
 from django.conf import settings
 from health_facility_app.models import HealthFacility
 from django.utils.timezone import now
@@ -20,5 +21,252 @@ class DiseaseIncident(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     
+    class Meta:
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['created_at', 'id'], name='incident_created_id_idx'),
+            models.Index(fields=['health_facility', 'created_at'], name='incident_facility_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='incident_status_created_idx'),
+            # Latest incidents per disease for /search/ and disease_name__lower lookups
+            models.Index(Lower('disease_name'), 'created_at', name='incident_disease_ci_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.disease_name} at {self.health_facility.name}"
+
+
+# Cases and incidents per day, area, disease and status, kept in sync by signals
+class IncidentDailyRollup(models.Model):
+    day = models.DateField()
+    district_ref = models.ForeignKey('geography_app.District', on_delete=models.CASCADE, related_name='+')
+    sector_ref = models.ForeignKey('geography_app.Sector', on_delete=models.CASCADE, related_name='+', db_index=False)
+    disease_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=20)
+    total_cases = models.BigIntegerField(default=0)
+    incident_count = models.IntegerField(default=0)
+    # Lets outbreak detection re-score only the series that changed
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    KEY_FIELDS = ('day', 'district_ref_id', 'sector_ref_id', 'disease_name', 'status')
+
+    class Meta:
+        unique_together = ['day', 'sector_ref', 'disease_name', 'status']
+        indexes = [
+            models.Index(fields=['district_ref', 'day'], name='rollup_district_day_idx'),
+            models.Index(Lower('disease_name'), 'day', name='rollup_disease_day_idx'),
+            # Covers the per-sector case sums of incidence.py
+            models.Index(fields=['sector_ref', 'disease_name', 'day', 'total_cases'], name='rollup_sector_disease_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.disease_name} ({self.status}) on {self.day}"
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """
+        Add {key: (cases, incidents)} deltas to the rollup, where key follows
+        KEY_FIELDS. Rows that drop to zero incidents are removed.
+        """
+        emptied = []
+        for key, (cases, incidents) in deltas.items():
+            if not cases and not incidents:
+                continue
+            lookup = dict(zip(cls.KEY_FIELDS, key))
+            updated = cls.objects.filter(**lookup).update(
+                total_cases=models.F('total_cases') + cases,
+                incident_count=models.F('incident_count') + incidents,
+                updated_at=now(),
+            )
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(total_cases=cases, incident_count=incidents, **lookup)
+                except IntegrityError:
+                    # Created concurrently; add to that row instead
+                    cls.objects.filter(**lookup).update(
+                        total_cases=models.F('total_cases') + cases,
+                        incident_count=models.F('incident_count') + incidents,
+                        updated_at=now(),
+                    )
+            if incidents < 0:
+                emptied.append(lookup)
+        for lookup in emptied:
+            deleted, _ = cls.objects.filter(incident_count__lte=0, **lookup).delete()
+            if deleted:
+                IncidentRollupDeletion.objects.create(
+                    sector_ref_id=lookup['sector_ref_id'], disease_name=lookup['disease_name']
+                )
+
+    @classmethod
+    def grouped_deltas(cls, incidents, sign=1):
+        """
+        Deltas for every incident in a queryset, computed with one grouped query.
+        """
+        rows = incidents.annotate(day=TruncDate('created_at')).values_list(
+            'day', 'health_facility__district_ref', 'health_facility__sector_ref', 'disease_name', 'status'
+        ).annotate(cases=models.Sum('number_of_cases'), incidents=models.Count('id')).order_by()
+        return {tuple(row[:5]): (sign * (row[5] or 0), sign * row[6]) for row in rows}
+
+    @classmethod
+    def rebuild_all(cls):
+        """
+        Drop and recompute the whole rollup from DiseaseIncident.
+        """
+        deltas = cls.grouped_deltas(DiseaseIncident.objects.all())
+        with transaction.atomic():
+            kept = {(key[2], key[3]) for key in deltas}
+            IncidentRollupDeletion.objects.bulk_create(
+                IncidentRollupDeletion(sector_ref_id=sector_id, disease_name=disease)
+                for sector_id, disease in cls.objects.values_list('sector_ref', 'disease_name').distinct()
+                if (sector_id, disease) not in kept
+            )
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                (
+                    cls(total_cases=cases, incident_count=incidents, **dict(zip(cls.KEY_FIELDS, key)))
+                    for key, (cases, incidents) in deltas.items()
+                ),
+                batch_size=1000,
+            )
+        return len(deltas)
+
+
+# Sector x disease pairs whose rollup rows were deleted, so outbreak detection
+# also re-scores series that no longer have any rollup row to carry updated_at
+class IncidentRollupDeletion(models.Model):
+    sector_ref = models.ForeignKey('geography_app.Sector', on_delete=models.CASCADE, related_name='+')
+    disease_name = models.CharField(max_length=255)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.disease_name} rollup deleted at {self.deleted_at}"
+
+
+# Early warnings raised by outbreak detection (outbreaks.py)
+class OutbreakAlert(models.Model):
+    LEVEL_CHOICES = [
+        ('FACILITY', 'Facility'),
+        ('SECTOR', 'Sector'),
+    ]
+    DETECTOR_CHOICES = [
+        ('EWMA', 'EWMA'),
+        ('CUSUM', 'CUSUM'),
+        ('POISSON', 'Poisson threshold'),
+    ]
+
+    level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
+    # Facility id for facility series, sector id for sector series
+    series_id = models.BigIntegerField()
+    health_facility = models.ForeignKey(
+        HealthFacility, on_delete=models.CASCADE, null=True, blank=True, related_name='outbreak_alerts'
+    )
+    district_ref = models.ForeignKey('geography_app.District', on_delete=models.CASCADE, related_name='+')
+    sector_ref = models.ForeignKey('geography_app.Sector', on_delete=models.CASCADE, related_name='+')
+    disease_name = models.CharField(max_length=255)
+    day = models.DateField()
+    detector = models.CharField(max_length=20, choices=DETECTOR_CHOICES)
+    observed_cases = models.IntegerField()
+    expected_cases = models.FloatField()
+    score = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['level', 'series_id', 'disease_name', 'day', 'detector']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='alert_created_id_idx'),
+            models.Index(fields=['district_ref', 'day'], name='alert_district_day_idx'),
+            models.Index(fields=['sector_ref', 'day'], name='alert_sector_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.detector} alert for {self.disease_name} on {self.day}"
+
+
+class OutbreakDetectionRun(models.Model):
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    as_of = models.DateField()
+    incremental = models.BooleanField(default=False)
+    series_scored = models.IntegerField(default=0)
+    alerts_raised = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"Outbreak detection as of {self.as_of}"
+
+
+# Append-only log of incident changes (history.py). Each row moves one
+# incident from its previous area/status/case count to the new one, so
+# status counts at any moment can be replayed from it. Rows are never
+# updated and outlive the incident.
+class IncidentStatusEvent(models.Model):
+    ACTION_CHOICES = [
+        ('CREATED', 'Created'),
+        ('UPDATED', 'Updated'),
+        ('MOVED', 'Moved with its facility'),
+        ('DELETED', 'Deleted'),
+    ]
+
+    # Empty only for incidents bulk-created on MySQL before ingest.py saved
+    # them one by one there
+    incident_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    disease_name = models.CharField(max_length=255)
+    # Where the incident was counted before the change; empty when created
+    previous_district_ref = models.ForeignKey(
+        'geography_app.District', on_delete=models.CASCADE, null=True, blank=True, related_name='+', db_index=False
+    )
+    previous_sector_ref = models.ForeignKey(
+        'geography_app.Sector', on_delete=models.CASCADE, null=True, blank=True, related_name='+', db_index=False
+    )
+    previous_status = models.CharField(max_length=20, null=True, blank=True)
+    previous_cases = models.IntegerField(null=True, blank=True)
+    # Where it is counted afterwards; empty when deleted
+    district_ref = models.ForeignKey(
+        'geography_app.District', on_delete=models.CASCADE, null=True, blank=True, related_name='+', db_index=False
+    )
+    sector_ref = models.ForeignKey(
+        'geography_app.Sector', on_delete=models.CASCADE, null=True, blank=True, related_name='+', db_index=False
+    )
+    status = models.CharField(max_length=20, null=True, blank=True)
+    number_of_cases = models.IntegerField(null=True, blank=True)
+    occurred_at = models.DateTimeField(default=now, db_index=True)
+
+    class Meta:
+        # As-of queries replay a time range of one area's events
+        indexes = [
+            models.Index(fields=['district_ref', 'occurred_at'], name='event_district_time_idx'),
+            models.Index(fields=['sector_ref', 'occurred_at'], name='event_sector_time_idx'),
+            models.Index(fields=['previous_district_ref', 'occurred_at'], name='event_prev_district_time_idx'),
+            models.Index(fields=['previous_sector_ref', 'occurred_at'], name='event_prev_sector_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} incident {self.incident_id} at {self.occurred_at}"
+
+
+# Status counts per sector at a point in time, so as-of queries only replay
+# the events after the nearest snapshot
+class IncidentStatusSnapshot(models.Model):
+    taken_at = models.DateTimeField(unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Incident status snapshot at {self.taken_at}"
+
+
+class IncidentStatusSnapshotCount(models.Model):
+    snapshot = models.ForeignKey(IncidentStatusSnapshot, on_delete=models.CASCADE, related_name='counts')
+    district_ref = models.ForeignKey('geography_app.District', on_delete=models.CASCADE, related_name='+')
+    sector_ref = models.ForeignKey('geography_app.Sector', on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20)
+    incident_count = models.IntegerField()
+    total_cases = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ['snapshot', 'sector_ref', 'status']
+        indexes = [
+            models.Index(fields=['snapshot', 'district_ref'], name='snapshot_count_district_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.incident_count} {self.status} incidents at {self.snapshot.taken_at}"
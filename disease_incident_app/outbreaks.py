@@ -0,0 +1,338 @@
+"""
+Outbreak detection over daily case counts.
+
+Every series (facility x disease, and sector x disease) is loaded into one
+row of a NumPy matrix of daily counts, and the detectors score all series
+at once:
+
+- POISSON: the day's count is improbably high for a Poisson variable with
+  the baseline mean.
+- EWMA: an exponentially weighted moving average of the counts rises above
+  its control limit.
+- CUSUM: the cumulative sum of standardized excesses over the baseline
+  crosses its decision threshold.
+
+The baseline for a day is the mean and standard deviation of the
+BASELINE_DAYS days ending GUARD_DAYS before it, so the start of an outbreak
+doesn't raise its own baseline. In incremental mode only the series whose
+rollup rows changed or were deleted since the last run are re-scored, and
+their stored alerts in the evaluation window that no longer fire are removed.
+"""
+import math
+from datetime import datetime, time, timedelta
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from backend.bulk import bulk_upsert
+from .models import (
+    DiseaseIncident, IncidentDailyRollup, IncidentRollupDeletion, OutbreakAlert, OutbreakDetectionRun,
+)
+
+BASELINE_DAYS = 28
+GUARD_DAYS = 2
+EVAL_DAYS = 7
+
+# Counts below this never raise an alert, whatever the baseline
+MIN_ALERT_CASES = 3
+# Floor for the baseline mean when deriving a standard deviation, so a
+# series with an all-zero baseline doesn't alert on a single case
+MIN_BASELINE_MEAN = 0.5
+
+POISSON_ALPHA = 0.001
+EWMA_LAMBDA = 0.3
+EWMA_LIMIT = 3.0
+CUSUM_SLACK = 0.5
+CUSUM_THRESHOLD = 5.0
+
+DETECTORS = ('POISSON', 'EWMA', 'CUSUM')
+
+
+def rolling_baseline(counts, baseline_days=BASELINE_DAYS, guard_days=GUARD_DAYS):
+    """
+    Per-day baseline mean and standard deviation for every series. Days
+    without a full baseline window get NaN.
+    """
+    n_series, n_days = counts.shape
+    sums = np.zeros((n_series, n_days + 1))
+    squares = np.zeros((n_series, n_days + 1))
+    np.cumsum(counts, axis=1, out=sums[:, 1:])
+    np.cumsum(counts.astype(np.float64) ** 2, axis=1, out=squares[:, 1:])
+
+    ends = np.arange(n_days) - guard_days
+    starts = ends - baseline_days
+    valid = starts >= 0
+
+    mean = np.full((n_series, n_days), np.nan)
+    std = np.full((n_series, n_days), np.nan)
+    window_sums = sums[:, ends[valid]] - sums[:, starts[valid]]
+    window_squares = squares[:, ends[valid]] - squares[:, starts[valid]]
+    mean[:, valid] = window_sums / baseline_days
+    std[:, valid] = np.sqrt(np.maximum(window_squares / baseline_days - mean[:, valid] ** 2, 0))
+    return mean, std
+
+
+def noise_floor(mean, std):
+    # Counts are at least Poisson-noisy
+    return np.maximum(std, np.sqrt(np.maximum(mean, MIN_BASELINE_MEAN)))
+
+
+def poisson_threshold(mu, alpha=POISSON_ALPHA):
+    """
+    Smallest k with P(X >= k) <= alpha for X ~ Poisson(mu).
+    """
+    mu = max(mu, MIN_BASELINE_MEAN)
+    log_pmf = -mu
+    cdf = 0.0
+    k = 0
+    while True:
+        cdf += math.exp(log_pmf)
+        k += 1
+        if 1.0 - cdf <= alpha:
+            return k
+        log_pmf += math.log(mu) - math.log(k)
+
+
+def poisson_tail(x, mu):
+    """
+    P(X >= x) for X ~ Poisson(mu).
+    """
+    mu = max(mu, MIN_BASELINE_MEAN)
+    log_pmf = -mu
+    cdf = 0.0
+    for k in range(int(x)):
+        cdf += math.exp(log_pmf)
+        log_pmf += math.log(mu) - math.log(k + 1)
+    return max(1.0 - cdf, 0.0)
+
+
+def detect_poisson(counts, mean, baseline_days=BASELINE_DAYS, alpha=POISSON_ALPHA):
+    """
+    Flag days whose count reaches the Poisson threshold of the baseline mean.
+    Baseline means are window sums over baseline_days, so the thresholds are
+    worked out once per distinct window sum rather than once per cell.
+    """
+    valid = ~np.isnan(mean)
+    window_sums = np.rint(np.where(valid, mean, 0) * baseline_days).astype(np.int64)
+    distinct, inverse = np.unique(window_sums, return_inverse=True)
+    thresholds = np.array([poisson_threshold(total / baseline_days, alpha) for total in distinct])
+    threshold = thresholds[inverse].reshape(counts.shape)
+    return valid & (counts >= threshold)
+
+
+def detect_ewma(counts, mean, std, lam=EWMA_LAMBDA, limit=EWMA_LIMIT):
+    """
+    Flag days where the EWMA of the counts exceeds baseline mean + limit
+    standard deviations of the EWMA statistic. Returns (flags, ewma).
+    """
+    sigma = noise_floor(mean, std) * math.sqrt(lam / (2 - lam))
+    ewma = np.empty(counts.shape)
+    ewma[:, 0] = counts[:, 0]
+    for day in range(1, counts.shape[1]):
+        ewma[:, day] = lam * counts[:, day] + (1 - lam) * ewma[:, day - 1]
+    with np.errstate(invalid='ignore'):
+        flags = ewma > mean + limit * sigma
+    return flags & ~np.isnan(mean), ewma
+
+
+def detect_cusum(counts, mean, std, slack=CUSUM_SLACK, threshold=CUSUM_THRESHOLD):
+    """
+    Flag days where the one-sided standardized CUSUM exceeds the threshold.
+    The sum restarts at zero wherever no baseline is available.
+    Returns (flags, cusum).
+    """
+    excess = (counts - mean) / noise_floor(mean, std) - slack
+    excess = np.where(np.isnan(excess), -np.inf, excess)
+    cusum = np.empty(counts.shape)
+    running = np.zeros(counts.shape[0])
+    for day in range(counts.shape[1]):
+        running = np.maximum(running + excess[:, day], 0)
+        cusum[:, day] = running
+    return cusum > threshold, cusum
+
+
+def score_series(counts, baseline_days=BASELINE_DAYS, guard_days=GUARD_DAYS):
+    """
+    Run every detector over a (series, days) count matrix. Returns
+    {detector: (flags, scores)} plus the baseline mean, as
+    (results, mean).
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    mean, std = rolling_baseline(counts, baseline_days, guard_days)
+    enough_cases = counts >= MIN_ALERT_CASES
+
+    with np.errstate(invalid='ignore'):
+        z_scores = (counts - mean) / noise_floor(mean, std)
+    ewma_flags, ewma = detect_ewma(counts, mean, std)
+    cusum_flags, cusum = detect_cusum(counts, mean, std)
+    results = {
+        'POISSON': (detect_poisson(counts, mean, baseline_days) & enough_cases, z_scores),
+        'EWMA': (ewma_flags & enough_cases, ewma),
+        'CUSUM': (cusum_flags & enough_cases, cusum),
+    }
+    return results, mean
+
+
+def load_series(level, start, end, touched=None):
+    """
+    Load daily case counts between start and end (inclusive) as a matrix.
+
+    Returns (series, counts) where series[i] is (series_id, district_id,
+    sector_id, facility_id or None, disease_name) for row i. `touched`
+    limits loading to a set of (sector_id, disease_name) pairs.
+    """
+    if level == 'FACILITY':
+        incidents = DiseaseIncident.objects.filter(
+            created_at__gte=timezone.make_aware(datetime.combine(start, time.min)),
+            created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+        )
+        if touched is not None:
+            incidents = incidents.filter(
+                health_facility__sector_ref__in={sector_id for sector_id, _ in touched},
+                disease_name__in={disease for _, disease in touched},
+            )
+        rows = incidents.annotate(day=TruncDate('created_at')).values_list(
+            'health_facility', 'health_facility__district_ref', 'health_facility__sector_ref', 'disease_name', 'day'
+        ).annotate(cases=Sum('number_of_cases')).order_by()
+        keyed = (
+            ((facility_id, district_id, sector_id, facility_id, disease), (sector_id, disease), day, cases)
+            for facility_id, district_id, sector_id, disease, day, cases in rows
+        )
+    else:
+        rollups = IncidentDailyRollup.objects.filter(day__gte=start, day__lte=end)
+        if touched is not None:
+            rollups = rollups.filter(
+                sector_ref__in={sector_id for sector_id, _ in touched},
+                disease_name__in={disease for _, disease in touched},
+            )
+        rows = rollups.values_list('district_ref', 'sector_ref', 'disease_name', 'day').annotate(
+            cases=Sum('total_cases')
+        ).order_by()
+        keyed = (
+            ((sector_id, district_id, sector_id, None, disease), (sector_id, disease), day, cases)
+            for district_id, sector_id, disease, day, cases in rows
+        )
+
+    index, series, cells = {}, [], []
+    for key, area_disease, day, cases in keyed:
+        if touched is not None and area_disease not in touched:
+            continue
+        if key not in index:
+            index[key] = len(series)
+            series.append(key)
+        cells.append((index[key], (day - start).days, cases or 0))
+
+    counts = np.zeros((len(series), (end - start).days + 1))
+    if cells:
+        rows_idx, days_idx, values = (np.array(column) for column in zip(*cells))
+        np.add.at(counts, (rows_idx, days_idx), values)
+    return series, counts
+
+
+def build_alerts(level, series, counts, start, eval_days=EVAL_DAYS):
+    """
+    Score a loaded matrix and return unsaved OutbreakAlerts for flagged days
+    in the last eval_days columns.
+    """
+    results, mean = score_series(counts)
+    first_eval_day = counts.shape[1] - eval_days
+    alerts = []
+    for detector in DETECTORS:
+        flags, scores = results[detector]
+        for row, column in zip(*np.nonzero(flags[:, first_eval_day:])):
+            column += first_eval_day
+            series_id, district_id, sector_id, facility_id, disease = series[row]
+            observed, expected = int(counts[row, column]), float(mean[row, column])
+            score = float(scores[row, column])
+            if detector == 'POISSON':
+                # Stored as -log10 of the tail probability
+                score = -math.log10(max(poisson_tail(observed, expected), 1e-300))
+            alerts.append(OutbreakAlert(
+                level=level, series_id=series_id, health_facility_id=facility_id,
+                district_ref_id=district_id, sector_ref_id=sector_id, disease_name=disease,
+                day=start + timedelta(days=int(column)), detector=detector,
+                observed_cases=observed, expected_cases=round(expected, 4), score=round(score, 4),
+            ))
+    return alerts
+
+
+def touched_series(since):
+    """
+    (sector_id, disease_name) pairs whose rollup rows were written or
+    deleted since `since`.
+    """
+    touched = set(
+        IncidentDailyRollup.objects.filter(updated_at__gte=since).values_list('sector_ref', 'disease_name').distinct()
+    )
+    touched.update(
+        IncidentRollupDeletion.objects.filter(deleted_at__gte=since).values_list('sector_ref', 'disease_name').distinct()
+    )
+    return touched
+
+
+def stale_alerts(alerts, first_day, last_day, touched=None):
+    """
+    Ids of stored alerts between first_day and last_day (inclusive) that
+    `alerts` no longer raises, among the series in `touched` (all series
+    when None).
+    """
+    raised = {(alert.level, alert.series_id, alert.disease_name, alert.day, alert.detector) for alert in alerts}
+    stored = OutbreakAlert.objects.filter(day__gte=first_day, day__lte=last_day)
+    if touched is not None:
+        stored = stored.filter(
+            sector_ref__in={sector_id for sector_id, _ in touched},
+            disease_name__in={disease for _, disease in touched},
+        )
+    return [
+        alert_id
+        for alert_id, sector_id, *key in stored.values_list(
+            'id', 'sector_ref', 'level', 'series_id', 'disease_name', 'day', 'detector'
+        )
+        if tuple(key) not in raised and (touched is None or (sector_id, key[2]) in touched)
+    ]
+
+
+def run_detection(as_of=None, incremental=True, eval_days=EVAL_DAYS):
+    """
+    Score facility and sector series up to as_of (default today) and store
+    the alerts. Incremental runs only re-score series touched since the
+    start of the last finished run, and fall back to a full run without one.
+    """
+    as_of = as_of or timezone.localdate()
+    started_at = timezone.now()
+    touched = None
+    if incremental:
+        last_run = OutbreakDetectionRun.objects.filter(finished_at__isnull=False).order_by('-started_at').first()
+        if last_run is not None:
+            touched = touched_series(last_run.started_at)
+        else:
+            incremental = False
+
+    start = as_of - timedelta(days=BASELINE_DAYS + GUARD_DAYS + eval_days - 1)
+    series_scored, alerts = 0, []
+    if touched is None or touched:
+        for level in ('FACILITY', 'SECTOR'):
+            series, counts = load_series(level, start, as_of, touched)
+            series_scored += len(series)
+            if series:
+                alerts.extend(build_alerts(level, series, counts, start, eval_days))
+
+    with transaction.atomic():
+        # Re-scored days that no longer alert, including series left without any cases
+        if touched is None or touched:
+            stale = stale_alerts(alerts, as_of - timedelta(days=eval_days - 1), as_of, touched)
+            OutbreakAlert.objects.filter(id__in=stale).delete()
+        bulk_upsert(
+            OutbreakAlert, alerts,
+            unique_fields=['level', 'series_id', 'disease_name', 'day', 'detector'],
+            update_fields=['observed_cases', 'expected_cases', 'score'],
+            batch_size=1000,
+        )
+        run = OutbreakDetectionRun.objects.create(
+            started_at=started_at, finished_at=timezone.now(), as_of=as_of, incremental=incremental,
+            series_scored=series_scored, alerts_raised=len(alerts),
+        )
+        # Later runs only read deletions made after this run started
+        IncidentRollupDeletion.objects.filter(deleted_at__lt=started_at).delete()
+    return run
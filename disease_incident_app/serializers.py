@@ -1,20 +1,61 @@
 # serializers.py
 from rest_framework import serializers
-from .models import DiseaseIncident
+from .models import DiseaseIncident, OutbreakAlert
 from health_facility_app.serializers import HealthFacilitySerializer, CustomUserSerializer
 from health_facility_app.models import HealthFacility
 from userApp.models import CustomUser
+from backend.serializers import DynamicFieldsMixin
+from geography_app.resolver import area_of
 
-class DiseaseIncidentSerializer(serializers.ModelSerializer):
-    health_facility = HealthFacilitySerializer(read_only=True)
+class DiseaseIncidentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    health_facility = serializers.PrimaryKeyRelatedField(read_only=True)
     health_facility_id = serializers.PrimaryKeyRelatedField(
         queryset=HealthFacility.objects.all(),
         write_only=True,
         source='health_facility'
     )
-    created_by = CustomUserSerializer(read_only=True)
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    expandable_fields = {
+        'health_facility': HealthFacilitySerializer,
+        'created_by': CustomUserSerializer,
+    }
 
     class Meta:
         model = DiseaseIncident
         fields = '__all__'
-        read_only_fields = ('id', 'created_at', 'created_by')
\ No newline at end of file
+        read_only_fields = ('id', 'created_at', 'created_by')
+
+
+# One row of a bulk upload (ingest.py). Facility ids are checked against the
+# ids loaded up front, passed in as context['facility_ids'].
+class BulkIncidentRowSerializer(serializers.Serializer):
+    disease_name = serializers.CharField(max_length=255)
+    health_facility_id = serializers.IntegerField()
+    number_of_cases = serializers.IntegerField(min_value=0)
+    status = serializers.ChoiceField(choices=DiseaseIncident.STATUS_CHOICES, default='ACTIVE')
+    description = serializers.CharField(allow_blank=True, required=False, default='')
+
+    def validate_health_facility_id(self, value):
+        if value not in self.context['facility_ids']:
+            raise serializers.ValidationError('Health facility not found')
+        return value
+
+
+class OutbreakAlertSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    health_facility = serializers.PrimaryKeyRelatedField(read_only=True)
+    district = serializers.SerializerMethodField()
+    sector = serializers.SerializerMethodField()
+    expandable_fields = {'health_facility': HealthFacilitySerializer}
+
+    class Meta:
+        model = OutbreakAlert
+        exclude = ('district_ref', 'sector_ref')
+
+    # Names come from the in-memory geography tables, not a join per row
+    def get_district(self, alert):
+        area = area_of(alert.sector_ref_id)
+        return area.district if area else None
+
+    def get_sector(self, alert):
+        area = area_of(alert.sector_ref_id)
+        return area.sector if area else None
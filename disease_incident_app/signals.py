@@ -0,0 +1,221 @@
+import threading
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from backend.signals import post_bulk_create
+from health_facility_app.models import HealthFacility
+from population_data_app.models import PopulationData
+from .models import DiseaseIncident, IncidentDailyRollup, IncidentStatusEvent
+from .history import make_event
+from .incidence import invalidate_incidence
+
+# Facilities being deleted in this thread. Their incidents are taken out of the
+# rollup with one grouped query instead of one update per cascaded incident.
+_deleting = threading.local()
+
+
+def _deleting_facility_ids():
+    if not hasattr(_deleting, 'facility_ids'):
+        _deleting.facility_ids = set()
+    return _deleting.facility_ids
+
+
+def _rollup_key(day, area, disease_name, status):
+    return (day, area[0], area[1], disease_name, status)
+
+
+def _facility_area(facility_id):
+    return HealthFacility.objects.filter(pk=facility_id).values_list('district_ref_id', 'sector_ref_id').first()
+
+
+def _apply_deltas(deltas):
+    IncidentDailyRollup.apply_deltas(deltas)
+    # Incidence rates are computed from the rollup
+    invalidate_incidence()
+
+
+def _add(deltas, key, cases, incidents):
+    previous_cases, previous_incidents = deltas.get(key, (0, 0))
+    deltas[key] = (previous_cases + cases, previous_incidents + incidents)
+
+
+# Keep what the rollup currently counts for this incident, so updates can move it
+@receiver(pre_save, sender=DiseaseIncident)
+def remember_rolled_up_incident(sender, instance, **kwargs):
+    instance._rolled_up = None
+    if instance.pk and not instance._state.adding:
+        instance._rolled_up = sender.objects.filter(pk=instance.pk).values_list(
+            'created_at', 'health_facility_id', 'disease_name', 'status', 'number_of_cases'
+        ).first()
+
+
+@receiver(post_save, sender=DiseaseIncident)
+def roll_up_saved_incident(sender, instance, **kwargs):
+    deltas = {}
+    previous = getattr(instance, '_rolled_up', None)
+    if previous:
+        created_at, facility_id, disease_name, status, cases = previous
+        area = _facility_area(facility_id)
+        _add(deltas, _rollup_key(timezone.localdate(created_at), area, disease_name, status), -cases, -1)
+
+    area = _facility_area(instance.health_facility_id)
+    key = _rollup_key(timezone.localdate(instance.created_at), area, instance.disease_name, instance.status)
+    _add(deltas, key, instance.number_of_cases, 1)
+    _apply_deltas(deltas)
+
+
+@receiver(post_bulk_create, sender=DiseaseIncident)
+def roll_up_created_incidents(sender, objs, **kwargs):
+    areas = {
+        facility_id: (district_id, sector_id)
+        for facility_id, district_id, sector_id in HealthFacility.objects.filter(
+            id__in={incident.health_facility_id for incident in objs}
+        ).values_list('id', 'district_ref_id', 'sector_ref_id')
+    }
+    deltas = {}
+    for incident in objs:
+        key = _rollup_key(
+            timezone.localdate(incident.created_at), areas[incident.health_facility_id],
+            incident.disease_name, incident.status,
+        )
+        _add(deltas, key, incident.number_of_cases, 1)
+    _apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=DiseaseIncident)
+def roll_up_deleted_incident(sender, instance, **kwargs):
+    if instance.health_facility_id in _deleting_facility_ids():
+        return
+    area = _facility_area(instance.health_facility_id)
+    if area is None:
+        return
+    key = _rollup_key(timezone.localdate(instance.created_at), area, instance.disease_name, instance.status)
+    _apply_deltas({key: (-instance.number_of_cases, -1)})
+
+
+@receiver(pre_delete, sender=HealthFacility)
+def remove_facility_from_rollup(sender, instance, **kwargs):
+    _deleting_facility_ids().add(instance.pk)
+    _apply_deltas(
+        IncidentDailyRollup.grouped_deltas(DiseaseIncident.objects.filter(health_facility_id=instance.pk), sign=-1)
+    )
+
+
+@receiver(post_delete, sender=HealthFacility)
+def facility_deleted(sender, instance, **kwargs):
+    _deleting_facility_ids().discard(instance.pk)
+
+
+@receiver(pre_save, sender=HealthFacility)
+def remember_facility_area(sender, instance, **kwargs):
+    instance._rolled_up_area = None
+    if instance.pk and not instance._state.adding:
+        instance._rolled_up_area = _facility_area(instance.pk)
+
+
+@receiver(post_save, sender=HealthFacility)
+def move_facility_incidents(sender, instance, **kwargs):
+    # A facility that changed sector takes its incidents' rollup rows with it
+    previous_area = getattr(instance, '_rolled_up_area', None)
+    if not previous_area or previous_area == (instance.district_ref_id, instance.sector_ref_id):
+        return
+
+    deltas = {}
+    for key, (cases, incidents) in IncidentDailyRollup.grouped_deltas(
+        DiseaseIncident.objects.filter(health_facility_id=instance.pk)
+    ).items():
+        day, _, _, disease_name, status = key
+        _add(deltas, _rollup_key(day, previous_area, disease_name, status), -cases, -incidents)
+        _add(deltas, key, cases, incidents)
+    _apply_deltas(deltas)
+
+
+# Status event log (history.py)
+
+def _counted(area, status, cases):
+    return (area[0], area[1], status, cases) if area else None
+
+
+@receiver(post_save, sender=DiseaseIncident)
+def log_saved_incident(sender, instance, **kwargs):
+    area = _facility_area(instance.health_facility_id)
+    current = _counted(area, instance.status, instance.number_of_cases)
+    previous = getattr(instance, '_rolled_up', None)
+    if not previous:
+        make_event('CREATED', instance.pk, instance.disease_name, current=current).save()
+        return
+
+    _, facility_id, _, previous_status, previous_cases = previous
+    previous_area = area if facility_id == instance.health_facility_id else _facility_area(facility_id)
+    before = _counted(previous_area, previous_status, previous_cases)
+    if before != current:
+        make_event('UPDATED', instance.pk, instance.disease_name, before, current).save()
+
+
+@receiver(post_bulk_create, sender=DiseaseIncident)
+def log_created_incidents(sender, objs, **kwargs):
+    # Senders save the rows instead where bulk inserts don't return ids
+    if any(incident.pk is None for incident in objs):
+        raise ValueError('Bulk-created incidents need ids for their status history')
+    areas = {
+        facility_id: (district_id, sector_id)
+        for facility_id, district_id, sector_id in HealthFacility.objects.filter(
+            id__in={incident.health_facility_id for incident in objs}
+        ).values_list('id', 'district_ref_id', 'sector_ref_id')
+    }
+    IncidentStatusEvent.objects.bulk_create(
+        (
+            make_event(
+                'CREATED', incident.pk, incident.disease_name,
+                current=_counted(areas[incident.health_facility_id], incident.status, incident.number_of_cases),
+            )
+            for incident in objs
+        ),
+        batch_size=1000,
+    )
+
+
+@receiver(post_delete, sender=DiseaseIncident)
+def log_deleted_incident(sender, instance, **kwargs):
+    # Incidents of a facility being deleted are logged together in pre_delete
+    if instance.health_facility_id in _deleting_facility_ids():
+        return
+    area = _facility_area(instance.health_facility_id)
+    previous = _counted(area, instance.status, instance.number_of_cases)
+    make_event('DELETED', instance.pk, instance.disease_name, previous=previous).save()
+
+
+def _log_facility_incidents(facility_id, action, previous_area, area):
+    incidents = DiseaseIncident.objects.filter(health_facility_id=facility_id).values_list(
+        'id', 'disease_name', 'status', 'number_of_cases'
+    )
+    IncidentStatusEvent.objects.bulk_create(
+        (
+            make_event(
+                action, incident_id, disease_name,
+                _counted(previous_area, status, cases), _counted(area, status, cases),
+            )
+            for incident_id, disease_name, status, cases in incidents.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+@receiver(pre_delete, sender=HealthFacility)
+def log_facility_deleted(sender, instance, **kwargs):
+    _log_facility_incidents(instance.pk, 'DELETED', (instance.district_ref_id, instance.sector_ref_id), None)
+
+
+@receiver(post_save, sender=HealthFacility)
+def log_facility_moved(sender, instance, **kwargs):
+    previous_area = getattr(instance, '_rolled_up_area', None)
+    area = (instance.district_ref_id, instance.sector_ref_id)
+    if previous_area and previous_area != area:
+        _log_facility_incidents(instance.pk, 'MOVED', previous_area, area)
+
+
+@receiver(post_save, sender=PopulationData)
+@receiver(post_delete, sender=PopulationData)
+@receiver(post_bulk_create, sender=PopulationData)
+def population_changed(sender, **kwargs):
+    invalidate_incidence()
@@ -1,3 +1,295 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from backend.testing import FastPathEquivalenceMixin, make_user, populate_area
+from geography_app.resolver import get_or_create_area
+from health_facility_app.models import HealthFacility
+from resource_allocation_app.models import AreaSummary
+from search_app.models import SearchTerm
+from backend.signals import post_bulk_create
+from .ingest import ingest_incidents
+from .models import (
+    DiseaseIncident, IncidentDailyRollup, IncidentRollupDeletion, IncidentStatusEvent, OutbreakAlert,
+)
+from .outbreaks import run_detection
 
-# Create your tests here.
+
+class IncidentFastPathTests(FastPathEquivalenceMixin, TestCase):
+    ENDPOINTS = [
+        ('GET', '/incident/incidents/', {}, None),
+        ('GET', '/incident/user/', {}, None),
+        ('GET', '/incident/district/Gasabo/', {}, None),
+        ('GET', '/incident/sector/Kimironko/', {}, None),
+        ('GET', '/incident/disease/malaria/', {}, None),
+        ('GET', '/incident/status/ACTIVE/', {}, None),
+    ]
+    FIELDS = ['id,disease_name,number_of_cases', 'id,created_at,status,health_facility,created_by']
+    EXPAND = ['health_facility', 'health_facility,health_facility.created_by', 'created_by']
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 20)
+        populate_area(cls.user, 'Kicukiro', 'Niboye', 5)
+        SearchTerm.rebuild_all()
+        facility_id = HealthFacility.objects.order_by('id').values_list('id', flat=True).first()
+        cls.ENDPOINTS = cls.ENDPOINTS + [('GET', f'/incident/facility/{facility_id}/', {}, None)]
+
+
+class OutbreakAlertFastPathTests(FastPathEquivalenceMixin, TestCase):
+    ENDPOINTS = [
+        ('GET', '/incident/outbreaks/', {}, None),
+        ('GET', '/incident/outbreaks/', {'level': 'facility', 'district': 'Gasabo'}, None),
+    ]
+    # district and sector are method fields, so only field lists without
+    # them can take the fast path
+    FIELDS = ['id,day,detector,score,health_facility', 'id,created_at,observed_cases,expected_cases,disease_name']
+    EXPAND = ['health_facility']
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        area = populate_area(cls.user, 'Gasabo', 'Kimironko', 10)
+        today = timezone.localdate()
+        OutbreakAlert.objects.bulk_create([
+            OutbreakAlert(
+                level='FACILITY', series_id=facility_id, health_facility_id=facility_id,
+                district_ref_id=area.district_id, sector_ref_id=area.sector_id, disease_name='Malaria',
+                day=today - timedelta(days=i % 3), detector=('POISSON', 'EWMA', 'CUSUM')[i % 3],
+                observed_cases=10 + i, expected_cases=2.5, score=4.75,
+            )
+            for i, facility_id in enumerate(HealthFacility.objects.values_list('id', flat=True))
+        ])
+
+
+class OutbreakDetectionTests(TestCase):
+    """
+    One case a day for 40 days in Kimironko, nothing in Niboye, then a
+    30-case incident in each today.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.kimironko = self.create_facility('Gasabo', 'Kimironko')
+        self.niboye = self.create_facility('Kicukiro', 'Niboye')
+        now = timezone.now()
+        for days in range(1, 41):
+            incident = self.report(self.kimironko, 1)
+            DiseaseIncident.objects.filter(pk=incident.pk).update(created_at=now - timedelta(days=days))
+        IncidentDailyRollup.rebuild_all()
+        self.kimironko_spike = self.report(self.kimironko, 30)
+        self.niboye_spike = self.report(self.niboye, 30)
+
+    def create_facility(self, district, sector):
+        area = get_or_create_area(district, sector)
+        return HealthFacility.objects.create(
+            name=f'{sector} Facility', facility_type='CLINIC', district=area.district, sector=area.sector,
+            capacity=50, contact_number='0780000000', created_by=self.user,
+        )
+
+    def report(self, facility, cases):
+        return DiseaseIncident.objects.create(
+            disease_name='Malaria', health_facility=facility, number_of_cases=cases, created_by=self.user
+        )
+
+    def alerts(self, facility):
+        return OutbreakAlert.objects.filter(sector_ref_id=facility.sector_ref_id)
+
+    def test_spikes_raise_facility_and_sector_alerts(self):
+        run_detection(incremental=False)
+        for facility in (self.kimironko, self.niboye):
+            self.assertTrue(self.alerts(facility).filter(level='FACILITY', health_facility=facility).exists())
+            self.assertTrue(self.alerts(facility).filter(level='SECTOR', series_id=facility.sector_ref_id).exists())
+
+    def test_alerts_that_no_longer_fire_are_removed(self):
+        run_detection(incremental=False)
+        self.kimironko_spike.number_of_cases = 1
+        self.kimironko_spike.save()
+
+        run = run_detection()
+        self.assertTrue(run.incremental)
+        self.assertFalse(self.alerts(self.kimironko).exists())
+        # Niboye wasn't re-scored
+        self.assertTrue(self.alerts(self.niboye).exists())
+
+    def test_deleted_rollup_rows_are_rescored(self):
+        run_detection(incremental=False)
+        self.niboye_spike.delete()
+        # Niboye has no rollup row left to mark as updated
+        self.assertFalse(IncidentDailyRollup.objects.filter(sector_ref_id=self.niboye.sector_ref_id).exists())
+        self.assertTrue(IncidentRollupDeletion.objects.filter(sector_ref_id=self.niboye.sector_ref_id).exists())
+
+        run = run_detection()
+        self.assertEqual(run.series_scored, 0)
+        self.assertFalse(self.alerts(self.niboye).exists())
+        self.assertTrue(self.alerts(self.kimironko).exists())
+        self.assertFalse(IncidentRollupDeletion.objects.exists())
+
+    def test_alerts_are_upserted_without_a_conflict_target(self):
+        # As on MySQL, whose ON DUPLICATE KEY UPDATE takes no unique fields
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            run_detection(incremental=False)
+        alert_ids = set(OutbreakAlert.objects.values_list('id', flat=True))
+        self.assertTrue(alert_ids)
+
+        self.niboye_spike.number_of_cases = 40
+        self.niboye_spike.save()
+        # Without any upsert the existing alerts are updated by primary key
+        with mock.patch.multiple(
+            connection.features, supports_update_conflicts=False, supports_update_conflicts_with_target=False
+        ):
+            run_detection(incremental=False)
+        self.assertEqual(set(OutbreakAlert.objects.values_list('id', flat=True)), alert_ids)
+        alert = self.alerts(self.niboye).get(level='FACILITY', detector='POISSON')
+        self.assertEqual(alert.observed_cases, 40)
+
+
+class IncidentIngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        cls.area = get_or_create_area('Gasabo', 'Kimironko')
+        cls.facility = HealthFacility.objects.create(
+            name='Kimironko Facility', facility_type='CLINIC', district=cls.area.district, sector=cls.area.sector,
+            capacity=50, contact_number='0780000000', created_by=cls.user,
+        )
+
+    def rows(self, count):
+        return [
+            {'disease_name': 'Cholera', 'health_facility_id': self.facility.id, 'number_of_cases': i + 1}
+            for i in range(count)
+        ]
+
+    def assert_logged_and_rolled_up(self, count):
+        incident_ids = set(DiseaseIncident.objects.values_list('id', flat=True))
+        self.assertEqual(len(incident_ids), count)
+        events = IncidentStatusEvent.objects.filter(action='CREATED')
+        self.assertEqual(set(events.values_list('incident_id', flat=True)), incident_ids)
+        self.assertEqual(events.count(), count)
+        rollup = IncidentDailyRollup.objects.get(sector_ref_id=self.area.sector_id, disease_name='Cholera')
+        self.assertEqual((rollup.incident_count, rollup.total_cases), (count, count * (count + 1) // 2))
+
+    def test_bulk_insert_logs_every_incident(self):
+        self.assertEqual(ingest_incidents(self.rows(5), self.user), (5, []))
+        self.assert_logged_and_rolled_up(5)
+
+    def test_backends_without_returned_ids_log_every_incident(self):
+        # As on MySQL
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            self.assertEqual(ingest_incidents(self.rows(5), self.user), (5, []))
+        self.assert_logged_and_rolled_up(5)
+
+    def upload(self, data, content_type=None):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            if content_type:
+                return client.post('/incident/add/bulk/', data, content_type=content_type)
+            return client.post('/incident/add/bulk/', data, format='json')
+
+    def test_json_upload_reports_rows_by_position(self):
+        rows = self.rows(5)
+        rows[1].pop('disease_name')
+        rows[2]['health_facility_id'] = self.facility.id + 1000
+        rows[3] = 'Cholera'
+        response = self.upload(rows)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 3))
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {1, 2, 3})
+        self.assertIn('disease_name', errors[1])
+        self.assertEqual(errors[2]['health_facility_id'], ['Health facility not found'])
+        self.assertEqual(
+            sorted(DiseaseIncident.objects.values_list('number_of_cases', flat=True)), [1, 5]
+        )
+
+    def test_ndjson_upload(self):
+        body = '\n'.join([
+            '{"disease_name": "Cholera", "health_facility_id": %d, "number_of_cases": 3}' % self.facility.id,
+            '',
+            '{"disease_name": "Cholera", "health_facility_id": "x", "number_of_cases": 1}',
+            '{"disease_name": "Cholera", "health_facility_id": %d, "number_of_cases": 2}' % self.facility.id,
+        ])
+        response = self.upload(body, 'application/x-ndjson')
+        self.assertEqual(response.status_code, 201, response.data)
+        # Blank lines aren't rows
+        self.assertEqual([error['row'] for error in response.data['errors']], [1])
+        self.assertEqual(response.data['created'], 2)
+
+        response = self.upload(body + '\n{"disease_name": ', 'application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 5', str(response.data))
+        self.assertEqual(DiseaseIncident.objects.count(), 2)
+
+    def test_uploads_that_create_nothing_are_rejected(self):
+        rows = self.rows(2)
+        for row in rows:
+            row['health_facility_id'] = self.facility.id + 1000
+        response = self.upload(rows)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.data['created'], response.data['failed']), (0, 2))
+
+        response = self.upload({'disease_name': 'Cholera'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.data)
+        self.assertFalse(DiseaseIncident.objects.exists())
+
+    def test_row_limit(self):
+        with mock.patch('disease_incident_app.views.MAX_BULK_ROWS', 3):
+            response = self.upload(self.rows(4))
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['error'], 'At most 3 incidents can be uploaded at once')
+            self.assertEqual(self.upload(self.rows(3)).status_code, 201)
+        self.assertEqual(DiseaseIncident.objects.count(), 3)
+
+    def test_incidents_without_ids_are_not_logged(self):
+        incident = DiseaseIncident(
+            disease_name='Cholera', health_facility=self.facility, number_of_cases=1, created_by=self.user
+        )
+        with self.assertRaises(ValueError):
+            post_bulk_create.send(sender=DiseaseIncident, objs=[incident])
+        self.assertFalse(IncidentStatusEvent.objects.exists())
+
+
+# Summaries and the search index catch up on commit
+class IncidentIngestCatchUpTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.area = get_or_create_area('Gasabo', 'Kimironko')
+        self.facility = HealthFacility.objects.create(
+            name='Kimironko Facility', facility_type='CLINIC', district=self.area.district,
+            sector=self.area.sector, capacity=50, contact_number='0780000000', created_by=self.user,
+        )
+
+    rows = IncidentIngestTests.rows
+
+    def test_upload_catches_up_rollup_summary_and_search(self):
+        self.assertEqual(AreaSummary.objects.get(sector_ref_id=self.area.sector_id).incident_count, 0)
+        rows = self.rows(4)
+        rows[0]['status'] = 'RESOLVED'
+        rows[1]['disease_name'] = 'Dengue'
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/incident/add/bulk/', rows, format='json')
+        self.assertEqual(response.data['created'], 4)
+
+        summary = AreaSummary.objects.get(sector_ref_id=self.area.sector_id)
+        self.assertEqual((summary.incident_count, summary.active_incidents, summary.resolved_incidents), (4, 3, 1))
+        self.assertEqual(
+            set(SearchTerm.objects.filter(kind='DISEASE', active=True).values_list('key', flat=True)),
+            {'cholera', 'dengue'},
+        )
+        rollups = dict(IncidentDailyRollup.objects.filter(
+            sector_ref_id=self.area.sector_id, disease_name='Cholera'
+        ).values_list('status', 'total_cases'))
+        self.assertEqual(rollups, {'RESOLVED': 1, 'ACTIVE': 3 + 4})
+        self.assertEqual(IncidentStatusEvent.objects.count(), 4)
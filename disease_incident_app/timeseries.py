@@ -0,0 +1,63 @@
+"""
+Incident time series served from IncidentDailyRollup.
+
+Daily rollup rows are summed into day, week (starting Monday) or month
+buckets by the database, so a series costs one grouped query over the
+rollup however many incidents it covers.
+"""
+from django.db.models import F, Sum
+from django.db.models.functions import TruncWeek, TruncMonth
+from geography_app.resolver import get_name_tables
+
+INTERVALS = {
+    'day': F,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# group_by name -> rollup column
+GROUP_COLUMNS = {
+    'district': 'district_ref',
+    'sector': 'sector_ref',
+    'disease': 'disease_name',
+    'status': 'status',
+}
+
+
+def _labels(group_by, values, tables):
+    labels = {}
+    for name, value in zip(group_by, values):
+        if name == 'district':
+            labels['district'] = tables.district_names.get(value)
+        elif name == 'sector':
+            area = tables.areas.get(value)
+            # Sector names repeat across districts, so name the district too
+            labels.setdefault('district', area.district if area else None)
+            labels['sector'] = area.sector if area else None
+        else:
+            labels[name] = value
+    return labels
+
+
+def build_timeseries(rollups, interval='day', group_by=('disease',)):
+    """
+    Sum a filtered IncidentDailyRollup queryset into one series per
+    combination of the group_by values.
+    """
+    columns = [GROUP_COLUMNS[name] for name in group_by]
+    rows = rollups.annotate(bucket=INTERVALS[interval]('day')).values('bucket', *columns).annotate(
+        cases=Sum('total_cases'), incidents=Sum('incident_count')
+    ).order_by(*columns, 'bucket')
+
+    tables = get_name_tables()
+    series = {}
+    for row in rows:
+        key = tuple(row[column] for column in columns)
+        if key not in series:
+            series[key] = {**_labels(group_by, key, tables), 'points': []}
+        series[key]['points'].append({
+            'date': row['bucket'],
+            'cases': row['cases'],
+            'incidents': row['incidents'],
+        })
+    return list(series.values())
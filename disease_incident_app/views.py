@@ -1,19 +1,32 @@
 # views.py
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import ValidationError
 from django.db.models import Q
-from .models import DiseaseIncident, HealthFacility
-from .serializers import DiseaseIncidentSerializer
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import datetime, time
+from .models import DiseaseIncident, HealthFacility, IncidentDailyRollup, OutbreakAlert
+from .serializers import DiseaseIncidentSerializer, OutbreakAlertSerializer
+from .timeseries import INTERVALS, GROUP_COLUMNS, build_timeseries
+from geography_app.resolver import resolve_district, resolve_sector, resolve_sector_ids, district_sector_ids
+from backend.streaming import is_streaming_requested, streaming_json_response
+from backend.pagination import paginated_response
+from backend.parsers import NDJSONParser
+from .ingest import MAX_BULK_ROWS, ingest_incidents
+from .history import status_counts_as_of
+from .incidence import PER, AGE_BAND_RISK, cached_incidence_rates
+from search_app.index import facility_ids_containing, disease_names_containing
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def add_incident(request):
     try:
-        serializer = DiseaseIncidentSerializer(data=request.data)
+        serializer = DiseaseIncidentSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             # Validate health facility exists
             health_facility_id = request.data.get('health_facility_id')
@@ -47,18 +60,54 @@ def add_incident(request):
 
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([JSONParser, NDJSONParser])
+def add_incidents_bulk(request):
+    """
+    Create many incidents from a JSON array, or NDJSON with
+    Content-Type: application/x-ndjson. Each row takes the same fields as
+    add_incident. Valid rows are inserted and invalid ones reported by their
+    position in the upload.
+    """
+    rows = request.data
+    if not isinstance(rows, list):
+        return Response(
+            {'error': 'Expected a JSON array or NDJSON of incidents'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(rows) > MAX_BULK_ROWS:
+        return Response(
+            {'error': f'At most {MAX_BULK_ROWS} incidents can be uploaded at once'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        created, errors = ingest_incidents(rows, request.user)
+        return Response(
+            {'created': created, 'failed': len(errors), 'errors': errors},
+            status=status.HTTP_201_CREATED if created or not errors else status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to create incidents: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_all_incidents(request):
     try:
-        incidents = DiseaseIncident.objects.all().select_related('health_facility', 'created_by')
-        if not incidents.exists():
-            return Response(
-                {'message': 'No incidents found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        serializer = DiseaseIncidentSerializer(incidents, many=True)
-        return Response(serializer.data)
+        incidents = DiseaseIncident.objects.all()
+        if is_streaming_requested(request):
+            return streaming_json_response(request, incidents, DiseaseIncidentSerializer)
+        return paginated_response(
+            request, incidents, DiseaseIncidentSerializer,
+            empty_message='No incidents found'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve incidents: {str(e)}'},
@@ -73,10 +122,10 @@ def get_all_incidents(request):
 def get_incident_by_id(request, pk):
     try:
         incident = get_object_or_404(
-            DiseaseIncident.objects.select_related('health_facility', 'created_by'),
+            DiseaseIncidentSerializer.optimize_queryset(DiseaseIncident.objects.all(), request),
             pk=pk
         )
-        serializer = DiseaseIncidentSerializer(incident)
+        serializer = DiseaseIncidentSerializer(incident, context={'request': request})
         return Response(serializer.data)
     except DiseaseIncident.DoesNotExist:
         return Response(
@@ -95,16 +144,12 @@ def get_incidents_by_user(request):
     try:
         incidents = DiseaseIncident.objects.filter(
             created_by=request.user
-        ).select_related('health_facility', 'created_by')
+        )
         
-        if not incidents.exists():
-            return Response(
-                {'message': 'No incidents found for this user'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = DiseaseIncidentSerializer(incidents, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, incidents, DiseaseIncidentSerializer,
+            empty_message='No incidents found for this user'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve user incidents: {str(e)}'},
@@ -123,16 +168,12 @@ def get_incidents_by_facility(request, facility_id):
             
         incidents = DiseaseIncident.objects.filter(
             health_facility_id=facility_id
-        ).select_related('health_facility', 'created_by')
+        )
         
-        if not incidents.exists():
-            return Response(
-                {'message': f'No incidents found for facility ID {facility_id}'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = DiseaseIncidentSerializer(incidents, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, incidents, DiseaseIncidentSerializer,
+            empty_message=f'No incidents found for facility ID {facility_id}'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve facility incidents: {str(e)}'},
@@ -144,26 +185,22 @@ def get_incidents_by_facility(request, facility_id):
 def get_incidents_by_facility_name(request, facility_name):
     try:
         # Case-insensitive partial match for facility name
-        facilities = HealthFacility.objects.filter(name__icontains=facility_name)
+        facility_ids = facility_ids_containing(facility_name)
         
-        if not facilities.exists():
+        if not facility_ids:
             return Response(
                 {'error': f'No health facilities found with name containing "{facility_name}"'},
                 status=status.HTTP_404_NOT_FOUND
             )
             
         incidents = DiseaseIncident.objects.filter(
-            health_facility__in=facilities
-        ).select_related('health_facility', 'created_by')
+            health_facility_id__in=facility_ids
+        )
         
-        if not incidents.exists():
-            return Response(
-                {'message': f'No incidents found for facilities matching "{facility_name}"'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = DiseaseIncidentSerializer(incidents, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, incidents, DiseaseIncidentSerializer,
+            empty_message=f'No incidents found for facilities matching "{facility_name}"'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve facility incidents: {str(e)}'},
@@ -175,17 +212,13 @@ def get_incidents_by_facility_name(request, facility_name):
 def get_incidents_by_district(request, district):
     try:
         incidents = DiseaseIncident.objects.filter(
-            health_facility__district__iexact=district
-        ).select_related('health_facility', 'created_by')
+            health_facility__district_ref_id=resolve_district(district)
+        )
         
-        if not incidents.exists():
-            return Response(
-                {'message': f'No incidents found in district "{district}"'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = DiseaseIncidentSerializer(incidents, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, incidents, DiseaseIncidentSerializer,
+            empty_message=f'No incidents found in district "{district}"'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve district incidents: {str(e)}'},
@@ -197,17 +230,13 @@ def get_incidents_by_district(request, district):
 def get_incidents_by_sector(request, sector):
     try:
         incidents = DiseaseIncident.objects.filter(
-            health_facility__sector__iexact=sector
-        ).select_related('health_facility', 'created_by')
+            health_facility__sector_ref_id__in=resolve_sector_ids(sector)
+        )
         
-        if not incidents.exists():
-            return Response(
-                {'message': f'No incidents found in sector "{sector}"'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = DiseaseIncidentSerializer(incidents, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, incidents, DiseaseIncidentSerializer,
+            empty_message=f'No incidents found in sector "{sector}"'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve sector incidents: {str(e)}'},
@@ -219,17 +248,13 @@ def get_incidents_by_sector(request, sector):
 def get_incidents_by_disease(request, disease_name):
     try:
         incidents = DiseaseIncident.objects.filter(
-            disease_name__icontains=disease_name
-        ).select_related('health_facility', 'created_by')
+            disease_name__lower__in=disease_names_containing(disease_name)
+        )
         
-        if not incidents.exists():
-            return Response(
-                {'message': f'No incidents found for disease "{disease_name}"'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = DiseaseIncidentSerializer(incidents, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, incidents, DiseaseIncidentSerializer,
+            empty_message=f'No incidents found for disease "{disease_name}"'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve disease incidents: {str(e)}'},
@@ -247,17 +272,13 @@ def get_incidents_by_status(request, status_value):
             )
             
         incidents = DiseaseIncident.objects.filter(
-            status__iexact=status_value
-        ).select_related('health_facility', 'created_by')
+            status=status_value
+        )
         
-        if not incidents.exists():
-            return Response(
-                {'message': f'No incidents found with status "{status_value}"'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = DiseaseIncidentSerializer(incidents, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, incidents, DiseaseIncidentSerializer,
+            empty_message=f'No incidents found with status "{status_value}"'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve status incidents: {str(e)}'},
@@ -284,7 +305,7 @@ def update_incident(request, pk):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        serializer = DiseaseIncidentSerializer(incident, data=request.data, partial=True)
+        serializer = DiseaseIncidentSerializer(incident, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
@@ -319,4 +340,262 @@ def delete_incident(request, pk):
         return Response(
             {'error': f'Failed to delete incident: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_incident_timeseries(request):
+    """
+    Cases and incident counts over time, read from the daily rollup.
+
+    Optional query parameters:
+    - interval: day (default), week or month
+    - start, end: inclusive dates, YYYY-MM-DD
+    - district, sector, disease, status: filters
+    - group_by: comma-separated district, sector, disease, status (default: disease)
+    """
+    params = request.query_params
+    interval = params.get('interval', 'day')
+    if interval not in INTERVALS:
+        return Response(
+            {'error': f'interval must be one of: {", ".join(INTERVALS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    group_by = [name.strip() for name in params.get('group_by', 'disease').split(',') if name.strip()]
+    unknown = [name for name in group_by if name not in GROUP_COLUMNS]
+    if unknown or len(set(group_by)) != len(group_by):
+        return Response(
+            {'error': f'group_by must list distinct values from: {", ".join(GROUP_COLUMNS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    dates = {}
+    for name in ('start', 'end'):
+        value = params.get(name)
+        if not value:
+            dates[name] = None
+            continue
+        try:
+            dates[name] = parse_date(value)
+        except ValueError:
+            dates[name] = None
+        if dates[name] is None:
+            return Response(
+                {'error': f'{name} must be a date in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    status_value = params.get('status')
+    if status_value and status_value.upper() not in dict(DiseaseIncident.STATUS_CHOICES):
+        return Response(
+            {'error': f'Invalid status value: {status_value}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        rollups = IncidentDailyRollup.objects.all()
+        if dates['start']:
+            rollups = rollups.filter(day__gte=dates['start'])
+        if dates['end']:
+            rollups = rollups.filter(day__lte=dates['end'])
+        if params.get('district') and params.get('sector'):
+            rollups = rollups.filter(sector_ref_id=resolve_sector(params['district'], params['sector']))
+        elif params.get('district'):
+            rollups = rollups.filter(district_ref_id=resolve_district(params['district']))
+        elif params.get('sector'):
+            rollups = rollups.filter(sector_ref_id__in=resolve_sector_ids(params['sector']))
+        if params.get('disease'):
+            rollups = rollups.filter(disease_name__lower=params['disease'].lower())
+        if status_value:
+            rollups = rollups.filter(status=status_value.upper())
+
+        return Response({
+            'interval': interval,
+            'start': dates['start'],
+            'end': dates['end'],
+            'group_by': group_by,
+            'series': build_timeseries(rollups, interval, group_by),
+        }, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to build incident time series: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_outbreak_alerts(request):
+    """
+    Alerts raised by outbreak detection (manage.py detect_outbreaks).
+
+    Optional query parameters:
+    - district, sector, disease: filters
+    - level: FACILITY or SECTOR
+    - detector: POISSON, EWMA or CUSUM
+    - since: only alerts for days on or after this date, YYYY-MM-DD
+    """
+    params = request.query_params
+    alerts = OutbreakAlert.objects.all()
+
+    for name, choices in (('level', OutbreakAlert.LEVEL_CHOICES), ('detector', OutbreakAlert.DETECTOR_CHOICES)):
+        value = params.get(name)
+        if value:
+            if value.upper() not in dict(choices):
+                return Response(
+                    {'error': f'Invalid {name}: {value}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            alerts = alerts.filter(**{name: value.upper()})
+
+    if params.get('since'):
+        try:
+            since = parse_date(params['since'])
+        except ValueError:
+            since = None
+        if since is None:
+            return Response(
+                {'error': 'since must be a date in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        alerts = alerts.filter(day__gte=since)
+
+    try:
+        if params.get('district') and params.get('sector'):
+            alerts = alerts.filter(sector_ref_id=resolve_sector(params['district'], params['sector']))
+        elif params.get('district'):
+            alerts = alerts.filter(district_ref_id=resolve_district(params['district']))
+        elif params.get('sector'):
+            alerts = alerts.filter(sector_ref_id__in=resolve_sector_ids(params['sector']))
+        if params.get('disease'):
+            alerts = alerts.filter(disease_name__lower=params['disease'].lower())
+
+        if is_streaming_requested(request):
+            return streaming_json_response(request, alerts, OutbreakAlertSerializer)
+        return paginated_response(request, alerts, OutbreakAlertSerializer)
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to retrieve outbreak alerts: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_status_counts_as_of(request):
+    """
+    Incidents and cases per status at the end of a day, answered from the
+    nearest earlier status snapshot plus the events logged after it.
+
+    Query parameters:
+    - date: YYYY-MM-DD (required)
+    - district, sector: optional area
+    """
+    params = request.query_params
+    try:
+        day = parse_date(params.get('date', ''))
+    except ValueError:
+        day = None
+    if day is None:
+        return Response(
+            {'error': 'date is required, in YYYY-MM-DD format'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        area = {}
+        if params.get('district') and params.get('sector'):
+            area = {'sector_ref_id': resolve_sector(params['district'], params['sector'])}
+        elif params.get('district'):
+            area = {'district_ref_id': resolve_district(params['district'])}
+        elif params.get('sector'):
+            area = {'sector_ref_id__in': resolve_sector_ids(params['sector'])}
+
+        as_of = timezone.make_aware(datetime.combine(day, time.max))
+        counts, snapshot = status_counts_as_of(as_of, area)
+        return Response({
+            'date': day,
+            'district': params.get('district'),
+            'sector': params.get('sector'),
+            'snapshot_at': snapshot.taken_at if snapshot else None,
+            'counts': {
+                status_value: {'incidents': incidents, 'cases': cases}
+                for status_value, (incidents, cases) in counts.items()
+            },
+        })
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to count incidents by status: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_incidence_rates(request):
+    """
+    Cases per 100,000 population by sector and disease, with age-adjusted
+    rates and 95% confidence intervals (see incidence.py).
+
+    Optional query parameters:
+    - start, end: inclusive dates, YYYY-MM-DD
+    - disease: one disease; every sector with population data is listed
+    - district, sector: only list these sectors (rates stay national)
+    - age_risk: relative risk of the under-5, youth, adult and elderly bands,
+      e.g. 2,1,1,3 (default: equal)
+    """
+    params = request.query_params
+    dates = {}
+    for name in ('start', 'end'):
+        value = params.get(name)
+        if not value:
+            dates[name] = None
+            continue
+        try:
+            dates[name] = parse_date(value)
+        except ValueError:
+            dates[name] = None
+        if dates[name] is None:
+            return Response(
+                {'error': f'{name} must be a date in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    age_risk = AGE_BAND_RISK
+    if params.get('age_risk'):
+        try:
+            age_risk = tuple(float(value) for value in params['age_risk'].split(','))
+        except ValueError:
+            age_risk = ()
+        if len(age_risk) != len(AGE_BAND_RISK) or not all(0 < value < float('inf') for value in age_risk):
+            return Response(
+                {'error': f'age_risk must be {len(AGE_BAND_RISK)} positive numbers separated by commas'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    try:
+        rates = cached_incidence_rates(dates['start'], dates['end'], params.get('disease'), age_risk)
+        sector_ids = None
+        if params.get('district') and params.get('sector'):
+            sector_ids = {resolve_sector(params['district'], params['sector'])}
+        elif params.get('district'):
+            sector_ids = set(district_sector_ids(resolve_district(params['district'])))
+        elif params.get('sector'):
+            sector_ids = set(resolve_sector_ids(params['sector']))
+
+        results = rates['results']
+        if sector_ids is not None:
+            results = [row for row, sector_id in zip(results, rates['sector_ids']) if sector_id in sector_ids]
+        return Response({
+            'start': dates['start'],
+            'end': dates['end'],
+            'per': PER,
+            'age_risk': age_risk,
+            'population': rates['population'],
+            'national': rates['national'],
+            'results': results,
+        })
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to compute incidence rates: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class GeographyAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'geography_app'
+
+    def ready(self):
+        from django.db.models import CharField
+        from django.db.models.functions import Lower
+        from . import signals  # noqa: F401
+
+        # name__lower=value.lower() compiles to LOWER(name) = ..., which matches
+        # the Lower() indexes; __iexact can't use an index on every backend
+        CharField.register_lookup(Lower)
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='District',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Sector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('district', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sectors', to='geography_app.district')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='district',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='district_name_ci_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='sector',
+            constraint=models.UniqueConstraint(models.F('district'), django.db.models.functions.text.Lower('name'), name='sector_district_name_ci_unique'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+
+def normalize(name):
+    return name.strip().lower()
+
+
+def backfill_area_refs(apps, schema_editor):
+    """
+    Create District and Sector rows from the existing district/sector strings,
+    matching names case-insensitively, and point every row at them.
+    """
+    District = apps.get_model('geography_app', 'District')
+    Sector = apps.get_model('geography_app', 'Sector')
+    HealthFacility = apps.get_model('health_facility_app', 'HealthFacility')
+    PopulationData = apps.get_model('population_data_app', 'PopulationData')
+    AreaSummary = apps.get_model('resource_allocation_app', 'AreaSummary')
+
+    districts, sectors = {}, {}
+
+    def area(district, sector):
+        district_key = normalize(district)
+        if district_key not in districts:
+            districts[district_key] = District.objects.create(name=district.strip())
+        district_row = districts[district_key]
+        sector_key = (district_row.id, normalize(sector))
+        if sector_key not in sectors:
+            sectors[sector_key] = Sector.objects.create(district=district_row, name=sector.strip())
+        return district_row, sectors[sector_key]
+
+    fields = ['district_ref', 'sector_ref', 'district', 'sector']
+    for model in (HealthFacility, PopulationData):
+        rows = []
+        for row in model.objects.only('id', 'district', 'sector').iterator(chunk_size=2000):
+            row.district_ref, row.sector_ref = area(row.district, row.sector)
+            row.district, row.sector = row.district_ref.name, row.sector_ref.name
+            rows.append(row)
+            if len(rows) == 2000:
+                model.objects.bulk_update(rows, fields, batch_size=1000)
+                rows = []
+        model.objects.bulk_update(rows, fields, batch_size=1000)
+
+    # Summaries are derived data. Keep the ones that map onto a sector of their
+    # own; spellings that merged into one sector are recomputed on next read.
+    summaries_by_sector = {}
+    for summary in AreaSummary.objects.all():
+        district_row, sector_row = area(summary.district, summary.sector)
+        summaries_by_sector.setdefault(sector_row.id, []).append(summary)
+
+    merged = []
+    for sector_id, summaries in summaries_by_sector.items():
+        if len(summaries) > 1:
+            merged.extend(summary.id for summary in summaries)
+            continue
+        summary = summaries[0]
+        summary.sector_ref_id = sector_id
+        summary.save(update_fields=['sector_ref'])
+    AreaSummary.objects.filter(id__in=merged).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography_app', '0001_initial'),
+        ('health_facility_app', '0005_remove_healthfacility_facility_area_ci_idx_and_more'),
+        ('population_data_app', '0004_remove_populationdata_population_area_ci_idx_and_more'),
+        ('resource_allocation_app', '0007_alter_areasummary_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_area_refs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.17 on 2026-10-18 16:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography_app', '0002_backfill_area_refs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sector',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sector',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import models
+from django.db.models.functions import Lower
+
+
+class District(models.Model):
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='district_name_ci_unique'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Sector(models.Model):
+    district = models.ForeignKey(District, on_delete=models.PROTECT, related_name='sectors')
+    name = models.CharField(max_length=100)
+    # Population-weighted centre in WGS84 degrees, used to derive accessibility
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint('district', Lower('name'), name='sector_district_name_ci_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.district.name} - {self.name}"
@@ -0,0 +1,197 @@
+"""
+District/sector name resolution.
+
+URLs and request bodies still name areas by their district and sector
+strings. The name tables are small, so they are loaded once per process and
+matched case-insensitively in memory; queries then filter and group on the
+integer keys. A version counter in the shared cache is bumped whenever a
+District or Sector row changes, which makes every worker reload.
+"""
+from collections import namedtuple
+from django.db import IntegrityError, transaction
+from backend.cache import get_version, bump_version
+from .models import District, Sector
+
+NAMES_NAMESPACE = 'geography-names'
+
+Area = namedtuple('Area', ['district_id', 'sector_id', 'district', 'sector'])
+
+
+class NameTables:
+    def __init__(self, districts, sectors):
+        # normalized district name -> id
+        self.district_ids = {}
+        # (district id, normalized sector name) -> id
+        self.sector_ids = {}
+        # normalized sector name -> [sector ids], a sector name can repeat across districts
+        self.sector_ids_by_name = {}
+        # district id -> [sector ids] ordered by name
+        self.district_sector_ids = {}
+        # district id -> name
+        self.district_names = {}
+        # sector id -> Area
+        self.areas = {}
+
+        for district_id, name in districts:
+            self.district_ids[normalize(name)] = district_id
+            self.district_names[district_id] = name
+        for sector_id, district_id, name in sorted(sectors, key=lambda row: row[2]):
+            self.sector_ids[(district_id, normalize(name))] = sector_id
+            self.sector_ids_by_name.setdefault(normalize(name), []).append(sector_id)
+            self.district_sector_ids.setdefault(district_id, []).append(sector_id)
+            self.areas[sector_id] = Area(district_id, sector_id, self.district_names[district_id], name)
+
+
+_loaded = (None, None)
+
+
+def normalize(name):
+    return name.strip().lower()
+
+
+def invalidate_names():
+    bump_version(NAMES_NAMESPACE)
+
+
+def get_name_tables():
+    global _loaded
+    version = get_version(NAMES_NAMESPACE)
+    loaded_version, tables = _loaded
+    if loaded_version == version:
+        return tables
+
+    tables = NameTables(
+        District.objects.values_list('id', 'name'),
+        Sector.objects.values_list('id', 'district_id', 'name'),
+    )
+    # Rows created inside an open transaction may still be rolled back, so
+    # only share tables read outside one
+    if not transaction.get_connection().in_atomic_block:
+        _loaded = (version, tables)
+    return tables
+
+
+def resolve_district(name):
+    return get_name_tables().district_ids.get(normalize(name))
+
+
+def resolve_sector(district, sector):
+    tables = get_name_tables()
+    district_id = tables.district_ids.get(normalize(district))
+    return tables.sector_ids.get((district_id, normalize(sector)))
+
+
+def resolve_sector_ids(name):
+    return get_name_tables().sector_ids_by_name.get(normalize(name), [])
+
+
+def district_sector_ids(district_id):
+    return get_name_tables().district_sector_ids.get(district_id, [])
+
+
+def area_of(sector_id):
+    return get_name_tables().areas.get(sector_id)
+
+
+def _get_or_create(model, name, **fields):
+    # Case-insensitive get_or_create; the unique Lower(name) constraint settles races
+    existing = model.objects.filter(name__lower=normalize(name), **fields).first()
+    if existing is not None:
+        return existing
+    try:
+        with transaction.atomic():
+            return model.objects.create(name=name.strip(), **fields)
+    except IntegrityError:
+        return model.objects.get(name__lower=normalize(name), **fields)
+
+
+def get_or_create_area(district, sector):
+    """
+    Return the Area for a district/sector pair, creating the rows on first use.
+    """
+    sector_id = resolve_sector(district, sector)
+    if sector_id is not None:
+        return area_of(sector_id)
+
+    district_row = _get_or_create(District, district)
+    sector_row = _get_or_create(Sector, sector, district=district_row)
+    return Area(district_row.id, sector_row.id, district_row.name, sector_row.name)
+
+
+def _names_changed():
+    # bulk_create sends no post_save. Bump again on commit so workers that
+    # reloaded before the new rows were visible reload once more.
+    invalidate_names()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(invalidate_names)
+
+
+def _district_rows(keys):
+    return {
+        normalize(name): (district_id, name)
+        for district_id, name in District.objects.filter(name__lower__in=keys).values_list('id', 'name')
+    }
+
+
+def _sector_rows(district_ids, keys):
+    return {
+        (district_id, normalize(name)): (sector_id, name)
+        for sector_id, district_id, name in Sector.objects.filter(
+            district_id__in=district_ids, name__lower__in=keys
+        ).values_list('id', 'district_id', 'name')
+    }
+
+
+def get_or_create_areas(pairs):
+    """
+    Areas for many (district, sector) name pairs, keyed by the normalized
+    pair. Only the requested names are looked up, and missing District and
+    Sector rows are bulk-created, so a batch costs a handful of statements
+    whatever its size and however many areas already exist.
+    """
+    pairs = {(normalize(district), normalize(sector)): (district.strip(), sector.strip()) for district, sector in pairs}
+    created = False
+
+    districts = _district_rows({district_key for district_key, _ in pairs})
+    new_districts = {
+        district_key: district for (district_key, _), (district, _) in pairs.items() if district_key not in districts
+    }
+    if new_districts:
+        District.objects.bulk_create([District(name=name) for name in new_districts.values()], ignore_conflicts=True)
+        districts.update(_district_rows(new_districts))
+        created = True
+
+    def sector_key(pair):
+        district_key, key = pair
+        return districts[district_key][0], key
+
+    district_ids = {district_id for district_id, _ in districts.values()}
+    sectors = _sector_rows(district_ids, {key for _, key in pairs})
+    new_sectors = {sector_key(pair): sector for pair, (_, sector) in pairs.items() if sector_key(pair) not in sectors}
+    if new_sectors:
+        Sector.objects.bulk_create(
+            [Sector(district_id=district_id, name=name) for (district_id, _), name in new_sectors.items()],
+            ignore_conflicts=True,
+        )
+        sectors.update(_sector_rows(district_ids, {key for _, key in new_sectors}))
+        created = True
+
+    if created:
+        _names_changed()
+
+    areas = {}
+    for pair in pairs:
+        district_id, district = districts[pair[0]]
+        sector_id, sector = sectors[sector_key(pair)]
+        areas[pair] = Area(district_id, sector_id, district, sector)
+    return areas
+
+
+def assign_area(instance):
+    """
+    Point a row with district/sector strings at its District and Sector, and
+    store the canonical spelling of both names.
+    """
+    area = get_or_create_area(instance.district, instance.sector)
+    instance.district_ref_id, instance.sector_ref_id = area.district_id, area.sector_id
+    instance.district, instance.sector = area.district, area.sector
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import District, Sector
+from .resolver import invalidate_names
+
+
+@receiver(post_save, sender=District)
+@receiver(post_save, sender=Sector)
+@receiver(post_delete, sender=District)
+@receiver(post_delete, sender=Sector)
+def area_names_changed(sender, instance, **kwargs):
+    invalidate_names()
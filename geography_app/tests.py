@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from backend.testing import make_user
+from health_facility_app.models import HealthFacility
+from .models import District, Sector
+from .resolver import (
+    assign_area, get_name_tables, get_or_create_area, get_or_create_areas, resolve_district, resolve_sector,
+    resolve_sector_ids,
+)
+
+
+class ResolverTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.kimironko = get_or_create_area('Gasabo', 'Kimironko')
+        cls.remera = get_or_create_area('Gasabo', 'Remera')
+        # The same sector name in another district
+        cls.kicukiro_kimironko = get_or_create_area('Kicukiro', 'Kimironko')
+
+    def test_resolve_sector_ignores_case_and_whitespace(self):
+        self.assertEqual(resolve_sector(' gasabo ', 'KIMIRONKO'), self.kimironko.sector_id)
+        self.assertEqual(resolve_sector('Kicukiro', 'kimironko'), self.kicukiro_kimironko.sector_id)
+        self.assertIsNone(resolve_sector('Kicukiro', 'Remera'))
+        self.assertIsNone(resolve_sector('Nyarugenge', 'Remera'))
+
+    def test_resolve_sector_ids_spans_districts(self):
+        self.assertEqual(
+            sorted(resolve_sector_ids(' Kimironko')),
+            sorted([self.kimironko.sector_id, self.kicukiro_kimironko.sector_id]),
+        )
+        self.assertEqual(resolve_sector_ids('remera'), [self.remera.sector_id])
+        self.assertEqual(resolve_sector_ids('Nyamirambo'), [])
+
+    def test_known_areas_are_not_created_again(self):
+        area = get_or_create_area('GASABO ', 'remera')
+        self.assertEqual(area, self.remera)
+        self.assertEqual((District.objects.count(), Sector.objects.count()), (2, 3))
+
+    def test_assign_area_stores_the_canonical_names(self):
+        facility = HealthFacility.objects.create(
+            name='Kimironko Clinic', facility_type='CLINIC', district='gasabo ', sector=' KIMIRONKO',
+            capacity=10, contact_number='0780000000', created_by=make_user(),
+        )
+        self.assertEqual(
+            (facility.district_ref_id, facility.sector_ref_id, facility.district, facility.sector),
+            (self.kimironko.district_id, self.kimironko.sector_id, 'Gasabo', 'Kimironko'),
+        )
+
+        facility.district, facility.sector = 'Nyarugenge', 'Nyamirambo'
+        assign_area(facility)
+        self.assertEqual(facility.sector_ref_id, resolve_sector('nyarugenge', 'nyamirambo'))
+        self.assertEqual(facility.district_ref_id, resolve_district('NYARUGENGE'))
+
+
+class NameTableCacheTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.area = get_or_create_area('Gasabo', 'Kimironko')
+
+    def test_tables_are_reused_until_a_name_changes(self):
+        tables = get_name_tables()
+        with self.assertNumQueries(0):
+            self.assertIs(get_name_tables(), tables)
+
+        Sector.objects.create(district_id=self.area.district_id, name='Remera')
+        self.assertIsNot(get_name_tables(), tables)
+        self.assertIsNotNone(resolve_sector('Gasabo', 'Remera'))
+
+        district = District.objects.get(id=self.area.district_id)
+        district.name = 'Gasabo District'
+        district.save()
+        self.assertEqual(resolve_district('gasabo district'), self.area.district_id)
+        self.assertIsNone(resolve_district('Gasabo'))
+
+    def test_bulk_created_names_are_seen(self):
+        get_name_tables()
+        areas = get_or_create_areas([('Nyarugenge', 'Nyamirambo'), ('gasabo', 'kimironko')])
+        self.assertEqual(areas[('gasabo', 'kimironko')], self.area)
+        self.assertEqual(
+            resolve_sector('Nyarugenge', 'Nyamirambo'), areas[('nyarugenge', 'nyamirambo')].sector_id
+        )
+
+    def test_tables_read_in_a_rolled_back_transaction_are_not_shared(self):
+        get_name_tables()
+        try:
+            with transaction.atomic():
+                get_or_create_area('Nyarugenge', 'Nyamirambo')
+                self.assertIsNotNone(resolve_sector('Nyarugenge', 'Nyamirambo'))
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertIsNone(resolve_sector('Nyarugenge', 'Nyamirambo'))
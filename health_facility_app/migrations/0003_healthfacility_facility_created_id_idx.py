@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_facility_app', '0002_alter_healthfacility_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='healthfacility',
+            index=models.Index(fields=['created_at', 'id'], name='facility_created_id_idx'),
+        ),
+    ]
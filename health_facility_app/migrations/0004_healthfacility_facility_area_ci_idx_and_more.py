@@ -0,0 +1,34 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:40
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_facility_app', '0003_healthfacility_facility_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='healthfacility',
+            index=models.Index(django.db.models.functions.text.Lower('district'), django.db.models.functions.text.Lower('sector'), name='facility_area_ci_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthfacility',
+            index=models.Index(django.db.models.functions.text.Lower('sector'), name='facility_sector_ci_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthfacility',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='facility_name_ci_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthfacility',
+            index=models.Index(fields=['district', 'sector'], name='facility_area_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthfacility',
+            index=models.Index(fields=['status', 'created_at'], name='facility_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography_app', '0001_initial'),
+        ('health_facility_app', '0004_healthfacility_facility_area_ci_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='healthfacility',
+            name='facility_area_ci_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='healthfacility',
+            name='facility_sector_ci_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='healthfacility',
+            name='facility_area_idx',
+        ),
+        migrations.AddField(
+            model_name='healthfacility',
+            name='district_ref',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='facilities', to='geography_app.district'),
+        ),
+        migrations.AddField(
+            model_name='healthfacility',
+            name='sector_ref',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='facilities', to='geography_app.sector'),
+        ),
+        migrations.AddIndex(
+            model_name='healthfacility',
+            index=models.Index(fields=['district_ref', 'created_at'], name='facility_district_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthfacility',
+            index=models.Index(fields=['sector_ref', 'created_at'], name='facility_sector_created_idx'),
+        ),
+    ]
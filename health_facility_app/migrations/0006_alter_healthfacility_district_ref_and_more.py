@@ -0,0 +1,25 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography_app', '0002_backfill_area_refs'),
+        ('health_facility_app', '0005_remove_healthfacility_facility_area_ci_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='healthfacility',
+            name='district_ref',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='facilities', to='geography_app.district'),
+        ),
+        migrations.AlterField(
+            model_name='healthfacility',
+            name='sector_ref',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='facilities', to='geography_app.sector'),
+        ),
+    ]
@@ -1,5 +1,8 @@
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models.functions import Lower
 from django.conf import settings
+from geography_app.resolver import assign_area
 
 class HealthFacility(models.Model):
     STATUS_CHOICES = [
@@ -20,11 +23,44 @@ class HealthFacility(models.Model):
     facility_type = models.CharField(max_length=50, choices=FACILITY_TYPES)
     district = models.CharField(max_length=100)
     sector = models.CharField(max_length=100)
+    # Integer keys for area filters and grouping, set from district/sector on save
+    district_ref = models.ForeignKey(
+        'geography_app.District', on_delete=models.PROTECT, related_name='facilities',
+        editable=False, db_index=False,
+    )
+    sector_ref = models.ForeignKey(
+        'geography_app.Sector', on_delete=models.PROTECT, related_name='facilities',
+        editable=False, db_index=False,
+    )
     capacity = models.IntegerField()
     contact_number = models.CharField(max_length=20)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
+    # WGS84 degrees; facilities without a location are left out of spatial queries
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Lets the spatial index reload only the facilities that changed
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE) 
     
+    class Meta:
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['created_at', 'id'], name='facility_created_id_idx'),
+            # Case-insensitive name lookups query name__lower
+            models.Index(Lower('name'), name='facility_name_ci_idx'),
+            models.Index(fields=['district_ref', 'created_at'], name='facility_district_created_idx'),
+            models.Index(fields=['sector_ref', 'created_at'], name='facility_sector_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='facility_status_created_idx'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        assign_area(self)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
@@ -1,18 +1,28 @@
 from rest_framework import serializers
 from .models import HealthFacility
 from userApp.models import CustomUser
+from backend.serializers import DynamicFieldsMixin
 
 # Serializer for the created_by user
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser()  # Fetches the custom user model
         fields = ['id', 'phone_number', 'email', 'role', 'is_active', 'is_staff', 'created_at']  # Specify desired fields
 
 # Serializer for the health facility
-class HealthFacilitySerializer(serializers.ModelSerializer):
-    created_by = CustomUserSerializer(read_only=True)  # Nest the user serializer
+class HealthFacilitySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)  # Expand with ?expand=created_by
+    expandable_fields = {'created_by': CustomUserSerializer}
 
     class Meta:
         model = HealthFacility
-        fields = '__all__'
+        exclude = ('district_ref', 'sector_ref')
         read_only_fields = ('id','created_at', 'created_by')
+
+    def validate(self, data):
+        # A location needs both coordinates
+        latitude = data.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = data.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError('Provide both latitude and longitude, or neither.')
+        return data
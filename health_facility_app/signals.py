@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import HealthFacility
+from .spatial import invalidate_locations
+
+
+@receiver(post_save, sender=HealthFacility)
+@receiver(post_delete, sender=HealthFacility)
+def facility_location_changed(sender, **kwargs):
+    invalidate_locations()
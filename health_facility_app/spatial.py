@@ -0,0 +1,282 @@
+"""
+Process-local spatial index over facility locations.
+
+Facilities are bucketed into a grid of CELL_DEGREES cells. Coordinates, type
+and status live in NumPy arrays and every cell holds an array of positions
+into them. A query reads the cells around the point, filters them with
+boolean masks and measures great-circle distances for those candidates only.
+Applying a change rebuilds only the cells it touches.
+
+Workers notice changes through a cache version that the signal handlers
+bump on commit, then read only the facilities updated since their last
+load. Deleted facilities are found by comparing ids when the row count
+shows some are gone.
+"""
+import math
+import threading
+from datetime import timedelta
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from backend.cache import get_version, bump_version
+from .models import HealthFacility
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# About 5.5 km north to south
+CELL_DEGREES = 0.05
+
+TYPE_CODES = {value: code for code, (value, _) in enumerate(HealthFacility.FACILITY_TYPES)}
+STATUS_CODES = {value: code for code, (value, _) in enumerate(HealthFacility.STATUS_CHOICES)}
+
+SPATIAL_NAMESPACE = 'facility-locations'
+# Re-read rows stamped this long before the last load, in case they were
+# committed after it
+RELOAD_OVERLAP = timedelta(minutes=5)
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """
+    Great-circle distances in km from one point to arrays of points, all in degrees.
+    """
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_pairs(latitudes, longitudes, to_latitudes, to_longitudes):
+    """
+    Great-circle distances in km between matching elements of the arrays.
+    """
+    lat1, lon1 = np.radians(latitudes), np.radians(longitudes)
+    lat2, lon2 = np.radians(to_latitudes), np.radians(to_longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _cell(latitude, longitude):
+    return math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES)
+
+
+def _ring(row, col, radius):
+    # Cells at Chebyshev distance `radius` from (row, col)
+    if radius == 0:
+        return [(row, col)]
+    cells = [(row - radius, col + offset) for offset in range(-radius, radius + 1)]
+    cells += [(row + radius, col + offset) for offset in range(-radius, radius + 1)]
+    cells += [(row + offset, col - radius) for offset in range(-radius + 1, radius)]
+    cells += [(row + offset, col + radius) for offset in range(-radius + 1, radius)]
+    return cells
+
+
+class SpatialIndex:
+    def __init__(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.latitudes = np.zeros(0)
+        self.longitudes = np.zeros(0)
+        self.types = np.zeros(0, dtype=np.int8)
+        self.statuses = np.zeros(0, dtype=np.int8)
+        # facility id -> position in the arrays
+        self.positions = {}
+        self.free = []
+        # cell -> set of positions, and the same as an array for queries
+        self.members = {}
+        self.cells = {}
+        # (first row, last row, first column, last column) of the occupied cells
+        self.bounds = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _grow(self, needed):
+        size = len(self.ids)
+        if needed <= size:
+            return
+        new_size = max(needed, size * 2, 1024)
+        for name in ('ids', 'latitudes', 'longitudes', 'types', 'statuses'):
+            array = getattr(self, name)
+            grown = np.zeros(new_size, dtype=array.dtype)
+            grown[:size] = array
+            setattr(self, name, grown)
+        self.free.extend(range(new_size - 1, size - 1, -1))
+
+    def _remove(self, facility_id, dirty):
+        position = self.positions.pop(facility_id, None)
+        if position is None:
+            return
+        cell = _cell(self.latitudes[position], self.longitudes[position])
+        self.members[cell].discard(position)
+        dirty.add(cell)
+        self.free.append(position)
+
+    def apply(self, rows):
+        """
+        Add or move facilities from (id, latitude, longitude, type, status)
+        rows; rows without coordinates remove the facility.
+        """
+        with self.lock:
+            dirty = set()
+            rows = list(rows)
+            self._grow(len(self.positions) + len(rows))
+            for facility_id, latitude, longitude, facility_type, facility_status in rows:
+                self._remove(facility_id, dirty)
+                if latitude is None or longitude is None:
+                    continue
+                position = self.free.pop()
+                self.positions[facility_id] = position
+                self.ids[position] = facility_id
+                self.latitudes[position] = latitude
+                self.longitudes[position] = longitude
+                self.types[position] = TYPE_CODES.get(facility_type, -1)
+                self.statuses[position] = STATUS_CODES.get(facility_status, -1)
+                cell = _cell(latitude, longitude)
+                self.members.setdefault(cell, set()).add(position)
+                dirty.add(cell)
+            self._rebuild_cells(dirty)
+
+    def remove(self, facility_ids):
+        with self.lock:
+            dirty = set()
+            for facility_id in facility_ids:
+                self._remove(facility_id, dirty)
+            self._rebuild_cells(dirty)
+
+    def _rebuild_cells(self, dirty):
+        for cell in dirty:
+            members = self.members.get(cell)
+            if members:
+                self.cells[cell] = np.fromiter(members, dtype=np.int64, count=len(members))
+            else:
+                self.members.pop(cell, None)
+                self.cells.pop(cell, None)
+        if dirty:
+            rows = [cell[0] for cell in self.cells]
+            cols = [cell[1] for cell in self.cells]
+            self.bounds = (min(rows), max(rows), min(cols), max(cols)) if self.cells else None
+
+    def _filtered(self, positions, types, statuses):
+        mask = np.ones(len(positions), dtype=bool)
+        if types is not None:
+            mask &= np.isin(self.types[positions], [TYPE_CODES[value] for value in types])
+        if statuses is not None:
+            mask &= np.isin(self.statuses[positions], [STATUS_CODES[value] for value in statuses])
+        return positions[mask]
+
+    def _gather(self, cells, types, statuses):
+        arrays = [self.cells[cell] for cell in cells if cell in self.cells]
+        if not arrays:
+            return np.zeros(0, dtype=np.int64)
+        return self._filtered(np.concatenate(arrays), types, statuses)
+
+    def _result(self, positions, distances, limit):
+        order = np.argsort(distances, kind='stable')[:limit]
+        return list(zip(self.ids[positions[order]].tolist(), distances[order].tolist()))
+
+    def nearest(self, latitude, longitude, k, types=None, statuses=None):
+        """
+        The k nearest facilities as (id, distance in km), nearest first.
+        `types` and `statuses` optionally list the accepted values.
+        """
+        with self.lock:
+            if not self.cells:
+                return []
+            row, col = _cell(latitude, longitude)
+            first_row, last_row, first_col, last_col = self.bounds
+            # Beyond this ring every occupied cell has been read
+            last_ring = max(abs(row - first_row), abs(row - last_row), abs(col - first_col), abs(col - last_col))
+
+            found_positions, found_distances = [], []
+            read = 0
+            for radius in range(last_ring + 1):
+                cells = _ring(row, col, radius)
+                read += len(cells)
+                if read > 4 * len(self.cells):
+                    # Sparse surroundings: scanning every facility is cheaper
+                    # than walking more empty rings
+                    positions = self._filtered(np.fromiter(self.positions.values(), dtype=np.int64), types, statuses)
+                    distances = haversine_km(latitude, longitude, self.latitudes[positions], self.longitudes[positions])
+                    return self._result(positions, distances, k)
+
+                positions = self._gather(cells, types, statuses)
+                if len(positions):
+                    found_positions.append(positions)
+                    found_distances.append(
+                        haversine_km(latitude, longitude, self.latitudes[positions], self.longitudes[positions])
+                    )
+                count = sum(len(positions) for positions in found_positions)
+                if count >= k:
+                    # Anything outside the rings read so far is at least this far
+                    widest = min(89.9, abs(latitude) + (radius + 1) * CELL_DEGREES)
+                    covered = radius * CELL_DEGREES * KM_PER_DEGREE * math.cos(math.radians(widest))
+                    distances = np.concatenate(found_distances)
+                    if np.partition(distances, k - 1)[k - 1] <= covered:
+                        break
+
+            if not found_positions:
+                return []
+            return self._result(np.concatenate(found_positions), np.concatenate(found_distances), k)
+
+    def within(self, latitude, longitude, radius_km, limit, types=None, statuses=None):
+        """
+        Facilities within radius_km as (id, distance in km), nearest first.
+        """
+        with self.lock:
+            delta_latitude = radius_km / KM_PER_DEGREE
+            widest = min(89.9, abs(latitude) + delta_latitude)
+            delta_longitude = min(180.0, radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest))))
+            first_row, first_col = _cell(latitude - delta_latitude, longitude - delta_longitude)
+            last_row, last_col = _cell(latitude + delta_latitude, longitude + delta_longitude)
+
+            if (last_row - first_row + 1) * (last_col - first_col + 1) > len(self.cells):
+                cells = [
+                    cell for cell in self.cells
+                    if first_row <= cell[0] <= last_row and first_col <= cell[1] <= last_col
+                ]
+            else:
+                cells = [
+                    (cell_row, cell_col)
+                    for cell_row in range(first_row, last_row + 1)
+                    for cell_col in range(first_col, last_col + 1)
+                ]
+            positions = self._gather(cells, types, statuses)
+            distances = haversine_km(latitude, longitude, self.latitudes[positions], self.longitudes[positions])
+            inside = distances <= radius_km
+            return self._result(positions[inside], distances[inside], limit)
+
+
+_loaded = (None, None, None)
+_load_lock = threading.Lock()
+
+_COLUMNS = ('id', 'latitude', 'longitude', 'facility_type', 'status')
+
+
+def invalidate_locations():
+    transaction.on_commit(lambda: bump_version(SPATIAL_NAMESPACE))
+
+
+def get_spatial_index():
+    global _loaded
+    version = get_version(SPATIAL_NAMESPACE)
+    loaded_version, loaded_at, index = _loaded
+    if loaded_version == version:
+        return index
+
+    with _load_lock:
+        loaded_version, loaded_at, index = _loaded
+        if loaded_version == version:
+            return index
+        started = timezone.now()
+        located = HealthFacility.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        if index is None:
+            index = SpatialIndex()
+            index.apply(located.values_list(*_COLUMNS).iterator(chunk_size=2000))
+        else:
+            changed = HealthFacility.objects.filter(updated_at__gte=loaded_at - RELOAD_OVERLAP)
+            index.apply(changed.values_list(*_COLUMNS).iterator(chunk_size=2000))
+            if located.count() != len(index):
+                existing = set(located.values_list('id', flat=True))
+                index.remove([facility_id for facility_id in list(index.positions) if facility_id not in existing])
+        _loaded = (version, started, index)
+    return index
@@ -1,3 +1,218 @@
-from django.test import TestCase
+import json
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from geography_app.resolver import get_or_create_area
+from search_app.models import SearchTerm
+from accessiblity_app.models import AccessibilityData
+from disease_incident_app.models import DiseaseIncident
+from population_data_app.models import PopulationData
+from resource_allocation_app.models import ResourceAllocation
+from backend.streaming import DEFAULT_CHUNK_SIZE
+from backend.testing import FastPathEquivalenceMixin, make_user, populate_area
+from .models import HealthFacility
+from .spatial import CELL_DEGREES, SpatialIndex, haversine_km
 
-# Create your tests here.
+
+def create_facilities(user, count, district='Gasabo', sector='Kimironko'):
+    area = get_or_create_area(district, sector)
+    HealthFacility.objects.bulk_create([
+        HealthFacility(
+            name=f'Facility {i}', facility_type='HOSPITAL' if i % 2 else 'CLINIC',
+            district=area.district, sector=area.sector,
+            district_ref_id=area.district_id, sector_ref_id=area.sector_id,
+            capacity=i, contact_number='0780000000', created_by=user,
+        )
+        for i in range(count)
+    ])
+
+
+class FacilityStreamTests(TestCase):
+    ROWS = DEFAULT_CHUNK_SIZE * 2 + 100
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        create_facilities(cls.user, cls.ROWS)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_stream_reads_primary_key_chunks(self):
+        response = self.client.get('/facility/facilities/', {'stream': '1'})
+        with CaptureQueriesContext(connection) as queries:
+            rows = json.loads(b''.join(response.streaming_content))
+
+        ids = list(HealthFacility.objects.order_by('pk').values_list('id', flat=True))
+        self.assertEqual([row['id'] for row in rows], ids)
+        selects = [query['sql'] for query in queries if 'health_facility_app_healthfacility' in query['sql']]
+        self.assertEqual(len(selects), 3)
+        for sql in selects:
+            self.assertIn(f'LIMIT {DEFAULT_CHUNK_SIZE}', sql)
+        self.assertIn('"id" >', selects[1])
+
+    def test_expanded_stream_matches_pages(self):
+        response = self.client.get('/facility/facilities/', {'stream': '1', 'expand': 'created_by'})
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(rows), self.ROWS)
+        self.assertEqual(rows[0]['created_by']['email'], self.user.email)
+
+
+class FacilityFastPathTests(FastPathEquivalenceMixin, TestCase):
+    ENDPOINTS = [
+        ('GET', '/facility/facilities/', {}, None),
+        ('GET', '/facility/name/facility/', {}, None),
+        ('GET', '/facility/district/Gasabo/', {}, None),
+        ('GET', '/facility/sector/Kimironko/', {}, None),
+        ('GET', '/facility/status/ACTIVE/', {}, None),
+    ]
+    FIELDS = ['id,name,latitude,longitude', 'id,created_at,updated_at,status,created_by']
+    EXPAND = ['created_by']
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 20)
+        populate_area(cls.user, 'Kicukiro', 'Niboye', 5)
+        SearchTerm.rebuild_all()
+
+
+class FilterIndexTests(TestCase):
+    """
+    Every filter endpoint's page query has an index on its filter column
+    followed by the created_at page order, whatever the backend.
+    """
+    INDEXES = [
+        (HealthFacility, 'facility_district_created_idx', ['district_ref_id', 'created_at']),
+        (HealthFacility, 'facility_sector_created_idx', ['sector_ref_id', 'created_at']),
+        (HealthFacility, 'facility_status_created_idx', ['status', 'created_at']),
+        (DiseaseIncident, 'incident_facility_created_idx', ['health_facility_id', 'created_at']),
+        (DiseaseIncident, 'incident_status_created_idx', ['status', 'created_at']),
+        (PopulationData, 'population_district_idx', ['district_ref_id', 'created_at']),
+        (PopulationData, 'population_sector_idx', ['sector_ref_id', 'created_at']),
+        (AccessibilityData, 'access_facility_created_idx', ['health_facility_id', 'created_at']),
+        (ResourceAllocation, 'allocation_facility_idx', ['health_facility_id', 'created_at']),
+    ]
+    # Functional indexes, whose columns not every backend reports
+    EXPRESSION_INDEXES = [
+        (HealthFacility, 'facility_name_ci_idx'),
+        (DiseaseIncident, 'incident_disease_ci_idx'),
+    ]
+
+    def constraints(self, model):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(cursor, model._meta.db_table)
+
+    def test_filters_have_their_indexes(self):
+        for model, name, columns in self.INDEXES:
+            with self.subTest(name):
+                index = self.constraints(model).get(name)
+                self.assertIsNotNone(index, f'{name} is missing')
+                self.assertTrue(index['index'])
+                self.assertEqual(index['columns'], columns)
+        for model, name in self.EXPRESSION_INDEXES:
+            with self.subTest(name):
+                self.assertIn(name, self.constraints(model))
+
+
+class SpatialIndexTests(SimpleTestCase):
+    """
+    Index queries give the same answers as measuring every facility.
+    """
+    TYPES = [value for value, _ in HealthFacility.FACILITY_TYPES]
+    STATUSES = [value for value, _ in HealthFacility.STATUS_CHOICES]
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.rows = {}
+        # Spread around Kigali, a dense cluster, a few far away and some at high latitude
+        latitudes = np.concatenate([
+            rng.uniform(-2.2, -1.7, 300), rng.normal(-1.95, 0.01, 100), [-1.0, -3.5, 0.4], rng.uniform(59.8, 60.2, 50),
+        ])
+        longitudes = np.concatenate([
+            rng.uniform(29.8, 30.4, 300), rng.normal(30.06, 0.01, 100), [29.0, 31.2, 30.0], rng.uniform(24.5, 25.5, 50),
+        ])
+        # Points on and just either side of cell edges
+        edge = CELL_DEGREES * -39
+        for offset, (latitude_shift, longitude_shift) in enumerate([(0, 0), (1e-9, 0), (-1e-9, 0), (0, 1e-9)]):
+            latitudes = np.append(latitudes, edge + latitude_shift)
+            longitudes = np.append(longitudes, CELL_DEGREES * 601 + longitude_shift + offset * 1e-6)
+        for facility_id, (latitude, longitude) in enumerate(zip(latitudes.tolist(), longitudes.tolist()), start=1):
+            self.rows[facility_id] = (
+                latitude, longitude, self.TYPES[facility_id % len(self.TYPES)],
+                self.STATUSES[facility_id % len(self.STATUSES)],
+            )
+        self.index = SpatialIndex()
+        self.index.apply((facility_id, *row) for facility_id, row in self.rows.items())
+
+        self.queries = [
+            (-1.95, 30.06), (-2.0, 30.1), (-1.7, 29.8), (-2.5, 30.5), (10.0, 10.0), (60.0, 25.0),
+            # Cell corners and edges
+            (CELL_DEGREES * -39, CELL_DEGREES * 601), (CELL_DEGREES * -39 + 1e-12, CELL_DEGREES * 601 - 1e-12),
+            (CELL_DEGREES * -40, 30.0), (-1.93, CELL_DEGREES * 602),
+        ]
+
+    def brute_force(self, latitude, longitude, types=None, statuses=None):
+        rows = [
+            (facility_id, row) for facility_id, row in self.rows.items()
+            if (types is None or row[2] in types) and (statuses is None or row[3] in statuses)
+        ]
+        if not rows:
+            return []
+        distances = haversine_km(
+            latitude, longitude, np.array([row[0] for _, row in rows]), np.array([row[1] for _, row in rows])
+        )
+        return sorted(zip([facility_id for facility_id, _ in rows], distances.tolist()), key=lambda item: item[1])
+
+    def assert_same(self, found, expected):
+        self.assertEqual([facility_id for facility_id, _ in found], [facility_id for facility_id, _ in expected])
+        for (_, distance), (_, expected_distance) in zip(found, expected):
+            self.assertAlmostEqual(distance, expected_distance, places=9)
+
+    def check_queries(self):
+        filters = [(None, None), (['CLINIC', 'HOSPITAL'], None), (None, ['ACTIVE']), (['PHARMACY'], ['CLOSED'])]
+        for latitude, longitude in self.queries:
+            for types, statuses in filters:
+                expected = self.brute_force(latitude, longitude, types, statuses)
+                for k in (1, 5, 40):
+                    with self.subTest(point=(latitude, longitude), types=types, statuses=statuses, k=k):
+                        self.assert_same(
+                            self.index.nearest(latitude, longitude, k, types, statuses), expected[:k]
+                        )
+                for radius in (0.5, 3, 20):
+                    with self.subTest(point=(latitude, longitude), types=types, statuses=statuses, radius=radius):
+                        self.assert_same(
+                            self.index.within(latitude, longitude, radius, 1000, types, statuses),
+                            [item for item in expected if item[1] <= radius],
+                        )
+
+    def test_queries_match_brute_force(self):
+        self.check_queries()
+        self.assertEqual(len(self.index.within(-1.95, 30.06, 20, 3)), 3)
+
+    def test_queries_after_moves_and_removals(self):
+        moved = {facility_id: self.rows[facility_id] for facility_id in range(1, 60, 3)}
+        for facility_id, (latitude, longitude, facility_type, facility_status) in moved.items():
+            self.rows[facility_id] = (latitude + 0.07, longitude - 0.11, facility_type, facility_status)
+        removed = list(range(2, 60, 5))
+        unlocated = [facility_id for facility_id in range(300, 320) if facility_id not in moved]
+        self.index.apply([(facility_id, *self.rows[facility_id]) for facility_id in moved] + [
+            (facility_id, None, None, 'CLINIC', 'ACTIVE') for facility_id in unlocated
+        ])
+        self.index.remove(removed)
+        for facility_id in removed + unlocated:
+            self.rows.pop(facility_id, None)
+
+        self.assertEqual(len(self.index), len(self.rows))
+        self.check_queries()
+
+    def test_empty_index(self):
+        index = SpatialIndex()
+        self.assertEqual(index.nearest(-1.95, 30.06, 3), [])
+        self.assertEqual(index.within(-1.95, 30.06, 10, 3), [])
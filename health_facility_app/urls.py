@@ -6,6 +6,7 @@ urlpatterns = [
     path('facilities/', views.get_all_facilities, name='get-all-facilities'),
     path('add/', views.add_facility, name='add-facility'),
     path('<int:pk>/', views.get_facility_by_id, name='get-facility-by-id'),
+    path('nearest/', views.get_nearest_facilities, name='get-nearest-facilities'),
     path('name/<str:name>/', views.get_facility_by_name, name='get-facility-by-name'),
     path('district/<str:district>/', views.get_facilities_by_district, name='get-facilities-by-district'),
     path('sector/<str:sector>/', views.get_facilities_by_sector, name='get-facilities-by-sector'),
@@ -5,13 +5,18 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from .models import HealthFacility
 from .serializers import HealthFacilitySerializer
+from geography_app.resolver import resolve_district, resolve_sector_ids
+from backend.streaming import is_streaming_requested, streaming_json_response
+from backend.pagination import paginated_response
+from search_app.index import facility_ids_containing
+from .spatial import get_spatial_index
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def add_facility(request):
-    serializer = HealthFacilitySerializer(data=request.data)
+    serializer = HealthFacilitySerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         serializer.save(created_by=request.user)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -23,50 +28,47 @@ def add_facility(request):
 @permission_classes([IsAuthenticated])
 def get_all_facilities(request):
     facilities = HealthFacility.objects.all()
-    serializer = HealthFacilitySerializer(facilities, many=True)
-    return Response(serializer.data)
+    if is_streaming_requested(request):
+        return streaming_json_response(request, facilities, HealthFacilitySerializer)
+    return paginated_response(request, facilities, HealthFacilitySerializer)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @permission_classes([IsAuthenticated])
 def get_facility_by_id(request, pk):
     facility = get_object_or_404(HealthFacility, pk=pk)
-    serializer = HealthFacilitySerializer(facility)
+    serializer = HealthFacilitySerializer(facility, context={'request': request})
     return Response(serializer.data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_facility_by_name(request, name):
-    facilities = HealthFacility.objects.filter(name__icontains=name)
-    serializer = HealthFacilitySerializer(facilities, many=True)
-    return Response(serializer.data)
+    facilities = HealthFacility.objects.filter(id__in=facility_ids_containing(name))
+    return paginated_response(request, facilities, HealthFacilitySerializer)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_facilities_by_district(request, district):
-    facilities = HealthFacility.objects.filter(district__iexact=district)
-    serializer = HealthFacilitySerializer(facilities, many=True)
-    return Response(serializer.data)
+    facilities = HealthFacility.objects.filter(district_ref_id=resolve_district(district))
+    return paginated_response(request, facilities, HealthFacilitySerializer)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_facilities_by_sector(request, sector):
-    facilities = HealthFacility.objects.filter(sector__iexact=sector)
-    serializer = HealthFacilitySerializer(facilities, many=True)
-    return Response(serializer.data)
+    facilities = HealthFacility.objects.filter(sector_ref_id__in=resolve_sector_ids(sector))
+    return paginated_response(request, facilities, HealthFacilitySerializer)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_facilities_by_status(request, status):
-    facilities = HealthFacility.objects.filter(status__iexact=status)
-    serializer = HealthFacilitySerializer(facilities, many=True)
-    return Response(serializer.data)
+    facilities = HealthFacility.objects.filter(status=status.upper())
+    return paginated_response(request, facilities, HealthFacilitySerializer)
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def update_facility(request, pk):
     facility = get_object_or_404(HealthFacility, pk=pk)
-    serializer = HealthFacilitySerializer(facility, data=request.data, partial=True)
+    serializer = HealthFacilitySerializer(facility, data=request.data, partial=True, context={'request': request})
     if serializer.is_valid():
         serializer.save()
         return Response(serializer.data)
@@ -77,4 +79,77 @@ def update_facility(request, pk):
 def delete_facility(request, pk):
     facility = get_object_or_404(HealthFacility, pk=pk)
     facility.delete()
-    return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+    return Response(status=status.HTTP_204_NO_CONTENT)
+MAX_NEAREST = 100
+
+
+def _choice_list(value, choices):
+    # Comma-separated choice values; None when absent, ValueError when invalid
+    if not value:
+        return None
+    values = [item.strip().upper() for item in value.split(',') if item.strip()]
+    if not values or any(item not in dict(choices) for item in values):
+        raise ValueError
+    return values
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_nearest_facilities(request):
+    """
+    Facilities nearest to ?lat=&lon=, with their distance in km.
+
+    Optional query parameters:
+    - k: number of facilities (default 10, at most 100)
+    - radius_km: only facilities within this distance, up to k of them
+    - type, status: comma-separated facility types / statuses
+    """
+    params = request.query_params
+    try:
+        latitude, longitude = float(params['lat']), float(params['lon'])
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError
+    except (KeyError, ValueError):
+        return Response(
+            {'error': 'lat and lon are required, in degrees'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        k = int(params.get('k', 10))
+        radius_km = float(params['radius_km']) if params.get('radius_km') else None
+        if not 1 <= k <= MAX_NEAREST or (radius_km is not None and not 0 < radius_km < float('inf')):
+            raise ValueError
+    except ValueError:
+        return Response(
+            {'error': f'k must be between 1 and {MAX_NEAREST} and radius_km a positive number'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        types = _choice_list(params.get('type'), HealthFacility.FACILITY_TYPES)
+        statuses = _choice_list(params.get('status'), HealthFacility.STATUS_CHOICES)
+    except ValueError:
+        return Response(
+            {'error': 'type and status must list valid facility types and statuses'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    index = get_spatial_index()
+    if radius_km is None:
+        matches = index.nearest(latitude, longitude, k, types, statuses)
+    else:
+        matches = index.within(latitude, longitude, radius_km, k, types, statuses)
+
+    facilities = HealthFacility.objects.in_bulk([facility_id for facility_id, _ in matches])
+    # Facilities deleted since the index was loaded are skipped
+    found = [(facilities[facility_id], distance) for facility_id, distance in matches if facility_id in facilities]
+    items = HealthFacilitySerializer(
+        [facility for facility, _ in found], many=True, context={'request': request}
+    ).data
+    return Response({
+        'latitude': latitude,
+        'longitude': longitude,
+        'radius_km': radius_km,
+        'results': [{**item, 'distance_km': round(distance, 3)} for item, (_, distance) in zip(items, found)],
+    })
@@ -0,0 +1,180 @@
+"""
+Streaming census import.
+
+Rows are read lazily from a CSV file and handled CHUNK_SIZE at a time. The
+gender and age consistency checks run over the whole chunk at once with
+NumPy, new districts/sectors are created in bulk, and the valid rows are
+upserted on (district, sector) with one INSERT ... ON CONFLICT / ON
+DUPLICATE KEY UPDATE per chunk (backend.bulk). Memory use depends on the
+chunk size, not on the size of the file.
+
+Optional latitude and longitude columns set the centroid of the row's
+sector, which the accessibility recompute uses as its population point.
+"""
+import csv
+from itertools import islice
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from backend.bulk import bulk_upsert
+from backend.signals import post_bulk_create
+from geography_app.models import Sector
+from geography_app.resolver import get_or_create_areas, normalize
+from .models import PopulationData
+
+CHUNK_SIZE = 1000
+
+INTEGER_COLUMNS = (
+    'total_population', 'male_population', 'female_population', 'children_under_5',
+    'youth_population', 'adult_population', 'elderly_population',
+)
+FLOAT_COLUMNS = ('population_density', 'unemployment_rate', 'literacy_rate')
+COLUMNS = ('district', 'sector', *INTEGER_COLUMNS, *FLOAT_COLUMNS, 'socioeconomic_status')
+
+SOCIOECONOMIC_STATUSES = dict(PopulationData.SOCIOECONOMIC_STATUS_CHOICES)
+CENTROID_COLUMNS = ('latitude', 'longitude')
+UPDATE_FIELDS = ['district_ref', 'sector_ref', *INTEGER_COLUMNS, *FLOAT_COLUMNS, 'socioeconomic_status']
+
+
+def parse_row(row):
+    """
+    Convert one CSV row to model field values. Returns (values, errors).
+    """
+    values, errors = {}, {}
+    for column in ('district', 'sector'):
+        value = (row.get(column) or '').strip()
+        if not value:
+            errors[column] = ['This field is required.']
+        elif len(value) > 100:
+            errors[column] = ['Ensure this field has no more than 100 characters.']
+        values[column] = value
+
+    for columns, convert, message in (
+        (INTEGER_COLUMNS, int, 'A valid integer is required.'),
+        (FLOAT_COLUMNS, float, 'A valid number is required.'),
+    ):
+        for column in columns:
+            try:
+                values[column] = convert(row.get(column) or '')
+            except ValueError:
+                errors[column] = [message]
+
+    status = (row.get('socioeconomic_status') or '').strip().upper()
+    if status not in SOCIOECONOMIC_STATUSES:
+        errors['socioeconomic_status'] = [f'"{status}" is not a valid choice.']
+    values['socioeconomic_status'] = status
+
+    centroid = [(row.get(column) or '').strip() for column in CENTROID_COLUMNS]
+    if any(centroid):
+        for column, value, limit in zip(CENTROID_COLUMNS, centroid, (90, 180)):
+            try:
+                values[column] = float(value)
+            except ValueError:
+                errors[column] = ['A valid number is required.']
+                continue
+            if not -limit <= values[column] <= limit:
+                errors[column] = [f'Ensure this value is between -{limit} and {limit}.']
+    return values, errors
+
+
+def consistency_errors(parsed):
+    """
+    Check every parsed row of a chunk at once. Returns {position: errors}
+    for the rows whose counts are negative or don't add up.
+    """
+    counts = np.array(
+        [[values[column] for column in INTEGER_COLUMNS] for values in parsed], dtype=np.int64
+    ).reshape(-1, len(INTEGER_COLUMNS))
+    total, male, female, under_5, youth, adult, elderly = counts.T
+
+    checks = (
+        ((counts < 0).any(axis=1), 'Population counts cannot be negative'),
+        (total != male + female, 'Total population must match sum of male and female population'),
+        (total != under_5 + youth + adult + elderly, 'Total population must match sum of age groups'),
+    )
+    errors = {}
+    for failed, message in checks:
+        for position in np.flatnonzero(failed):
+            errors.setdefault(int(position), {'total_population': []})['total_population'].append(message)
+    return errors
+
+
+def import_chunk(chunk, user, result, on_reject=None):
+    """
+    Validate and upsert one chunk of (line number, CSV row) pairs, adding
+    the outcome to the result counters.
+    """
+    parsed, lines, rejected = [], [], []
+    for line, row in chunk:
+        values, errors = parse_row(row)
+        if errors:
+            rejected.append((line, errors))
+        else:
+            parsed.append(values)
+            lines.append(line)
+
+    inconsistent = consistency_errors(parsed)
+    # A later row for the same area replaces an earlier one, as it would
+    # across chunks
+    latest = {}
+    for position, values in enumerate(parsed):
+        if position in inconsistent:
+            rejected.append((lines[position], inconsistent[position]))
+        else:
+            latest[(normalize(values['district']), normalize(values['sector']))] = values
+
+    result['rejected'] += len(rejected)
+    if on_reject:
+        for line, errors in sorted(rejected, key=lambda rejection: rejection[0]):
+            on_reject(line, errors)
+    if not latest:
+        return
+
+    with transaction.atomic():
+        areas = get_or_create_areas((values['district'], values['sector']) for values in latest.values())
+        rows, centroids = [], []
+        for key, values in latest.items():
+            area = areas[key]
+            if 'latitude' in values:
+                centroids.append(Sector(
+                    id=area.sector_id, latitude=values.pop('latitude'), longitude=values.pop('longitude')
+                ))
+            values.update(
+                district=area.district, sector=area.sector,
+                district_ref_id=area.district_id, sector_ref_id=area.sector_id,
+            )
+            rows.append(PopulationData(created_by=user, **values))
+
+        existing = PopulationData.objects.filter(
+            sector_ref_id__in=[row.sector_ref_id for row in rows]
+        ).count()
+        bulk_upsert(PopulationData, rows, ['district', 'sector'], UPDATE_FIELDS, batch_size=len(rows))
+        post_bulk_create.send(sender=PopulationData, objs=rows)
+        Sector.objects.bulk_update(centroids, list(CENTROID_COLUMNS))
+
+    result['updated'] += existing
+    result['created'] += len(rows) - existing
+
+
+def import_census(lines, user, on_reject=None, chunk_size=CHUNK_SIZE):
+    """
+    Import census rows from an iterable of CSV lines with a header row.
+    `on_reject(line number, errors)` is called for every rejected row.
+    Returns {'created': n, 'updated': n, 'rejected': n}.
+
+    Each chunk is committed on its own, so rows before a failing chunk stay
+    imported.
+    """
+    reader = csv.DictReader(lines)
+    missing = [column for column in COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ValidationError(f'Missing columns: {", ".join(missing)}')
+
+    result = {'created': 0, 'updated': 0, 'rejected': 0}
+    rows = ((reader.line_num, row) for row in reader)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        import_chunk(chunk, user, result, on_reject)
+    return result
@@ -0,0 +1,46 @@
+import csv
+import json
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from userApp.models import CustomUser
+from population_data_app.census import CHUNK_SIZE, import_census
+
+
+class Command(BaseCommand):
+    help = 'Import census population data from a CSV file, updating areas that already have data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row of PopulationData field names')
+        parser.add_argument('--user', required=True, help='Email of the user the imported rows are created by')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--rejects', help='Write rejected rows and their errors to this CSV file')
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(email=options['user'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'No user with email {options["user"]}')
+
+        rejects_file = open(options['rejects'], 'w', newline='') if options['rejects'] else None
+        try:
+            if rejects_file:
+                writer = csv.writer(rejects_file)
+                writer.writerow(['line', 'errors'])
+
+                def on_reject(line, errors):
+                    writer.writerow([line, json.dumps(errors)])
+            else:
+                def on_reject(line, errors):
+                    self.stderr.write(f'Line {line}: {json.dumps(errors)}')
+
+            with open(options['path'], newline='', encoding='utf-8-sig') as census:
+                result = import_census(census, user, on_reject, options['chunk_size'])
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        finally:
+            if rejects_file:
+                rejects_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result["created"]}, updated {result["updated"]}, rejected {result["rejected"]} rows.'
+        ))
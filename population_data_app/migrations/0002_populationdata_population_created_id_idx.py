@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('population_data_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='populationdata',
+            index=models.Index(fields=['created_at', 'id'], name='population_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:40
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('population_data_app', '0002_populationdata_population_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='populationdata',
+            index=models.Index(django.db.models.functions.text.Lower('district'), django.db.models.functions.text.Lower('sector'), name='population_area_ci_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='populationdata',
+            index=models.Index(django.db.models.functions.text.Lower('sector'), name='population_sector_ci_idx'),
+        ),
+    ]
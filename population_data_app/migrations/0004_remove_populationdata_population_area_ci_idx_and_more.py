@@ -0,0 +1,41 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography_app', '0001_initial'),
+        ('population_data_app', '0003_populationdata_population_area_ci_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='populationdata',
+            name='population_area_ci_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='populationdata',
+            name='population_sector_ci_idx',
+        ),
+        migrations.AddField(
+            model_name='populationdata',
+            name='district_ref',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='populations', to='geography_app.district'),
+        ),
+        migrations.AddField(
+            model_name='populationdata',
+            name='sector_ref',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='populations', to='geography_app.sector'),
+        ),
+        migrations.AddIndex(
+            model_name='populationdata',
+            index=models.Index(fields=['district_ref', 'created_at'], name='population_district_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='populationdata',
+            index=models.Index(fields=['sector_ref', 'created_at'], name='population_sector_idx'),
+        ),
+    ]
@@ -2,6 +2,7 @@
 from django.db import models
 from django.conf import settings
 from django.forms import ValidationError
+from geography_app.resolver import assign_area
 
 class PopulationData(models.Model):
     SOCIOECONOMIC_STATUS_CHOICES = [
@@ -12,6 +13,15 @@ class PopulationData(models.Model):
     
     district = models.CharField(max_length=100)
     sector = models.CharField(max_length=100)
+    # Integer keys for area filters and grouping, set from district/sector on save
+    district_ref = models.ForeignKey(
+        'geography_app.District', on_delete=models.PROTECT, related_name='populations',
+        editable=False, db_index=False,
+    )
+    sector_ref = models.ForeignKey(
+        'geography_app.Sector', on_delete=models.PROTECT, related_name='populations',
+        editable=False, db_index=False,
+    )
     total_population = models.IntegerField()
     male_population = models.IntegerField()
     female_population = models.IntegerField()
@@ -28,6 +38,12 @@ class PopulationData(models.Model):
     
     class Meta:
         unique_together = ['district', 'sector']
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['created_at', 'id'], name='population_created_id_idx'),
+            models.Index(fields=['district_ref', 'created_at'], name='population_district_idx'),
+            models.Index(fields=['sector_ref', 'created_at'], name='population_sector_idx'),
+        ]
         
     def clean(self):
         # Validate total population matches demographic breakdowns
@@ -42,6 +58,7 @@ class PopulationData(models.Model):
             
     def save(self, *args, **kwargs):
         self.clean()
+        assign_area(self)
         super().save(*args, **kwargs)
     
     def __str__(self):
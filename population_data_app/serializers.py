@@ -3,13 +3,15 @@ from rest_framework import serializers
 from .models import PopulationData
 from userApp.models import CustomUser
 from health_facility_app.serializers import CustomUserSerializer
+from backend.serializers import DynamicFieldsMixin
 
-class PopulationDataSerializer(serializers.ModelSerializer):
-    created_by = CustomUserSerializer(read_only=True)
+class PopulationDataSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    expandable_fields = {'created_by': CustomUserSerializer}
     
     class Meta:
         model = PopulationData
-        fields = '__all__'
+        exclude = ('district_ref', 'sector_ref')
         read_only_fields = ('id', 'created_at', 'created_by')
         
     def validate(self, data):
@@ -1,3 +1,77 @@
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from backend.testing import FastPathEquivalenceMixin, make_user, populate_area
+from .census import COLUMNS, import_census
+from .models import PopulationData
 
-# Create your tests here.
+
+class PopulationFastPathTests(FastPathEquivalenceMixin, TestCase):
+    ENDPOINTS = [
+        ('GET', '/population/populations/', {}, None),
+        ('GET', '/population/user/', {}, None),
+        ('GET', '/population/district/Gasabo/', {}, None),
+        ('GET', '/population/sector/Kimironko/', {}, None),
+        ('GET', '/population/status/MIDDLE/', {}, None),
+    ]
+    FIELDS = ['id,district,sector,total_population', 'id,created_at,population_density,literacy_rate,created_by']
+    EXPAND = ['created_by']
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 2)
+        populate_area(cls.user, 'Gasabo', 'Remera', 2)
+        populate_area(cls.user, 'Kicukiro', 'Niboye', 2)
+
+
+class CensusImportTests(TestCase):
+    HEADER = ','.join(COLUMNS)
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+
+    def csv_row(self, district, sector, total):
+        half, quarter = total // 2, total // 4
+        return f'{district},{sector},{total},{half},{total - half},{quarter},{quarter},{quarter},{total - 3 * quarter},100.0,10.0,80.0,middle'
+
+    def import_rows(self, *rows):
+        rejected = []
+        result = import_census([self.HEADER, *rows], self.user, lambda line, errors: rejected.append(line))
+        return result, rejected
+
+    def test_import_creates_and_updates_areas(self):
+        result, _ = self.import_rows(self.csv_row('Gasabo', 'Kimironko', 1000), self.csv_row('Gasabo', 'Remera', 2000))
+        self.assertEqual(result, {'created': 2, 'updated': 0, 'rejected': 0})
+
+        result, rejected = self.import_rows(
+            self.csv_row('gasabo', 'kimironko', 1200), self.csv_row('Kicukiro', 'Niboye', 800), 'Gasabo,Remera,x',
+        )
+        self.assertEqual(result, {'created': 1, 'updated': 1, 'rejected': 1})
+        self.assertEqual(rejected, [4])
+        self.assertEqual(
+            dict(PopulationData.objects.values_list('sector', 'total_population')),
+            {'Kimironko': 1200, 'Remera': 2000, 'Niboye': 800},
+        )
+
+    def test_import_without_a_conflict_target(self):
+        # As on MySQL, whose ON DUPLICATE KEY UPDATE takes no unique fields
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            result, _ = self.import_rows(self.csv_row('Gasabo', 'Kimironko', 1000))
+        self.assertEqual(result['created'], 1)
+        row_id = PopulationData.objects.get().id
+
+        # Without any upsert the existing row is updated by primary key
+        with mock.patch.multiple(
+            connection.features, supports_update_conflicts=False, supports_update_conflicts_with_target=False
+        ):
+            result, _ = self.import_rows(self.csv_row('Gasabo', 'Kimironko', 1600), self.csv_row('Gasabo', 'Remera', 400))
+        self.assertEqual(result, {'created': 1, 'updated': 1, 'rejected': 0})
+        self.assertEqual(PopulationData.objects.get(sector='Kimironko').id, row_id)
+        self.assertEqual(
+            dict(PopulationData.objects.values_list('sector', 'total_population')),
+            {'Kimironko': 1600, 'Remera': 400},
+        )
@@ -5,6 +5,7 @@ from . import views
 urlpatterns = [
     path('populations/', views.get_all_populations, name='get-all-populations'),
     path('add/', views.add_population, name='add-population'),
+    path('import/', views.import_populations, name='import-populations'),
     path('<int:pk>/', views.get_population_by_id, name='get-population-by-id'),
     path('user/', views.get_populations_by_user, name='get-populations-by-user'),
     path('district/<str:district>/', views.get_populations_by_district, name='get-populations-by-district'),
@@ -1,3 +1,4 @@
+import codecs
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -6,18 +7,20 @@ from django.shortcuts import get_object_or_404
 from django.core.exceptions import ValidationError
 from .models import PopulationData
 from .serializers import PopulationDataSerializer
+from geography_app.resolver import resolve_district, resolve_sector, resolve_sector_ids
+from backend.streaming import is_streaming_requested, streaming_json_response
+from backend.pagination import paginated_response
+from .census import import_census
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def add_population(request):
     try:
-        serializer = PopulationDataSerializer(data=request.data)
+        serializer = PopulationDataSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             # Check if population data already exists for this district/sector
-            if PopulationData.objects.filter(
-                district=request.data['district'],
-                sector=request.data['sector']
-            ).exists():
+            sector_id = resolve_sector(request.data['district'], request.data['sector'])
+            if sector_id is not None and PopulationData.objects.filter(sector_ref_id=sector_id).exists():
                 error_message = 'Population data for this district and sector already exists.'
                 print(f"Validation Error: {error_message}")
                 return Response(
@@ -48,12 +51,52 @@ def add_population(request):
 
 
 
+# Rejected rows listed in the import response; the rest are only counted
+MAX_REPORTED_REJECTIONS = 100
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_populations(request):
+    """
+    Import a census CSV uploaded as the multipart field `file`. Areas that
+    already have population data are updated.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response(
+            {'error': 'Upload the census CSV as the "file" field'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    rejections = []
+
+    def on_reject(line, errors):
+        if len(rejections) < MAX_REPORTED_REJECTIONS:
+            rejections.append({'line': line, 'errors': errors})
+
+    try:
+        result = import_census(codecs.iterdecode(upload, 'utf-8-sig'), request.user, on_reject)
+        return Response({**result, 'rejections': rejections})
+    except ValidationError as e:
+        return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+    except UnicodeDecodeError:
+        return Response({'error': 'The census file must be UTF-8 encoded'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to import population data: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_population_by_id(request, pk):
     try:
         population = get_object_or_404(PopulationData, pk=pk)
-        serializer = PopulationDataSerializer(population)
+        serializer = PopulationDataSerializer(population, context={'request': request})
         return Response(serializer.data)
     except PopulationData.DoesNotExist:
         return Response(
@@ -70,14 +113,13 @@ def get_population_by_id(request, pk):
 @permission_classes([IsAuthenticated])
 def get_all_populations(request):
     try:
-        populations = PopulationData.objects.all().select_related('created_by')
-        if not populations.exists():
-            return Response(
-                {'message': 'No population data found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        serializer = PopulationDataSerializer(populations, many=True)
-        return Response(serializer.data)
+        populations = PopulationData.objects.all()
+        if is_streaming_requested(request):
+            return streaming_json_response(request, populations, PopulationDataSerializer)
+        return paginated_response(
+            request, populations, PopulationDataSerializer,
+            empty_message='No population data found'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve population data: {str(e)}'},
@@ -90,16 +132,12 @@ def get_populations_by_user(request):
     try:
         populations = PopulationData.objects.filter(
             created_by=request.user
-        ).select_related('created_by')
+        )
         
-        if not populations.exists():
-            return Response(
-                {'message': 'No population data found for this user'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = PopulationDataSerializer(populations, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, populations, PopulationDataSerializer,
+            empty_message='No population data found for this user'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve user population data: {str(e)}'},
@@ -119,7 +157,7 @@ def update_population(request, pk):
         print(f"Current values: {PopulationDataSerializer(population).data}")
         print(f"Requested updates: {request.data}")
         
-        serializer = PopulationDataSerializer(population, data=request.data, partial=True)
+        serializer = PopulationDataSerializer(population, data=request.data, partial=True, context={'request': request})
         
         if serializer.is_valid():
             serializer.save()
@@ -183,17 +221,13 @@ def delete_population(request, pk):
 def get_populations_by_district(request, district):
     try:
         populations = PopulationData.objects.filter(
-            district__iexact=district
-        ).select_related('created_by')
+            district_ref_id=resolve_district(district)
+        )
         
-        if not populations.exists():
-            return Response(
-                {'message': f'No population data found for district "{district}"'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = PopulationDataSerializer(populations, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, populations, PopulationDataSerializer,
+            empty_message=f'No population data found for district "{district}"'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve district population data: {str(e)}'},
@@ -205,17 +239,13 @@ def get_populations_by_district(request, district):
 def get_populations_by_sector(request, sector):
     try:
         populations = PopulationData.objects.filter(
-            sector__iexact=sector
-        ).select_related('created_by')
+            sector_ref_id__in=resolve_sector_ids(sector)
+        )
         
-        if not populations.exists():
-            return Response(
-                {'message': f'No population data found for sector "{sector}"'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = PopulationDataSerializer(populations, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, populations, PopulationDataSerializer,
+            empty_message=f'No population data found for sector "{sector}"'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve sector population data: {str(e)}'},
@@ -233,17 +263,13 @@ def get_populations_by_socioeconomic_status(request, status_value):
             )
             
         populations = PopulationData.objects.filter(
-            socioeconomic_status__iexact=status_value
-        ).select_related('created_by')
+            socioeconomic_status=status_value
+        )
         
-        if not populations.exists():
-            return Response(
-                {'message': f'No population data found for socioeconomic status "{status_value}"'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-            
-        serializer = PopulationDataSerializer(populations, many=True)
-        return Response(serializer.data)
+        return paginated_response(
+            request, populations, PopulationDataSerializer,
+            empty_message=f'No population data found for socioeconomic status "{status_value}"'
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to retrieve socioeconomic status population data: {str(e)}'},
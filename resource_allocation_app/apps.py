@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ResourceAllocationAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'resource_allocation_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,154 @@
+"""
+Sector coverage gaps.
+
+Every sector with population data is scored on three measures of how
+underserved it is:
+
+- population_per_capacity: residents per unit of capacity of its ACTIVE
+  facilities (no capacity at all counts as the worst value);
+- poor_share: share of its accessibility records rated POOR;
+- served_per_capacity: people_served across those records per unit of
+  capacity.
+
+Each measure comes from one grouped query over its table. The measures are
+turned into percentile ranks across sectors with NumPy, and gap_score is the
+mean of the ranks a sector has, so 1 is the worst-served sector on every
+measure. The ranked list is cached under a version that the signal handlers
+bump whenever facilities, population data or accessibility records change.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from backend.cache import make_key, get_version, bump_version, record
+from geography_app.resolver import get_name_tables
+from health_facility_app.models import HealthFacility
+from population_data_app.models import PopulationData
+from accessiblity_app.models import AccessibilityData
+
+CACHE_GROUP = 'coverage-gaps'
+COVERAGE_NAMESPACE = 'coverage'
+MEASURES = ('population_per_capacity', 'poor_share', 'served_per_capacity')
+
+
+def invalidate_coverage():
+    transaction.on_commit(lambda: bump_version(COVERAGE_NAMESPACE))
+
+
+def load_inputs():
+    """
+    Per-sector population, active facility capacity and accessibility totals,
+    from one grouped query per table.
+    """
+    populations = dict(PopulationData.objects.values_list('sector_ref').annotate(
+        total=Sum('total_population')
+    ).order_by())
+    facilities = {
+        sector_id: (count, capacity or 0)
+        for sector_id, count, capacity in HealthFacility.objects.filter(status='ACTIVE').values_list(
+            'sector_ref'
+        ).annotate(count=Count('id'), capacity=Sum('capacity')).order_by()
+    }
+    accessibility = {
+        sector_id: (count, poor, people or 0)
+        for sector_id, count, poor, people in AccessibilityData.objects.values_list(
+            'health_facility__sector_ref'
+        ).annotate(
+            count=Count('id'),
+            poor=Count('id', filter=Q(accessibility_rating='POOR')),
+            people=Sum('people_served'),
+        ).order_by()
+    }
+    return populations, facilities, accessibility
+
+
+def percentile_ranks(values):
+    """
+    Rank of every value among the finite-or-infinite (not NaN) values, from
+    0 (lowest) to 1 (highest), with ties sharing their average rank. NaN
+    stays NaN.
+    """
+    ranks = np.full(len(values), np.nan)
+    known = ~np.isnan(values)
+    count = known.sum()
+    if not count:
+        return ranks
+    ordered = np.sort(values[known])
+    below = np.searchsorted(ordered, values[known], side='left')
+    up_to = np.searchsorted(ordered, values[known], side='right')
+    ranks[known] = (below + up_to - 1) / 2 / max(count - 1, 1)
+    return ranks
+
+
+def _rounded(values, digits):
+    # NaN and infinity become None
+    finite = np.isfinite(values)
+    return [value if ok else None for value, ok in zip(np.where(finite, values, 0).round(digits).tolist(), finite.tolist())]
+
+
+def compute_gaps(populations, facilities, accessibility):
+    """
+    Ranked gap list for every sector in `populations`, worst served first.
+    """
+    sector_ids = list(populations)
+    population = np.array([populations[sector_id] or 0 for sector_id in sector_ids], dtype=np.float64)
+    facility_rows = np.array(
+        [facilities.get(sector_id, (0, 0)) for sector_id in sector_ids], dtype=np.float64
+    ).reshape(-1, 2)
+    access_rows = np.array(
+        [accessibility.get(sector_id, (0, 0, 0)) for sector_id in sector_ids], dtype=np.float64
+    ).reshape(-1, 3)
+    facility_count, capacity = facility_rows.T
+    records, poor, people_served = access_rows.T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Residents and no capacity give infinity, which ranks as the worst
+        population_per_capacity = np.where(capacity > 0, population / capacity, np.where(population > 0, np.inf, 0.0))
+        poor_share = np.where(records > 0, poor / records, np.nan)
+        served_per_capacity = np.where(capacity > 0, people_served / capacity, np.nan)
+
+    ranks = np.vstack([percentile_ranks(values) for values in (population_per_capacity, poor_share, served_per_capacity)])
+    ranked = ~np.isnan(ranks)
+    gap_score = np.where(ranked.any(axis=0), np.nansum(ranks, axis=0) / np.maximum(ranked.sum(axis=0), 1), np.nan)
+    # Worst first; sectors with more residents first among equal scores
+    order = np.lexsort((-population, -np.nan_to_num(gap_score, nan=-1.0)))
+
+    columns = {
+        'population': population.astype(np.int64).tolist(),
+        'facility_count': facility_count.astype(np.int64).tolist(),
+        'capacity': capacity.astype(np.int64).tolist(),
+        'population_per_capacity': _rounded(population_per_capacity, 2),
+        'accessibility_records': records.astype(np.int64).tolist(),
+        'poor_share': _rounded(poor_share, 4),
+        'people_served': people_served.astype(np.int64).tolist(),
+        'served_per_capacity': _rounded(served_per_capacity, 2),
+        'gap_score': _rounded(gap_score, 4),
+    }
+    areas = get_name_tables().areas
+    results = []
+    for rank, i in enumerate(order.tolist(), start=1):
+        area = areas.get(sector_ids[i])
+        row = {
+            'rank': rank,
+            'district': area.district if area else None,
+            'sector': area.sector if area else None,
+        }
+        row.update((name, values[i]) for name, values in columns.items())
+        results.append(row)
+    return {'results': results, 'sector_ids': [sector_ids[i] for i in order.tolist()]}
+
+
+def cached_coverage_gaps():
+    """
+    compute_gaps() for the whole country, cached until its inputs change.
+    """
+    key = make_key(CACHE_GROUP, get_version(COVERAGE_NAMESPACE))
+    gaps = cache.get(key)
+    if gaps is not None:
+        record(CACHE_GROUP, 'hit')
+        return gaps
+
+    record(CACHE_GROUP, 'miss')
+    gaps = compute_gaps(*load_inputs())
+    cache.set(key, gaps)
+    return gaps
@@ -0,0 +1,178 @@
+"""
+Payload builder for the district/sector dashboard.
+
+Every queryset here is evaluated exactly once, with the nested facility and
+user rows joined in, so the number of queries does not grow with the number
+of facilities, incidents or allocations in an area. Rows are grouped on
+their integer sector keys. Built payloads are cached per sector under a
+version counter that the signal handlers bump whenever a row in that sector
+changes.
+"""
+from django.db.models import Prefetch
+from backend.cache import make_key, bump_version, bump_versions, get_many_versioned, get_stats
+from geography_app.resolver import resolve_district, resolve_sector, district_sector_ids, area_of
+from health_facility_app.models import HealthFacility
+from health_facility_app.serializers import HealthFacilitySerializer
+from disease_incident_app.models import DiseaseIncident
+from disease_incident_app.serializers import DiseaseIncidentSerializer
+from population_data_app.models import PopulationData
+from population_data_app.serializers import PopulationDataSerializer
+from accessiblity_app.models import AccessibilityData
+from accessiblity_app.serializers import AccessibilityDataSerializer
+from .models import ResourceAllocation, AllocationEquipment, AreaSummary
+from .serializers import ResourceAllocationSerializer
+
+# The dashboard always returns fully nested facility and user objects
+USER_EXPAND = {'created_by'}
+FACILITY_ROW_EXPAND = {'health_facility', 'health_facility.created_by', 'created_by'}
+
+
+def build_area_payloads(sector_ids):
+    """
+    Build dashboard payloads for many sectors with one query per model.
+
+    Returns a dict keyed by sector id.
+    """
+    summaries = {row.sector_ref_id: row for row in AreaSummary.objects.filter(sector_ref_id__in=sector_ids)}
+    missing = set(sector_ids) - set(summaries)
+    if missing:
+        summaries.update(AreaSummary.rebuild_many(missing))
+    populations = {
+        row.sector_ref_id: row
+        for row in PopulationData.objects.select_related('created_by').filter(sector_ref_id__in=sector_ids)
+    }
+
+    def by_sector(rows, sector_of):
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(sector_of(row), []).append(row)
+        return grouped
+
+    def facility_sector_of(row):
+        return row.health_facility.sector_ref_id
+
+    health_facilities = by_sector(
+        HealthFacility.objects.select_related('created_by').filter(sector_ref_id__in=sector_ids),
+        lambda row: row.sector_ref_id,
+    )
+    accessibility_data = by_sector(
+        AccessibilityData.objects.select_related('health_facility__created_by', 'created_by').filter(
+            health_facility__sector_ref_id__in=sector_ids
+        ),
+        facility_sector_of,
+    )
+    disease_incidents = by_sector(
+        DiseaseIncident.objects.select_related('health_facility__created_by', 'created_by').filter(
+            health_facility__sector_ref_id__in=sector_ids
+        ),
+        facility_sector_of,
+    )
+    resource_allocations = by_sector(
+        ResourceAllocation.objects.select_related('health_facility__created_by', 'created_by').prefetch_related(
+            Prefetch('equipment_items', queryset=AllocationEquipment.objects.select_related('item'))
+        ).filter(health_facility__sector_ref_id__in=sector_ids),
+        facility_sector_of,
+    )
+
+    payloads = {}
+    for sector_id in sector_ids:
+        area = area_of(sector_id)
+        summary = summaries.get(sector_id) or AreaSummary.empty(area)
+        payloads[sector_id] = serialize_area(
+            area.district, area.sector, summary, populations.get(sector_id),
+            health_facilities.get(sector_id, []), accessibility_data.get(sector_id, []),
+            disease_incidents.get(sector_id, []), resource_allocations.get(sector_id, []),
+        )
+    return payloads
+
+
+def empty_area_payload(district, sector):
+    # Payload for names that don't match any known sector
+    return serialize_area(district, sector, AreaSummary(district=district, sector=sector), None, [], [], [], [])
+
+
+CACHE_GROUP = 'district-sector-data'
+
+
+def area_namespace(sector_id):
+    return make_key('area', sector_id)
+
+
+def invalidate_area(sector_id):
+    bump_version(area_namespace(sector_id))
+
+
+def invalidate_areas(sector_ids):
+    bump_versions([area_namespace(sector_id) for sector_id in sector_ids])
+
+
+def get_cache_stats():
+    return get_stats(CACHE_GROUP)
+
+
+def get_area_payloads(areas=None, district=None):
+    """
+    Dashboard payloads for a list of (district, sector) name pairs, or for
+    every sector of one district, keyed by (district, sector). Only the
+    sectors missing from the cache are rebuilt, together in one batch.
+    """
+    if district is not None:
+        requested = {}
+        for sector_id in district_sector_ids(resolve_district(district)):
+            area = area_of(sector_id)
+            requested[(area.district, area.sector)] = sector_id
+    else:
+        requested = {(area_district, area_sector): resolve_sector(area_district, area_sector)
+                     for area_district, area_sector in areas}
+
+    sector_ids = {sector_id for sector_id in requested.values() if sector_id is not None}
+    namespaces = {area_namespace(sector_id): sector_id for sector_id in sector_ids}
+
+    def build(missing):
+        payloads = build_area_payloads([namespaces[namespace] for namespace in missing])
+        return {area_namespace(sector_id): payload for sector_id, payload in payloads.items()}
+
+    cached = get_many_versioned(CACHE_GROUP, list(namespaces), build) if namespaces else {}
+    return {
+        area: cached[area_namespace(sector_id)] if sector_id is not None else empty_area_payload(*area)
+        for area, sector_id in requested.items()
+    }
+
+
+def get_area_payload(district, sector):
+    return get_area_payloads([(district, sector)])[(district, sector)]
+
+
+def serialize_area(district, sector, summary, population_data,
+                   health_facilities, accessibility_data, disease_incidents, resource_allocations):
+    # Group the health facilities by their type
+    grouped_health_facilities = {}
+    for facility in health_facilities:
+        grouped_health_facilities.setdefault(facility.facility_type, []).append(facility)
+
+    return {
+        'district': district,
+        'sector': sector,
+        'population_data': PopulationDataSerializer(population_data, expand=USER_EXPAND).data if population_data else None,
+        'health_facilities': {
+            'total_count': summary.facility_count,
+            'total_capacity': summary.total_capacity,
+            'grouped_by_type': {
+                facility_type: HealthFacilitySerializer(facilities, many=True, expand=USER_EXPAND).data
+                for facility_type, facilities in grouped_health_facilities.items()
+            }
+        },
+        'accessibility_metrics': {
+            'average_travel_time': round(summary.avg_travel_time, 2),
+            'detailed_data': AccessibilityDataSerializer(accessibility_data, many=True, expand=FACILITY_ROW_EXPAND).data
+        },
+        'disease_incidents': {
+            'total_count': summary.incident_count,
+            'by_status': summary.incidents_by_status,
+            'incidents': DiseaseIncidentSerializer(disease_incidents, many=True, expand=FACILITY_ROW_EXPAND).data
+        },
+        'resource_allocations': {
+            'total_count': summary.allocation_count,
+            'allocations': ResourceAllocationSerializer(resource_allocations, many=True, expand=FACILITY_ROW_EXPAND).data
+        }
+    }
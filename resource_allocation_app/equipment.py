@@ -0,0 +1,211 @@
+"""
+Structured equipment on resource allocations.
+
+Allocations keep their free-text `equipment` description. The quantities
+themselves live in AllocationEquipment rows that point at the EquipmentItem
+catalog. Text such as "2 ventilators, oxygen concentrator x3" is parsed into
+(item, quantity) lines. Item names are matched case-insensitively, and the
+plurals listed in SINGULARS are made singular, so "Ventilators" and
+"ventilator" are the same item. Missing catalog items are bulk-created the way
+get_or_create_areas() creates sectors.
+
+Totals are one GROUP BY over the line items joined to their allocation and
+facility. District and sector names come from the cached name tables.
+"""
+import re
+from django.db.models import Count, Sum
+from geography_app.resolver import get_name_tables, normalize
+from .models import AllocationEquipment, EquipmentItem
+from .intervals import scope_allocations
+
+MAX_NAME_LENGTH = 100
+
+_SEPARATORS = re.compile(r'[,;\n]+|\s+and\s+|\s*&\s*')
+# "2 ventilators", "2x ventilators", "2 x ventilators"
+_QUANTITY_FIRST = re.compile(r'^(\d+)\s*(?:[x×*](?=\s))?\s*(.+)$')
+# "ventilators x2", "ventilators: 2", "ventilators (2)"
+_QUANTITY_LAST = re.compile(r'^(.+?)\s*(?:[x×*:]\s*|\(\s*)(\d+)\s*\)?$')
+
+# group_by name -> line item column
+GROUP_COLUMNS = {
+    'item': 'item__name',
+    'facility': 'allocation__health_facility_id',
+    'district': 'allocation__health_facility__district_ref_id',
+    'sector': 'allocation__health_facility__sector_ref_id',
+}
+
+
+# Plurals merged with their singular. Anything else is stored as typed, since
+# suffix rules get words like "buses" and "glasses" wrong.
+SINGULARS = {
+    plural: singular for singular, plural in [
+        ('ambulance', 'ambulances'), ('bag', 'bags'), ('battery', 'batteries'), ('bed', 'beds'),
+        ('bottle', 'bottles'), ('box', 'boxes'), ('bus', 'buses'), ('concentrator', 'concentrators'),
+        ('cylinder', 'cylinders'), ('defibrillator', 'defibrillators'), ('dose', 'doses'),
+        ('generator', 'generators'), ('glove', 'gloves'), ('incubator', 'incubators'), ('kit', 'kits'),
+        ('mask', 'masks'), ('monitor', 'monitors'), ('oximeter', 'oximeters'), ('pack', 'packs'),
+        ('pump', 'pumps'), ('stretcher', 'stretchers'), ('syringe', 'syringes'), ('tent', 'tents'),
+        ('test', 'tests'), ('thermometer', 'thermometers'), ('ventilator', 'ventilators'), ('vial', 'vials'),
+        ('wheelchair', 'wheelchairs'),
+    ]
+}
+
+
+def _singular(word):
+    singular = SINGULARS.get(word.lower())
+    if singular is None:
+        return word
+    if word.isupper():
+        return singular.upper()
+    return singular.capitalize() if word[0].isupper() else singular
+
+
+def item_name(name):
+    """
+    Catalog spelling of an item: single spaces and its head noun, the last
+    word or the one before "of", made singular when SINGULARS lists it.
+    """
+    words = name.split()
+    if not words:
+        return ''
+    lower = [word.lower() for word in words]
+    head = lower.index('of', 1) - 1 if 'of' in lower[1:] else len(words) - 1
+    words[head] = _singular(words[head])
+    return ' '.join(words)[:MAX_NAME_LENGTH]
+
+
+def parse_equipment(text):
+    """
+    (item name, quantity) lines from free text, quantities of the same item
+    added up. Fragments without a number count once; ones without a name
+    are skipped.
+    """
+    lines = {}
+    for fragment in _SEPARATORS.split(text or ''):
+        fragment = fragment.strip()
+        if not fragment:
+            continue
+        match = _QUANTITY_FIRST.match(fragment)
+        if match:
+            quantity, name = int(match.group(1)), match.group(2)
+        else:
+            match = _QUANTITY_LAST.match(fragment)
+            name, quantity = (match.group(1), int(match.group(2))) if match else (fragment, 1)
+        name = item_name(name)
+        if not quantity or not re.search(r'[^\W\d_]', name):
+            continue
+        key = normalize(name)
+        previous_name, previous_quantity = lines.get(key, (name, 0))
+        lines[key] = (previous_name, previous_quantity + quantity)
+    return list(lines.values())
+
+
+def format_equipment(lines):
+    """
+    Text for (item name, quantity) lines, which parse_equipment() reads back.
+    """
+    return ', '.join(f'{quantity} x {name}' for name, quantity in lines)
+
+
+def _item_rows(keys):
+    return {
+        normalize(name): (item_id, name)
+        for item_id, name in EquipmentItem.objects.filter(name__lower__in=keys).values_list('id', 'name')
+    }
+
+
+def get_or_create_items(names):
+    """
+    Catalog (id, name) for many item names, keyed by the normalized name.
+    """
+    names = {normalize(item_name(name)): item_name(name) for name in names}
+    names.pop('', None)
+    items = _item_rows(set(names)) if names else {}
+    missing = {key: name for key, name in names.items() if key not in items}
+    if missing:
+        EquipmentItem.objects.bulk_create([EquipmentItem(name=name) for name in missing.values()], ignore_conflicts=True)
+        items.update(_item_rows(set(missing)))
+    return items
+
+
+def set_equipment(lines_by_allocation):
+    """
+    Replace the line items of each allocation id with its (item name,
+    quantity) lines, in a handful of statements for the whole batch.
+    """
+    if not lines_by_allocation:
+        return
+    items = get_or_create_items(name for lines in lines_by_allocation.values() for name, _ in lines)
+    AllocationEquipment.objects.filter(allocation_id__in=list(lines_by_allocation)).delete()
+    rows = {}
+    for allocation_id, lines in lines_by_allocation.items():
+        for name, quantity in lines:
+            item_id = items[normalize(item_name(name))][0]
+            # The same item named twice adds up
+            key = (allocation_id, item_id)
+            rows[key] = rows.get(key, 0) + quantity
+    AllocationEquipment.objects.bulk_create(
+        [
+            AllocationEquipment(allocation_id=allocation_id, item_id=item_id, quantity=quantity)
+            for (allocation_id, item_id), quantity in rows.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def line_order(line):
+    return normalize(line['item'])
+
+
+def load_equipment_items(allocation_ids):
+    """
+    {allocation id: [{'item', 'quantity'}, ...]} for a page of allocations,
+    from one query.
+    """
+    lines = {}
+    for allocation_id, name, quantity in AllocationEquipment.objects.filter(
+        allocation_id__in=allocation_ids
+    ).values_list('allocation_id', 'item__name', 'quantity'):
+        lines.setdefault(allocation_id, []).append({'item': name, 'quantity': quantity})
+    for allocation_lines in lines.values():
+        allocation_lines.sort(key=line_order)
+    return lines
+
+
+def equipment_totals(group_by, item=None, facility_id=None, district=None, sector=None, day=None):
+    """
+    Allocated quantities grouped by one or more of item, facility, district
+    and sector, largest first. `day` counts only allocations active on it.
+    """
+    lines = scope_allocations(AllocationEquipment.objects.all(), facility_id, district, sector, 'allocation__')
+    if item:
+        lines = lines.filter(item__name__lower=normalize(item_name(item)))
+    if day is not None:
+        lines = lines.filter(allocation__start_date__lte=day, allocation__end_date__gt=day)
+
+    columns = [GROUP_COLUMNS[name] for name in group_by]
+    rows = lines.values(*columns).annotate(
+        quantity=Sum('quantity'), allocations=Count('allocation', distinct=True)
+    ).order_by('-quantity', *columns)
+
+    tables = get_name_tables()
+    results = []
+    for row in rows:
+        result = {}
+        for name, column in zip(group_by, columns):
+            value = row[column]
+            if name == 'district':
+                result['district'] = tables.district_names.get(value)
+            elif name == 'sector':
+                area = tables.areas.get(value)
+                # Sector names repeat across districts, so name the district too
+                result.setdefault('district', area.district if area else None)
+                result['sector'] = area.sector if area else None
+            elif name == 'facility':
+                result['health_facility_id'] = value
+            else:
+                result[name] = value
+        result['quantity'] = row['quantity']
+        result['allocations'] = row['allocations']
+        results.append(result)
+    return results
@@ -0,0 +1,105 @@
+"""
+Date-range queries over resource allocations.
+
+An allocation covers the half-open range [start_date, end_date). Both dates
+are stored and indexed after health_facility and on their own, so "active on
+a day" and "overlapping a range" are plain range filters:
+
+    start_date < range end  and  end_date > range start
+
+Checking a batch of proposed allocations reads every existing allocation
+that could clash with any of them in one query per CONFLICT_CHUNK
+facilities. The batch is then sorted by facility and start date, and each
+proposal is compared only with allocations that start before it ends.
+"""
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from django.db.models import F
+from geography_app.resolver import resolve_district, resolve_sector, resolve_sector_ids
+from .models import ResourceAllocation
+
+CONFLICT_CHUNK = 1000
+
+Proposal = namedtuple('Proposal', ['health_facility_id', 'start_date', 'end_date'])
+
+
+def scope_allocations(queryset, facility_id=None, district=None, sector=None, prefix=''):
+    """
+    Narrow allocations, or rows reaching them through `prefix`, to one
+    facility, or to a district and/or sector by name.
+    """
+    if facility_id is not None:
+        queryset = queryset.filter(**{prefix + 'health_facility_id': facility_id})
+    if district and sector:
+        queryset = queryset.filter(**{prefix + 'health_facility__sector_ref_id': resolve_sector(district, sector)})
+    elif district:
+        queryset = queryset.filter(**{prefix + 'health_facility__district_ref_id': resolve_district(district)})
+    elif sector:
+        queryset = queryset.filter(**{prefix + 'health_facility__sector_ref_id__in': resolve_sector_ids(sector)})
+    return queryset
+
+
+def overlapping(start, end, queryset=None):
+    """
+    Allocations in effect on at least one day of [start, end).
+    """
+    queryset = ResourceAllocation.objects.all() if queryset is None else queryset
+    # Allocations of zero days are in effect on no day
+    return queryset.filter(end_date__gt=start, start_date__lt=end).filter(end_date__gt=F('start_date'))
+
+
+def active_on(day, queryset=None):
+    return overlapping(day, day + timedelta(days=1), queryset)
+
+
+def find_conflicts(proposals):
+    """
+    For every (health_facility_id, start_date, end_date) proposal, the ids of
+    the existing allocations at the same facility that overlap it and the
+    positions of the other proposals in the batch that do. Returns a list of
+    {'allocations', 'proposals'} dicts in the order of `proposals`.
+    """
+    proposals = [Proposal(*proposal) for proposal in proposals]
+    results = [{'allocations': [], 'proposals': []} for _ in proposals]
+    if not proposals:
+        return results
+
+    # Existing allocations per facility, sorted by start date
+    earliest = min(proposal.start_date for proposal in proposals)
+    latest = max(proposal.end_date for proposal in proposals)
+    facility_ids = sorted({proposal.health_facility_id for proposal in proposals})
+    existing = defaultdict(list)
+    for first in range(0, len(facility_ids), CONFLICT_CHUNK):
+        rows = overlapping(earliest, latest).filter(
+            health_facility_id__in=facility_ids[first:first + CONFLICT_CHUNK]
+        ).order_by('start_date', 'id').values_list('health_facility_id', 'start_date', 'end_date', 'id')
+        for facility_id, start_date, end_date, allocation_id in rows:
+            existing[facility_id].append((start_date, end_date, allocation_id))
+
+    by_facility = defaultdict(list)
+    for position, proposal in enumerate(proposals):
+        # Empty ranges are in effect on no day and clash with nothing
+        if proposal.end_date > proposal.start_date:
+            by_facility[proposal.health_facility_id].append((proposal.start_date, proposal.end_date, position))
+
+    for facility_id, batch in by_facility.items():
+        rows = existing.get(facility_id, [])
+        starts = [row[0] for row in rows]
+        batch.sort()
+        for index, (start_date, end_date, position) in enumerate(batch):
+            results[position]['allocations'] = [
+                allocation_id
+                for row_start, row_end, allocation_id in rows[:bisect_left(starts, end_date)]
+                if row_end > start_date
+            ]
+            # Earlier entries in the sorted batch start no later than this
+            # one, so they overlap it when they end after it starts
+            for other_start, other_end, other in batch[:index]:
+                if other_end > start_date:
+                    results[position]['proposals'].append(other)
+                    results[other]['proposals'].append(position)
+
+    for result in results:
+        result['proposals'].sort()
+    return results
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from resource_allocation_app.models import AreaSummary
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the AreaSummary table from scratch'
+
+    def handle(self, *args, **options):
+        count = AreaSummary.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} area summaries.'))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_allocation_app', '0003_rename_description_resourceallocation_equipment_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AreaSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('district', models.CharField(max_length=100)),
+                ('sector', models.CharField(max_length=100)),
+                ('total_population', models.IntegerField(blank=True, null=True)),
+                ('facility_count', models.IntegerField(default=0)),
+                ('total_capacity', models.IntegerField(default=0)),
+                ('accessibility_count', models.IntegerField(default=0)),
+                ('avg_travel_time', models.FloatField(default=0)),
+                ('incident_count', models.IntegerField(default=0)),
+                ('active_incidents', models.IntegerField(default=0)),
+                ('resolved_incidents', models.IntegerField(default=0)),
+                ('under_investigation_incidents', models.IntegerField(default=0)),
+                ('contained_incidents', models.IntegerField(default=0)),
+                ('allocation_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('district', 'sector')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_allocation_app', '0004_areasummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resourceallocation',
+            index=models.Index(fields=['created_at', 'id'], name='allocation_created_id_idx'),
+        ),
+    ]
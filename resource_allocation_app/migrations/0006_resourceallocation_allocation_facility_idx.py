@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_allocation_app', '0005_resourceallocation_allocation_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resourceallocation',
+            index=models.Index(fields=['health_facility', 'created_at'], name='allocation_facility_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography_app', '0001_initial'),
+        ('resource_allocation_app', '0006_resourceallocation_allocation_facility_idx'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='areasummary',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='areasummary',
+            name='sector_ref',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='geography_app.sector'),
+        ),
+    ]
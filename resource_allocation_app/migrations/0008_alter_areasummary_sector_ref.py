@@ -0,0 +1,20 @@
+# Generated by Django 4.2.17 on 2026-10-18 14:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geography_app', '0002_backfill_area_refs'),
+        ('resource_allocation_app', '0007_alter_areasummary_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='areasummary',
+            name='sector_ref',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='geography_app.sector'),
+        ),
+    ]
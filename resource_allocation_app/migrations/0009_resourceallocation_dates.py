@@ -0,0 +1,23 @@
+# Generated by Django 4.2.17 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_allocation_app', '0008_alter_areasummary_sector_ref'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resourceallocation',
+            name='start_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='resourceallocation',
+            name='end_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from datetime import timedelta
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_allocation_dates(apps, schema_editor):
+    """
+    Existing allocations started on the day they were created.
+    """
+    ResourceAllocation = apps.get_model('resource_allocation_app', 'ResourceAllocation')
+
+    rows = []
+    for row in ResourceAllocation.objects.only('id', 'created_at', 'duration_in_days').iterator(chunk_size=2000):
+        row.start_date = timezone.localdate(row.created_at) if timezone.is_aware(row.created_at) else row.created_at.date()
+        row.end_date = row.start_date + timedelta(days=row.duration_in_days)
+        rows.append(row)
+        if len(rows) == 2000:
+            ResourceAllocation.objects.bulk_update(rows, ['start_date', 'end_date'])
+            rows = []
+    ResourceAllocation.objects.bulk_update(rows, ['start_date', 'end_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_allocation_app', '0009_resourceallocation_dates'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_allocation_dates, migrations.RunPython.noop),
+    ]
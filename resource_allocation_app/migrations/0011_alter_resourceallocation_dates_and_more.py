@@ -0,0 +1,32 @@
+# Generated by Django 4.2.17 on 2026-10-18 16:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_allocation_app', '0010_backfill_allocation_dates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resourceallocation',
+            name='start_date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AlterField(
+            model_name='resourceallocation',
+            name='end_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='resourceallocation',
+            index=models.Index(fields=['health_facility', 'end_date', 'start_date'], name='allocation_facility_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resourceallocation',
+            index=models.Index(fields=['end_date', 'start_date'], name='allocation_dates_idx'),
+        ),
+    ]
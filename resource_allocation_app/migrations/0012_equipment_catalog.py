@@ -0,0 +1,57 @@
+# Generated by Django 4.2.17 on 2026-10-18 17:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_allocation_app', '0011_alter_resourceallocation_dates_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AllocationEquipment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EquipmentItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='resourceallocation',
+            name='equipment',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddConstraint(
+            model_name='equipmentitem',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='equipment_item_name_ci_unique'),
+        ),
+        migrations.AddField(
+            model_name='allocationequipment',
+            name='allocation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='equipment_items', to='resource_allocation_app.resourceallocation'),
+        ),
+        migrations.AddField(
+            model_name='allocationequipment',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='allocation_lines', to='resource_allocation_app.equipmentitem'),
+        ),
+        migrations.AddIndex(
+            model_name='allocationequipment',
+            index=models.Index(fields=['item', 'allocation'], name='allocation_equipment_item_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='allocationequipment',
+            unique_together={('allocation', 'item')},
+        ),
+    ]
@@ -0,0 +1,100 @@
+import re
+from django.db import migrations
+
+# Frozen copy of resource_allocation_app.equipment.parse_equipment() and item_name()
+SEPARATORS = re.compile(r'[,;\n]+|\s+and\s+|\s*&\s*')
+QUANTITY_FIRST = re.compile(r'^(\d+)\s*(?:[x×*](?=\s))?\s*(.+)$')
+QUANTITY_LAST = re.compile(r'^(.+?)\s*(?:[x×*:]\s*|\(\s*)(\d+)\s*\)?$')
+
+
+def normalize(name):
+    return name.strip().lower()
+
+
+SINGULARS = {
+    plural: singular for singular, plural in [
+        ('ambulance', 'ambulances'), ('bag', 'bags'), ('battery', 'batteries'), ('bed', 'beds'),
+        ('bottle', 'bottles'), ('box', 'boxes'), ('bus', 'buses'), ('concentrator', 'concentrators'),
+        ('cylinder', 'cylinders'), ('defibrillator', 'defibrillators'), ('dose', 'doses'),
+        ('generator', 'generators'), ('glove', 'gloves'), ('incubator', 'incubators'), ('kit', 'kits'),
+        ('mask', 'masks'), ('monitor', 'monitors'), ('oximeter', 'oximeters'), ('pack', 'packs'),
+        ('pump', 'pumps'), ('stretcher', 'stretchers'), ('syringe', 'syringes'), ('tent', 'tents'),
+        ('test', 'tests'), ('thermometer', 'thermometers'), ('ventilator', 'ventilators'), ('vial', 'vials'),
+        ('wheelchair', 'wheelchairs'),
+    ]
+}
+
+
+def singular(word):
+    name = SINGULARS.get(word.lower())
+    if name is None:
+        return word
+    if word.isupper():
+        return name.upper()
+    return name.capitalize() if word[0].isupper() else name
+
+
+def item_name(name):
+    words = name.split()
+    if not words:
+        return ''
+    lower = [word.lower() for word in words]
+    head = lower.index('of', 1) - 1 if 'of' in lower[1:] else len(words) - 1
+    words[head] = singular(words[head])
+    return ' '.join(words)[:100]
+
+
+def parse_equipment(text):
+    lines = {}
+    for fragment in SEPARATORS.split(text or ''):
+        fragment = fragment.strip()
+        if not fragment:
+            continue
+        match = QUANTITY_FIRST.match(fragment)
+        if match:
+            quantity, name = int(match.group(1)), match.group(2)
+        else:
+            match = QUANTITY_LAST.match(fragment)
+            name, quantity = (match.group(1), int(match.group(2))) if match else (fragment, 1)
+        name = item_name(name)
+        if not quantity or not re.search(r'[^\W\d_]', name):
+            continue
+        previous_name, previous_quantity = lines.get(normalize(name), (name, 0))
+        lines[normalize(name)] = (previous_name, previous_quantity + quantity)
+    return lines
+
+
+def backfill_allocation_equipment(apps, schema_editor):
+    """
+    Parse every allocation's equipment text into catalog items and line items.
+    """
+    ResourceAllocation = apps.get_model('resource_allocation_app', 'ResourceAllocation')
+    EquipmentItem = apps.get_model('resource_allocation_app', 'EquipmentItem')
+    AllocationEquipment = apps.get_model('resource_allocation_app', 'AllocationEquipment')
+
+    items = {}
+    lines = []
+
+    def flush():
+        AllocationEquipment.objects.bulk_create(lines, batch_size=1000)
+        lines.clear()
+
+    for allocation_id, text in ResourceAllocation.objects.values_list('id', 'equipment').iterator(chunk_size=2000):
+        for key, (name, quantity) in parse_equipment(text).items():
+            if key not in items:
+                items[key] = EquipmentItem.objects.create(name=name).id
+            lines.append(AllocationEquipment(allocation_id=allocation_id, item_id=items[key], quantity=quantity))
+        if len(lines) >= 2000:
+            flush()
+    flush()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resource_allocation_app', '0012_equipment_catalog'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_allocation_equipment, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
+from datetime import timedelta
 from django.db import models
 from django.conf import settings
+from django.db.models.functions import Lower
+from django.utils import timezone
 from rest_framework import serializers, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -10,11 +13,253 @@ from userApp.models import CustomUser
 # ResourceAllocation Model
 class ResourceAllocation(models.Model):
     health_facility = models.ForeignKey(HealthFacility, on_delete=models.CASCADE, related_name='allocations')
-    equipment = models.TextField()
+    # Free-text description; the structured quantities are in equipment_items
+    equipment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     specialist = models.IntegerField()
     duration_in_days = models.IntegerField()
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # First day in effect, today unless given. end_date is the first day no
+    # longer in effect, start_date + duration_in_days, so an allocation is
+    # active on day D when start_date <= D < end_date.
+    start_date = models.DateField(default=timezone.localdate)
+    end_date = models.DateField(editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['created_at', 'id'], name='allocation_created_id_idx'),
+            models.Index(fields=['health_facility', 'created_at'], name='allocation_facility_idx'),
+            # Active and overlap queries: rows ending after the start of the
+            # range, then starting before its end
+            models.Index(fields=['health_facility', 'end_date', 'start_date'], name='allocation_facility_dates_idx'),
+            models.Index(fields=['end_date', 'start_date'], name='allocation_dates_idx'),
+        ]
+
+    def set_dates(self):
+        if self.start_date is None:
+            self.start_date = timezone.localdate()
+        self.end_date = self.start_date + timedelta(days=self.duration_in_days)
+
+    def save(self, *args, **kwargs):
+        self.set_dates()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Allocation for {self.health_facility.name} on {self.date_of_allocation}" 
+
+
+# Catalog of allocatable equipment, one row per item whatever its spelling case
+class EquipmentItem(models.Model):
+    name = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(Lower('name'), name='equipment_item_name_ci_unique'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+# Quantity of one catalog item in an allocation
+class AllocationEquipment(models.Model):
+    allocation = models.ForeignKey(ResourceAllocation, on_delete=models.CASCADE, related_name='equipment_items')
+    item = models.ForeignKey(EquipmentItem, on_delete=models.PROTECT, related_name='allocation_lines')
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ['allocation', 'item']
+        indexes = [
+            models.Index(fields=['item', 'allocation'], name='allocation_equipment_item_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} {self.item.name}"
+
+
+# Precomputed headline numbers for a sector, kept in sync by signals
+class AreaSummary(models.Model):
+    sector_ref = models.OneToOneField('geography_app.Sector', on_delete=models.CASCADE, related_name='summary')
+    district = models.CharField(max_length=100)
+    sector = models.CharField(max_length=100)
+    total_population = models.IntegerField(null=True, blank=True)
+    facility_count = models.IntegerField(default=0)
+    total_capacity = models.IntegerField(default=0)
+    accessibility_count = models.IntegerField(default=0)
+    avg_travel_time = models.FloatField(default=0)
+    incident_count = models.IntegerField(default=0)
+    active_incidents = models.IntegerField(default=0)
+    resolved_incidents = models.IntegerField(default=0)
+    under_investigation_incidents = models.IntegerField(default=0)
+    contained_incidents = models.IntegerField(default=0)
+    allocation_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Maps DiseaseIncident.status values to the counter columns above
+    STATUS_FIELDS = {
+        'ACTIVE': 'active_incidents',
+        'RESOLVED': 'resolved_incidents',
+        'UNDER_INVESTIGATION': 'under_investigation_incidents',
+        'CONTAINED': 'contained_incidents',
+    }
+
+    def __str__(self):
+        return f"{self.district} - {self.sector} Summary"
+
+    @property
+    def incidents_by_status(self):
+        return {status: getattr(self, field) for status, field in self.STATUS_FIELDS.items()}
+
+    @classmethod
+    def empty(cls, area):
+        return cls(sector_ref_id=area.sector_id, district=area.district, sector=area.sector)
+
+    @classmethod
+    def refresh(cls, sector_id):
+        """
+        Recompute the summary row for one sector from the source tables.
+        Returns None when the sector no longer exists.
+        """
+        from geography_app.resolver import area_of
+        from population_data_app.models import PopulationData
+        from accessiblity_app.models import AccessibilityData
+        from disease_incident_app.models import DiseaseIncident
+
+        area = area_of(sector_id)
+        if area is None:
+            cls.objects.filter(sector_ref_id=sector_id).delete()
+            return None
+
+        facility_stats = HealthFacility.objects.filter(
+            sector_ref_id=sector_id
+        ).aggregate(count=models.Count('id'), capacity=models.Sum('capacity'))
+        accessibility_stats = AccessibilityData.objects.filter(
+            health_facility__sector_ref_id=sector_id
+        ).aggregate(count=models.Count('id'), avg_time=models.Avg('avg_travel_time'))
+        incident_counts = dict(
+            DiseaseIncident.objects.filter(
+                health_facility__sector_ref_id=sector_id
+            ).values_list('status').annotate(count=models.Count('id')).order_by()
+        )
+
+        values = {
+            'district': area.district,
+            'sector': area.sector,
+            'total_population': PopulationData.objects.filter(
+                sector_ref_id=sector_id
+            ).values_list('total_population', flat=True).first(),
+            'facility_count': facility_stats['count'],
+            'total_capacity': facility_stats['capacity'] or 0,
+            'accessibility_count': accessibility_stats['count'],
+            'avg_travel_time': accessibility_stats['avg_time'] or 0,
+            'incident_count': sum(incident_counts.values()),
+            'allocation_count': ResourceAllocation.objects.filter(
+                health_facility__sector_ref_id=sector_id
+            ).count(),
+        }
+        for status, field in cls.STATUS_FIELDS.items():
+            values[field] = incident_counts.get(status, 0)
+
+        # Drop rows for areas that no longer have any data
+        if not values['facility_count'] and values['total_population'] is None:
+            cls.objects.filter(sector_ref_id=sector_id).delete()
+            return cls(sector_ref_id=sector_id, **values)
+
+        summary, _ = cls.objects.update_or_create(sector_ref_id=sector_id, defaults=values)
+        return summary
+
+    @classmethod
+    def compute_many(cls, sector_ids=None):
+        """
+        Unsaved summaries for the given sectors (every sector when None),
+        keyed by sector id, with one grouped query per source table.
+        Sectors without any data are left out.
+        """
+        from geography_app.resolver import get_name_tables
+        from population_data_app.models import PopulationData
+        from accessiblity_app.models import AccessibilityData
+        from disease_incident_app.models import DiseaseIncident
+
+        def in_sectors(queryset, field):
+            return queryset if sector_ids is None else queryset.filter(**{f'{field}__in': sector_ids})
+
+        areas = get_name_tables().areas
+        summaries = {}
+
+        def summary_for(sector_id):
+            if sector_id not in summaries:
+                summaries[sector_id] = cls.empty(areas[sector_id])
+            return summaries[sector_id]
+
+        for sector_id, total in in_sectors(PopulationData.objects, 'sector_ref').values_list(
+            'sector_ref', 'total_population'
+        ):
+            summary_for(sector_id).total_population = total
+
+        for row in in_sectors(HealthFacility.objects, 'sector_ref').values('sector_ref').annotate(
+            count=models.Count('id'), capacity=models.Sum('capacity')
+        ).order_by():
+            summary = summary_for(row['sector_ref'])
+            summary.facility_count = row['count']
+            summary.total_capacity = row['capacity'] or 0
+
+        for row in in_sectors(AccessibilityData.objects, 'health_facility__sector_ref').values(
+            'health_facility__sector_ref'
+        ).annotate(count=models.Count('id'), avg_time=models.Avg('avg_travel_time')).order_by():
+            summary = summary_for(row['health_facility__sector_ref'])
+            summary.accessibility_count = row['count']
+            summary.avg_travel_time = row['avg_time'] or 0
+
+        for row in in_sectors(DiseaseIncident.objects, 'health_facility__sector_ref').values(
+            'health_facility__sector_ref', 'status'
+        ).annotate(count=models.Count('id')).order_by():
+            summary = summary_for(row['health_facility__sector_ref'])
+            summary.incident_count += row['count']
+            field = cls.STATUS_FIELDS.get(row['status'])
+            if field:
+                setattr(summary, field, getattr(summary, field) + row['count'])
+
+        for row in in_sectors(ResourceAllocation.objects, 'health_facility__sector_ref').values(
+            'health_facility__sector_ref'
+        ).annotate(count=models.Count('id')).order_by():
+            summary = summary_for(row['health_facility__sector_ref'])
+            summary.allocation_count = row['count']
+
+        return summaries
+
+    @classmethod
+    def rebuild_many(cls, sector_ids):
+        """
+        Recompute the summary rows of many sectors at once, like refresh()
+        for each of them. Returns {sector id: summary} for the sectors that
+        have data.
+        """
+        from django.db import transaction
+        from backend.bulk import bulk_upsert
+
+        sector_ids = set(sector_ids)
+        summaries = cls.compute_many(sector_ids)
+        update_fields = [
+            field.name for field in cls._meta.concrete_fields if field.name not in ('id', 'sector_ref')
+        ]
+        with transaction.atomic():
+            # Drop rows for areas that no longer have any data
+            cls.objects.filter(sector_ref_id__in=sector_ids - set(summaries)).delete()
+            bulk_upsert(cls, summaries.values(), ['sector_ref'], update_fields, batch_size=1000)
+        return summaries
+
+    @classmethod
+    def rebuild_all(cls):
+        """
+        Drop and recompute every summary row with one grouped query per source table.
+        """
+        from django.db import transaction
+
+        summaries = cls.compute_many()
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(summaries.values(), batch_size=1000)
+
+        return len(summaries)
@@ -0,0 +1,209 @@
+"""
+Specialist allocation planning.
+
+Each ACTIVE facility gets a demand score:
+
+    demand = case_weight * active cases
+             + population_weight * catchment residents / 1000
+
+where the catchment is the sector's census population split across the
+sector's ACTIVE facilities in proportion to their capacity. The k-th extra
+specialist sent to a facility that already has `current` specialists
+allocated on the start date is worth demand / (current + k), so each
+additional specialist is worth less than the previous one. Maximizing the
+total over a budget of B specialists is a separable concave problem.
+Greedily taking the B largest marginal values solves it exactly, and the
+greedy picks are the values above a threshold. The threshold is found by
+bisection over all facilities at once with NumPy; the specialists still
+unassigned after it are handed out in rounds of at most one per facility.
+"""
+from collections import namedtuple
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from backend.signals import post_bulk_create
+from geography_app.resolver import get_name_tables
+from health_facility_app.models import HealthFacility
+from disease_incident_app.models import DiseaseIncident
+from population_data_app.models import PopulationData
+from .models import ResourceAllocation
+from .intervals import active_on
+from .equipment import parse_equipment, set_equipment
+
+RESIDENTS_PER_UNIT = 1000
+BISECTION_STEPS = 100
+
+Inputs = namedtuple('Inputs', ['facility_ids', 'names', 'sector_ids', 'cases', 'catchment', 'current'])
+
+
+def load_inputs(district_id=None, day=None):
+    """
+    Active cases, catchment population and specialists allocated on `day`
+    (today by default) for every ACTIVE facility (of one district when
+    given), as arrays.
+    """
+    day = day or timezone.localdate()
+    facilities = HealthFacility.objects.filter(status='ACTIVE')
+    if district_id is not None:
+        facilities = facilities.filter(district_ref_id=district_id)
+    rows = list(facilities.order_by('id').values_list('id', 'name', 'sector_ref_id', 'capacity'))
+    facility_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    sector_ids = np.array([row[2] for row in rows], dtype=np.int64)
+    capacity = np.array([max(row[3], 0) for row in rows], dtype=np.float64)
+    position = {facility_id: i for i, facility_id in enumerate(facility_ids.tolist())}
+
+    def per_facility(pairs):
+        values = np.zeros(len(rows))
+        for facility_id, value in pairs:
+            if facility_id in position:
+                values[position[facility_id]] += value or 0
+        return values
+
+    cases = per_facility(
+        DiseaseIncident.objects.filter(status='ACTIVE').values_list('health_facility').annotate(
+            cases=Sum('number_of_cases')
+        ).order_by()
+    )
+
+    current = per_facility(
+        active_on(day).values_list('health_facility').annotate(specialists=Sum('specialist')).order_by()
+    )
+
+    # Split each sector's population across its facilities by capacity
+    sector_index, sector_of = np.unique(sector_ids, return_inverse=True)
+    populations = dict(PopulationData.objects.filter(sector_ref_id__in=sector_index.tolist()).values_list(
+        'sector_ref_id', 'total_population'
+    ))
+    sector_population = np.array([populations.get(sector_id, 0) for sector_id in sector_index.tolist()], dtype=np.float64)
+    sector_capacity = np.bincount(sector_of, weights=capacity, minlength=len(sector_index))
+    sector_facilities = np.bincount(sector_of, minlength=len(sector_index))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Facilities without capacity data share their sector equally
+        share = np.where(
+            sector_capacity[sector_of] > 0, capacity / sector_capacity[sector_of], 1 / sector_facilities[sector_of]
+        )
+    catchment = sector_population[sector_of] * share if len(rows) else np.zeros(0)
+
+    return Inputs(facility_ids, [row[1] for row in rows], sector_ids, cases, catchment, current)
+
+
+def _counts(demand, current, threshold, limit, budget):
+    # Extra specialists whose marginal value demand / (current + k) is at
+    # least threshold; more than the budget is never needed
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        counts = np.floor(demand / threshold - current)
+    counts = np.nan_to_num(counts, nan=0.0, posinf=float(budget))
+    return np.clip(np.minimum(counts, limit), 0, budget).astype(np.int64)
+
+
+def allocate(demand, current, budget, limit=None):
+    """
+    Extra specialists per facility maximizing sum(demand * (H(current + extra)
+    - H(current))) for harmonic-number-like diminishing returns, with at most
+    `limit` extra per facility.
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    current = np.asarray(current, dtype=np.float64)
+    count = len(demand)
+    limit = np.full(count, np.inf) if limit is None else np.broadcast_to(np.asarray(limit, dtype=np.float64), count)
+    eligible = (demand > 0) & (limit > 0)
+    if not budget or not eligible.any():
+        return np.zeros(count, dtype=np.int64)
+    capacity = np.where(eligible, limit, 0).sum()
+    if capacity <= budget:
+        # Everyone can take their whole limit
+        return np.where(eligible, limit, 0).astype(np.int64)
+
+    # The largest first marginal value takes at least one specialist
+    high = (demand / (current + 1)).max() * (1 + 1e-12)
+    low = high / (budget + current.max() + 1) / 2
+    while _counts(demand, current, low, limit, budget).sum() < budget:
+        low /= 2
+    for _ in range(BISECTION_STEPS):
+        middle = (low + high) / 2
+        if _counts(demand, current, middle, limit, budget).sum() <= budget:
+            high = middle
+        else:
+            low = middle
+        if high - low <= high * 1e-12:
+            break
+
+    extra = _counts(demand, current, high, limit, budget)
+    remaining = budget - int(extra.sum())
+    while remaining > 0:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gains = np.where(eligible & (extra < limit), demand / (current + extra + 1), -np.inf)
+        candidates = min(remaining, int(np.isfinite(gains).sum()))
+        if not candidates:
+            break
+        chosen = np.argpartition(-gains, candidates - 1)[:candidates]
+        extra[chosen] += 1
+        remaining -= candidates
+    return extra
+
+
+def plan_allocation(budget, case_weight=1.0, population_weight=1.0, max_per_facility=None, district_id=None,
+                    start_date=None):
+    """
+    Proposed extra specialists for the ACTIVE facilities from start_date
+    (today by default), most first.
+    """
+    inputs = load_inputs(district_id, start_date)
+    demand = case_weight * inputs.cases + population_weight * inputs.catchment / RESIDENTS_PER_UNIT
+    extra = allocate(demand, inputs.current, budget, max_per_facility)
+
+    chosen = np.flatnonzero(extra)
+    chosen = chosen[np.lexsort((inputs.facility_ids[chosen], -demand[chosen], -extra[chosen]))]
+    areas = get_name_tables().areas
+    plan = []
+    for i in chosen.tolist():
+        area = areas.get(int(inputs.sector_ids[i]))
+        plan.append({
+            'health_facility_id': int(inputs.facility_ids[i]),
+            'name': inputs.names[i],
+            'district': area.district if area else None,
+            'sector': area.sector if area else None,
+            'active_cases': int(inputs.cases[i]),
+            'catchment_population': int(round(inputs.catchment[i])),
+            'current_specialists': int(inputs.current[i]),
+            'demand': round(float(demand[i]), 3),
+            'proposed_specialists': int(extra[i]),
+        })
+    return {
+        'budget': budget,
+        'assigned': int(extra.sum()),
+        'facilities_considered': len(inputs.facility_ids),
+        'plan': plan,
+    }
+
+
+def commit_plan(plan, user, duration_in_days, equipment='', start_date=None):
+    """
+    Create one ResourceAllocation per facility in the plan, each with the
+    equipment lines parsed from `equipment`.
+    """
+    allocations = [
+        ResourceAllocation(
+            health_facility_id=row['health_facility_id'], specialist=row['proposed_specialists'],
+            duration_in_days=duration_in_days, equipment=equipment, start_date=start_date, created_by=user,
+        )
+        for row in plan
+    ]
+    lines = parse_equipment(equipment)
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            # bulk_create skips save(), which derives the dates
+            for allocation in allocations:
+                allocation.set_dates()
+            ResourceAllocation.objects.bulk_create(allocations, batch_size=1000)
+            post_bulk_create.send(sender=ResourceAllocation, objs=allocations)
+        else:
+            # MySQL doesn't return ids from bulk inserts, and re-reading them
+            # could pick up rows committed concurrently; a plan has at most
+            # one row per facility
+            for allocation in allocations:
+                allocation.save()
+        if lines and allocations:
+            set_equipment({allocation.id: lines for allocation in allocations})
+    return allocations
@@ -1,35 +1,114 @@
 # Serializer for ResourceAllocation
-from .models import ResourceAllocation
+from django.db import transaction
+from django.db.models import Prefetch
+from .models import ResourceAllocation, AllocationEquipment
+from .equipment import parse_equipment, format_equipment, set_equipment, load_equipment_items, line_order
 from rest_framework import serializers
 from health_facility_app.models import HealthFacility
-from userApp.models import CustomUser
+from health_facility_app.serializers import HealthFacilitySerializer, CustomUserSerializer
+from backend.serializers import DynamicFieldsMixin
+
+
+class EquipmentLineListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        return sorted(super().to_representation(data), key=line_order)
 
-# Serializer for the created_by user
-class CustomUserSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = CustomUser()  # Fetches the custom user model
-        fields = ['id', 'phone_number', 'email', 'role', 'is_active', 'is_staff', 'created_at']  # Specify desired fields
 
-# Serializer for the health facility
-class HealthFacilitySerializer(serializers.ModelSerializer):
-    created_by = CustomUserSerializer(read_only=True)  # Nest the user serializer
+class EquipmentLineSerializer(serializers.Serializer):
+    """
+    One catalog item and its quantity; unknown item names join the catalog.
+    """
+    item = serializers.CharField(max_length=100)
+    quantity = serializers.IntegerField(min_value=1)
 
     class Meta:
-        model = HealthFacility
-        fields = '__all__'
-        read_only_fields = ('id','created_at', 'created_by')
+        list_serializer_class = EquipmentLineListSerializer
 
 
-class ResourceAllocationSerializer(serializers.ModelSerializer):
-    created_by = CustomUserSerializer(read_only=True)
-    health_facility = HealthFacilitySerializer(read_only=True)  # Nested serializer
+class ResourceAllocationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    created_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    health_facility = serializers.PrimaryKeyRelatedField(read_only=True)  # Expand with ?expand=health_facility
     health_facility_id = serializers.PrimaryKeyRelatedField(
         queryset=HealthFacility.objects.all(),
         source='health_facility',  # Maps to the foreign key
         write_only=True
     )
+    # Either this list or the free-text equipment can be sent; the other is
+    # filled in from it
+    equipment_items = EquipmentLineSerializer(many=True, required=False)
+    expandable_fields = {
+        'health_facility': HealthFacilitySerializer,
+        'created_by': CustomUserSerializer,
+    }
+    values_list_loaders = {
+        'equipment_items': load_equipment_items,
+    }
 
     class Meta:
         model = ResourceAllocation
-        fields = ['id', 'health_facility', 'health_facility_id', 'equipment', 'specialist', 'duration_in_days', 'created_by', 'created_at']
-        read_only_fields = ['id', 'created_by', 'created_at']
+        fields = ['id', 'health_facility', 'health_facility_id', 'equipment', 'equipment_items', 'specialist', 'duration_in_days', 'start_date', 'end_date', 'created_by', 'created_at']
+        read_only_fields = ['id', 'end_date', 'created_by', 'created_at']
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request=None, expand=None):
+        return super().optimize_queryset(queryset, request, expand).prefetch_related(
+            Prefetch('equipment_items', queryset=AllocationEquipment.objects.select_related('item'))
+        )
+
+    def _equipment_lines(self, validated_data):
+        """
+        (item, quantity) lines to store, or None to keep the current ones.
+        """
+        lines = validated_data.pop('equipment_items', None)
+        if lines is not None:
+            lines = [(line['item'], line['quantity']) for line in lines]
+            if 'equipment' not in validated_data:
+                validated_data['equipment'] = format_equipment(lines)
+            return lines
+        if 'equipment' in validated_data:
+            return parse_equipment(validated_data['equipment'])
+        return None
+
+    def create(self, validated_data):
+        lines = self._equipment_lines(validated_data)
+        with transaction.atomic():
+            allocation = super().create(validated_data)
+            set_equipment({allocation.id: lines or []})
+        return allocation
+
+    def update(self, instance, validated_data):
+        lines = self._equipment_lines(validated_data)
+        with transaction.atomic():
+            allocation = super().update(instance, validated_data)
+            if lines is not None:
+                set_equipment({allocation.id: lines})
+        return allocation
+
+
+class AllocationPlanSerializer(serializers.Serializer):
+    """
+    Parameters of an optimized specialist allocation plan.
+    """
+    budget = serializers.IntegerField(min_value=1)
+    case_weight = serializers.FloatField(min_value=0, default=1.0)
+    population_weight = serializers.FloatField(min_value=0, default=1.0)
+    max_per_facility = serializers.IntegerField(min_value=1, required=False)
+    district = serializers.CharField(required=False)
+    commit = serializers.BooleanField(default=False)
+    duration_in_days = serializers.IntegerField(min_value=1, required=False)
+    start_date = serializers.DateField(required=False)
+    equipment = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate(self, data):
+        if data['commit'] and 'duration_in_days' not in data:
+            raise serializers.ValidationError({'duration_in_days': 'Required to commit the plan.'})
+        return data
+
+
+class ProposedAllocationSerializer(serializers.Serializer):
+    """
+    One allocation to check for conflicts before it is created.
+    """
+    health_facility_id = serializers.IntegerField()
+    start_date = serializers.DateField(required=False)
+    duration_in_days = serializers.IntegerField(min_value=1)
@@ -0,0 +1,151 @@
+import threading
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from backend.signals import post_bulk_create
+from health_facility_app.models import HealthFacility
+from disease_incident_app.models import DiseaseIncident
+from population_data_app.models import PopulationData
+from accessiblity_app.models import AccessibilityData
+from .models import ResourceAllocation, AreaSummary
+from .dashboard import invalidate_area, invalidate_areas
+from .coverage import invalidate_coverage
+
+# Sectors and facilities touched by the current transaction. Their summaries are
+# refreshed and cached dashboards invalidated once on commit, so a cascade
+# delete of a busy facility does not recompute the same area for every child row.
+_pending = threading.local()
+
+
+def _pending_sets():
+    if not hasattr(_pending, 'sector_ids'):
+        _pending.sector_ids = set()
+        _pending.facility_ids = set()
+    return _pending.sector_ids, _pending.facility_ids
+
+
+def refresh_pending_areas():
+    sector_ids, facility_ids = _pending_sets()
+    _pending.sector_ids, _pending.facility_ids = set(), set()
+
+    if facility_ids:
+        sector_ids |= set(
+            HealthFacility.objects.filter(id__in=facility_ids).values_list('sector_ref_id', flat=True)
+        )
+    for sector_id in sector_ids:
+        AreaSummary.refresh(sector_id)
+        invalidate_area(sector_id)
+
+
+def _schedule_refresh():
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        refresh_pending_areas()
+        return
+
+    # A rolled back savepoint discards its hooks, so check the hook is still queued
+    scheduled = any(hook[1] is refresh_pending_areas for hook in connection.run_on_commit)
+    if not scheduled:
+        transaction.on_commit(refresh_pending_areas)
+
+
+def mark_area_changed(sector_id):
+    sector_ids, _ = _pending_sets()
+    sector_ids.add(sector_id)
+    _schedule_refresh()
+
+
+def mark_facility_changed(facility_id):
+    _, facility_ids = _pending_sets()
+    facility_ids.add(facility_id)
+    _schedule_refresh()
+
+
+# Remember where a row lived before an update so both old and new areas are refreshed
+@receiver(pre_save, sender=HealthFacility)
+@receiver(pre_save, sender=PopulationData)
+def remember_previous_area(sender, instance, **kwargs):
+    instance._previous_area = None
+    if instance.pk and not instance._state.adding:
+        instance._previous_area = sender.objects.filter(pk=instance.pk).values_list(
+            'sector_ref_id', flat=True
+        ).first()
+
+
+@receiver(pre_save, sender=DiseaseIncident)
+@receiver(pre_save, sender=AccessibilityData)
+@receiver(pre_save, sender=ResourceAllocation)
+def remember_previous_facility(sender, instance, **kwargs):
+    instance._previous_facility_id = None
+    if instance.pk and not instance._state.adding:
+        instance._previous_facility_id = sender.objects.filter(pk=instance.pk).values_list(
+            'health_facility_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=HealthFacility)
+@receiver(post_save, sender=PopulationData)
+@receiver(post_delete, sender=HealthFacility)
+@receiver(post_delete, sender=PopulationData)
+def area_row_changed(sender, instance, **kwargs):
+    mark_area_changed(instance.sector_ref_id)
+    previous_area = getattr(instance, '_previous_area', None)
+    if previous_area and previous_area != instance.sector_ref_id:
+        mark_area_changed(previous_area)
+
+
+@receiver(post_save, sender=DiseaseIncident)
+@receiver(post_save, sender=AccessibilityData)
+@receiver(post_save, sender=ResourceAllocation)
+@receiver(post_delete, sender=DiseaseIncident)
+@receiver(post_delete, sender=AccessibilityData)
+@receiver(post_delete, sender=ResourceAllocation)
+def facility_row_changed(sender, instance, **kwargs):
+    mark_facility_changed(instance.health_facility_id)
+    previous_facility_id = getattr(instance, '_previous_facility_id', None)
+    if previous_facility_id and previous_facility_id != instance.health_facility_id:
+        mark_facility_changed(previous_facility_id)
+
+
+@receiver(post_bulk_create, sender=DiseaseIncident)
+def facility_rows_created(sender, objs, **kwargs):
+    for facility_id in {obj.health_facility_id for obj in objs}:
+        mark_facility_changed(facility_id)
+
+
+def _drop_summaries_on_commit(sector_ids):
+    # Bulk writes can touch thousands of sectors. The dashboard rebuilds
+    # missing summaries on demand, so drop them with one DELETE instead of
+    # refreshing each sector.
+    def drop_summaries():
+        AreaSummary.objects.filter(sector_ref_id__in=sector_ids).delete()
+        invalidate_areas(sector_ids)
+
+    transaction.on_commit(drop_summaries)
+
+
+@receiver(post_bulk_create, sender=PopulationData)
+def area_rows_created(sender, objs, **kwargs):
+    _drop_summaries_on_commit({obj.sector_ref_id for obj in objs})
+
+
+@receiver(post_bulk_create, sender=AccessibilityData)
+@receiver(post_bulk_create, sender=ResourceAllocation)
+def bulk_facility_rows_created(sender, objs, **kwargs):
+    facility_ids = {obj.health_facility_id for obj in objs}
+    if facility_ids:
+        _drop_summaries_on_commit(set(
+            HealthFacility.objects.filter(id__in=facility_ids).values_list('sector_ref_id', flat=True)
+        ))
+
+
+@receiver(post_save, sender=HealthFacility)
+@receiver(post_save, sender=PopulationData)
+@receiver(post_save, sender=AccessibilityData)
+@receiver(post_delete, sender=HealthFacility)
+@receiver(post_delete, sender=PopulationData)
+@receiver(post_delete, sender=AccessibilityData)
+@receiver(post_bulk_create, sender=PopulationData)
+@receiver(post_bulk_create, sender=AccessibilityData)
+def coverage_input_changed(sender, **kwargs):
+    invalidate_coverage()
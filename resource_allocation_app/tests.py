@@ -1,3 +1,549 @@
-from django.test import TestCase
+import heapq
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from importlib import import_module
+from unittest import mock
+from django.apps import apps
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from backend.testing import FastPathEquivalenceMixin, make_user, populate_area
+from geography_app.resolver import get_or_create_area, resolve_district
+from health_facility_app.models import HealthFacility
+from population_data_app.models import PopulationData
+from backend.cache import get_stats
+from .coverage import CACHE_GROUP, compute_gaps, percentile_ranks
+from .equipment import item_name, load_equipment_items, parse_equipment
+from .intervals import active_on, find_conflicts, overlapping
+from .models import AllocationEquipment, AreaSummary, EquipmentItem, ResourceAllocation
+from .optimizer import allocate, commit_plan, plan_allocation
 
-# Create your tests here.
+
+class DistrictSectorQueryBudgetTests(TransactionTestCase):
+    """
+    The dashboard runs the same number of queries whatever the size of the
+    areas it returns. Outside a transaction the name tables are shared, as
+    they are between requests, so each count includes one reload after the
+    cache is cleared.
+    """
+    ROWS = 1000
+    AREA_QUERIES = 9
+    DISTRICT_QUERIES = 9
+    # One grouped query per source table, then an upsert with its BEGIN and COMMIT
+    REBUILD_QUERIES = 8
+
+    def setUp(self):
+        # Name tables cached by an earlier test point at flushed rows
+        cache.clear()
+        self.user = make_user()
+        populate_area(self.user, 'Gasabo', 'Kimironko', self.ROWS)
+        populate_area(self.user, 'Gasabo', 'Remera', 5)
+        AreaSummary.rebuild_all()
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_area_query_count_is_fixed(self):
+        with self.assertNumQueries(self.AREA_QUERIES):
+            response = self.client.get(
+                '/resource_allocation/district-sector-data/', {'district': 'Gasabo', 'sector': 'Kimironko'}
+            )
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['health_facilities']['total_count'], self.ROWS)
+        self.assertEqual(sum(len(rows) for rows in data['health_facilities']['grouped_by_type'].values()), self.ROWS)
+        self.assertEqual(len(data['accessibility_metrics']['detailed_data']), self.ROWS)
+        self.assertEqual(len(data['disease_incidents']['incidents']), self.ROWS)
+        self.assertEqual(data['disease_incidents']['by_status']['ACTIVE'], self.ROWS // 2)
+        self.assertEqual(len(data['resource_allocations']['allocations']), self.ROWS)
+        allocation = data['resource_allocations']['allocations'][0]
+        self.assertEqual(allocation['health_facility']['created_by']['id'], self.user.id)
+        self.assertEqual(allocation['equipment_items'], [{'item': 'ventilator', 'quantity': 2}])
+
+    def test_small_area_costs_the_same(self):
+        with self.assertNumQueries(self.AREA_QUERIES):
+            response = self.client.get(
+                '/resource_allocation/district-sector-data/', {'district': 'Gasabo', 'sector': 'Remera'}
+            )
+        self.assertEqual(response.data['health_facilities']['total_count'], 5)
+
+    def test_district_query_count_is_fixed(self):
+        with self.assertNumQueries(self.DISTRICT_QUERIES):
+            response = self.client.post(
+                '/resource_allocation/district-sector-data/batch/', {'district': 'Gasabo'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [(area['sector'], area['health_facilities']['total_count']) for area in response.data['areas']],
+            [('Kimironko', self.ROWS), ('Remera', 5)],
+        )
+
+    def test_missing_summaries_are_rebuilt_together(self):
+        AreaSummary.objects.all().delete()
+        with self.assertNumQueries(self.DISTRICT_QUERIES + self.REBUILD_QUERIES):
+            response = self.client.post(
+                '/resource_allocation/district-sector-data/batch/', {'district': 'Gasabo'}, format='json'
+            )
+        self.assertEqual(
+            [(area['sector'], area['health_facilities']['total_count']) for area in response.data['areas']],
+            [('Kimironko', self.ROWS), ('Remera', 5)],
+        )
+        self.assertEqual(
+            dict(AreaSummary.objects.values_list('sector', 'incident_count')), {'Kimironko': self.ROWS, 'Remera': 5}
+        )
+
+
+class AllocationFastPathTests(FastPathEquivalenceMixin, TestCase):
+    ENDPOINTS = [
+        ('GET', '/resource_allocation/allocations/', {}, None),
+        ('GET', '/resource_allocation/user/', {}, None),
+        ('POST', '/resource_allocation/facility/', {}, {'facility_name': 'Kimironko Facility 3'}),
+        ('GET', '/resource_allocation/active/', {'district': 'Gasabo'}, None),
+    ]
+    FIELDS = ['id,equipment,equipment_items', 'id,created_at,start_date,end_date,specialist,health_facility']
+    EXPAND = ['health_facility', 'health_facility,health_facility.created_by', 'created_by']
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 20)
+        today = timezone.localdate()
+        cls.ENDPOINTS = cls.ENDPOINTS + [(
+            'GET', '/resource_allocation/overlapping/',
+            {'start': today.isoformat(), 'end': (today + timedelta(days=7)).isoformat()},
+            None,
+        )]
+
+
+def greedy_allocation(demand, current, budget, limit=None):
+    # One specialist at a time to the largest marginal value
+    extra = [0] * len(demand)
+    heap = [(-demand[i] / (current[i] + 1), i) for i in range(len(demand)) if demand[i] > 0 and limit != 0]
+    heapq.heapify(heap)
+    while budget and heap:
+        _, i = heapq.heappop(heap)
+        extra[i] += 1
+        budget -= 1
+        if limit is None or extra[i] < limit:
+            heapq.heappush(heap, (-demand[i] / (current[i] + extra[i] + 1), i))
+    return extra
+
+
+def total_value(demand, current, extra):
+    return sum(
+        demand[i] * sum(1 / (current[i] + k) for k in range(1, extra[i] + 1)) for i in range(len(demand))
+    )
+
+
+class AllocateTests(SimpleTestCase):
+    def test_matches_one_at_a_time_greedy(self):
+        rng = np.random.default_rng(1)
+        for trial in range(200):
+            count = int(rng.integers(1, 40))
+            demand = rng.integers(0, 50, count).astype(float)
+            current = rng.integers(0, 5, count).astype(float)
+            budget = int(rng.integers(0, 200))
+            limit = None if trial % 2 else int(rng.integers(1, 6))
+            with self.subTest(trial=trial):
+                extra = allocate(demand, current, budget, limit)
+                expected = greedy_allocation(demand, current, budget, limit)
+                self.assertEqual(int(extra.sum()), sum(expected))
+                self.assertAlmostEqual(
+                    total_value(demand, current, extra.tolist()), total_value(demand, current, expected), places=6
+                )
+                if limit is not None:
+                    self.assertTrue((extra <= limit).all())
+
+    def test_budget_beyond_every_limit(self):
+        self.assertEqual(allocate([5, 0, 3], [0, 0, 1], 100, 2).tolist(), [2, 0, 2])
+        self.assertEqual(allocate([5, 3], [0, 0], 0).tolist(), [0, 0])
+
+
+class OptimizerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 6)
+        populate_area(cls.user, 'Kicukiro', 'Niboye', 3)
+
+    def test_plan_spends_the_budget_by_demand(self):
+        result = plan_allocation(8)
+        self.assertEqual((result['assigned'], result['facilities_considered']), (8, 9))
+        plan = result['plan']
+        self.assertEqual(sum(row['proposed_specialists'] for row in plan), 8)
+        self.assertEqual(
+            [row['proposed_specialists'] for row in plan],
+            sorted((row['proposed_specialists'] for row in plan), reverse=True),
+        )
+        # populate_area allocates one specialist to every facility
+        self.assertTrue(all(row['current_specialists'] == 1 for row in plan))
+
+    def test_plan_for_one_district_with_a_cap(self):
+        result = plan_allocation(10, max_per_facility=1, district_id=resolve_district('kicukiro'))
+        self.assertEqual(result['assigned'], 3)
+        self.assertEqual({row['district'] for row in result['plan']}, {'Kicukiro'})
+
+    def assert_committed(self, plan, allocations):
+        self.assertEqual(
+            [(allocation.health_facility_id, allocation.specialist) for allocation in allocations],
+            [(row['health_facility_id'], row['proposed_specialists']) for row in plan],
+        )
+        ids = [allocation.id for allocation in allocations]
+        self.assertNotIn(None, ids)
+        stored = ResourceAllocation.objects.filter(id__in=ids)
+        self.assertEqual(stored.count(), len(plan))
+        self.assertTrue(all(allocation.end_date for allocation in stored))
+        self.assertEqual(
+            load_equipment_items(ids), {allocation_id: [{'item': 'ultrasound', 'quantity': 1}] for allocation_id in ids}
+        )
+
+    def test_commit_plan(self):
+        plan = plan_allocation(5)['plan']
+        allocations = commit_plan(plan, self.user, 30, '1 ultrasound')
+        self.assert_committed(plan, allocations)
+
+    def test_commit_plan_without_returned_ids(self):
+        # As on MySQL; earlier allocations by the same user must not get the lines
+        plan = plan_allocation(5)['plan']
+        earlier = set(ResourceAllocation.objects.values_list('id', flat=True))
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            allocations = commit_plan(plan, self.user, 30, '1 ultrasound')
+        self.assert_committed(plan, allocations)
+        self.assertFalse(any(
+            line['item'] == 'ultrasound' for lines in load_equipment_items(earlier).values() for line in lines
+        ))
+
+
+backfill_equipment = import_module('resource_allocation_app.migrations.0013_backfill_allocation_equipment')
+
+EQUIPMENT_TEXTS = [
+    '2 ventilators, oxygen concentrator x3 and Masks (4); 2x Ventilator',
+    '3 buses & 10 boxes of gloves',
+    'reading glasses: 2\n1 x BEDS',
+    'stretcher, 5, 0 tents',
+]
+
+
+class EquipmentParserTests(SimpleTestCase):
+    def test_item_name(self):
+        cases = {
+            'Ventilators': 'Ventilator',
+            '  oxygen   concentrators ': 'oxygen concentrator',
+            'BEDS': 'BED',
+            'buses': 'bus',
+            'boxes of gloves': 'box of gloves',
+            'batteries': 'battery',
+            # Not listed, so kept as typed
+            'glasses': 'glasses',
+            'scissors': 'scissors',
+            'x-ray films': 'x-ray films',
+        }
+        for name, expected in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(item_name(name), expected)
+
+    def test_parse_equipment(self):
+        self.assertEqual(parse_equipment(EQUIPMENT_TEXTS[0]), [
+            ('ventilator', 4), ('oxygen concentrator', 3), ('Mask', 4),
+        ])
+        self.assertEqual(parse_equipment(EQUIPMENT_TEXTS[1]), [('bus', 3), ('box of gloves', 10)])
+        self.assertEqual(parse_equipment(EQUIPMENT_TEXTS[2]), [('reading glasses', 2), ('BED', 1)])
+        # No number counts once, no name or a zero quantity is skipped
+        self.assertEqual(parse_equipment(EQUIPMENT_TEXTS[3]), [('stretcher', 1)])
+        self.assertEqual(parse_equipment(''), [])
+
+    def test_backfill_copy_matches(self):
+        for text in EQUIPMENT_TEXTS:
+            with self.subTest(text=text):
+                self.assertEqual(list(backfill_equipment.parse_equipment(text).values()), parse_equipment(text))
+
+
+class EquipmentStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 1)
+        cls.facility_id = ResourceAllocation.objects.get().health_facility_id
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_backfill(self):
+        allocations = ResourceAllocation.objects.bulk_create([
+            ResourceAllocation(
+                health_facility_id=self.facility_id, equipment=text, specialist=1, duration_in_days=10,
+                start_date=timezone.localdate(), end_date=timezone.localdate() + timedelta(days=10),
+                created_by=self.user,
+            )
+            for text in EQUIPMENT_TEXTS
+        ])
+        AllocationEquipment.objects.all().delete()
+        EquipmentItem.objects.all().delete()
+
+        backfill_equipment.backfill_allocation_equipment(apps, None)
+        ids = list(ResourceAllocation.objects.filter(equipment__in=EQUIPMENT_TEXTS).order_by('id').values_list(
+            'id', flat=True
+        ))
+        self.assertEqual(len(ids), len(allocations))
+        lines = load_equipment_items(ids)
+        self.assertEqual(lines[ids[0]], [
+            {'item': 'Mask', 'quantity': 4},
+            {'item': 'oxygen concentrator', 'quantity': 3},
+            {'item': 'ventilator', 'quantity': 4},
+        ])
+        self.assertEqual(lines[ids[1]], [
+            {'item': 'box of gloves', 'quantity': 10}, {'item': 'bus', 'quantity': 3},
+        ])
+        self.assertEqual(lines[ids[3]], [{'item': 'stretcher', 'quantity': 1}])
+        # One catalog row per item whatever the spelling
+        self.assertEqual(EquipmentItem.objects.filter(name__lower='ventilator').count(), 1)
+
+    def create(self, **fields):
+        response = self.client.post('/resource_allocation/create/', {
+            'health_facility_id': self.facility_id, 'specialist': 1, 'duration_in_days': 7, **fields,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def test_equipment_text_fills_the_items(self):
+        allocation = self.create(equipment='3 Ventilators and 10 boxes of gloves')
+        self.assertEqual(allocation['equipment'], '3 Ventilators and 10 boxes of gloves')
+        self.assertEqual(allocation['equipment_items'], [
+            {'item': 'box of gloves', 'quantity': 10},
+            # Joins the catalog item the fixture created
+            {'item': 'ventilator', 'quantity': 3},
+        ])
+
+    def test_equipment_items_fill_the_text(self):
+        allocation = self.create(equipment_items=[
+            {'item': 'Buses', 'quantity': 2}, {'item': 'oxygen cylinder', 'quantity': 4},
+        ])
+        self.assertEqual(allocation['equipment'], '2 x Buses, 4 x oxygen cylinder')
+        self.assertEqual(allocation['equipment_items'], [
+            {'item': 'Bus', 'quantity': 2}, {'item': 'oxygen cylinder', 'quantity': 4},
+        ])
+
+        response = self.client.put(f"/resource_allocation/update/{allocation['id']}/", {
+            'equipment': '1 bus',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['equipment_items'], [{'item': 'Bus', 'quantity': 1}])
+
+
+backfill_dates = import_module('resource_allocation_app.migrations.0010_backfill_allocation_dates')
+
+
+class IntervalTests(TestCase):
+    DAY = date(2026, 1, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        populate_area(cls.user, 'Gasabo', 'Kimironko', 2)
+        ResourceAllocation.objects.all().delete()
+        cls.first, cls.second = HealthFacility.objects.order_by('id').values_list('id', flat=True)
+        cls.a1 = cls.allocate(cls.first, 0, 5)
+        cls.a2 = cls.allocate(cls.first, 5, 3)
+        cls.a3 = cls.allocate(cls.second, 2, 10)
+        cls.empty = cls.allocate(cls.first, 3, 0)
+
+    @classmethod
+    def allocate(cls, facility_id, offset, days):
+        return ResourceAllocation.objects.create(
+            health_facility_id=facility_id, specialist=1, duration_in_days=days,
+            start_date=cls.DAY + timedelta(days=offset), created_by=cls.user,
+        ).id
+
+    def day(self, offset):
+        return self.DAY + timedelta(days=offset)
+
+    def ids(self, queryset):
+        return sorted(queryset.values_list('id', flat=True))
+
+    def test_active_on_is_half_open(self):
+        self.assertEqual(self.ids(active_on(self.day(-1))), [])
+        self.assertEqual(self.ids(active_on(self.day(0))), [self.a1])
+        self.assertEqual(self.ids(active_on(self.day(3))), [self.a1, self.a3])
+        # a1 ends where a2 starts
+        self.assertEqual(self.ids(active_on(self.day(4))), [self.a1, self.a3])
+        self.assertEqual(self.ids(active_on(self.day(5))), [self.a2, self.a3])
+        self.assertEqual(self.ids(active_on(self.day(12))), [])
+
+    def test_overlapping(self):
+        self.assertEqual(self.ids(overlapping(self.day(-3), self.day(0))), [])
+        self.assertEqual(self.ids(overlapping(self.day(5), self.day(6))), [self.a2, self.a3])
+        self.assertEqual(self.ids(overlapping(self.day(8), self.day(12))), [self.a3])
+        # The empty allocation lies inside this range but is in effect on no day
+        self.assertEqual(self.ids(overlapping(self.day(1), self.day(4))), [self.a1, self.a3])
+        self.assertEqual(
+            self.ids(overlapping(self.day(0), self.day(20), ResourceAllocation.objects.filter(
+                health_facility_id=self.second
+            ))),
+            [self.a3],
+        )
+
+    PROPOSALS = [
+        (0, 4, 6),
+        (0, 5, 7),
+        # Starts where the first proposal ends
+        (0, 6, 8),
+        (1, 5, 6),
+        (0, 5, 5),
+        (0, 8, 9),
+    ]
+    EXPECTED = [
+        {'allocations': ['a1', 'a2'], 'proposals': [1]},
+        {'allocations': ['a2'], 'proposals': [0, 2]},
+        {'allocations': ['a2'], 'proposals': [1]},
+        {'allocations': ['a3'], 'proposals': []},
+        # Empty
+        {'allocations': [], 'proposals': []},
+        # Starts where a2 ends
+        {'allocations': [], 'proposals': []},
+    ]
+
+    def check_conflicts(self):
+        facilities = [self.first, self.second]
+        results = find_conflicts([
+            (facilities[facility], self.day(start), self.day(end)) for facility, start, end in self.PROPOSALS
+        ])
+        self.assertEqual(results, [
+            {'allocations': [getattr(self, name) for name in result['allocations']], 'proposals': result['proposals']}
+            for result in self.EXPECTED
+        ])
+
+    def test_find_conflicts(self):
+        with self.assertNumQueries(1):
+            self.check_conflicts()
+        self.assertEqual(find_conflicts([]), [])
+
+    def test_find_conflicts_in_chunks(self):
+        with mock.patch('resource_allocation_app.intervals.CONFLICT_CHUNK', 1), self.assertNumQueries(2):
+            self.check_conflicts()
+
+    def test_conflicts_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post('/resource_allocation/conflicts/', {'allocations': [
+            {'health_facility_id': self.first, 'start_date': self.day(4), 'duration_in_days': 2},
+            {'health_facility_id': self.first, 'start_date': self.day(5), 'duration_in_days': 1},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [(row['conflicting_allocations'], row['conflicting_proposals']) for row in response.data['results']],
+            [([self.a1, self.a2], [1]), ([self.a2], [0])],
+        )
+
+    def test_date_backfill(self):
+        created_at = datetime(2025, 3, 1, 23, 30, tzinfo=dt_timezone.utc)
+        ResourceAllocation.objects.update(created_at=created_at, start_date=self.DAY, end_date=self.DAY)
+        ResourceAllocation.objects.filter(id=self.a3).update(created_at=created_at + timedelta(hours=1))
+
+        with self.settings(TIME_ZONE='Africa/Kigali'):
+            backfill_dates.backfill_allocation_dates(apps, None)
+        dates = {
+            allocation_id: (start_date, end_date)
+            for allocation_id, start_date, end_date in ResourceAllocation.objects.values_list(
+                'id', 'start_date', 'end_date'
+            )
+        }
+        # Kigali is two hours ahead of UTC
+        self.assertEqual(dates[self.a1], (date(2025, 3, 2), date(2025, 3, 7)))
+        self.assertEqual(dates[self.a3], (date(2025, 3, 2), date(2025, 3, 12)))
+        self.assertEqual(dates[self.empty], (date(2025, 3, 2), date(2025, 3, 2)))
+
+
+class PercentileRankTests(SimpleTestCase):
+    def assert_ranks(self, values, expected):
+        np.testing.assert_allclose(percentile_ranks(np.array(values, dtype=np.float64)), expected)
+
+    def test_ties_share_their_average_rank(self):
+        self.assert_ranks([3, 1, 2, 2], [1, 0, 0.5, 0.5])
+        self.assert_ranks([4, 4, 4], [0.5, 0.5, 0.5])
+        self.assert_ranks([7], [0])
+
+    def test_nan_is_left_out_and_infinity_ranks_highest(self):
+        self.assert_ranks([np.nan, 5, np.inf, 5, 1], [np.nan, 0.5, 1, 0.5, 0])
+        self.assert_ranks([np.nan, np.nan], [np.nan, np.nan])
+        self.assert_ranks([], [])
+
+
+class CoverageGapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        cls.user = make_user()
+        cls.sectors = {
+            name: get_or_create_area('Gasabo', name).sector_id for name in ('Kimironko', 'Remera', 'Kacyiru', 'Gisozi')
+        }
+
+    def test_compute_gaps(self):
+        kimironko, remera, kacyiru, gisozi = (self.sectors[name] for name in ('Kimironko', 'Remera', 'Kacyiru', 'Gisozi'))
+        gaps = compute_gaps(
+            {kimironko: 1000, remera: 1000, kacyiru: 0, gisozi: 2000},
+            # Remera has residents and no capacity, Kacyiru has neither
+            {kimironko: (2, 100), gisozi: (1, 100)},
+            {kimironko: (10, 5, 1000), gisozi: (10, 5, 500)},
+        )
+        self.assertEqual(gaps['sector_ids'], [remera, kimironko, gisozi, kacyiru])
+        rows = {row['sector']: row for row in gaps['results']}
+        self.assertEqual([row['rank'] for row in gaps['results']], [1, 2, 3, 4])
+        self.assertEqual(rows['Remera']['gap_score'], 1.0)
+        self.assertIsNone(rows['Remera']['population_per_capacity'])
+        self.assertIsNone(rows['Remera']['poor_share'])
+        # Ranks 1/3, 1/2 (a tie with Gisozi) and 1
+        self.assertEqual(rows['Kimironko']['gap_score'], round((1 / 3 + 0.5 + 1) / 3, 4))
+        self.assertEqual(rows['Gisozi']['gap_score'], round((2 / 3 + 0.5 + 0) / 3, 4))
+        self.assertEqual(rows['Kacyiru']['gap_score'], 0.0)
+        self.assertEqual(
+            (rows['Gisozi']['population_per_capacity'], rows['Gisozi']['served_per_capacity']), (20.0, 5.0)
+        )
+
+    def test_equal_scores_put_larger_populations_first(self):
+        kimironko, remera = self.sectors['Kimironko'], self.sectors['Remera']
+        gaps = compute_gaps({kimironko: 500, remera: 900}, {kimironko: (1, 50), remera: (1, 90)}, {})
+        self.assertEqual(gaps['sector_ids'], [remera, kimironko])
+
+    def gaps(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/resource_allocation/coverage-gaps/')
+        self.assertEqual(response.status_code, 200, response.data)
+        return {row['sector']: row for row in response.data['results']}
+
+    def test_cached_gaps_follow_facility_and_population_changes(self):
+        populate_area(self.user, 'Gasabo', 'Kimironko', 3)
+        populate_area(self.user, 'Gasabo', 'Remera', 3)
+        cache.clear()
+        self.assertEqual(self.gaps()['Kimironko']['capacity'], 150)
+        self.gaps()
+        self.assertEqual((get_stats(CACHE_GROUP)['hits'], get_stats(CACHE_GROUP)['misses']), (1, 1))
+
+        facility = HealthFacility.objects.filter(sector='Kimironko').order_by('id').first()
+        facility.status = 'CLOSED'
+        with self.captureOnCommitCallbacks(execute=True):
+            facility.save()
+        self.assertEqual(self.gaps()['Kimironko']['capacity'], 100)
+
+        population = PopulationData.objects.get(sector='Remera')
+        population.total_population = 30000
+        population.male_population = population.female_population = 15000
+        population.adult_population += 10000
+        with self.captureOnCommitCallbacks(execute=True):
+            population.save()
+        rows = self.gaps()
+        self.assertEqual(rows['Remera']['population'], 30000)
+        self.assertEqual(rows['Remera']['population_per_capacity'], 200.0)
+        self.assertEqual(get_stats(CACHE_GROUP)['misses'], 3)
+
+        # Without a commit the cached list stays
+        with self.captureOnCommitCallbacks(execute=False):
+            HealthFacility.objects.filter(sector='Remera').first().delete()
+        self.assertEqual(self.gaps()['Remera']['facility_count'], 3)
@@ -8,6 +8,15 @@ from .views import (
     update_allocation,
     delete_allocation,
     get_district_sector_data,
+    get_district_sector_batch_data,
+    get_district_sector_cache_stats,
+    get_coverage_gaps,
+    optimize_allocations,
+    get_active_allocations,
+    get_overlapping_allocations,
+    check_allocation_conflicts,
+    get_equipment_items,
+    get_equipment_totals,
 )
 
 urlpatterns = [
@@ -19,4 +28,13 @@ urlpatterns = [
     path('update/<int:allocation_id>/', update_allocation, name='update_allocation'),
     path('delete/<int:allocation_id>/', delete_allocation, name='delete_allocation'),
     path('district-sector-data/', get_district_sector_data, name='district-sector-data'),
+    path('district-sector-data/batch/', get_district_sector_batch_data, name='district-sector-batch-data'),
+    path('district-sector-data/cache-stats/', get_district_sector_cache_stats, name='district-sector-cache-stats'),
+    path('coverage-gaps/', get_coverage_gaps, name='coverage-gaps'),
+    path('optimize/', optimize_allocations, name='optimize-allocations'),
+    path('active/', get_active_allocations, name='active-allocations'),
+    path('overlapping/', get_overlapping_allocations, name='overlapping-allocations'),
+    path('conflicts/', check_allocation_conflicts, name='allocation-conflicts'),
+    path('equipment-items/', get_equipment_items, name='equipment-items'),
+    path('equipment-totals/', get_equipment_totals, name='equipment-totals'),
 ]
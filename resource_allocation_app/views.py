@@ -4,6 +4,8 @@ from rest_framework import status
 from .models import ResourceAllocation
 from health_facility_app.models import HealthFacility
 from .serializers import ResourceAllocationSerializer
+from backend.streaming import is_streaming_requested, streaming_json_response
+from backend.pagination import paginated_response
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import IntegrityError
 from rest_framework.permissions import IsAuthenticated
@@ -25,7 +27,7 @@ def create_resource_allocation(request):
             return Response({"error": f"Health facility with ID {health_facility_id} does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
         # Prepare serializer
-        serializer = ResourceAllocationSerializer(data=data)
+        serializer = ResourceAllocationSerializer(data=data, context={'request': request})
 
         if serializer.is_valid():
             # Save with the current user as `created_by`
@@ -47,8 +49,9 @@ def create_resource_allocation(request):
 def get_all_allocations(request):
     try:
         allocations = ResourceAllocation.objects.all()
-        serializer = ResourceAllocationSerializer(allocations, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if is_streaming_requested(request):
+            return streaming_json_response(request, allocations, ResourceAllocationSerializer)
+        return paginated_response(request, allocations, ResourceAllocationSerializer)
     except Exception as e:
         return Response({"error": f"Error retrieving allocations: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -58,7 +61,7 @@ def get_all_allocations(request):
 def get_allocation_by_id(request, allocation_id):
     try:
         allocation = ResourceAllocation.objects.get(id=allocation_id)
-        serializer = ResourceAllocationSerializer(allocation)
+        serializer = ResourceAllocationSerializer(allocation, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     except ObjectDoesNotExist:
         return Response({"error": f"Allocation with ID {allocation_id} not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -77,13 +80,12 @@ def get_allocations_by_facility(request):
             return Response({"error": "Facility name is required."}, status=status.HTTP_400_BAD_REQUEST)
 
         # Fetch health facility by name
-        facility = HealthFacility.objects.filter(name__iexact=facility_name).first()
+        facility = HealthFacility.objects.filter(name__lower=facility_name.lower()).first()
         if not facility:
             return Response({"error": f"No health facility found with the name '{facility_name}'."}, status=status.HTTP_404_NOT_FOUND)
 
         allocations = ResourceAllocation.objects.filter(health_facility=facility)
-        serializer = ResourceAllocationSerializer(allocations, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginated_response(request, allocations, ResourceAllocationSerializer)
     except Exception as e:
         return Response({"error": f"Error retrieving allocations: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -93,8 +95,7 @@ def get_allocations_by_facility(request):
 def get_allocations_by_user(request):
     try:
         allocations = ResourceAllocation.objects.filter(created_by=request.user)
-        serializer = ResourceAllocationSerializer(allocations, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return paginated_response(request, allocations, ResourceAllocationSerializer)
     except Exception as e:
         return Response({"error": f"Error retrieving user allocations: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -109,7 +110,7 @@ def update_allocation(request, allocation_id):
         if allocation.created_by != request.user:
             return Response({"error": "You are not authorized to update this allocation."}, status=status.HTTP_403_FORBIDDEN)
 
-        serializer = ResourceAllocationSerializer(allocation, data=request.data, partial=True)
+        serializer = ResourceAllocationSerializer(allocation, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -150,18 +151,20 @@ def delete_allocation(request, allocation_id):
 
 
 
+from datetime import date, timedelta
+from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, Avg
-from disease_incident_app.models import DiseaseIncident
-from population_data_app.models import PopulationData
-from accessiblity_app.models import AccessibilityData
-from accessiblity_app.serializers import AccessibilityDataSerializer
-from population_data_app.serializers import PopulationDataSerializer
-from health_facility_app.serializers import HealthFacilitySerializer
-from disease_incident_app.serializers import DiseaseIncidentSerializer
+from .dashboard import get_area_payload, get_area_payloads, get_cache_stats
+from .coverage import cached_coverage_gaps
+from .optimizer import plan_allocation, commit_plan
+from .serializers import AllocationPlanSerializer, ProposedAllocationSerializer
+from .intervals import scope_allocations, overlapping, active_on, find_conflicts
+from .equipment import GROUP_COLUMNS, equipment_totals
+from .models import EquipmentItem
+from geography_app.resolver import resolve_district, resolve_sector, resolve_sector_ids, district_sector_ids
 
 
 @api_view(['GET'])
@@ -184,83 +187,56 @@ def get_district_sector_data(request):
         )
     
     try:
-        # Get population data
-        population_data = PopulationData.objects.filter(
-            district=district,
-            sector=sector
-        ).first()
-        
-        # Get health facilities
-        health_facilities = HealthFacility.objects.filter(
-            district=district,
-            sector=sector
-        )
-        
-        # Group the health facilities by their type
-        grouped_health_facilities = {}
-        for facility in health_facilities:
-            if facility.facility_type not in grouped_health_facilities:
-                grouped_health_facilities[facility.facility_type] = []
-            grouped_health_facilities[facility.facility_type].append(facility)
-
-        # Get accessibility data for all health facilities in the area
-        accessibility_data = AccessibilityData.objects.filter(
-            health_facility__district=district,
-            health_facility__sector=sector
-        )
+        response_data = get_area_payload(district, sector)
+        return Response(response_data, status=status.HTTP_200_OK)
         
-        # Get disease incidents
-        disease_incidents = DiseaseIncident.objects.filter(
-            health_facility__district=district,
-            health_facility__sector=sector
+    except Exception as e:
+        return Response(
+            {"error": f"An error occurred: {str(e)}"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
-        
-        # Get resource allocations
-        resource_allocations = ResourceAllocation.objects.filter(
-            health_facility__district=district,
-            health_facility__sector=sector
+
+
+MAX_BATCH_AREAS = 100
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def get_district_sector_batch_data(request):
+    """
+    Get the district/sector payload for many areas in one request.
+    
+    Request body, one of:
+    - areas: list of {"district": ..., "sector": ...} objects
+    - district: District name, to return every sector in that district
+    """
+    areas = request.data.get('areas')
+    district = request.data.get('district')
+    
+    if not areas and not district:
+        return Response(
+            {"error": "Either an areas list or a district is required"},
+            status=status.HTTP_400_BAD_REQUEST
         )
-        
-        # Calculate aggregated statistics
-        total_facility_capacity = health_facilities.aggregate(
-            total_capacity=Sum('capacity')
-        )['total_capacity'] or 0
-        
-        avg_travel_time = accessibility_data.aggregate(
-            avg_time=Avg('avg_travel_time')
-        )['avg_time'] or 0
-        
-        # Prepare the response data
-        response_data = {
-            'district': district,
-            'sector': sector,
-            'population_data': PopulationDataSerializer(population_data).data if population_data else None,
-            'health_facilities': {
-                'total_count': health_facilities.count(),
-                'total_capacity': total_facility_capacity,
-                'grouped_by_type': {
-                    facility_type: HealthFacilitySerializer(facilities, many=True).data
-                    for facility_type, facilities in grouped_health_facilities.items()
-                }
-            },
-            'accessibility_metrics': {
-                'average_travel_time': round(avg_travel_time, 2),
-                'detailed_data': AccessibilityDataSerializer(accessibility_data, many=True).data
-            },
-            'disease_incidents': {
-                'total_count': disease_incidents.count(),
-                'incidents': DiseaseIncidentSerializer(disease_incidents, many=True).data
-            },
-            'resource_allocations': {
-                'total_count': resource_allocations.count(),
-                'allocations': ResourceAllocationSerializer(resource_allocations, many=True).data
-            }
-        }
-        
-        # Print the response data to the terminal
-        print(response_data)
-        
-        return Response(response_data, status=status.HTTP_200_OK)
+    
+    if areas:
+        if not isinstance(areas, list) or len(areas) > MAX_BATCH_AREAS:
+            return Response(
+                {"error": f"areas must be a list of at most {MAX_BATCH_AREAS} district/sector pairs"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            areas = list(dict.fromkeys((area['district'], area['sector']) for area in areas))
+        except (KeyError, TypeError):
+            return Response(
+                {"error": "Each area must have a district and a sector"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        district = None
+    
+    try:
+        payloads = get_area_payloads(areas=areas, district=district)
+        return Response({"areas": list(payloads.values())}, status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response(
@@ -269,6 +245,58 @@ def get_district_sector_data(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_district_sector_cache_stats(request):
+    """
+    Hit/miss counters for the cached district/sector payloads.
+    """
+    return Response(get_cache_stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_coverage_gaps(request):
+    """
+    Sectors ranked from worst to best served by population per unit of
+    facility capacity, share of POOR accessibility ratings and people served
+    per unit of capacity (see coverage.py).
+
+    Optional query parameters:
+    - district, sector: only list these sectors (ranks stay national)
+    - limit: at most this many sectors
+    """
+    params = request.query_params
+    limit = params.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return Response({'error': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        gaps = cached_coverage_gaps()
+        sector_ids = None
+        if params.get('district') and params.get('sector'):
+            sector_ids = {resolve_sector(params['district'], params['sector'])}
+        elif params.get('district'):
+            sector_ids = set(district_sector_ids(resolve_district(params['district'])))
+        elif params.get('sector'):
+            sector_ids = set(resolve_sector_ids(params['sector']))
+
+        results = gaps['results']
+        if sector_ids is not None:
+            results = [row for row, sector_id in zip(results, gaps['sector_ids']) if sector_id in sector_ids]
+        return Response({'count': len(results), 'results': results[:limit]}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to compute coverage gaps: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 
 
 
@@ -400,4 +428,221 @@ def get_district_sector_data(request):
         
         
         
-    
\ No newline at end of file
+    
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def optimize_allocations(request):
+    """
+    Spread a budget of specialists over the ACTIVE facilities by active
+    case load and catchment population, net of the specialists already
+    allocated to them (see optimizer.py).
+
+    Request body:
+    - budget: number of specialists to allocate
+    - case_weight, population_weight: weight of an active case and of 1000
+      catchment residents (default 1 each)
+    - max_per_facility: optional cap on the specialists added per facility
+    - district: optional, only plan for that district's facilities
+    - start_date: optional, when the allocations start (default today)
+    - commit: when true, create the proposed allocations for
+      duration_in_days with the given equipment
+    """
+    serializer = AllocationPlanSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    params = serializer.validated_data
+
+    district_id = None
+    if params.get('district'):
+        district_id = resolve_district(params['district'])
+        if district_id is None:
+            return Response({'error': 'District not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        plan = plan_allocation(
+            params['budget'], params['case_weight'], params['population_weight'],
+            params.get('max_per_facility'), district_id, params.get('start_date'),
+        )
+        plan['committed'] = False
+        if params['commit']:
+            commit_plan(
+                plan['plan'], request.user, params['duration_in_days'], params['equipment'], params.get('start_date')
+            )
+            plan['committed'] = True
+        return Response(plan, status=status.HTTP_201_CREATED if plan['committed'] else status.HTTP_200_OK)
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to plan allocations: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+MAX_CONFLICT_PROPOSALS = 5000
+
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value), None
+    except (TypeError, ValueError):
+        return None, Response({'error': f'{name} must be a date as YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _scoped(request, queryset):
+    params = request.query_params
+    facility = params.get('facility')
+    return scope_allocations(
+        queryset, int(facility) if facility else None, params.get('district'), params.get('sector')
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_active_allocations(request):
+    """
+    Allocations in effect on a day.
+
+    Query parameters:
+    - date: YYYY-MM-DD, default today
+    - facility (id), district, sector: optional scope
+    """
+    day = timezone.localdate()
+    if request.query_params.get('date'):
+        day, error = _parse_date(request.query_params['date'], 'date')
+        if error:
+            return error
+    try:
+        return paginated_response(request, _scoped(request, active_on(day)), ResourceAllocationSerializer)
+    except ValueError:
+        return Response({'error': 'facility must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': f'Error retrieving allocations: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_overlapping_allocations(request):
+    """
+    Allocations in effect on at least one day from start up to, but not
+    including, end.
+
+    Query parameters:
+    - start, end: YYYY-MM-DD
+    - facility (id), district, sector: optional scope
+    """
+    start, error = _parse_date(request.query_params.get('start'), 'start')
+    if error:
+        return error
+    end, error = _parse_date(request.query_params.get('end'), 'end')
+    if error:
+        return error
+    if end <= start:
+        return Response({'error': 'end must be after start'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        return paginated_response(request, _scoped(request, overlapping(start, end)), ResourceAllocationSerializer)
+    except ValueError:
+        return Response({'error': 'facility must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': f'Error retrieving allocations: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def check_allocation_conflicts(request):
+    """
+    Check a batch of proposed allocations against the existing ones and
+    each other.
+
+    Request body:
+    - allocations: list of {"health_facility_id", "start_date" (default
+      today), "duration_in_days"}
+
+    Every proposal comes back with the ids of the existing allocations at
+    its facility that overlap it and the positions of the overlapping
+    proposals in the batch.
+    """
+    proposals = request.data.get('allocations')
+    if not isinstance(proposals, list) or len(proposals) > MAX_CONFLICT_PROPOSALS:
+        return Response(
+            {'error': f'allocations must be a list of at most {MAX_CONFLICT_PROPOSALS} proposals'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    serializer = ProposedAllocationSerializer(data=proposals, many=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        today = timezone.localdate()
+        rows = []
+        for proposal in serializer.validated_data:
+            start_date = proposal.get('start_date') or today
+            rows.append((
+                proposal['health_facility_id'], start_date, start_date + timedelta(days=proposal['duration_in_days'])
+            ))
+        results = []
+        for (facility_id, start_date, end_date), conflicts in zip(rows, find_conflicts(rows)):
+            results.append({
+                'health_facility_id': facility_id,
+                'start_date': start_date,
+                'end_date': end_date,
+                'conflicts': bool(conflicts['allocations'] or conflicts['proposals']),
+                'conflicting_allocations': conflicts['allocations'],
+                'conflicting_proposals': conflicts['proposals'],
+            })
+        return Response(
+            {'conflicts': sum(result['conflicts'] for result in results), 'results': results},
+            status=status.HTTP_200_OK
+        )
+    except Exception as e:
+        return Response({'error': f'Failed to check conflicts: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_equipment_items(request):
+    """
+    The equipment catalog.
+    """
+    try:
+        return paginated_response(request, EquipmentItem.objects.values('id', 'name', 'created_at'))
+    except Exception as e:
+        return Response({'error': f'Error retrieving equipment items: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_equipment_totals(request):
+    """
+    Allocated equipment quantities from one GROUP BY over the line items.
+
+    Query parameters:
+    - group_by: comma-separated item, facility, district, sector (default item)
+    - item, facility (id), district, sector: optional filters
+    - date: YYYY-MM-DD, only count allocations active on that day
+    """
+    params = request.query_params
+    group_by = [name.strip() for name in params.get('group_by', 'item').split(',') if name.strip()]
+    unknown = [name for name in group_by if name not in GROUP_COLUMNS]
+    if not group_by or unknown or len(set(group_by)) != len(group_by):
+        return Response(
+            {'error': f'group_by must list distinct values from: {", ".join(GROUP_COLUMNS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    day = None
+    if params.get('date'):
+        day, error = _parse_date(params['date'], 'date')
+        if error:
+            return error
+    try:
+        facility = int(params['facility']) if params.get('facility') else None
+    except ValueError:
+        return Response({'error': 'facility must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        results = equipment_totals(
+            group_by, params.get('item'), facility, params.get('district'), params.get('sector'), day
+        )
+        return Response({'group_by': group_by, 'results': results}, status=status.HTTP_200_OK)
+    except Exception as e:
+        return Response({'error': f'Failed to total equipment: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,176 @@
+"""
+In-process trigram index over SearchTerm.
+
+Each worker keeps the active facility and disease names in memory with a
+posting list per trigram, so a query is matched by counting shared
+trigrams instead of scanning rows with LIKE '%...%'. A name scores by how
+many of the query's trigrams it contains, much like pg_trgm's word
+similarity, which tolerates typos and missing letters.
+
+Signal handlers bump a cache version when terms change. A worker that sees
+a new version reads only the rows updated since its last load.
+"""
+import math
+import re
+import threading
+from collections import Counter
+from datetime import timedelta
+from heapq import nlargest
+from django.db import transaction
+from django.utils import timezone
+from backend.cache import get_version, bump_version
+from .models import SearchTerm
+
+SEARCH_NAMESPACE = 'search-terms'
+
+# Re-read rows stamped this long before the last load, in case they were
+# committed after it
+RELOAD_OVERLAP = timedelta(minutes=5)
+
+# Share of the query's trigrams a name must contain to match
+MIN_COVERAGE = 0.45
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize(text):
+    return _whitespace.sub(' ', text).strip().lower()
+
+
+def trigrams(text):
+    # Each word is padded like pg_trgm does, so word starts weigh more
+    grams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    def __init__(self):
+        # kind -> {key: (text, normalized text, trigrams)}
+        self.terms = {}
+        # kind -> {trigram: set of keys}
+        self.postings = {}
+        self.lock = threading.Lock()
+
+    def _add(self, kind, key, text):
+        self._remove(kind, key)
+        normalized = normalize(text)
+        grams = trigrams(normalized)
+        self.terms.setdefault(kind, {})[key] = (text, normalized, grams)
+        postings = self.postings.setdefault(kind, {})
+        for gram in grams:
+            postings.setdefault(gram, set()).add(key)
+
+    def _remove(self, kind, key):
+        entry = self.terms.get(kind, {}).pop(key, None)
+        if entry is None:
+            return
+        postings = self.postings[kind]
+        for gram in entry[2]:
+            postings[gram].discard(key)
+            if not postings[gram]:
+                del postings[gram]
+
+    def apply(self, rows):
+        """
+        Apply (kind, key, text, active) rows, in updated_at order.
+        """
+        with self.lock:
+            for kind, key, text, active in rows:
+                if active:
+                    self._add(kind, key, text)
+                else:
+                    self._remove(kind, key)
+
+    def search(self, kind, query, limit):
+        """
+        Best matches of one kind as (score, key, text), best first. A name
+        equal to the query scores 1 and one containing it at least 0.9.
+        """
+        needle = normalize(query)
+        grams = trigrams(needle)
+        if not grams:
+            return []
+
+        with self.lock:
+            terms, postings = self.terms.get(kind, {}), self.postings.get(kind, {})
+            lists = sorted((postings.get(gram, frozenset()) for gram in grams), key=len)
+            # A name that reaches MIN_COVERAGE must contain at least one of the
+            # rarest trigrams, so candidates come from their short posting
+            # lists and the common trigrams are only checked against them
+            needed = math.ceil(MIN_COVERAGE * len(grams))
+            probe = len(grams) - needed + 1
+            shared = Counter()
+            for keys in lists[:probe]:
+                shared.update(keys)
+            for keys in lists[probe:]:
+                shared.update(keys.intersection(shared))
+
+            matches = []
+            for key, count in shared.items():
+                coverage = count / len(grams)
+                if coverage < MIN_COVERAGE:
+                    continue
+                text, normalized, term_grams = terms[key]
+                similarity = count / (len(grams) + len(term_grams) - count)
+                score = 0.7 * coverage + 0.3 * similarity
+                if normalized == needle:
+                    score = 1.0
+                elif needle in normalized:
+                    score = max(score, 0.9)
+                matches.append((round(score, 4), similarity, key, text))
+
+        best = nlargest(limit, matches, key=lambda match: (match[0], match[1]))
+        return [(score, key, text) for score, _, key, text in best]
+
+    def containing(self, kind, text):
+        """
+        Keys of the names of one kind that contain `text`, case-insensitively,
+        the same rows icontains would match.
+        """
+        needle = normalize(text)
+        with self.lock:
+            return [key for key, (_, normalized, _) in self.terms.get(kind, {}).items() if needle in normalized]
+
+
+_loaded = (None, None, None)
+_load_lock = threading.Lock()
+
+
+def invalidate_terms():
+    # Workers reload once the change is visible to them
+    transaction.on_commit(lambda: bump_version(SEARCH_NAMESPACE))
+
+
+def get_index():
+    global _loaded
+    version = get_version(SEARCH_NAMESPACE)
+    loaded_version, loaded_at, index = _loaded
+    if loaded_version == version:
+        return index
+
+    with _load_lock:
+        loaded_version, loaded_at, index = _loaded
+        if loaded_version == version:
+            return index
+        started = timezone.now()
+        rows = SearchTerm.objects.order_by('updated_at', 'id')
+        if index is None:
+            index = TrigramIndex()
+            rows = rows.filter(active=True)
+        else:
+            rows = rows.filter(updated_at__gte=loaded_at - RELOAD_OVERLAP)
+        index.apply(rows.values_list('kind', 'key', 'text', 'active').iterator(chunk_size=2000))
+        _loaded = (version, started, index)
+    return index
+
+
+def facility_ids_containing(text):
+    return [int(key) for key in get_index().containing('FACILITY', text)]
+
+
+def disease_names_containing(text):
+    # Keys are lower-cased names, for disease_name__lower__in
+    return get_index().containing('DISEASE', text)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from search_app.index import invalidate_terms
+from search_app.models import SearchTerm
+
+
+class Command(BaseCommand):
+    help = 'Recompute the facility and disease names searched by /search/'
+
+    def handle(self, *args, **options):
+        count = SearchTerm.rebuild_all()
+        invalidate_terms()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} search terms.'))
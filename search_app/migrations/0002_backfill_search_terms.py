@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import Min
+from django.db.models.functions import Lower
+
+
+def backfill_search_terms(apps, schema_editor):
+    SearchTerm = apps.get_model('search_app', 'SearchTerm')
+    HealthFacility = apps.get_model('health_facility_app', 'HealthFacility')
+    DiseaseIncident = apps.get_model('disease_incident_app', 'DiseaseIncident')
+
+    SearchTerm.objects.bulk_create(
+        (
+            SearchTerm(kind='FACILITY', key=str(facility_id), text=name)
+            for facility_id, name in HealthFacility.objects.values_list('id', 'name')
+        ),
+        batch_size=1000,
+    )
+    SearchTerm.objects.bulk_create(
+        (
+            SearchTerm(kind='DISEASE', key=row['key'], text=row['text'].strip())
+            for row in DiseaseIncident.objects.values(key=Lower('disease_name')).annotate(
+                text=Min('disease_name')
+            ).order_by()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search_app', '0001_initial'),
+        ('health_facility_app', '0006_alter_healthfacility_district_ref_and_more'),
+        ('disease_incident_app', '0008_diseaseincident_incident_disease_ci_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+from django.db import models
+from django.utils import timezone
+
+
+# Facility and disease names searched by /search/ (see index.py). Rows are
+# deactivated rather than deleted, so workers can catch up by reading only
+# the rows updated since their last load.
+class SearchTerm(models.Model):
+    KIND_CHOICES = [
+        ('FACILITY', 'Facility'),
+        ('DISEASE', 'Disease'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Facility id for facilities, lower-cased disease_name for diseases
+    key = models.CharField(max_length=255)
+    text = models.CharField(max_length=255)
+    active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        unique_together = ['kind', 'key']
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.text}"
+
+    @classmethod
+    def rebuild_all(cls):
+        """
+        Recompute every term from HealthFacility and DiseaseIncident.
+        """
+        from django.db.models import Min
+        from django.db.models.functions import Lower
+        from backend.bulk import bulk_upsert
+        from health_facility_app.models import HealthFacility
+        from disease_incident_app.models import DiseaseIncident
+
+        started = timezone.now()
+        terms = [
+            cls(kind='FACILITY', key=str(facility_id), text=name)
+            for facility_id, name in HealthFacility.objects.values_list('id', 'name')
+        ]
+        terms.extend(
+            cls(kind='DISEASE', key=row['key'], text=row['text'].strip())
+            for row in DiseaseIncident.objects.values(key=Lower('disease_name')).annotate(
+                text=Min('disease_name')
+            ).order_by()
+        )
+        bulk_upsert(cls, terms, ['kind', 'key'], ['text', 'active', 'updated_at'], batch_size=1000)
+        # Whatever the upsert didn't touch no longer exists
+        cls.objects.filter(active=True, updated_at__lt=started).update(active=False, updated_at=timezone.now())
+        return len(terms)
@@ -0,0 +1,95 @@
+import threading
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from backend.bulk import bulk_upsert
+from backend.signals import post_bulk_create
+from health_facility_app.models import HealthFacility
+from disease_incident_app.models import DiseaseIncident
+from .index import invalidate_terms
+from .models import SearchTerm
+
+# Disease keys that may have lost their last incident in this thread. They are
+# checked once, after commit, instead of once per deleted incident.
+_pending = threading.local()
+
+
+def _pending_disease_keys():
+    if not hasattr(_pending, 'keys'):
+        _pending.keys = set()
+    return _pending.keys
+
+
+def _retire_unused_diseases():
+    keys, _pending.keys = _pending_disease_keys(), set()
+    unused = [key for key in keys if not DiseaseIncident.objects.filter(disease_name__lower=key).exists()]
+    if unused and SearchTerm.objects.filter(kind='DISEASE', key__in=unused, active=True).update(
+        active=False, updated_at=timezone.now()
+    ):
+        invalidate_terms()
+
+
+def _check_disease_later(key):
+    _pending_disease_keys().add(key)
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _retire_unused_diseases()
+        return
+
+    # A rolled back savepoint discards its hooks, so check the hook is still queued
+    scheduled = any(hook[1] is _retire_unused_diseases for hook in connection.run_on_commit)
+    if not scheduled:
+        transaction.on_commit(_retire_unused_diseases)
+
+
+def _ensure_diseases(names):
+    terms = {name.lower(): name.strip() for name in names}
+    known = set(SearchTerm.objects.filter(kind='DISEASE', key__in=terms, active=True).values_list('key', flat=True))
+    missing = [SearchTerm(kind='DISEASE', key=key, text=text) for key, text in terms.items() if key not in known]
+    if missing:
+        bulk_upsert(SearchTerm, missing, ['kind', 'key'], ['text', 'active', 'updated_at'])
+        invalidate_terms()
+
+
+@receiver(post_save, sender=HealthFacility)
+def index_facility(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    SearchTerm.objects.update_or_create(
+        kind='FACILITY', key=str(instance.pk), defaults={'text': instance.name, 'active': True}
+    )
+    invalidate_terms()
+
+
+@receiver(post_delete, sender=HealthFacility)
+def unindex_facility(sender, instance, **kwargs):
+    SearchTerm.objects.filter(kind='FACILITY', key=str(instance.pk)).update(active=False, updated_at=timezone.now())
+    invalidate_terms()
+
+
+@receiver(pre_save, sender=DiseaseIncident)
+def remember_disease_name(sender, instance, **kwargs):
+    instance._indexed_disease = None
+    if instance.pk and not instance._state.adding:
+        instance._indexed_disease = sender.objects.filter(pk=instance.pk).values_list(
+            'disease_name', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=DiseaseIncident)
+def index_disease(sender, instance, **kwargs):
+    _ensure_diseases([instance.disease_name])
+    previous = getattr(instance, '_indexed_disease', None)
+    if previous and previous.lower() != instance.disease_name.lower():
+        _check_disease_later(previous.lower())
+
+
+@receiver(post_bulk_create, sender=DiseaseIncident)
+def index_created_diseases(sender, objs, **kwargs):
+    _ensure_diseases({incident.disease_name for incident in objs})
+
+
+@receiver(post_delete, sender=DiseaseIncident)
+def unindex_disease(sender, instance, **kwargs):
+    _check_disease_later(instance.disease_name.lower())
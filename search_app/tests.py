@@ -0,0 +1,74 @@
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+from backend.testing import make_user, populate_area
+from disease_incident_app.models import DiseaseIncident
+from health_facility_app.models import HealthFacility
+from .models import SearchTerm
+
+
+# As on MySQL, whose ON DUPLICATE KEY UPDATE takes no unique fields
+def without_conflict_target():
+    return mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False)
+
+
+# Backends without any upsert update the existing rows by primary key
+def without_upsert():
+    return mock.patch.multiple(
+        connection.features, supports_update_conflicts=False, supports_update_conflicts_with_target=False
+    )
+
+
+class SearchTermUpsertTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        populate_area(self.user, 'Gasabo', 'Kimironko', 3)
+        self.facility = HealthFacility.objects.order_by('id').first()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_incident(self, disease_name):
+        response = self.client.post('/incident/add/', {
+            'disease_name': disease_name, 'health_facility_id': self.facility.id,
+            'number_of_cases': 2, 'status': 'ACTIVE',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_new_disease_is_indexed_without_a_conflict_target(self):
+        with without_conflict_target():
+            self.add_incident('Cholera')
+        term = SearchTerm.objects.get(kind='DISEASE', key='cholera')
+        self.assertEqual((term.text, term.active), ('Cholera', True))
+
+    def test_retired_disease_is_reactivated_without_upsert(self):
+        with without_conflict_target():
+            self.add_incident('Cholera')
+        term = SearchTerm.objects.get(kind='DISEASE', key='cholera')
+        SearchTerm.objects.filter(pk=term.pk).update(active=False)
+
+        with without_upsert():
+            self.add_incident('cholera ')
+        reactivated = SearchTerm.objects.get(kind='DISEASE', key='cholera')
+        self.assertEqual(reactivated.pk, term.pk)
+        self.assertTrue(reactivated.active)
+        self.assertGreater(reactivated.updated_at, term.updated_at)
+
+    def test_rebuild_all_without_upsert(self):
+        with without_conflict_target():
+            SearchTerm.rebuild_all()
+        ids = dict(SearchTerm.objects.values_list('key', 'id'))
+        # Changed behind the signals' back
+        HealthFacility.objects.filter(pk=self.facility.pk).update(name='Remera Hospital')
+        DiseaseIncident.objects.update(disease_name='Dengue')
+
+        with without_upsert():
+            self.assertEqual(SearchTerm.rebuild_all(), 4)
+        terms = {key: (pk, text, active) for key, pk, text, active in SearchTerm.objects.values_list(
+            'key', 'id', 'text', 'active'
+        )}
+        self.assertEqual(terms[str(self.facility.pk)], (ids[str(self.facility.pk)], 'Remera Hospital', True))
+        self.assertEqual(terms['malaria'], (ids['malaria'], 'Malaria', False))
+        self.assertEqual(terms['dengue'][1:], ('Dengue', True))
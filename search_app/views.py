@@ -0,0 +1,87 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from health_facility_app.models import HealthFacility
+from health_facility_app.serializers import HealthFacilitySerializer
+from disease_incident_app.models import DiseaseIncident
+from disease_incident_app.serializers import DiseaseIncidentSerializer
+from .index import get_index
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Diseases whose incidents are listed
+MAX_DISEASES = 5
+TYPES = ('facility', 'incident')
+
+
+def _search_facilities(index, query, limit):
+    matches = index.search('FACILITY', query, limit)
+    facilities = HealthFacility.objects.in_bulk([int(key) for _, key, _ in matches])
+    # Facilities deleted since the index was loaded are skipped
+    found = [(score, facilities[int(key)]) for score, key, _ in matches if int(key) in facilities]
+    items = HealthFacilitySerializer([facility for _, facility in found], many=True, fields=set(), expand=set()).data
+    return [{**item, 'score': score} for (score, _), item in zip(found, items)]
+
+
+def _search_incidents(index, query, limit):
+    diseases = index.search('DISEASE', query, MAX_DISEASES)
+    ranked = []
+    for score, key, _ in diseases:
+        latest = DiseaseIncident.objects.filter(disease_name__lower=key).order_by('-created_at')[:limit]
+        ranked.extend((score, incident) for incident in latest)
+    ranked.sort(key=lambda match: (match[0], match[1].created_at), reverse=True)
+
+    ranked = ranked[:limit]
+    items = DiseaseIncidentSerializer([incident for _, incident in ranked], many=True, fields=set(), expand=set()).data
+    results = [{**item, 'score': score} for (score, _), item in zip(ranked, items)]
+    return [{'name': text, 'score': score} for score, _, text in diseases], results
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search(request):
+    """
+    Rank facilities by name and incidents by disease name for ?q=. Matching
+    tolerates typos; ?type=facility or ?type=incident searches one of them
+    and ?limit= caps each list.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    search_type = request.query_params.get('type')
+    if search_type and search_type not in TYPES:
+        return Response(
+            {'error': f'Invalid type: {search_type}. Use facility or incident'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        return Response(
+            {'error': f'limit must be an integer between 1 and {MAX_LIMIT}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        index = get_index()
+        facilities, diseases, incidents = [], [], []
+        if search_type in (None, 'facility'):
+            facilities = _search_facilities(index, query, limit)
+        if search_type in (None, 'incident'):
+            diseases, incidents = _search_incidents(index, query, limit)
+        return Response({
+            'query': query,
+            'facilities': facilities,
+            'diseases': diseases,
+            'incidents': incidents,
+        })
+    except Exception as e:
+        return Response(
+            {'error': f'Failed to search: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
@@ -231,6 +231,8 @@ from rest_framework.response import Response
 from .models import CustomUser
 from django.core.exceptions import ObjectDoesNotExist
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from backend.streaming import is_streaming_requested, streaming_json_response
+from backend.pagination import paginated_response
 
 
 
@@ -319,7 +321,9 @@ def list_all_users(request):
     users = CustomUser.objects.all().values(
         'id', 'phone_number', 'email', 'role', 'created_at',
     )
-    return Response({"users": list(users)}, status=200)
+    if is_streaming_requested(request):
+        return streaming_json_response(request, users, wrap_key='users')
+    return paginated_response(request, users, results_key='users')
 
 
 